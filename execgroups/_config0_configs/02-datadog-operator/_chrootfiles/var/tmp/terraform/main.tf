@@ -16,6 +16,18 @@ variable "aws_default_region" {
   default     = "us-east-1"
 }
 
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
 # Terraform configuration
 terraform {
   required_providers {
@@ -39,9 +51,17 @@ provider "aws" {
   region = var.aws_default_region
 }
 
-# Get EKS cluster information
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
 data "aws_eks_cluster" "cluster" {
-  name = var.eks_cluster
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].certificate_authority[0].data : var.eks_cluster_ca_data
 }
 
 data "aws_eks_cluster_auth" "cluster" {
@@ -50,15 +70,15 @@ data "aws_eks_cluster_auth" "cluster" {
 
 # Configure Kubernetes provider with EKS credentials
 provider "kubernetes" {
-  host                   = data.aws_eks_cluster.cluster.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.cluster.token
 }
 
 provider "helm" {
   kubernetes {
-    host                   = data.aws_eks_cluster.cluster.endpoint
-    cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+    host                   = local.cluster_endpoint
+    cluster_ca_certificate = base64decode(local.cluster_ca_data)
     token                  = data.aws_eks_cluster_auth.cluster.token
   }
 }
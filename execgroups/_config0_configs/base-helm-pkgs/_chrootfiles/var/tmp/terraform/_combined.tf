@@ -31,8 +31,17 @@ provider "aws" {
   }
 }
 
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
 data "aws_eks_cluster" "eks" {
-  name = var.eks_cluster
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.eks[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.eks[0].certificate_authority[0].data : var.eks_cluster_ca_data
 }
 
 data "aws_eks_cluster_auth" "eks" {
@@ -40,19 +49,44 @@ data "aws_eks_cluster_auth" "eks" {
 }
 
 provider "kubernetes" {
-  host                   = data.aws_eks_cluster.eks.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.eks.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.eks.token
 }
 
 provider "helm" {
   kubernetes = {
-    host                   = data.aws_eks_cluster.eks.endpoint
-    cluster_ca_certificate = base64decode(data.aws_eks_cluster.eks.certificate_authority[0].data)
+    host                   = local.cluster_endpoint
+    cluster_ca_certificate = base64decode(local.cluster_ca_data)
     token                  = data.aws_eks_cluster_auth.eks.token
   }
 }
 
+# Charts come from tools/chart_mirror.py when chart_repo_url is set, as
+# direct tarball urls so no repo index is downloaded on apply
+locals {
+  chart_mirror = var.chart_repo_url == null ? null : trimsuffix(var.chart_repo_url, "/")
+
+  # versions tools/chart_mirror.py puts into the mirror; the public
+  # repos stay unpinned unless a *_chart_version is given, so clusters
+  # already on a newer chart are not downgraded
+  mirror_chart_versions = {
+    metrics_server_chart_version = "3.12.1"
+    prometheus_chart_version     = "25.21.0"
+    grafana_chart_version        = "7.3.11"
+  }
+
+  metrics_server_chart_version = var.metrics_server_chart_version != null ? var.metrics_server_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.metrics_server_chart_version
+  )
+  prometheus_chart_version = var.prometheus_chart_version != null ? var.prometheus_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.prometheus_chart_version
+  )
+  grafana_chart_version = var.grafana_chart_version != null ? var.grafana_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.grafana_chart_version
+  )
+}
+
 resource "kubernetes_namespace" "monitoring" {
   count = var.install_prometheus_grafana ? 1 : 0
   
@@ -66,8 +100,9 @@ resource "helm_release" "metrics_server" {
   
   name       = "metrics-server"
   namespace  = "kube-system"
-  repository = "https://kubernetes-sigs.github.io/metrics-server/"
-  chart      = "metrics-server"
+  repository = local.chart_mirror == null ? "https://kubernetes-sigs.github.io/metrics-server/" : null
+  chart      = local.chart_mirror == null ? "metrics-server" : "${local.chart_mirror}/metrics-server-${local.metrics_server_chart_version}.tgz"
+  version    = local.metrics_server_chart_version
   
   values = [
     <<-EOT
@@ -86,8 +121,9 @@ resource "helm_release" "prometheus" {
   
   name       = "prometheus"
   namespace  = kubernetes_namespace.monitoring[0].metadata[0].name
-  repository = "https://prometheus-community.github.io/helm-charts"
-  chart      = "prometheus"
+  repository = local.chart_mirror == null ? "https://prometheus-community.github.io/helm-charts" : null
+  chart      = local.chart_mirror == null ? "prometheus" : "${local.chart_mirror}/prometheus-${local.prometheus_chart_version}.tgz"
+  version    = local.prometheus_chart_version
   
   values = [
     <<-EOT
@@ -111,8 +147,9 @@ resource "helm_release" "grafana" {
   
   name       = "grafana"
   namespace  = kubernetes_namespace.monitoring[0].metadata[0].name
-  repository = "https://grafana.github.io/helm-charts"
-  chart      = "grafana"
+  repository = local.chart_mirror == null ? "https://grafana.github.io/helm-charts" : null
+  chart      = local.chart_mirror == null ? "grafana" : "${local.chart_mirror}/grafana-${local.grafana_chart_version}.tgz"
+  version    = local.grafana_chart_version
   
   values = [
     <<-EOT
@@ -183,6 +220,18 @@ variable "eks_cluster" {
   description = "EKS cluster name"
 }
 
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
 variable "install_prometheus_grafana" {
   type        = bool
   description = "Whether to install Prometheus and Grafana"
@@ -210,3 +259,27 @@ variable "grafana_admin_password" {
   sensitive   = true
   default     = "admin"
 }
+
+variable "chart_repo_url" {
+  type        = string
+  description = "Chart mirror (tools/chart_mirror.py) holding <chart>-<version>.tgz; the public repos are used when null"
+  default     = null
+}
+
+variable "metrics_server_chart_version" {
+  type        = string
+  description = "Version of the metrics-server chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
+
+variable "prometheus_chart_version" {
+  type        = string
+  description = "Version of the prometheus chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
+
+variable "grafana_chart_version" {
+  type        = string
+  description = "Version of the grafana chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
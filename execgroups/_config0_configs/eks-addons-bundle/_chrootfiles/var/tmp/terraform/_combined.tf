@@ -0,0 +1,348 @@
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+####FILE####:::provider.tf
+
+# base-helm-pkgs, external-dns-addon, install-argocd-crds and
+# install-argocd as modules of one root: one init, one set of provider
+# connections and one cluster lookup, and tofu applies the add-ons in
+# parallel.  modules/ is generated by tools/addons_bundle.py.
+terraform {
+  required_version = ">= 1.7.0"
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+    kubernetes = {
+      source  = "hashicorp/kubernetes"
+      version = ">= 2.20"
+    }
+    helm = {
+      source  = "hashicorp/helm"
+      version = ">= 3.0.0" # set = [...] list syntax
+    }
+    kubectl = {
+      source  = "gavinbunney/kubectl"
+      version = ">= 1.14.0"
+    }
+  }
+}
+
+locals {
+  sorted_cloud_tags = [
+    for k in sort(keys(var.cloud_tags)) : {
+      key   = k
+      value = var.cloud_tags[k]
+    }
+  ]
+  all_tags = merge(
+    { for item in local.sorted_cloud_tags : item.key => item.value },
+    { orchestrated_by = "config0" }
+  )
+}
+
+provider "aws" {
+  region = var.aws_default_region
+
+  default_tags {
+    tags = local.all_tags
+  }
+}
+
+# The stack passes the cluster endpoint/CA/OIDC issuer/version in from the
+# config0 resource db; only describe the cluster when one is missing.
+# The modules get the resolved values and never describe it themselves.
+data "aws_eks_cluster" "cluster" {
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster      = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null || var.eks_oidc_issuer == null || var.eks_cluster_version == null
+  cluster_endpoint    = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data     = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].certificate_authority[0].data : var.eks_cluster_ca_data
+  cluster_oidc_issuer = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].identity[0].oidc[0].issuer : var.eks_oidc_issuer
+  cluster_version     = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].version : var.eks_cluster_version
+}
+
+data "aws_eks_cluster_auth" "cluster" {
+  name = var.eks_cluster
+}
+
+provider "kubernetes" {
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
+  token                  = data.aws_eks_cluster_auth.cluster.token
+}
+
+provider "helm" {
+  kubernetes = {
+    host                   = local.cluster_endpoint
+    cluster_ca_certificate = base64decode(local.cluster_ca_data)
+    token                  = data.aws_eks_cluster_auth.cluster.token
+  }
+}
+
+provider "kubectl" {
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
+  token                  = data.aws_eks_cluster_auth.cluster.token
+  load_config_file       = false
+}
+
+####FILE####:::variables.tf
+
+# Cluster
+variable "aws_default_region" {
+  description = "AWS region"
+  type        = string
+  default     = "us-east-1"
+}
+
+variable "eks_cluster" {
+  description = "EKS cluster name"
+  type        = string
+}
+
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this, eks_cluster_ca_data, eks_oidc_issuer and eks_cluster_version are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "eks_oidc_issuer" {
+  description = "OIDC issuer URL of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_version" {
+  description = "Kubernetes version of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "cloud_tags" {
+  description = "Tags to apply to cloud resources (will be sorted for consistency)"
+  type        = map(string)
+  default     = {}
+}
+
+variable "k8_tags" {
+  description = "A map of labels to apply to Kubernetes resources"
+  type        = map(string)
+  default     = {
+    owner       = "platform"
+    environment = "production"
+  }
+}
+
+variable "chart_repo_url" {
+  description = "Chart mirror (tools/chart_mirror.py) holding <chart>-<version>.tgz; the public repos are used when null"
+  type        = string
+  default     = null
+}
+
+# base-helm-pkgs
+variable "install_metrics_server" {
+  description = "Whether to install Metrics Server"
+  type        = bool
+  default     = true
+}
+
+variable "install_prometheus_grafana" {
+  description = "Whether to install Prometheus and Grafana"
+  type        = bool
+  default     = true
+}
+
+variable "grafana_admin_password" {
+  description = "Grafana admin password"
+  type        = string
+  sensitive   = true
+  default     = "admin"
+}
+
+# external-dns-addon
+variable "install_external_dns" {
+  description = "Whether to install the ExternalDNS EKS add-on"
+  type        = bool
+  default     = true
+}
+
+variable "general_external_dns_role_name" {
+  description = "Name of the existing general ExternalDNS IAM role with DNS permissions"
+  type        = string
+  default     = null
+}
+
+variable "domain_filters" {
+  description = "Comma-separated list of domains that ExternalDNS will manage"
+  type        = string
+  default     = ""
+}
+
+variable "external_dns_policy" {
+  description = "ExternalDNS policy: sync or upsert-only"
+  type        = string
+  default     = "upsert-only"
+}
+
+variable "external_dns_addon_version" {
+  description = "Version of the ExternalDNS EKS add-on, looked up by cluster version when null"
+  type        = string
+  default     = null
+}
+
+variable "external_dns_namespace" {
+  description = "Kubernetes namespace for ExternalDNS"
+  type        = string
+  default     = "external-dns"
+}
+
+# install-argocd-crds and install-argocd
+variable "install_argocd" {
+  description = "Whether to install the ArgoCD CRDs and ArgoCD"
+  type        = bool
+  default     = true
+}
+
+variable "argocd_namespace" {
+  description = "Namespace to install ArgoCD"
+  type        = string
+  default     = "argocd"
+}
+
+variable "argocd_chart_version" {
+  description = "Version of the ArgoCD Helm chart"
+  type        = string
+  default     = "7.1.3"
+}
+
+variable "argocd_chart_repo_url" {
+  description = "Helm repo URL for ArgoCD"
+  type        = string
+  default     = "https://argoproj.github.io/argo-helm"
+}
+
+####FILE####:::main.tf
+
+module "base_helm_pkgs" {
+  source = "./modules/base-helm-pkgs"
+  count  = var.install_metrics_server || var.install_prometheus_grafana ? 1 : 0
+
+  aws_default_region         = var.aws_default_region
+  eks_cluster                = var.eks_cluster
+  eks_cluster_endpoint       = local.cluster_endpoint
+  eks_cluster_ca_data        = local.cluster_ca_data
+  install_metrics_server     = var.install_metrics_server
+  install_prometheus_grafana = var.install_prometheus_grafana
+  grafana_admin_password     = var.grafana_admin_password
+  chart_repo_url             = var.chart_repo_url
+}
+
+module "external_dns_addon" {
+  source = "./modules/external-dns-addon"
+  count  = var.install_external_dns ? 1 : 0
+
+  aws_default_region             = var.aws_default_region
+  cloud_tags                     = var.cloud_tags
+  eks_cluster                    = var.eks_cluster
+  eks_cluster_endpoint           = local.cluster_endpoint
+  eks_cluster_ca_data            = local.cluster_ca_data
+  eks_oidc_issuer                = local.cluster_oidc_issuer
+  eks_cluster_version            = local.cluster_version
+  general_external_dns_role_name = var.general_external_dns_role_name
+  domain_filters                 = var.domain_filters
+  external_dns_policy            = var.external_dns_policy
+  addon_version                  = var.external_dns_addon_version
+  namespace                      = var.external_dns_namespace
+}
+
+module "install_argocd_crds" {
+  source = "./modules/install-argocd-crds"
+  count  = var.install_argocd ? 1 : 0
+
+  aws_default_region   = var.aws_default_region
+  eks_cluster          = var.eks_cluster
+  eks_cluster_endpoint = local.cluster_endpoint
+  eks_cluster_ca_data  = local.cluster_ca_data
+  cloud_tags           = var.cloud_tags
+  k8_tags              = var.k8_tags
+  argocd_namespace     = var.argocd_namespace
+}
+
+# the chart is installed with installCRDs=false
+module "install_argocd" {
+  source = "./modules/install-argocd"
+  count  = var.install_argocd ? 1 : 0
+
+  aws_default_region    = var.aws_default_region
+  eks_cluster           = var.eks_cluster
+  eks_cluster_endpoint  = local.cluster_endpoint
+  eks_cluster_ca_data   = local.cluster_ca_data
+  cloud_tags            = var.cloud_tags
+  k8_tags               = var.k8_tags
+  argocd_namespace      = var.argocd_namespace
+  argocd_chart_version  = var.argocd_chart_version
+  argocd_chart_repo_url = var.argocd_chart_repo_url
+  chart_repo_url        = var.chart_repo_url
+
+  depends_on = [module.install_argocd_crds]
+}
+
+####FILE####:::outputs.tf
+
+output "grafana_endpoint" {
+  description = "Grafana endpoint"
+  value       = try(module.base_helm_pkgs[0].grafana_endpoint, null)
+}
+
+output "prometheus_endpoint" {
+  description = "Prometheus server endpoint"
+  value       = try(module.base_helm_pkgs[0].prometheus_endpoint, null)
+}
+
+output "cluster_external_dns_role_arn" {
+  description = "ARN of the cluster-specific ExternalDNS IAM role"
+  value       = try(module.external_dns_addon[0].cluster_external_dns_role_arn, null)
+}
+
+output "external_dns_addon_version" {
+  description = "Version of the ExternalDNS add-on"
+  value       = try(module.external_dns_addon[0].external_dns_addon_version, null)
+}
+
+output "argocd_crd_sha256" {
+  description = "Content hash of each applied CRD"
+  value       = try(module.install_argocd_crds[0].argocd_crd_sha256, null)
+}
+
+output "argocd_release_name" {
+  description = "ArgoCD Helm release name"
+  value       = try(module.install_argocd[0].argocd_release_name, null)
+}
+
+output "argocd_namespace" {
+  description = "Namespace where ArgoCD is installed"
+  value       = try(module.install_argocd[0].argocd_namespace, null)
+}
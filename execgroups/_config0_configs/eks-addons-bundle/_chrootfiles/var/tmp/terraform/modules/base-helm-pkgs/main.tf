@@ -0,0 +1,172 @@
+terraform {
+  required_providers {
+    aws        = { source = "hashicorp/aws", version = ">= 5.0" }
+    kubernetes = { source = "hashicorp/kubernetes", version = ">= 2.0" }
+    helm       = { source = "hashicorp/helm", version = ">= 2.0" }
+  }
+  required_version = ">= 1.3"
+}
+
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
+data "aws_eks_cluster" "eks" {
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.eks[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.eks[0].certificate_authority[0].data : var.eks_cluster_ca_data
+}
+
+data "aws_eks_cluster_auth" "eks" {
+  name = var.eks_cluster
+}
+
+# Charts come from tools/chart_mirror.py when chart_repo_url is set, as
+# direct tarball urls so no repo index is downloaded on apply
+locals {
+  chart_mirror = var.chart_repo_url == null ? null : trimsuffix(var.chart_repo_url, "/")
+
+  # versions tools/chart_mirror.py puts into the mirror; the public
+  # repos stay unpinned unless a *_chart_version is given, so clusters
+  # already on a newer chart are not downgraded
+  mirror_chart_versions = {
+    metrics_server_chart_version = "3.12.1"
+    prometheus_chart_version     = "25.21.0"
+    grafana_chart_version        = "7.3.11"
+  }
+
+  metrics_server_chart_version = var.metrics_server_chart_version != null ? var.metrics_server_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.metrics_server_chart_version
+  )
+  prometheus_chart_version = var.prometheus_chart_version != null ? var.prometheus_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.prometheus_chart_version
+  )
+  grafana_chart_version = var.grafana_chart_version != null ? var.grafana_chart_version : (
+    local.chart_mirror == null ? null : local.mirror_chart_versions.grafana_chart_version
+  )
+}
+
+resource "kubernetes_namespace" "monitoring" {
+  count = var.install_prometheus_grafana ? 1 : 0
+  
+  metadata {
+    name = "monitoring"
+  }
+}
+
+resource "helm_release" "metrics_server" {
+  count = var.install_metrics_server ? 1 : 0
+  
+  name       = "metrics-server"
+  namespace  = "kube-system"
+  repository = local.chart_mirror == null ? "https://kubernetes-sigs.github.io/metrics-server/" : null
+  chart      = local.chart_mirror == null ? "metrics-server" : "${local.chart_mirror}/metrics-server-${local.metrics_server_chart_version}.tgz"
+  version    = local.metrics_server_chart_version
+  
+  values = [
+    <<-EOT
+    args:
+      - --kubelet-preferred-address-types=InternalIP
+    resources:
+      requests:
+        cpu: 100m
+        memory: 200Mi
+    EOT
+  ]
+}
+
+resource "helm_release" "prometheus" {
+  count = var.install_prometheus_grafana ? 1 : 0
+  
+  name       = "prometheus"
+  namespace  = kubernetes_namespace.monitoring[0].metadata[0].name
+  repository = local.chart_mirror == null ? "https://prometheus-community.github.io/helm-charts" : null
+  chart      = local.chart_mirror == null ? "prometheus" : "${local.chart_mirror}/prometheus-${local.prometheus_chart_version}.tgz"
+  version    = local.prometheus_chart_version
+  
+  values = [
+    <<-EOT
+    server:
+      retention: 15d
+      persistentVolume:
+        enabled: true
+        size: 50Gi
+    alertmanager:
+      persistentVolume:
+        enabled: true
+        size: 10Gi
+    EOT
+  ]
+  
+  depends_on = [kubernetes_namespace.monitoring]
+}
+
+resource "helm_release" "grafana" {
+  count = var.install_prometheus_grafana ? 1 : 0
+  
+  name       = "grafana"
+  namespace  = kubernetes_namespace.monitoring[0].metadata[0].name
+  repository = local.chart_mirror == null ? "https://grafana.github.io/helm-charts" : null
+  chart      = local.chart_mirror == null ? "grafana" : "${local.chart_mirror}/grafana-${local.grafana_chart_version}.tgz"
+  version    = local.grafana_chart_version
+  
+  values = [
+    <<-EOT
+    persistence:
+      enabled: true
+      size: 10Gi
+    adminPassword: ${var.grafana_admin_password}
+    datasources:
+      datasources.yaml:
+        apiVersion: 1
+        datasources:
+        - name: Prometheus
+          type: prometheus
+          url: http://prometheus-server.monitoring.svc.cluster.local
+          access: proxy
+          isDefault: true
+    dashboards:
+      default:
+        kubernetes:
+          gnetId: 10000
+          revision: 1
+          datasource: Prometheus
+        node-exporter:
+          gnetId: 1860
+          revision: 27
+          datasource: Prometheus
+    service:
+      type: LoadBalancer
+    EOT
+  ]
+  
+  depends_on = [
+    kubernetes_namespace.monitoring,
+    helm_release.prometheus
+  ]
+}
+
+data "kubernetes_service" "grafana_service" {
+  count = var.install_prometheus_grafana ? 1 : 0
+  
+  metadata {
+    name      = "grafana"
+    namespace = kubernetes_namespace.monitoring[0].metadata[0].name
+  }
+  depends_on = [helm_release.grafana]
+}
+
+output "grafana_endpoint" {
+  description = "Grafana endpoint"
+  value       = var.install_prometheus_grafana ? "http://${data.kubernetes_service.grafana_service[0].status[0].load_balancer[0].ingress[0].hostname}" : null
+  depends_on  = [helm_release.grafana]
+}
+
+output "prometheus_endpoint" {
+  description = "Prometheus server endpoint"
+  value       = var.install_prometheus_grafana ? "http://${helm_release.prometheus[0].name}.monitoring.svc.cluster.local" : null
+  depends_on  = [helm_release.prometheus]
+}
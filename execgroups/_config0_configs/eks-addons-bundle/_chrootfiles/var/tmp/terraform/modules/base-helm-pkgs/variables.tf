@@ -0,0 +1,73 @@
+variable "aws_default_region" {
+  type        = string
+  description = "AWS region"
+}
+
+variable "eks_cluster" {
+  type        = string
+  description = "EKS cluster name"
+}
+
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "install_prometheus_grafana" {
+  type        = bool
+  description = "Whether to install Prometheus and Grafana"
+  default     = true
+}
+
+variable "install_metrics_server" {
+  type        = bool
+  description = "Whether to install Metrics Server"
+  default     = false
+}
+
+variable "default_tags" {
+  type        = map(string)
+  description = "Default tags for AWS resources"
+  default     = {
+    Environment = "Production"
+    ManagedBy   = "Terraform"
+  }
+}
+
+variable "grafana_admin_password" {
+  type        = string
+  description = "Grafana admin password"
+  sensitive   = true
+  default     = "admin"
+}
+
+variable "chart_repo_url" {
+  type        = string
+  description = "Chart mirror (tools/chart_mirror.py) holding <chart>-<version>.tgz; the public repos are used when null"
+  default     = null
+}
+
+variable "metrics_server_chart_version" {
+  type        = string
+  description = "Version of the metrics-server chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
+
+variable "prometheus_chart_version" {
+  type        = string
+  description = "Version of the prometheus chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
+
+variable "grafana_chart_version" {
+  type        = string
+  description = "Version of the grafana chart; latest from the public repo, or the mirror's pinned version with chart_repo_url, when null"
+  default     = null
+}
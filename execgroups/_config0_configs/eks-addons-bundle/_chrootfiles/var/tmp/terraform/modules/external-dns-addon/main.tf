@@ -0,0 +1,213 @@
+
+# Data Sources
+data "aws_caller_identity" "current" {}
+data "aws_region" "current" {}
+
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
+data "aws_eks_cluster" "cluster" {
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+# eks_cluster_version stored as a float arrives as 1.3 for 1.30; no
+# single digit minor is still on EKS, so one is a dropped trailing zero
+locals {
+  lookup_cluster      = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null || var.eks_oidc_issuer == null || var.eks_cluster_version == null
+  cluster_endpoint    = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data     = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].certificate_authority[0].data : var.eks_cluster_ca_data
+  cluster_oidc_issuer = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].identity[0].oidc[0].issuer : var.eks_oidc_issuer
+  cluster_version     = replace(local.lookup_cluster ? data.aws_eks_cluster.cluster[0].version : var.eks_cluster_version, "/^(\\d+\\.\\d)$/", "$${1}0")
+}
+
+# Add-on version from the index written by tools/addon_versions.py sync;
+# describe-addon-versions is only called for versions the index lacks
+locals {
+  addon_index   = jsondecode(file("${path.module}/addon_versions.json")).versions
+  addon_key     = "external-dns/${local.cluster_version}/${var.addon_compute_type}/${var.addon_arch}"
+  indexed_addon = var.addon_version != null ? var.addon_version : try(local.addon_index[local.addon_key][var.addon_most_recent == true ? "latest" : "default"], null)
+  addon_version = local.indexed_addon != null ? local.indexed_addon : data.aws_eks_addon_version.external_dns[0].version
+}
+
+data "aws_eks_addon_version" "external_dns" {
+  count              = local.indexed_addon == null ? 1 : 0
+  addon_name         = "external-dns"
+  kubernetes_version = local.cluster_version
+  most_recent        = var.addon_most_recent == true
+}
+
+data "aws_eks_cluster_auth" "cluster" {
+  name = var.eks_cluster
+}
+
+# Reference to existing OIDC provider
+data "aws_iam_openid_connect_provider" "eks" {
+  url = local.cluster_oidc_issuer
+}
+
+# Local Values
+locals {
+  txt_owner_id         = var.txt_owner_id != null ? var.txt_owner_id : "${var.eks_cluster}-external-dns"
+  oidc_issuer_url      = local.cluster_oidc_issuer
+  oidc_issuer_hostname = replace(local.oidc_issuer_url, "https://", "")
+  
+  # Construct general external DNS role ARN using account ID and role name
+  general_external_dns_role_arn = "arn:aws:iam::${data.aws_caller_identity.current.account_id}:role/${var.general_external_dns_role_name}"
+  
+  # Process domain filters - split comma-separated string into list and trim whitespace
+  domain_filters_list = var.domain_filters != "" ? [
+    for domain in split(",", var.domain_filters) : trimspace(domain)
+    if trimspace(domain) != ""
+  ] : []
+  
+  # Additional tags for resources (will be merged with cloud_tags via provider default_tags)
+  resource_tags = {
+    Cluster   = var.eks_cluster
+    Component = "external-dns"
+    ManagedBy = "terraform"
+  }
+}
+
+# Cluster-Specific IAM Role for ExternalDNS
+resource "aws_iam_role" "external_dns_cluster" {
+  name        = "${var.eks_cluster}-external-dns-role"
+  description = "Cluster-specific IAM role for ExternalDNS"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRoleWithWebIdentity"
+        Effect = "Allow"
+        Principal = {
+          Federated = data.aws_iam_openid_connect_provider.eks.arn
+        }
+        Condition = {
+          StringEquals = {
+            "${local.oidc_issuer_hostname}:sub" = "system:serviceaccount:${var.namespace}:external-dns"
+            "${local.oidc_issuer_hostname}:aud" = "sts.amazonaws.com"
+          }
+        }
+      }
+    ]
+  })
+
+  tags = merge(local.resource_tags, {
+    Name = "${var.eks_cluster}-external-dns-role"
+  })
+}
+
+# Policy for cluster role to assume the general role
+resource "aws_iam_role_policy" "external_dns_assume_general" {
+  name = "${var.eks_cluster}-external-dns-assume-policy"
+  role = aws_iam_role.external_dns_cluster.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = "sts:AssumeRole"
+        Resource = local.general_external_dns_role_arn
+        Condition = {
+          StringEquals = {
+            "sts:ExternalId" = "external-dns"
+          }
+        }
+      }
+    ]
+  })
+}
+
+# Kubernetes Namespace
+resource "kubernetes_namespace" "external_dns" {
+  metadata {
+    name = var.namespace
+    labels = {
+      name = var.namespace
+    }
+  }
+}
+
+# ExternalDNS EKS Add-on
+resource "aws_eks_addon" "external_dns" {
+  cluster_name                = var.eks_cluster
+  addon_name                  = "external-dns"
+  addon_version               = local.addon_version
+  service_account_role_arn    = aws_iam_role.external_dns_cluster.arn
+  resolve_conflicts_on_create = "OVERWRITE"
+  resolve_conflicts_on_update = "OVERWRITE"
+  
+  configuration_values = jsonencode(merge(
+    {
+      env = [
+        {
+          name  = "AWS_DEFAULT_REGION"
+          value = data.aws_region.current.name
+        },
+        {
+          name  = "AWS_ROLE_ARN"
+          value = local.general_external_dns_role_arn
+        },
+        {
+          name  = "AWS_STS_EXTERNAL_ID"
+          value = "external-dns"
+        }
+      ]
+      
+      policy     = var.external_dns_policy
+      txtOwnerId = local.txt_owner_id
+      sources    = var.sources
+      interval   = var.interval
+      registry   = "txt"
+    },
+    # Only include domainFilters if the list is not empty
+    length(local.domain_filters_list) > 0 ? { domainFilters = local.domain_filters_list } : {}
+  ))
+
+  depends_on = [
+    kubernetes_namespace.external_dns,
+    aws_iam_role_policy.external_dns_assume_general
+  ]
+
+  tags = merge(local.resource_tags, {
+    Name = "${var.eks_cluster}-external-dns-addon"
+  })
+}
+
+# Scale ExternalDNS deployment using kubectl patch with anti-affinity
+resource "kubectl_manifest" "external_dns_scale" {
+  yaml_body = <<YAML
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: external-dns
+  namespace: ${var.namespace}
+spec:
+  replicas: 2
+  template:
+    spec:
+      affinity:
+        podAntiAffinity:
+          requiredDuringSchedulingIgnoredDuringExecution:
+          - labelSelector:
+              matchExpressions:
+              - key: app.kubernetes.io/name
+                operator: In
+                values:
+                - external-dns
+            topologyKey: kubernetes.io/hostname
+          - labelSelector:
+              matchExpressions:
+              - key: app.kubernetes.io/name
+                operator: In
+                values:
+                - external-dns
+            topologyKey: topology.kubernetes.io/zone
+YAML
+
+  server_side_apply = true
+  force_conflicts   = true
+
+  depends_on = [aws_eks_addon.external_dns]
+}
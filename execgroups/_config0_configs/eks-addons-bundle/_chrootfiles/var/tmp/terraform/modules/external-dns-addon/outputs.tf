@@ -0,0 +1,59 @@
+
+# Cluster-specific outputs
+output "cluster_external_dns_role_arn" {
+  description = "ARN of the cluster-specific ExternalDNS IAM role"
+  value       = aws_iam_role.external_dns_cluster.arn
+}
+
+output "cluster_external_dns_role_name" {
+  description = "Name of the cluster-specific ExternalDNS IAM role"
+  value       = aws_iam_role.external_dns_cluster.name
+}
+
+# EKS Add-on outputs
+output "external_dns_addon_arn" {
+  description = "ARN of the ExternalDNS add-on"
+  value       = aws_eks_addon.external_dns.arn
+}
+
+output "external_dns_addon_version" {
+  description = "Version of the ExternalDNS add-on"
+  value       = aws_eks_addon.external_dns.addon_version
+}
+
+# Configuration outputs
+output "txt_owner_id" {
+  description = "TXT owner ID used by ExternalDNS"
+  value       = local.txt_owner_id
+}
+
+output "namespace" {
+  description = "Kubernetes namespace where ExternalDNS is deployed"
+  value       = kubernetes_namespace.external_dns.metadata[0].name
+}
+
+output "domain_filters_list" {
+  description = "Processed list of domain filters"
+  value       = local.domain_filters_list
+}
+
+# Infrastructure outputs
+output "oidc_provider_arn" {
+  description = "ARN of the existing OIDC provider"
+  value       = data.aws_iam_openid_connect_provider.eks.arn
+}
+
+output "general_role_arn" {
+  description = "ARN of the general ExternalDNS role being used"
+  value       = local.general_external_dns_role_arn
+}
+
+output "general_role_name" {
+  description = "Name of the general ExternalDNS role being used"
+  value       = var.general_external_dns_role_name
+}
+
+output "aws_account_id" {
+  description = "AWS account ID"
+  value       = data.aws_caller_identity.current.account_id
+}
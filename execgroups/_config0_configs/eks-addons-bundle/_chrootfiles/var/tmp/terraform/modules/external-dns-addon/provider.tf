@@ -0,0 +1,44 @@
+
+# Terraform Version Configuration
+terraform {
+  required_version = ">= 1.1.0"
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+    kubernetes = {
+      source  = "hashicorp/kubernetes"
+      version = "~> 2.20"
+    }
+    tls = {
+      source  = "hashicorp/tls"
+      version = "~> 4.0"
+    }
+    kubectl = {
+      source  = "gavinbunney/kubectl"  # Explicitly specify source to avoid registry confusion
+      version = ">= 1.14.0"
+    }
+  }
+}
+
+# Local block to sort tags for consistent ordering
+locals {
+  # Convert user-provided tags map to sorted list
+  sorted_cloud_tags = [
+    for k in sort(keys(var.cloud_tags)) : {
+      key   = k
+      value = var.cloud_tags[k]
+    }
+  ]
+
+  # Create a sorted and consistent map of all tags
+  all_tags = merge(
+    # Convert sorted list back to map
+    { for item in local.sorted_cloud_tags : item.key => item.value },
+    {
+      # Tag indicating resources are managed by config0
+      orchestrated_by = "config0"
+    }
+  )
+}
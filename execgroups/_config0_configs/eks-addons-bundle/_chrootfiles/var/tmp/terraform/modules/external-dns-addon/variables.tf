@@ -0,0 +1,144 @@
+
+# AWS Configuration Variables
+variable "aws_default_region" {
+  description = "AWS region where resources will be created"
+  type        = string
+  default     = "us-west-2"
+}
+
+variable "cloud_tags" {
+  description = "Tags to apply to cloud resources (will be sorted for consistency)"
+  type        = map(string)
+  default     = {}
+}
+
+# EKS Cluster Configuration
+variable "eks_cluster" {
+  description = "Name of the EKS cluster"
+  type        = string
+  
+  validation {
+    condition     = length(var.eks_cluster) > 0
+    error_message = "Cluster name cannot be empty."
+  }
+}
+
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "eks_oidc_issuer" {
+  description = "OIDC issuer URL of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+# IAM Role Configuration
+variable "general_external_dns_role_name" {
+  description = "Name of the existing general ExternalDNS IAM role with DNS permissions"
+  type        = string
+  default     = "external-dns-yofool"
+}
+
+# ExternalDNS Configuration
+variable "domain_filters" {
+  description = "Comma-separated list of domains that ExternalDNS will manage (e.g., 'example.com,test.com')"
+  type        = string
+  default     = ""
+}
+
+variable "external_dns_policy" {
+  description = "ExternalDNS policy: sync or upsert-only"
+  type        = string
+  default     = "upsert-only"
+  
+  validation {
+    condition     = contains(["sync", "upsert-only"], var.external_dns_policy)
+    error_message = "Policy must be either 'sync' or 'upsert-only'."
+  }
+}
+
+variable "addon_version" {
+  description = "Version of the ExternalDNS EKS add-on. When null it is looked up in addon_versions.json (tools/addon_versions.py) by cluster version"
+  type        = string
+  default     = null
+}
+
+variable "addon_most_recent" {
+  description = "Use the newest compatible add-on version instead of the EKS default when addon_version is null"
+  type        = bool
+  default     = false
+}
+
+variable "addon_compute_type" {
+  description = "Compute type used to look up the add-on version (auto, ec2 or fargate)"
+  type        = string
+  default     = "ec2"
+}
+
+variable "addon_arch" {
+  description = "Node architecture used to look up the add-on version (amd64 or arm64)"
+  type        = string
+  default     = "amd64"
+}
+
+variable "eks_cluster_version" {
+  description = "Kubernetes version of the EKS cluster. The aws_eks_cluster lookup is used when this is not set"
+  type        = string
+  default     = null
+}
+
+variable "namespace" {
+  description = "Kubernetes namespace for ExternalDNS deployment"
+  type        = string
+  default     = "external-dns"
+  
+  validation {
+    condition     = can(regex("^[a-z0-9-]+$", var.namespace))
+    error_message = "Namespace must contain only lowercase letters, numbers, and hyphens."
+  }
+}
+
+variable "txt_owner_id" {
+  description = "Unique identifier for this ExternalDNS instance"
+  type        = string
+  default     = null
+}
+
+variable "log_level" {
+  description = "Log level for ExternalDNS"
+  type        = string
+  default     = "info"
+  
+  validation {
+    condition     = contains(["panic", "fatal", "error", "warn", "info", "debug", "trace"], var.log_level)
+    error_message = "Log level must be one of: panic, fatal, error, warn, info, debug, trace."
+  }
+}
+
+variable "interval" {
+  description = "Sync interval for ExternalDNS"
+  type        = string
+  default     = "1m"
+}
+
+variable "sources" {
+  description = "Kubernetes resources to watch for DNS entries"
+  type        = list(string)
+  default     = ["service", "ingress"]
+  
+  validation {
+    condition = alltrue([
+      for source in var.sources : contains(["service", "ingress", "node", "pod", "gateway"], source)
+    ])
+    error_message = "Sources must be from: service, ingress, node, pod, gateway."
+  }
+}
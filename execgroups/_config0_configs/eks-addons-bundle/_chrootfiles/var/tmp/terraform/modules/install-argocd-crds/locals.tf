@@ -0,0 +1,31 @@
+locals {
+  # AWS tag handling
+  sorted_cloud_tags = [
+    for k in sort(keys(var.cloud_tags)) : {
+      key   = k
+      value = var.cloud_tags[k]
+    }
+  ]
+  all_tags = merge(
+    { for item in local.sorted_cloud_tags : item.key => item.value },
+    { orchestrated_by = "config0" }
+  )
+
+  # Kubernetes tag handling
+  sorted_k8_tags = {
+    for k in sort(keys(var.k8_tags)) :
+    k => var.k8_tags[k]
+  }
+
+  # Compact CRDs built from crds/*.yaml by tools/crd_compact.py:
+  # descriptions stripped, canonical json, one <crd name>.json per CRD
+  crd_dir   = "${path.module}/crds-compact"
+  crd_files = fileset(local.crd_dir, "*.json")
+
+  crds = {
+    for f in local.crd_files : trimsuffix(f, ".json") => {
+      sha256   = filesha256("${local.crd_dir}/${f}")
+      manifest = jsondecode(file("${local.crd_dir}/${f}"))
+    }
+  }
+}
@@ -0,0 +1,40 @@
+# Server-side applied from the compact json.  yaml_body only changes when
+# a CRD's content hash does, so unchanged CRDs never re-apply, and state
+# carries the compact body and live-object fingerprints rather than the
+# decoded openAPI schema kubernetes_manifest kept.
+resource "kubectl_manifest" "argocd_crds" {
+  for_each = local.crds
+
+  server_side_apply = true
+  force_conflicts   = true
+
+  # the manager kubernetes_manifest applied with, so fields it set that
+  # the compact CRDs no longer carry (descriptions) are released
+  field_manager = "Terraform"
+
+  yaml_body = jsonencode(merge(
+    each.value.manifest,
+    {
+      metadata = merge(
+        each.value.manifest.metadata,
+        {
+          labels = merge(
+            try(each.value.manifest.metadata.labels, {}),
+            local.sorted_k8_tags,
+            {
+              "app.kubernetes.io/managed-by" = "Helm"
+            }
+          ),
+          annotations = merge(
+            try(each.value.manifest.metadata.annotations, {}),
+            {
+              "meta.helm.sh/release-name"      = "argocd"
+              "meta.helm.sh/release-namespace" = var.argocd_namespace
+              "config0.com/content-sha256"     = each.value.sha256
+            }
+          )
+        }
+      )
+    }
+  ))
+}
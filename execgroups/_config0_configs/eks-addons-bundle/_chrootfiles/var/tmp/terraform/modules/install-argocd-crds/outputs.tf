@@ -0,0 +1,19 @@
+output "argocd_crd_files" {
+  description = "List of ArgoCD CRD files applied"
+  value       = local.crd_files
+}
+
+output "argocd_crd_sha256" {
+  description = "Content hash of each applied CRD"
+  value       = { for name, crd in local.crds : name => crd.sha256 }
+}
+
+output "applied_k8s_labels" {
+  description = "Kubernetes labels applied to each CRD"
+  value       = local.sorted_k8_tags
+}
+
+output "aws_default_tags" {
+  description = "AWS default tags applied to all resources"
+  value       = local.all_tags
+}
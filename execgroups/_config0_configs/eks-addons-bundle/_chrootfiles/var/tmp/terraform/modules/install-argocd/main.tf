@@ -0,0 +1,74 @@
+
+locals {
+  # AWS tag handling (for completeness, same as your CRD file)
+  sorted_cloud_tags = [
+    for k in sort(keys(var.cloud_tags)) : {
+      key   = k
+      value = var.cloud_tags[k]
+    }
+  ]
+  all_tags = merge(
+    { for item in local.sorted_cloud_tags : item.key => item.value },
+    { orchestrated_by = "config0" }
+  )
+
+  # Kubernetes tag handling (sorted for consistency)
+  sorted_k8_tags = {
+    for k in sort(keys(var.k8_tags)) :
+    k => var.k8_tags[k]
+  }
+}
+
+resource "kubernetes_namespace" "argocd" {
+  metadata {
+    name   = var.argocd_namespace
+    labels = local.sorted_k8_tags
+  }
+}
+
+resource "helm_release" "argocd" {
+  name             = "argocd"
+  chart            = var.chart_repo_url == null ? "argo-cd" : "${trimsuffix(var.chart_repo_url, "/")}/argo-cd-${var.argocd_chart_version}.tgz"
+  repository       = var.chart_repo_url == null ? var.argocd_chart_repo_url : null
+  version          = var.argocd_chart_version
+  namespace        = kubernetes_namespace.argocd.metadata[0].name
+  create_namespace = false
+
+  set = [
+    {
+      name  = "installCRDs"
+      value = "false"
+    }
+  ]
+
+  values = [yamlencode({
+    controller = { replicaCount = 2 }
+    repoServer = { replicaCount = 2 }
+    server     = { replicaCount = 2 }
+    applicationSet = { replicaCount = 2 }
+    dex        = { replicaCount = 2 }
+    redis      = { replicaCount = 2 }
+    global = {
+      labels = local.sorted_k8_tags
+    }
+  })]
+
+  depends_on = [
+    kubernetes_namespace.argocd
+  ]
+}
+
+output "argocd_release_name" {
+  description = "ArgoCD Helm release name"
+  value       = helm_release.argocd.name
+}
+
+output "argocd_namespace" {
+  description = "Namespace where ArgoCD is installed"
+  value       = var.argocd_namespace
+}
+
+output "k8_tags" {
+  description = "Ordered tags applied to ArgoCD resources"
+  value       = local.sorted_k8_tags
+}
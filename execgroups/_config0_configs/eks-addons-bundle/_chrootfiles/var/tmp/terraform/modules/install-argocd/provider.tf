@@ -0,0 +1,35 @@
+
+terraform {
+  required_version = ">= 1.1.0"
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+    kubernetes = {
+      source  = "hashicorp/kubernetes"
+      version = ">= 2.11.0"
+    }
+    helm = {
+      source  = "hashicorp/helm"
+      version = ">= 3.0.0" # set = [...] list syntax
+    }
+  }
+}
+
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
+data "aws_eks_cluster" "eks" {
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.eks[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.eks[0].certificate_authority[0].data : var.eks_cluster_ca_data
+}
+
+data "aws_eks_cluster_auth" "eks" {
+  name = var.eks_cluster
+}
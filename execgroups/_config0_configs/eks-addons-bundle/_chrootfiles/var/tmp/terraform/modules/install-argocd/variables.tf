@@ -0,0 +1,65 @@
+
+variable "aws_default_region" {
+  description = "AWS region"
+  type        = string
+  default     = "us-east-1"
+}
+
+variable "eks_cluster" {
+  description = "EKS cluster name"
+  type        = string
+}
+
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "cloud_tags" {
+  description = "A map of tags to apply to all AWS resources"
+  type        = map(string)
+  default     = {
+    owner       = "platform"
+    environment = "production"
+  }
+}
+
+variable "k8_tags" {
+  description = "A map of labels to apply to Kubernetes resources"
+  type        = map(string)
+  default     = {
+    owner       = "platform"
+    environment = "production"
+  }
+}
+
+variable "argocd_namespace" {
+  description = "Namespace to install ArgoCD"
+  type        = string
+  default     = "argocd"
+}
+
+variable "argocd_chart_version" {
+  description = "Version of the ArgoCD Helm chart"
+  type        = string
+  default     = "7.1.3"
+}
+
+variable "argocd_chart_repo_url" {
+  description = "Helm repo URL for ArgoCD"
+  type        = string
+  default     = "https://argoproj.github.io/argo-helm"
+}
+
+variable "chart_repo_url" {
+  description = "Chart mirror (tools/chart_mirror.py) holding argo-cd-<version>.tgz; argocd_chart_repo_url is used when null"
+  type        = string
+  default     = null
+}
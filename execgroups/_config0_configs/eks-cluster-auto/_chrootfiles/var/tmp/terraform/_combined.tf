@@ -505,6 +505,16 @@ output "cluster_endpoint" {
   value       = module.eks.cluster_endpoint
 }
 
+output "cluster_certificate_authority_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  value       = module.eks.cluster_certificate_authority_data
+}
+
+output "oidc_issuer" {
+  description = "OIDC issuer URL of the EKS cluster"
+  value       = module.eks.cluster_oidc_issuer_url
+}
+
 output "oidc_provider_url" {
   description = "OIDC issuer URL for the EKS cluster"
   value       = module.eks.oidc_provider
@@ -0,0 +1,46 @@
+# IAM role mapping through EKS access entries
+# Replaces the eksctl create iamidentitymapping CodeBuild step; every
+# role in access_entry_role_names is mapped in the same apply that
+# creates the cluster
+locals {
+  access_entry_role_arns = {
+    for role_name in compact([for name in split(",", var.access_entry_role_names) : trimspace(name)]) :
+    role_name => "arn:aws:iam::${data.aws_caller_identity.current.account_id}:role/${role_name}"
+  }
+
+  access_entries_enabled = length(local.access_entry_role_arns) > 0
+}
+
+resource "aws_eks_access_entry" "role_access" {
+  for_each = local.access_entry_role_arns
+
+  cluster_name  = aws_eks_cluster.main.name
+  principal_arn = each.value
+  type          = "STANDARD"
+
+  tags = merge(
+    var.cloud_tags,
+    {
+      Name = "${each.key}-access-entry"
+      Role = each.key
+    }
+  )
+}
+
+resource "aws_eks_access_policy_association" "role_policies" {
+  for_each = {
+    for pair in setproduct(keys(local.access_entry_role_arns), var.access_entry_policy_arns) :
+    "${pair[0]}-${element(split("/", pair[1]), length(split("/", pair[1])) - 1)}" => {
+      role_name  = pair[0]
+      policy_arn = pair[1]
+    }
+  }
+
+  cluster_name  = aws_eks_cluster.main.name
+  policy_arn    = each.value.policy_arn
+  principal_arn = aws_eks_access_entry.role_access[each.value.role_name].principal_arn
+
+  access_scope {
+    type = "cluster"
+  }
+}
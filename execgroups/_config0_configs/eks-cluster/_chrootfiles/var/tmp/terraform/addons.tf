@@ -0,0 +1,71 @@
+# Managed core add-ons
+#
+# vpc-cni and kube-proxy are daemonsets and go ACTIVE without nodes;
+# coredns only does once nodes can run it, so the eks-nodegroup
+# execgroup manages it after the node groups.
+
+locals {
+  vpc_cni_env = {
+    for key, value in {
+      ENABLE_PREFIX_DELEGATION = var.vpc_cni_prefix_delegation ? "true" : null
+      WARM_PREFIX_TARGET       = var.vpc_cni_warm_prefix_target != null ? tostring(var.vpc_cni_warm_prefix_target) : null
+      WARM_IP_TARGET           = var.vpc_cni_warm_ip_target != null ? tostring(var.vpc_cni_warm_ip_target) : null
+      MINIMUM_IP_TARGET        = var.vpc_cni_minimum_ip_target != null ? tostring(var.vpc_cni_minimum_ip_target) : null
+    } : key => value if value != null
+  }
+
+  # configuration_values per add-on; for-filters instead of conditionals
+  # since the branches would be objects of different types
+  core_addons = {
+    for name, addon in {
+      "vpc-cni" = {
+        enabled = var.vpc_cni_addon
+        version = var.vpc_cni_version
+        configuration = {
+          for key, value in { env = local.vpc_cni_env } : key => value if length(value) > 0
+        }
+      }
+      "kube-proxy" = {
+        enabled = var.kube_proxy_addon
+        version = var.kube_proxy_version
+        configuration = {
+          for key, value in {
+            mode = "ipvs"
+            ipvs = { scheduler = var.kube_proxy_ipvs_scheduler }
+          } : key => value if var.kube_proxy_mode == "ipvs"
+        }
+      }
+    } : name => addon if addon.enabled
+  }
+}
+
+data "aws_eks_addon_version" "core" {
+  for_each = { for name, addon in local.core_addons : name => name if addon.version == null }
+
+  addon_name         = each.key
+  kubernetes_version = var.eks_cluster_version
+  most_recent        = var.core_addons_most_recent
+}
+
+resource "aws_eks_addon" "core" {
+  for_each = local.core_addons
+
+  cluster_name  = aws_eks_cluster.main.name
+  addon_name    = each.key
+  addon_version = coalesce(each.value.version, try(data.aws_eks_addon_version.core[each.key].version, null))
+
+  # the self-managed daemonsets EKS installs are taken over keeping
+  # their settings (custom CNI env and such); later updates come from
+  # configuration_values
+  resolve_conflicts_on_create = "PRESERVE"
+  resolve_conflicts_on_update = "OVERWRITE"
+
+  configuration_values = length(each.value.configuration) > 0 ? jsonencode(each.value.configuration) : null
+
+  tags = merge(
+    var.cloud_tags,
+    {
+      Product = "eks"
+    },
+  )
+}
@@ -6,3 +6,5 @@ data "aws_eks_cluster" "eks" {
 data "aws_eks_cluster_auth" "eks" {
   name = aws_eks_cluster.main.id
 }
+
+data "aws_caller_identity" "current" {}
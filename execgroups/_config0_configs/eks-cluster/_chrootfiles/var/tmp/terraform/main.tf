@@ -4,6 +4,15 @@ resource "aws_eks_cluster" "main" {
   role_arn = aws_iam_role.eks_cluster.arn
   version  = var.eks_cluster_version
 
+  # Only set when roles are mapped through access entries so existing
+  # CONFIG_MAP clusters are left untouched
+  dynamic "access_config" {
+    for_each = local.access_entries_enabled ? [1] : []
+    content {
+      authentication_mode = "API_AND_CONFIG_MAP"
+    }
+  }
+
   vpc_config {
     security_group_ids      = [aws_security_group.eks_cluster.id, aws_security_group.eks_nodes.id, var.eks_cluster_sg_id]
     subnet_ids              = var.eks_cluster_subnet_ids
@@ -62,4 +62,24 @@ output "cluster_subnet_ids" {
 output "cluster_security_group_ids" {
   description = "List of security group IDs used by the EKS cluster"
   value       = aws_eks_cluster.main.vpc_config[0].security_group_ids
-}
\ No newline at end of file
+}
+
+output "cluster_certificate_authority_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  value       = aws_eks_cluster.main.certificate_authority[0].data
+}
+
+output "oidc_issuer" {
+  description = "OIDC issuer URL of the EKS cluster"
+  value       = aws_eks_cluster.main.identity[0].oidc[0].issuer
+}
+
+output "access_entry_role_arns" {
+  description = "Map of IAM role name to the principal ARN mapped through EKS access entries"
+  value       = { for k, v in aws_eks_access_entry.role_access : k => v.principal_arn }
+}
+
+output "core_addon_versions" {
+  description = "Map of managed core add-on name to installed version"
+  value       = { for name, addon in aws_eks_addon.core : name => addon.addon_version }
+}
@@ -55,3 +55,85 @@ variable "cloud_tags" {
   default     = {}
 }
 
+variable "access_entry_role_names" {
+  description = "Comma-separated IAM role names to map into the cluster through EKS access entries"
+  type        = string
+  default     = ""
+}
+
+variable "access_entry_policy_arns" {
+  description = "EKS access policies associated with each role in access_entry_role_names"
+  type        = list(string)
+  default     = ["arn:aws:eks::aws:cluster-access-policy/AmazonEKSClusterAdminPolicy"]
+}
+
+variable "core_addons_most_recent" {
+  description = "Use the newest compatible vpc-cni/kube-proxy versions instead of the EKS defaults for eks_cluster_version"
+  type        = bool
+  default     = false
+}
+
+variable "vpc_cni_addon" {
+  description = "Manage vpc-cni as an EKS add-on instead of the self-managed daemonset EKS installs"
+  type        = bool
+  default     = false
+}
+
+variable "vpc_cni_version" {
+  description = "vpc-cni add-on version; resolved from eks_cluster_version when null"
+  type        = string
+  default     = null
+}
+
+variable "vpc_cni_prefix_delegation" {
+  description = "Assign /28 prefixes instead of single IPs to node ENIs (ENABLE_PREFIX_DELEGATION), raising pods per node on Nitro instances"
+  type        = bool
+  default     = false
+}
+
+variable "vpc_cni_warm_prefix_target" {
+  description = "WARM_PREFIX_TARGET: free prefixes kept attached per node with prefix delegation"
+  type        = number
+  default     = null
+}
+
+variable "vpc_cni_warm_ip_target" {
+  description = "WARM_IP_TARGET: free IPs kept attached per node"
+  type        = number
+  default     = null
+}
+
+variable "vpc_cni_minimum_ip_target" {
+  description = "MINIMUM_IP_TARGET: IPs allocated per node at start"
+  type        = number
+  default     = null
+}
+
+variable "kube_proxy_addon" {
+  description = "Manage kube-proxy as an EKS add-on instead of the self-managed daemonset EKS installs"
+  type        = bool
+  default     = false
+}
+
+variable "kube_proxy_version" {
+  description = "kube-proxy add-on version; resolved from eks_cluster_version when null"
+  type        = string
+  default     = null
+}
+
+variable "kube_proxy_mode" {
+  description = "kube-proxy mode: iptables or ipvs"
+  type        = string
+  default     = "iptables"
+
+  validation {
+    condition     = contains(["iptables", "ipvs"], var.kube_proxy_mode)
+    error_message = "Valid values for kube_proxy_mode are iptables or ipvs."
+  }
+}
+
+variable "kube_proxy_ipvs_scheduler" {
+  description = "IPVS scheduler with kube_proxy_mode ipvs (rr, lc, sh, ...)"
+  type        = string
+  default     = "rr"
+}
@@ -0,0 +1,66 @@
+# Interruption handling: EC2 and AWS Health events about Karpenter's
+# nodes go to a queue the controller reads, so it drains a node ahead
+# of a spot interruption or scheduled maintenance instead of losing it
+resource "aws_sqs_queue" "interruption" {
+  name                      = "${var.eks_cluster}-karpenter"
+  message_retention_seconds = 300
+  sqs_managed_sse_enabled   = true
+
+  tags = {
+    Product = "eks"
+  }
+}
+
+resource "aws_sqs_queue_policy" "interruption" {
+  queue_url = aws_sqs_queue.interruption.url
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid       = "AllowEventBridge"
+        Effect    = "Allow"
+        Principal = { Service = ["events.amazonaws.com", "sqs.amazonaws.com"] }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.interruption.arn
+      },
+      {
+        Sid       = "DenyHTTP"
+        Effect    = "Deny"
+        Principal = "*"
+        Action    = "sqs:*"
+        Resource  = aws_sqs_queue.interruption.arn
+        Condition = { Bool = { "aws:SecureTransport" = false } }
+      },
+    ]
+  })
+}
+
+locals {
+  interruption_events = {
+    health            = { source = ["aws.health"], detail-type = ["AWS Health Event"] }
+    spot-interruption = { source = ["aws.ec2"], detail-type = ["EC2 Spot Instance Interruption Warning"] }
+    rebalance         = { source = ["aws.ec2"], detail-type = ["EC2 Instance Rebalance Recommendation"] }
+    state-change      = { source = ["aws.ec2"], detail-type = ["EC2 Instance State-change Notification"] }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "interruption" {
+  for_each = local.interruption_events
+
+  name          = "${var.eks_cluster}-karpenter-${each.key}"
+  description   = "Karpenter interruption events of EKS cluster ${var.eks_cluster}"
+  event_pattern = jsonencode(each.value)
+
+  tags = {
+    Product = "eks"
+  }
+}
+
+resource "aws_cloudwatch_event_target" "interruption" {
+  for_each = aws_cloudwatch_event_rule.interruption
+
+  rule      = each.value.name
+  target_id = "KarpenterInterruptionQueue"
+  arn       = aws_sqs_queue.interruption.arn
+}
@@ -0,0 +1,164 @@
+# With chart_repo_url the chart is a tarball url in a mirror laid out
+# like tools/chart_mirror.py's, so nothing is pulled from the registry
+locals {
+  chart_mirror = var.chart_repo_url == null ? null : trimsuffix(var.chart_repo_url, "/")
+}
+
+resource "helm_release" "karpenter" {
+  name       = "karpenter"
+  namespace  = var.karpenter_namespace
+  repository = local.chart_mirror == null ? "oci://public.ecr.aws/karpenter" : null
+  chart      = local.chart_mirror == null ? "karpenter" : "${local.chart_mirror}/karpenter-${var.karpenter_version}.tgz"
+  version    = var.karpenter_version
+
+  create_namespace = true
+  wait             = true
+
+  # the chart keeps the controller off nodes Karpenter launched itself,
+  # so it runs on the static node group
+  values = [yamlencode({
+    replicas = var.karpenter_replicas
+    serviceAccount = {
+      name = "karpenter"
+    }
+    settings = {
+      clusterName       = var.eks_cluster
+      clusterEndpoint   = data.aws_eks_cluster.cluster.endpoint
+      interruptionQueue = aws_sqs_queue.interruption.name
+    }
+    controller = {
+      resources = {
+        requests = { cpu = "1", memory = "1Gi" }
+        limits   = { cpu = "1", memory = "1Gi" }
+      }
+    }
+  })]
+
+  depends_on = [
+    aws_eks_addon.pod_identity_agent,
+    aws_eks_pod_identity_association.controller,
+    aws_iam_role_policy.controller,
+  ]
+}
+
+locals {
+  ami_alias = "${var.karpenter_ami_family}@${var.karpenter_ami_version}"
+
+  kubelet = {
+    for key, value in {
+      maxPods        = var.eks_node_max_pods
+      kubeReserved   = var.eks_node_kube_reserved
+      systemReserved = var.eks_node_system_reserved
+    } : key => value if value != null
+  }
+
+  # Bottlerocket keeps the OS on /dev/xvda and containers on /dev/xvdb;
+  # mappings given here replace Karpenter's defaults, so both are listed
+  os_block_devices = [
+    for family in [var.karpenter_ami_family] : {
+      deviceName = "/dev/xvda"
+      ebs        = { volumeSize = "4Gi", volumeType = "gp3", encrypted = true, deleteOnTermination = true }
+    } if family == "bottlerocket"
+  ]
+
+  block_device = {
+    deviceName = var.karpenter_ami_family == "bottlerocket" ? "/dev/xvdb" : "/dev/xvda"
+    ebs = {
+      for key, value in {
+        volumeSize          = "${var.eks_node_disksize}Gi"
+        volumeType          = coalesce(var.eks_node_volume_type, "gp3")
+        iops                = var.eks_node_volume_iops
+        throughput          = var.eks_node_volume_throughput
+        encrypted           = true
+        deleteOnTermination = true
+      } : key => value if value != null
+    }
+  }
+
+  node_class = {
+    apiVersion = "karpenter.k8s.aws/v1"
+    kind       = "EC2NodeClass"
+    metadata = {
+      name = var.karpenter_nodepool
+    }
+    spec = merge(
+      {
+        role                       = local.node_role_name
+        amiSelectorTerms           = [{ alias = local.ami_alias }]
+        subnetSelectorTerms        = [for id in var.eks_node_group_subnet_ids : { id = id }]
+        securityGroupSelectorTerms = [for id in local.security_group_ids : { id = id }]
+        blockDeviceMappings        = concat(local.os_block_devices, [local.block_device])
+        tags = merge(
+          var.cloud_tags,
+          {
+            Product = "eks"
+          },
+        )
+      },
+      { for key, value in { kubelet = local.kubelet } : key => value if length(value) > 0 },
+      { for key, value in { userData = var.eks_node_user_data } : key => value if value != null },
+    )
+  }
+
+  requirements = concat(
+    [
+      { key = "kubernetes.io/arch", operator = "In", values = [var.karpenter_arch] },
+      { key = "kubernetes.io/os", operator = "In", values = ["linux"] },
+      { key = "karpenter.sh/capacity-type", operator = "In", values = var.karpenter_capacity_types },
+    ],
+    [
+      for types in [var.eks_node_instance_types] :
+      { key = "node.kubernetes.io/instance-type", operator = "In", values = types } if length(types) > 0
+    ],
+  )
+
+  node_pool = {
+    apiVersion = "karpenter.sh/v1"
+    kind       = "NodePool"
+    metadata = {
+      name = var.karpenter_nodepool
+    }
+    spec = {
+      template = {
+        metadata = {
+          labels = var.karpenter_labels
+        }
+        spec = {
+          nodeClassRef = {
+            group = "karpenter.k8s.aws"
+            kind  = "EC2NodeClass"
+            name  = var.karpenter_nodepool
+          }
+          requirements = local.requirements
+          expireAfter  = var.karpenter_expire_after
+        }
+      }
+      limits = {
+        cpu    = var.karpenter_cpu_limit
+        memory = var.karpenter_memory_limit
+      }
+      disruption = {
+        consolidationPolicy = var.karpenter_consolidation_policy
+        consolidateAfter    = var.karpenter_consolidate_after
+      }
+    }
+  }
+}
+
+# wait: on destroy the node class is only gone once its finalizer saw
+# Karpenter terminate the NodePool's nodes, before the chart is removed
+resource "kubectl_manifest" "node_class" {
+  yaml_body         = yamlencode(local.node_class)
+  server_side_apply = true
+  wait              = true
+
+  depends_on = [helm_release.karpenter]
+}
+
+resource "kubectl_manifest" "node_pool" {
+  yaml_body         = yamlencode(local.node_pool)
+  server_side_apply = true
+  wait              = true
+
+  depends_on = [kubectl_manifest.node_class]
+}
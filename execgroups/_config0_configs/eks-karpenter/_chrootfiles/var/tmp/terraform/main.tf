@@ -0,0 +1,255 @@
+# The EC2NodeClass needs the cluster security group EKS created, which
+# is not kept in the config0 resource db, so the cluster is described
+data "aws_eks_cluster" "cluster" {
+  name = var.eks_cluster
+}
+
+data "aws_eks_cluster_auth" "cluster" {
+  name = var.eks_cluster
+}
+
+data "aws_caller_identity" "current" {}
+data "aws_partition" "current" {}
+
+locals {
+  partition   = data.aws_partition.current.partition
+  region      = var.aws_default_region
+  account_id  = data.aws_caller_identity.current.account_id
+  cluster_tag = "kubernetes.io/cluster/${var.eks_cluster}"
+
+  node_role_name = regex("[^/]+$", var.eks_node_role_arn)
+
+  security_group_ids = (
+    var.security_group_ids != null ? var.security_group_ids :
+    [data.aws_eks_cluster.cluster.vpc_config[0].cluster_security_group_id]
+  )
+
+  # resources Karpenter creates for a node: scoped to this cluster
+  # through the tags it puts on them at creation
+  node_resources = [
+    for type in ["fleet", "instance", "volume", "network-interface", "launch-template", "spot-instances-request"] :
+    "arn:${local.partition}:ec2:${local.region}:*:${type}/*"
+  ]
+}
+
+# Karpenter controller role, handed to the karpenter service account
+# through EKS Pod Identity
+resource "aws_iam_role" "controller" {
+  name        = "${var.eks_cluster}-karpenter"
+  description = "Karpenter controller of EKS cluster ${var.eks_cluster}"
+
+  assume_role_policy = jsonencode({
+    Version   = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Principal = {
+          Service = "pods.eks.amazonaws.com"
+        }
+        Action = ["sts:AssumeRole", "sts:TagSession"]
+      }
+    ]
+  })
+
+  tags = {
+    Product = "eks"
+  }
+}
+
+resource "aws_iam_role_policy" "controller" {
+  name = "${var.eks_cluster}-karpenter"
+  role = aws_iam_role.controller.id
+
+  policy = jsonencode({
+    Version   = "2012-10-17"
+    Statement = [
+      {
+        Sid      = "AllowScopedEC2InstanceAccessActions"
+        Effect   = "Allow"
+        Action   = ["ec2:RunInstances", "ec2:CreateFleet"]
+        Resource = [
+          "arn:${local.partition}:ec2:${local.region}::image/*",
+          "arn:${local.partition}:ec2:${local.region}::snapshot/*",
+          "arn:${local.partition}:ec2:${local.region}:*:security-group/*",
+          "arn:${local.partition}:ec2:${local.region}:*:subnet/*",
+          "arn:${local.partition}:ec2:${local.region}:*:capacity-reservation/*",
+        ]
+      },
+      {
+        Sid       = "AllowScopedEC2LaunchTemplateAccessActions"
+        Effect    = "Allow"
+        Action    = ["ec2:RunInstances", "ec2:CreateFleet"]
+        Resource  = "arn:${local.partition}:ec2:${local.region}:*:launch-template/*"
+        Condition = {
+          StringEquals = { "aws:ResourceTag/${local.cluster_tag}" = "owned" }
+          StringLike   = { "aws:ResourceTag/karpenter.sh/nodepool" = "*" }
+        }
+      },
+      {
+        Sid       = "AllowScopedEC2InstanceActionsWithTags"
+        Effect    = "Allow"
+        Action    = ["ec2:RunInstances", "ec2:CreateFleet", "ec2:CreateLaunchTemplate"]
+        Resource  = local.node_resources
+        Condition = {
+          StringEquals = {
+            "aws:RequestTag/${local.cluster_tag}" = "owned"
+            "aws:RequestTag/eks:eks-cluster-name" = var.eks_cluster
+          }
+          StringLike = { "aws:RequestTag/karpenter.sh/nodepool" = "*" }
+        }
+      },
+      {
+        Sid       = "AllowScopedResourceCreationTagging"
+        Effect    = "Allow"
+        Action    = "ec2:CreateTags"
+        Resource  = local.node_resources
+        Condition = {
+          StringEquals = {
+            "aws:RequestTag/${local.cluster_tag}" = "owned"
+            "aws:RequestTag/eks:eks-cluster-name" = var.eks_cluster
+            "ec2:CreateAction"                    = ["RunInstances", "CreateFleet", "CreateLaunchTemplate"]
+          }
+          StringLike = { "aws:RequestTag/karpenter.sh/nodepool" = "*" }
+        }
+      },
+      {
+        Sid       = "AllowScopedResourceTagging"
+        Effect    = "Allow"
+        Action    = "ec2:CreateTags"
+        Resource  = "arn:${local.partition}:ec2:${local.region}:*:instance/*"
+        Condition = {
+          StringEquals                = { "aws:ResourceTag/${local.cluster_tag}" = "owned" }
+          StringLike                  = { "aws:ResourceTag/karpenter.sh/nodepool" = "*" }
+          StringEqualsIfExists        = { "aws:RequestTag/eks:eks-cluster-name" = var.eks_cluster }
+          "ForAllValues:StringEquals" = { "aws:TagKeys" = ["eks:eks-cluster-name", "karpenter.sh/nodeclaim", "Name"] }
+        }
+      },
+      {
+        Sid      = "AllowScopedDeletion"
+        Effect   = "Allow"
+        Action   = ["ec2:TerminateInstances", "ec2:DeleteLaunchTemplate"]
+        Resource = [
+          "arn:${local.partition}:ec2:${local.region}:*:instance/*",
+          "arn:${local.partition}:ec2:${local.region}:*:launch-template/*",
+        ]
+        Condition = {
+          StringEquals = { "aws:ResourceTag/${local.cluster_tag}" = "owned" }
+          StringLike   = { "aws:ResourceTag/karpenter.sh/nodepool" = "*" }
+        }
+      },
+      {
+        Sid    = "AllowRegionalReadActions"
+        Effect = "Allow"
+        Action = [
+          "ec2:DescribeAvailabilityZones",
+          "ec2:DescribeCapacityReservations",
+          "ec2:DescribeImages",
+          "ec2:DescribeInstances",
+          "ec2:DescribeInstanceTypeOfferings",
+          "ec2:DescribeInstanceTypes",
+          "ec2:DescribeLaunchTemplates",
+          "ec2:DescribeSecurityGroups",
+          "ec2:DescribeSpotPriceHistory",
+          "ec2:DescribeSubnets",
+        ]
+        Resource  = "*"
+        Condition = { StringEquals = { "aws:RequestedRegion" = local.region } }
+      },
+      {
+        Sid      = "AllowSSMReadActions"
+        Effect   = "Allow"
+        Action   = "ssm:GetParameter"
+        Resource = "arn:${local.partition}:ssm:${local.region}::parameter/aws/service/*"
+      },
+      {
+        Sid      = "AllowPricingReadActions"
+        Effect   = "Allow"
+        Action   = "pricing:GetProducts"
+        Resource = "*"
+      },
+      {
+        Sid      = "AllowInterruptionQueueActions"
+        Effect   = "Allow"
+        Action   = ["sqs:DeleteMessage", "sqs:GetQueueUrl", "sqs:ReceiveMessage"]
+        Resource = aws_sqs_queue.interruption.arn
+      },
+      {
+        Sid       = "AllowPassingInstanceRole"
+        Effect    = "Allow"
+        Action    = "iam:PassRole"
+        Resource  = var.eks_node_role_arn
+        Condition = { StringEquals = { "iam:PassedToService" = ["ec2.amazonaws.com"] } }
+      },
+      {
+        # Karpenter creates the instance profile of each EC2NodeClass
+        # from its role
+        Sid    = "AllowScopedInstanceProfileActions"
+        Effect = "Allow"
+        Action = [
+          "iam:TagInstanceProfile",
+          "iam:AddRoleToInstanceProfile",
+          "iam:RemoveRoleFromInstanceProfile",
+          "iam:DeleteInstanceProfile",
+        ]
+        Resource  = "arn:${local.partition}:iam::${local.account_id}:instance-profile/*"
+        Condition = {
+          StringEquals = {
+            "aws:ResourceTag/${local.cluster_tag}"          = "owned"
+            "aws:ResourceTag/topology.kubernetes.io/region" = local.region
+          }
+          StringLike = { "aws:ResourceTag/karpenter.k8s.aws/ec2nodeclass" = "*" }
+        }
+      },
+      {
+        Sid       = "AllowScopedInstanceProfileCreation"
+        Effect    = "Allow"
+        Action    = ["iam:CreateInstanceProfile", "iam:TagInstanceProfile"]
+        Resource  = "arn:${local.partition}:iam::${local.account_id}:instance-profile/*"
+        Condition = {
+          StringEquals = {
+            "aws:RequestTag/${local.cluster_tag}"          = "owned"
+            "aws:RequestTag/eks:eks-cluster-name"          = var.eks_cluster
+            "aws:RequestTag/topology.kubernetes.io/region" = local.region
+          }
+          StringLike = { "aws:RequestTag/karpenter.k8s.aws/ec2nodeclass" = "*" }
+        }
+      },
+      {
+        Sid      = "AllowInstanceProfileReadActions"
+        Effect   = "Allow"
+        Action   = ["iam:GetInstanceProfile", "iam:ListInstanceProfiles"]
+        Resource = "*"
+      },
+      {
+        Sid      = "AllowAPIServerEndpointDiscovery"
+        Effect   = "Allow"
+        Action   = "eks:DescribeCluster"
+        Resource = data.aws_eks_cluster.cluster.arn
+      },
+    ]
+  })
+}
+
+resource "aws_eks_addon" "pod_identity_agent" {
+  count = var.pod_identity_agent_addon ? 1 : 0
+
+  cluster_name                = var.eks_cluster
+  addon_name                  = "eks-pod-identity-agent"
+  resolve_conflicts_on_create = "OVERWRITE"
+  resolve_conflicts_on_update = "OVERWRITE"
+
+  tags = {
+    Product = "eks"
+  }
+}
+
+resource "aws_eks_pod_identity_association" "controller" {
+  cluster_name    = var.eks_cluster
+  namespace       = var.karpenter_namespace
+  service_account = "karpenter"
+  role_arn        = aws_iam_role.controller.arn
+
+  tags = {
+    Product = "eks"
+  }
+}
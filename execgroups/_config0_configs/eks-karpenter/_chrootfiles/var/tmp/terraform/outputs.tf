@@ -0,0 +1,29 @@
+output "controller_role_arn" {
+  description = "ARN of the IAM role of the karpenter controller"
+  value       = aws_iam_role.controller.arn
+}
+
+output "interruption_queue_name" {
+  description = "Name of the SQS queue Karpenter reads interruption events from"
+  value       = aws_sqs_queue.interruption.name
+}
+
+output "interruption_queue_arn" {
+  description = "ARN of the interruption queue"
+  value       = aws_sqs_queue.interruption.arn
+}
+
+output "karpenter_version" {
+  description = "Version of the installed karpenter chart"
+  value       = helm_release.karpenter.version
+}
+
+output "node_pool" {
+  description = "Name of the NodePool (and of its EC2NodeClass)"
+  value       = var.karpenter_nodepool
+}
+
+output "security_group_ids" {
+  description = "Security groups of the nodes Karpenter launches"
+  value       = local.security_group_ids
+}
@@ -0,0 +1,71 @@
+# AWS, Helm and kubectl Provider Configuration
+
+# Local block to sort tags for consistent ordering
+locals {
+  # Convert user-provided tags map to sorted list
+  sorted_cloud_tags = [
+    for k in sort(keys(var.cloud_tags)) : {
+      key   = k
+      value = var.cloud_tags[k]
+    }
+  ]
+
+  # Create a sorted and consistent map of all tags
+  all_tags = merge(
+    # Convert sorted list back to map
+    { for item in local.sorted_cloud_tags : item.key => item.value },
+    {
+      # Tag indicating resources are managed by config0
+      orchestrated_by = "config0"
+    }
+  )
+}
+
+provider "aws" {
+  # Region where AWS resources will be created
+  region = var.aws_default_region
+
+  # Default tags applied to all resources with consistent ordering
+  default_tags {
+    tags = local.all_tags
+  }
+}
+
+provider "helm" {
+  kubernetes = {
+    host                   = data.aws_eks_cluster.cluster.endpoint
+    cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+    token                  = data.aws_eks_cluster_auth.cluster.token
+  }
+}
+
+# NodePool/EC2NodeClass are custom resources whose CRDs the chart
+# installs in the same apply, so they go through kubectl_manifest
+# (no schema lookup at plan time) rather than kubernetes_manifest
+provider "kubectl" {
+  host                   = data.aws_eks_cluster.cluster.endpoint
+  cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+  token                  = data.aws_eks_cluster_auth.cluster.token
+  load_config_file       = false
+}
+
+# Terraform Version Configuration
+terraform {
+  # Minimum Terraform version required
+  required_version = ">= 1.3.0"
+
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = ">= 5.0"
+    }
+    helm = {
+      source  = "hashicorp/helm"
+      version = ">= 3.0.0" # kubernetes = {...} attribute syntax
+    }
+    kubectl = {
+      source  = "gavinbunney/kubectl"
+      version = ">= 1.14.0"
+    }
+  }
+}
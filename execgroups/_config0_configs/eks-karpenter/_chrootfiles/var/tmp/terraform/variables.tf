@@ -0,0 +1,213 @@
+variable "aws_default_region" {
+  description = "The AWS region to deploy resources into"
+  type        = string
+  default     = "us-west-1"
+}
+
+variable "eks_cluster" {
+  description = "Name of the EKS cluster Karpenter provisions nodes for"
+  type        = string
+}
+
+variable "cloud_tags" {
+  description = "Additional tags to apply to all resources, nodes launched by Karpenter included"
+  type        = map(string)
+  default     = {}
+}
+
+# Karpenter controller
+
+variable "karpenter_version" {
+  description = "Version of the karpenter helm chart (and controller)"
+  type        = string
+  default     = "1.5.0"
+}
+
+variable "karpenter_namespace" {
+  description = "Namespace the karpenter controller is installed into"
+  type        = string
+  default     = "kube-system"
+}
+
+variable "karpenter_replicas" {
+  description = "Replicas of the karpenter controller; they run on the static node group"
+  type        = number
+  default     = 2
+}
+
+variable "pod_identity_agent_addon" {
+  description = "Install the eks-pod-identity-agent add-on the controller's IAM role is handed out through; set false if the cluster already has it"
+  type        = bool
+  default     = true
+}
+
+variable "chart_repo_url" {
+  description = "Chart mirror holding karpenter-<karpenter_version>.tgz; null pulls the chart from oci://public.ecr.aws/karpenter"
+  type        = string
+  default     = null
+}
+
+# EC2NodeClass - how nodes are launched
+
+variable "eks_node_role_arn" {
+  description = "ARN of the node IAM role; the role of the static node group, so its access entry covers Karpenter nodes too"
+  type        = string
+}
+
+variable "eks_node_group_subnet_ids" {
+  description = "List of subnet IDs Karpenter launches nodes into"
+  type        = list(string)
+}
+
+variable "security_group_ids" {
+  description = "Security groups of Karpenter nodes; null uses the cluster security group EKS created, as managed node groups do"
+  type        = list(string)
+  default     = null
+}
+
+variable "karpenter_ami_family" {
+  description = "AMI family of the EC2NodeClass amiSelectorTerms alias: al2, al2023 or bottlerocket"
+  type        = string
+  default     = "al2023"
+
+  validation {
+    condition     = contains(["al2", "al2023", "bottlerocket"], var.karpenter_ami_family)
+    error_message = "Valid values for karpenter_ami_family are al2, al2023 or bottlerocket."
+  }
+}
+
+variable "karpenter_ami_version" {
+  description = "AMI version of the alias; latest rolls nodes onto new AMIs through drift"
+  type        = string
+  default     = "latest"
+}
+
+variable "eks_node_disksize" {
+  description = "Disk size in GiB of the node volume (the data volume on Bottlerocket)"
+  type        = number
+  default     = 30
+}
+
+variable "eks_node_volume_type" {
+  description = "EBS volume type of the node volume (defaults to gp3)"
+  type        = string
+  default     = null
+
+  validation {
+    condition     = var.eks_node_volume_type == null || contains(["gp2", "gp3", "io1", "io2"], coalesce(var.eks_node_volume_type, "gp3"))
+    error_message = "Valid values for eks_node_volume_type are gp2, gp3, io1 or io2."
+  }
+}
+
+variable "eks_node_volume_iops" {
+  description = "Provisioned IOPS of the node volume (gp3: 3000-16000, io1/io2)"
+  type        = number
+  default     = null
+}
+
+variable "eks_node_volume_throughput" {
+  description = "Throughput in MiB/s of a gp3 node volume (125-1000)"
+  type        = number
+  default     = null
+}
+
+variable "eks_node_max_pods" {
+  description = "Kubelet maxPods of Karpenter nodes"
+  type        = number
+  default     = null
+}
+
+variable "eks_node_kube_reserved" {
+  description = "Kubelet kubeReserved of Karpenter nodes, e.g. { cpu = \"250m\", memory = \"1Gi\" }"
+  type        = map(string)
+  default     = null
+}
+
+variable "eks_node_system_reserved" {
+  description = "Kubelet systemReserved of Karpenter nodes"
+  type        = map(string)
+  default     = null
+}
+
+variable "eks_node_user_data" {
+  description = "User data Karpenter merges with the one it generates (shell script or MIME for al2/al2023, TOML for bottlerocket)"
+  type        = string
+  default     = null
+}
+
+# NodePool - what Karpenter may launch and when it removes nodes
+
+variable "karpenter_nodepool" {
+  description = "Name of the NodePool and of its EC2NodeClass"
+  type        = string
+  default     = "default"
+}
+
+variable "karpenter_arch" {
+  description = "Node architecture: amd64 or arm64"
+  type        = string
+  default     = "amd64"
+
+  validation {
+    condition     = contains(["amd64", "arm64"], var.karpenter_arch)
+    error_message = "Valid values for karpenter_arch are amd64 or arm64."
+  }
+}
+
+variable "karpenter_capacity_types" {
+  description = "karpenter.sh/capacity-type values: spot and/or on-demand; with both Karpenter prefers spot"
+  type        = list(string)
+  default     = ["on-demand"]
+
+  validation {
+    condition     = length(var.karpenter_capacity_types) > 0 && alltrue([for type in var.karpenter_capacity_types : contains(["spot", "on-demand"], type)])
+    error_message = "karpenter_capacity_types takes spot and/or on-demand."
+  }
+}
+
+variable "eks_node_instance_types" {
+  description = "Instance types Karpenter may pick from; empty lets it pick any type of karpenter_arch"
+  type        = list(string)
+  default     = []
+}
+
+variable "karpenter_labels" {
+  description = "Labels of the nodes in the NodePool"
+  type        = map(string)
+  default     = {}
+}
+
+variable "karpenter_cpu_limit" {
+  description = "Total vCPUs the NodePool may launch"
+  type        = string
+  default     = "1000"
+}
+
+variable "karpenter_memory_limit" {
+  description = "Total memory the NodePool may launch"
+  type        = string
+  default     = "1000Gi"
+}
+
+variable "karpenter_consolidation_policy" {
+  description = "WhenEmptyOrUnderutilized (bin-pack onto fewer nodes) or WhenEmpty"
+  type        = string
+  default     = "WhenEmptyOrUnderutilized"
+
+  validation {
+    condition     = contains(["WhenEmptyOrUnderutilized", "WhenEmpty"], var.karpenter_consolidation_policy)
+    error_message = "Valid values for karpenter_consolidation_policy are WhenEmptyOrUnderutilized or WhenEmpty."
+  }
+}
+
+variable "karpenter_consolidate_after" {
+  description = "How long a node has to be consolidatable before Karpenter removes it"
+  type        = string
+  default     = "1m"
+}
+
+variable "karpenter_expire_after" {
+  description = "Age after which nodes are replaced, or Never"
+  type        = string
+  default     = "720h"
+}
@@ -0,0 +1,49 @@
+# coredns add-on
+#
+# vpc-cni and kube-proxy are managed with the cluster (eks-cluster
+# addons.tf); coredns only goes ACTIVE once nodes can run its pods, so
+# it is added here after the node groups.
+
+data "aws_eks_cluster" "coredns" {
+  count = var.coredns_addon && var.coredns_version == null ? 1 : 0
+
+  name = var.eks_cluster
+}
+
+data "aws_eks_addon_version" "coredns" {
+  count = var.coredns_addon && var.coredns_version == null ? 1 : 0
+
+  addon_name         = "coredns"
+  kubernetes_version = data.aws_eks_cluster.coredns[0].version
+}
+
+resource "aws_eks_addon" "coredns" {
+  count = var.coredns_addon ? 1 : 0
+
+  cluster_name  = var.eks_cluster
+  addon_name    = "coredns"
+  addon_version = coalesce(var.coredns_version, try(data.aws_eks_addon_version.coredns[0].version, null))
+
+  # the self-managed deployment EKS installs is taken over keeping its
+  # settings; later updates come from configuration_values
+  resolve_conflicts_on_create = "PRESERVE"
+  resolve_conflicts_on_update = "OVERWRITE"
+
+  # replicas follow the node and core count of the cluster
+  configuration_values = var.coredns_autoscaling ? jsonencode({
+    autoScaling = {
+      enabled     = true
+      minReplicas = var.coredns_min_replicas
+      maxReplicas = var.coredns_max_replicas
+    }
+  }) : null
+
+  tags = merge(
+    var.cloud_tags,
+    {
+      Product = "eks"
+    },
+  )
+
+  depends_on = [aws_eks_node_group.main]
+}
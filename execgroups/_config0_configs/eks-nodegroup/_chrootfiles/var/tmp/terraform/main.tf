@@ -1,19 +1,207 @@
+locals {
+  # A pool that sets either max_unavailable attribute replaces both
+  # eks_node_max_unavailable* variables, which conflict if both are set
+  pool_sets_update_config = {
+    for name, pool in var.eks_node_groups : name => (
+      pool.max_unavailable != null || pool.max_unavailable_percentage != null
+    )
+  }
+
+  # Without eks_node_groups the module keeps its single "main" pool
+  # built from the eks_node_* variables. Pools in eks_node_groups fall
+  # back to the same variables for any attribute they leave unset.
+  node_group_keys = length(var.eks_node_groups) > 0 ? keys(var.eks_node_groups) : ["main"]
+
+  node_groups = {
+    for name in local.node_group_keys : name => {
+      node_group_name = coalesce(
+        try(var.eks_node_groups[name].node_group_name, null),
+        name == "main" ? var.eks_node_group_name : "${var.eks_cluster}-nodegroup-${name}"
+      )
+      subnet_ids     = coalesce(try(var.eks_node_groups[name].subnet_ids, null), var.eks_node_group_subnet_ids)
+      capacity_type  = coalesce(try(var.eks_node_groups[name].capacity_type, null), var.eks_node_capacity_type)
+      ami_type       = coalesce(try(var.eks_node_groups[name].ami_type, null), var.eks_node_ami_type)
+      instance_types = coalesce(try(var.eks_node_groups[name].instance_types, null), var.eks_node_instance_types)
+      disk_size      = coalesce(try(var.eks_node_groups[name].disk_size, null), var.eks_node_disksize)
+      desired_size   = coalesce(try(var.eks_node_groups[name].desired_size, null), var.eks_node_desired_capacity)
+      max_size       = coalesce(try(var.eks_node_groups[name].max_size, null), var.eks_node_max_capacity)
+      min_size       = coalesce(try(var.eks_node_groups[name].min_size, null), var.eks_node_min_capacity)
+      labels         = try(var.eks_node_groups[name].labels, {})
+
+      max_unavailable = (
+        try(local.pool_sets_update_config[name], false) ?
+        try(var.eks_node_groups[name].max_unavailable, null) : var.eks_node_max_unavailable
+      )
+      max_unavailable_percentage = (
+        try(local.pool_sets_update_config[name], false) ?
+        try(var.eks_node_groups[name].max_unavailable_percentage, null) : var.eks_node_max_unavailable_percentage
+      )
+    }
+  }
+}
+
+locals {
+  # Any of these settings puts every pool on a generated launch template;
+  # the root volume then moves from disk_size to the template
+  launch_template_enabled = anytrue([
+    var.eks_node_max_pods != null,
+    var.eks_node_kube_reserved != null,
+    var.eks_node_system_reserved != null,
+    var.eks_node_containerd_config != null,
+    var.eks_node_volume_type != null,
+    var.eks_node_volume_iops != null,
+    var.eks_node_volume_throughput != null,
+    var.eks_node_user_data != null,
+  ])
+
+  kubelet_config = {
+    for key, value in {
+      maxPods        = var.eks_node_max_pods
+      kubeReserved   = var.eks_node_kube_reserved
+      systemReserved = var.eks_node_system_reserved
+    } : key => value if value != null
+  }
+
+  # AL2023: nodeadm merges this NodeConfig with the one EKS generates
+  node_config_spec = {
+    for key, value in {
+      kubelet    = length(local.kubelet_config) > 0 ? { config = local.kubelet_config } : null
+      containerd = var.eks_node_containerd_config != null ? { config = var.eks_node_containerd_config } : null
+    } : key => value if value != null
+  }
+
+  mime_parts = concat(
+    length(local.node_config_spec) > 0 ? [join("\n", [
+      "Content-Type: application/node.eks.aws",
+      "",
+      "---",
+      jsonencode({
+        apiVersion = "node.eks.aws/v1alpha1"
+        kind       = "NodeConfig"
+        spec       = local.node_config_spec
+      }),
+    ])] : [],
+    var.eks_node_user_data != null ? [join("\n", [
+      "Content-Type: text/x-shellscript; charset=\"us-ascii\"",
+      "",
+      var.eks_node_user_data,
+    ])] : [],
+  )
+
+  mime_user_data = length(local.mime_parts) > 0 ? join("\n", concat(
+    ["MIME-Version: 1.0", "Content-Type: multipart/mixed; boundary=\"//\"", ""],
+    flatten([for part in local.mime_parts : ["--//", part]]),
+    ["--//--", ""],
+  )) : null
+
+  # Bottlerocket: TOML settings, merged with the ones EKS generates
+  bottlerocket_user_data = join("\n", concat(
+    ["[settings.kubernetes]"],
+    var.eks_node_max_pods != null ? ["max-pods = ${var.eks_node_max_pods}"] : [],
+    var.eks_node_kube_reserved != null ? concat(
+      ["", "[settings.kubernetes.kube-reserved]"],
+      [for key, value in var.eks_node_kube_reserved : "\"${key}\" = \"${value}\""]
+    ) : [],
+    var.eks_node_system_reserved != null ? concat(
+      ["", "[settings.kubernetes.system-reserved]"],
+      [for key, value in var.eks_node_system_reserved : "\"${key}\" = \"${value}\""]
+    ) : [],
+    var.eks_node_user_data != null ? ["", var.eks_node_user_data] : [],
+    [""],
+  ))
+}
+
+resource "aws_launch_template" "main" {
+  for_each = { for key, pool in local.node_groups : key => pool if local.launch_template_enabled }
+
+  name_prefix            = "${each.value.node_group_name}-"
+  update_default_version = true
+
+  user_data = (
+    can(regex("^BOTTLEROCKET", each.value.ami_type)) ? base64encode(local.bottlerocket_user_data) :
+    local.mime_user_data != null ? base64encode(local.mime_user_data) : null
+  )
+
+  # Bottlerocket keeps the OS on /dev/xvda and containers on /dev/xvdb
+  block_device_mappings {
+    device_name = can(regex("^BOTTLEROCKET", each.value.ami_type)) ? "/dev/xvdb" : "/dev/xvda"
+
+    ebs {
+      volume_size           = each.value.disk_size
+      volume_type           = coalesce(var.eks_node_volume_type, "gp3")
+      iops                  = var.eks_node_volume_iops
+      throughput            = var.eks_node_volume_throughput
+      delete_on_termination = true
+    }
+  }
+
+  tag_specifications {
+    resource_type = "instance"
+    tags = merge(
+      var.cloud_tags,
+      {
+        Product = "eks"
+      },
+    )
+  }
+
+  tags = merge(
+    var.cloud_tags,
+    {
+      Product = "eks"
+    },
+  )
+
+  lifecycle {
+    create_before_destroy = true
+  }
+}
+
 resource "aws_eks_node_group" "main" {
-  cluster_name    = var.eks_cluster
-  subnet_ids      = var.eks_node_group_subnet_ids
-  node_group_name = var.eks_node_group_name
-  node_role_arn   = var.eks_node_role_arn
+  for_each = local.node_groups
+
+  cluster_name  = var.eks_cluster
+  subnet_ids    = each.value.subnet_ids
+  node_role_arn = var.eks_node_role_arn
+
+  # blue_green names pools <name>-<suffix> so a change that replaces
+  # the pool (ami_type, instance_types, disk_size, ...) brings up the
+  # new pool next to the old one before the old one is drained
+  node_group_name        = var.eks_node_rollout == "blue_green" ? null : each.value.node_group_name
+  node_group_name_prefix = var.eks_node_rollout == "blue_green" ? "${each.value.node_group_name}-" : null
 
   scaling_config {
-    desired_size = var.eks_node_desired_capacity
-    max_size     = var.eks_node_max_capacity
-    min_size     = var.eks_node_min_capacity
+    desired_size = each.value.desired_size
+    max_size     = each.value.max_size
+    min_size     = each.value.min_size
   }
 
-  ami_type       = var.eks_node_ami_type
-  capacity_type  = var.eks_node_capacity_type
-  disk_size      = var.eks_node_disksize
-  instance_types = var.eks_node_instance_types
+  # in-place updates (AMI release, launch template) replace this many
+  # nodes at a time instead of EKS's default of one
+  dynamic "update_config" {
+    for_each = each.value.max_unavailable != null || each.value.max_unavailable_percentage != null ? [1] : []
+
+    content {
+      max_unavailable            = each.value.max_unavailable
+      max_unavailable_percentage = each.value.max_unavailable_percentage
+    }
+  }
+
+  ami_type       = each.value.ami_type
+  capacity_type  = each.value.capacity_type
+  disk_size      = local.launch_template_enabled ? null : each.value.disk_size
+  instance_types = each.value.instance_types
+  labels         = each.value.labels
+
+  # a new template version rolls the pool like an AMI update
+  dynamic "launch_template" {
+    for_each = [for key, template in aws_launch_template.main : template if key == each.key]
+
+    content {
+      id      = launch_template.value.id
+      version = launch_template.value.latest_version
+    }
+  }
 
   tags = merge(
     var.cloud_tags,
@@ -22,9 +210,15 @@ resource "aws_eks_node_group" "main" {
     },
   )
 
-  # Ensure node group resources are properly destroyed before creating new ones
+  # Replacement pools are created before the old ones are destroyed
   lifecycle {
     create_before_destroy = true
   }
 }
 
+# The single node group used to be a plain resource; keep existing
+# state by moving it to the "main" key
+moved {
+  from = aws_eks_node_group.main
+  to   = aws_eks_node_group.main["main"]
+}
@@ -1,4 +1,44 @@
 output "arn" {
-  description = "ARN of the EKS Node Group"
-  value       = aws_eks_node_group.main.arn
-}
\ No newline at end of file
+  description = "ARN of the EKS Node Group (the \"main\" pool, or the first pool in fleet mode)"
+  value       = try(aws_eks_node_group.main["main"].arn, values(aws_eks_node_group.main)[0].arn)
+}
+
+output "node_group_arns" {
+  description = "Map of pool key to EKS Node Group ARN"
+  value       = { for k, ng in aws_eks_node_group.main : k => ng.arn }
+}
+
+output "node_group_names" {
+  description = "Map of pool key to EKS Node Group name"
+  value       = { for k, ng in aws_eks_node_group.main : k => ng.node_group_name }
+}
+
+output "launch_template_ids" {
+  description = "Map of pool key to the generated launch template ID (empty without launch template settings)"
+  value       = { for k, lt in aws_launch_template.main : k => lt.id }
+}
+
+output "node_groups" {
+  description = "Per-pool capacity settings of the EKS Node Groups"
+  value = {
+    for k, ng in aws_eks_node_group.main : k => {
+      name           = ng.node_group_name
+      arn            = ng.arn
+      status         = ng.status
+      capacity_type  = ng.capacity_type
+      ami_type       = ng.ami_type
+      instance_types = ng.instance_types
+      min_size       = ng.scaling_config[0].min_size
+      max_size       = ng.scaling_config[0].max_size
+      desired_size   = ng.scaling_config[0].desired_size
+
+      max_unavailable            = try(ng.update_config[0].max_unavailable, null)
+      max_unavailable_percentage = try(ng.update_config[0].max_unavailable_percentage, null)
+    }
+  }
+}
+
+output "coredns_version" {
+  description = "Installed coredns add-on version (null without coredns_addon)"
+  value       = try(aws_eks_addon.coredns[0].addon_version, null)
+}
@@ -41,8 +41,8 @@ provider "aws" {
 # Terraform Version Configuration
 # Specifies the required Terraform and provider versions
 terraform {
-  # Minimum Terraform version required
-  required_version = ">= 1.1.0"
+  # Minimum Terraform version required (optional() object attributes)
+  required_version = ">= 1.3.0"
 
   # Required providers with version constraints
   required_providers {
@@ -36,13 +36,13 @@ variable "eks_node_capacity_type" {
 }
 
 variable "eks_node_ami_type" {
-  description = "Type of Amazon Machine Image (AMI) associated with the EKS Node Group. Valid values: AL2_x86_64, AL2_x86_64_GPU, AL2_ARM_64, CUSTOM, BOTTLEROCKET_ARM_64, BOTTLEROCKET_x86_64"
+  description = "Type of Amazon Machine Image (AMI) associated with the EKS Node Group. Valid values: AL2_x86_64, AL2_x86_64_GPU, AL2_ARM_64, AL2023_x86_64_STANDARD, AL2023_ARM_64_STANDARD, CUSTOM, BOTTLEROCKET_ARM_64, BOTTLEROCKET_x86_64"
   type        = string
   default     = "AL2_x86_64"
 
   validation {
-    condition     = contains(["AL2_x86_64", "AL2_x86_64_GPU", "AL2_ARM_64", "CUSTOM", "BOTTLEROCKET_ARM_64", "BOTTLEROCKET_x86_64"], var.eks_node_ami_type)
-    error_message = "Valid values for eks_node_ami_type are AL2_x86_64, AL2_x86_64_GPU, AL2_ARM_64, CUSTOM, BOTTLEROCKET_ARM_64, or BOTTLEROCKET_x86_64."
+    condition     = contains(["AL2_x86_64", "AL2_x86_64_GPU", "AL2_ARM_64", "AL2023_x86_64_STANDARD", "AL2023_ARM_64_STANDARD", "CUSTOM", "BOTTLEROCKET_ARM_64", "BOTTLEROCKET_x86_64"], var.eks_node_ami_type)
+    error_message = "Valid values for eks_node_ami_type are AL2_x86_64, AL2_x86_64_GPU, AL2_ARM_64, AL2023_x86_64_STANDARD, AL2023_ARM_64_STANDARD, CUSTOM, BOTTLEROCKET_ARM_64, or BOTTLEROCKET_x86_64."
   }
 }
 
@@ -82,3 +82,160 @@ variable "cloud_tags" {
   default     = {}
 }
 
+
+variable "eks_node_groups" {
+  description = "Map of node pools to create in one apply, keyed by pool name. Attributes left unset fall back to the eks_node_* variables. When empty a single \"main\" pool named eks_node_group_name is created"
+  type = map(object({
+    node_group_name = optional(string)
+    subnet_ids      = optional(list(string))
+    capacity_type   = optional(string)
+    ami_type        = optional(string)
+    instance_types  = optional(list(string))
+    disk_size       = optional(number)
+    desired_size    = optional(number)
+    max_size        = optional(number)
+    min_size        = optional(number)
+    labels          = optional(map(string), {})
+
+    max_unavailable            = optional(number)
+    max_unavailable_percentage = optional(number)
+  }))
+  default = {}
+
+  validation {
+    condition = alltrue([
+      for pool in values(var.eks_node_groups) :
+      pool.capacity_type == null || contains(["ON_DEMAND", "SPOT"], coalesce(pool.capacity_type, "ON_DEMAND"))
+    ])
+    error_message = "capacity_type of each pool in eks_node_groups must be ON_DEMAND or SPOT."
+  }
+
+  validation {
+    condition = alltrue([
+      for pool in values(var.eks_node_groups) :
+      pool.max_unavailable == null || pool.max_unavailable_percentage == null
+    ])
+    error_message = "Each pool in eks_node_groups sets at most one of max_unavailable and max_unavailable_percentage."
+  }
+}
+
+variable "eks_node_max_unavailable" {
+  description = "Number of nodes replaced at a time during in-place node group updates (1-100). Null leaves EKS's default of one"
+  type        = number
+  default     = null
+
+  validation {
+    condition     = var.eks_node_max_unavailable == null || (coalesce(var.eks_node_max_unavailable, 1) >= 1 && coalesce(var.eks_node_max_unavailable, 1) <= 100)
+    error_message = "eks_node_max_unavailable must be between 1 and 100."
+  }
+}
+
+variable "eks_node_max_unavailable_percentage" {
+  description = "Percentage of nodes replaced at a time during in-place node group updates (1-100). Conflicts with eks_node_max_unavailable"
+  type        = number
+  default     = null
+
+  validation {
+    condition     = var.eks_node_max_unavailable_percentage == null || (coalesce(var.eks_node_max_unavailable_percentage, 1) >= 1 && coalesce(var.eks_node_max_unavailable_percentage, 1) <= 100)
+    error_message = "eks_node_max_unavailable_percentage must be between 1 and 100."
+  }
+}
+
+variable "eks_node_rollout" {
+  description = "How replacing changes roll out: rolling keeps the pool name, blue_green names pools with a generated suffix so a replacement pool is created next to the old one before it is drained"
+  type        = string
+  default     = "rolling"
+
+  validation {
+    condition     = contains(["rolling", "blue_green"], var.eks_node_rollout)
+    error_message = "Valid values for eks_node_rollout are rolling or blue_green."
+  }
+}
+
+variable "eks_node_max_pods" {
+  description = "Kubelet maxPods, set through the launch template (AL2023 and Bottlerocket AMI types)"
+  type        = number
+  default     = null
+}
+
+variable "eks_node_kube_reserved" {
+  description = "Kubelet kubeReserved, e.g. { cpu = \"250m\", memory = \"1Gi\" } (AL2023 and Bottlerocket AMI types)"
+  type        = map(string)
+  default     = null
+}
+
+variable "eks_node_system_reserved" {
+  description = "Kubelet systemReserved (AL2023 and Bottlerocket AMI types)"
+  type        = map(string)
+  default     = null
+}
+
+variable "eks_node_containerd_config" {
+  description = "containerd config TOML merged by nodeadm (AL2023 AMI types)"
+  type        = string
+  default     = null
+}
+
+variable "eks_node_volume_type" {
+  description = "EBS volume type of the node volume when a launch template is used (defaults to gp3)"
+  type        = string
+  default     = null
+
+  validation {
+    condition     = var.eks_node_volume_type == null || contains(["gp2", "gp3", "io1", "io2"], coalesce(var.eks_node_volume_type, "gp3"))
+    error_message = "Valid values for eks_node_volume_type are gp2, gp3, io1 or io2."
+  }
+}
+
+variable "eks_node_volume_iops" {
+  description = "Provisioned IOPS of the node volume (gp3: 3000-16000, io1/io2)"
+  type        = number
+  default     = null
+}
+
+variable "eks_node_volume_throughput" {
+  description = "Throughput in MiB/s of a gp3 node volume (125-1000)"
+  type        = number
+  default     = null
+
+  validation {
+    condition     = var.eks_node_volume_throughput == null || (coalesce(var.eks_node_volume_throughput, 125) >= 125 && coalesce(var.eks_node_volume_throughput, 125) <= 1000)
+    error_message = "eks_node_volume_throughput must be between 125 and 1000."
+  }
+}
+
+variable "eks_node_user_data" {
+  description = "Extra user data: a shell script part for AL2/AL2023, TOML settings for Bottlerocket"
+  type        = string
+  default     = null
+}
+
+variable "coredns_addon" {
+  description = "Manage coredns as an EKS add-on once the node groups exist"
+  type        = bool
+  default     = false
+}
+
+variable "coredns_version" {
+  description = "coredns add-on version; the EKS default for the cluster version when null"
+  type        = string
+  default     = null
+}
+
+variable "coredns_autoscaling" {
+  description = "Scale coredns replicas with the number of nodes and cores"
+  type        = bool
+  default     = false
+}
+
+variable "coredns_min_replicas" {
+  description = "Minimum coredns replicas with coredns_autoscaling"
+  type        = number
+  default     = 2
+}
+
+variable "coredns_max_replicas" {
+  description = "Maximum coredns replicas with coredns_autoscaling"
+  type        = number
+  default     = 10
+}
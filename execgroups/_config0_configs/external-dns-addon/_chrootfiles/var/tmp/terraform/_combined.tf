@@ -77,15 +77,15 @@ provider "aws" {
 
 # Kubernetes Provider Configuration
 provider "kubernetes" {
-  host                   = data.aws_eks_cluster.cluster.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.cluster.token
 }
 
 # Kubectl Provider Configuration
 provider "kubectl" {
-  host                   = data.aws_eks_cluster.cluster.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.cluster.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.cluster.token
   load_config_file       = false
 }
@@ -116,6 +116,24 @@ variable "eks_cluster" {
   }
 }
 
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
+variable "eks_oidc_issuer" {
+  description = "OIDC issuer URL of the EKS cluster"
+  type        = string
+  default     = null
+}
+
 # IAM Role Configuration
 variable "general_external_dns_role_name" {
   description = "Name of the existing general ExternalDNS IAM role with DNS permissions"
@@ -142,9 +160,33 @@ variable "external_dns_policy" {
 }
 
 variable "addon_version" {
-  description = "Version of the ExternalDNS EKS add-on"
+  description = "Version of the ExternalDNS EKS add-on. When null it is looked up in addon_versions.json (tools/addon_versions.py) by cluster version"
+  type        = string
+  default     = null
+}
+
+variable "addon_most_recent" {
+  description = "Use the newest compatible add-on version instead of the EKS default when addon_version is null"
+  type        = bool
+  default     = false
+}
+
+variable "addon_compute_type" {
+  description = "Compute type used to look up the add-on version (auto, ec2 or fargate)"
   type        = string
-  default     = "v0.18.0-eksbuild.1"
+  default     = "ec2"
+}
+
+variable "addon_arch" {
+  description = "Node architecture used to look up the add-on version (amd64 or arm64)"
+  type        = string
+  default     = "amd64"
+}
+
+variable "eks_cluster_version" {
+  description = "Kubernetes version of the EKS cluster. The aws_eks_cluster lookup is used when this is not set"
+  type        = string
+  default     = null
 }
 
 variable "namespace" {
@@ -200,8 +242,37 @@ variable "sources" {
 data "aws_caller_identity" "current" {}
 data "aws_region" "current" {}
 
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
 data "aws_eks_cluster" "cluster" {
-  name = var.eks_cluster
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+# eks_cluster_version stored as a float arrives as 1.3 for 1.30; no
+# single digit minor is still on EKS, so one is a dropped trailing zero
+locals {
+  lookup_cluster      = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null || var.eks_oidc_issuer == null || var.eks_cluster_version == null
+  cluster_endpoint    = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data     = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].certificate_authority[0].data : var.eks_cluster_ca_data
+  cluster_oidc_issuer = local.lookup_cluster ? data.aws_eks_cluster.cluster[0].identity[0].oidc[0].issuer : var.eks_oidc_issuer
+  cluster_version     = replace(local.lookup_cluster ? data.aws_eks_cluster.cluster[0].version : var.eks_cluster_version, "/^(\\d+\\.\\d)$/", "$${1}0")
+}
+
+# Add-on version from the index written by tools/addon_versions.py sync;
+# describe-addon-versions is only called for versions the index lacks
+locals {
+  addon_index   = jsondecode(file("${path.module}/addon_versions.json")).versions
+  addon_key     = "external-dns/${local.cluster_version}/${var.addon_compute_type}/${var.addon_arch}"
+  indexed_addon = var.addon_version != null ? var.addon_version : try(local.addon_index[local.addon_key][var.addon_most_recent == true ? "latest" : "default"], null)
+  addon_version = local.indexed_addon != null ? local.indexed_addon : data.aws_eks_addon_version.external_dns[0].version
+}
+
+data "aws_eks_addon_version" "external_dns" {
+  count              = local.indexed_addon == null ? 1 : 0
+  addon_name         = "external-dns"
+  kubernetes_version = local.cluster_version
+  most_recent        = var.addon_most_recent == true
 }
 
 data "aws_eks_cluster_auth" "cluster" {
@@ -210,13 +281,13 @@ data "aws_eks_cluster_auth" "cluster" {
 
 # Reference to existing OIDC provider
 data "aws_iam_openid_connect_provider" "eks" {
-  url = data.aws_eks_cluster.cluster.identity[0].oidc[0].issuer
+  url = local.cluster_oidc_issuer
 }
 
 # Local Values
 locals {
   txt_owner_id         = var.txt_owner_id != null ? var.txt_owner_id : "${var.eks_cluster}-external-dns"
-  oidc_issuer_url      = data.aws_eks_cluster.cluster.identity[0].oidc[0].issuer
+  oidc_issuer_url      = local.cluster_oidc_issuer
   oidc_issuer_hostname = replace(local.oidc_issuer_url, "https://", "")
   
   # Construct general external DNS role ARN using account ID and role name
@@ -301,7 +372,7 @@ resource "kubernetes_namespace" "external_dns" {
 resource "aws_eks_addon" "external_dns" {
   cluster_name                = var.eks_cluster
   addon_name                  = "external-dns"
-  addon_version               = var.addon_version
+  addon_version               = local.addon_version
   service_account_role_arn    = aws_iam_role.external_dns_cluster.arn
   resolve_conflicts_on_create = "OVERWRITE"
   resolve_conflicts_on_update = "OVERWRITE"
@@ -25,6 +25,18 @@ variable "eks_cluster" {
   type        = string
 }
 
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
 variable "cloud_tags" {
   description = "A map of tags to apply to all AWS resources"
   type        = map(string)
@@ -69,8 +81,17 @@ locals {
     k => var.k8_tags[k]
   }
 
-  # All CRD YAMLs in the 'crds/' directory
-  crd_files = fileset("${path.module}/crds", "*.yaml")
+  # Compact CRDs built from crds/*.yaml by tools/crd_compact.py:
+  # descriptions stripped, canonical json, one <crd name>.json per CRD
+  crd_dir   = "${path.module}/crds-compact"
+  crd_files = fileset(local.crd_dir, "*.json")
+
+  crds = {
+    for f in local.crd_files : trimsuffix(f, ".json") => {
+      sha256   = filesha256("${local.crd_dir}/${f}")
+      manifest = jsondecode(file("${local.crd_dir}/${f}"))
+    }
+  }
 }
 
 ####FILE####:::provider.tf
@@ -89,7 +110,7 @@ provider "aws" {
 }
 
 terraform {
-  required_version = ">= 1.1.0"
+  required_version = ">= 1.7.0" # removed blocks
   required_providers {
     aws = {
       source  = "hashicorp/aws"
@@ -99,51 +120,91 @@ terraform {
       source  = "hashicorp/kubernetes"
       version = ">= 2.11.0"
     }
+    kubectl = {
+      source  = "gavinbunney/kubectl"
+      version = ">= 1.14.0"
+    }
   }
 }
 
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
 data "aws_eks_cluster" "eks" {
-  name = var.eks_cluster
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.eks[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.eks[0].certificate_authority[0].data : var.eks_cluster_ca_data
 }
 
 data "aws_eks_cluster_auth" "eks" {
-  name = data.aws_eks_cluster.eks.name
+  name = var.eks_cluster
 }
 
+# only still needed to forget the old kubernetes_manifest state
 provider "kubernetes" {
-  host                   = data.aws_eks_cluster.eks.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.eks.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.eks.token
 }
 
-####FILE####:::main.tf
-resource "kubernetes_manifest" "argocd_crds" {
-  for_each = { for f in local.crd_files : f => yamldecode(file("${path.module}/crds/${f}")) }
+provider "kubectl" {
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
+  token                  = data.aws_eks_cluster_auth.eks.token
+  load_config_file       = false
+}
 
-  manifest = merge(
-    each.value,
+####FILE####:::main.tf
+# Server-side applied from the compact json.  yaml_body only changes when
+# a CRD's content hash does, so unchanged CRDs never re-apply, and state
+# carries the compact body and live-object fingerprints rather than the
+# decoded openAPI schema kubernetes_manifest kept.
+resource "kubectl_manifest" "argocd_crds" {
+  for_each = local.crds
+
+  server_side_apply = true
+  force_conflicts   = true
+
+  # the manager kubernetes_manifest applied with, so fields it set that
+  # the compact CRDs no longer carry (descriptions) are released
+  field_manager = "Terraform"
+
+  yaml_body = jsonencode(merge(
+    each.value.manifest,
     {
       metadata = merge(
-        try(each.value.metadata, {}),
+        each.value.manifest.metadata,
         {
           labels = merge(
-            try(each.value.metadata.labels, {}),
+            try(each.value.manifest.metadata.labels, {}),
             local.sorted_k8_tags,
             {
               "app.kubernetes.io/managed-by" = "Helm"
             }
           ),
           annotations = merge(
-            try(each.value.metadata.annotations, {}),
+            try(each.value.manifest.metadata.annotations, {}),
             {
               "meta.helm.sh/release-name"      = "argocd"
               "meta.helm.sh/release-namespace" = var.argocd_namespace
+              "config0.com/content-sha256"     = each.value.sha256
             }
           )
         }
       )
     }
-  )
+  ))
+}
+
+# The CRDs used to be kubernetes_manifest resources.  Forget them without
+# deleting anything (deleting a CRD deletes every Application with it);
+# kubectl_manifest above takes the live objects over.
+removed {
+  from = kubernetes_manifest.argocd_crds
 }
 
 ####FILE####:::outputs.tf
@@ -152,6 +213,11 @@ output "argocd_crd_files" {
   value       = local.crd_files
 }
 
+output "argocd_crd_sha256" {
+  description = "Content hash of each applied CRD"
+  value       = { for name, crd in local.crds : name => crd.sha256 }
+}
+
 output "applied_k8s_labels" {
   description = "Kubernetes labels applied to each CRD"
   value       = local.sorted_k8_tags
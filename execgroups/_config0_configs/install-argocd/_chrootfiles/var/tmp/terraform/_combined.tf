@@ -26,6 +26,18 @@ variable "eks_cluster" {
   type        = string
 }
 
+variable "eks_cluster_endpoint" {
+  description = "API server endpoint of the EKS cluster. The aws_eks_cluster lookup is skipped when this and eks_cluster_ca_data are set"
+  type        = string
+  default     = null
+}
+
+variable "eks_cluster_ca_data" {
+  description = "Base64 encoded certificate authority data of the EKS cluster"
+  type        = string
+  default     = null
+}
+
 variable "cloud_tags" {
   description = "A map of tags to apply to all AWS resources"
   type        = map(string)
@@ -62,6 +74,12 @@ variable "argocd_chart_repo_url" {
   default     = "https://argoproj.github.io/argo-helm"
 }
 
+variable "chart_repo_url" {
+  description = "Chart mirror (tools/chart_mirror.py) holding argo-cd-<version>.tgz; argocd_chart_repo_url is used when null"
+  type        = string
+  default     = null
+}
+
 
 ####FILE####:::provider.tf
 
@@ -78,7 +96,7 @@ terraform {
     }
     helm = {
       source  = "hashicorp/helm"
-      version = ">= 2.11.0"
+      version = ">= 3.0.0" # set = [...] list syntax
     }
   }
 }
@@ -91,24 +109,33 @@ provider "aws" {
   }
 }
 
+# The stack passes the cluster endpoint/CA in from the config0 resource db;
+# only describe the cluster when they are missing
 data "aws_eks_cluster" "eks" {
-  name = var.eks_cluster
+  count = local.lookup_cluster ? 1 : 0
+  name  = var.eks_cluster
+}
+
+locals {
+  lookup_cluster   = var.eks_cluster_endpoint == null || var.eks_cluster_ca_data == null
+  cluster_endpoint = local.lookup_cluster ? data.aws_eks_cluster.eks[0].endpoint : var.eks_cluster_endpoint
+  cluster_ca_data  = local.lookup_cluster ? data.aws_eks_cluster.eks[0].certificate_authority[0].data : var.eks_cluster_ca_data
 }
 
 data "aws_eks_cluster_auth" "eks" {
-  name = data.aws_eks_cluster.eks.name
+  name = var.eks_cluster
 }
 
 provider "kubernetes" {
-  host                   = data.aws_eks_cluster.eks.endpoint
-  cluster_ca_certificate = base64decode(data.aws_eks_cluster.eks.certificate_authority[0].data)
+  host                   = local.cluster_endpoint
+  cluster_ca_certificate = base64decode(local.cluster_ca_data)
   token                  = data.aws_eks_cluster_auth.eks.token
 }
 
 provider "helm" {
   kubernetes = {
-    host                   = data.aws_eks_cluster.eks.endpoint
-    cluster_ca_certificate = base64decode(data.aws_eks_cluster.eks.certificate_authority[0].data)
+    host                   = local.cluster_endpoint
+    cluster_ca_certificate = base64decode(local.cluster_ca_data)
     token                  = data.aws_eks_cluster_auth.eks.token
   }
 }
@@ -145,8 +172,8 @@ resource "kubernetes_namespace" "argocd" {
 
 resource "helm_release" "argocd" {
   name             = "argocd"
-  chart            = "argo-cd"
-  repository       = var.argocd_chart_repo_url
+  chart            = var.chart_repo_url == null ? "argo-cd" : "${trimsuffix(var.chart_repo_url, "/")}/argo-cd-${var.argocd_chart_version}.tgz"
+  repository       = var.chart_repo_url == null ? var.argocd_chart_repo_url : null
   version          = var.argocd_chart_version
   namespace        = kubernetes_namespace.argocd.metadata[0].name
   create_namespace = false
@@ -13,6 +13,384 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+# AMI types EKS stops publishing from kubernetes 1.33 on
+AL2_AMI_TYPES = ["AL2_x86_64", "AL2_x86_64_GPU", "AL2_ARM_64"]
+AL2_LAST_K8S_VERSION = (1, 32)
+
+# jobs that only do something with autoscaler="karpenter"; they stay
+# scheduled either way and return without inserting anything otherwise
+KARPENTER_JOBS = ["karpenter"]
+
+# lookup kind -> (ec2 call, id filter, response key)
+_EC2_DESCRIBE = {
+    "subnet": ("describe_subnets", "SubnetIds", "Subnets"),
+    "security_group": ("describe_security_groups", "GroupIds", "SecurityGroups"),
+    "vpc": ("describe_vpcs", "VpcIds", "Vpcs")
+}
+
+
+def _is_skipped(job, autoscaler):
+    if job in KARPENTER_JOBS:
+        return autoscaler != "karpenter"
+    return False
+
+
+def _get_k8s_version(value):
+    """
+    (major, minor) of a cluster version.  eks_cluster_version is parsed
+    as a float so 1.30 arrives as 1.3 - there is no single digit minor
+    EKS still runs, so one is read as a dropped trailing zero.
+    """
+    major, _, minor = str(value).partition(".")
+    if len(minor) == 1:
+        minor += "0"
+    return int(major), int(minor or 0)
+
+
+def _get_instance_arch(instance_type):
+    """arm64 for graviton families (m6g, c7gn, t4g, a1), x86_64 otherwise."""
+    family = instance_type.split(".")[0]
+    if family == "a1":
+        return "arm64"
+    match = re.match(r"^[a-z]+\d+([a-z]*)$", family)
+    if not match:
+        return None
+    return "arm64" if "g" in match.group(1) else "x86_64"
+
+
+def _is_accelerated(instance_type):
+    return bool(re.match(r"^(g|p|inf|trn|dl)\d", instance_type))
+
+
+def _get_aws_lookup(region):
+    """
+    lookup(kind, ids) -> {id: description, or None if it does not
+    exist}.  Ids the lookup cannot settle (no credentials, access
+    denied) are left out and their checks skipped with a warning.
+    Returns None without boto3.
+    """
+    try:
+        import boto3
+        from botocore.exceptions import BotoCoreError, ClientError
+    except ImportError:
+        return None
+
+    def lookup(kind, ids):
+        found = {}
+        for resource_id in ids:
+            try:
+                if kind == "iam_role":
+                    found[resource_id] = boto3.client("iam").get_role(RoleName=resource_id)["Role"]
+                else:
+                    call, id_filter, key = _EC2_DESCRIBE[kind]
+                    response = getattr(boto3.client("ec2", region_name=region), call)(
+                        **{id_filter: [resource_id]})
+                    found[resource_id] = response[key][0]
+            except ClientError as error:
+                code = error.response.get("Error", {}).get("Code", "")
+                if code.endswith("NotFound") or code == "NoSuchEntity":
+                    found[resource_id] = None
+            except BotoCoreError:
+                pass
+        return found
+
+    return lookup
+
+
+class _Preflight:
+    """
+    Cross-field checks over the arguments of every job, run by the
+    preflight job before eks_cluster so a bad nodegroup or add-on
+    argument fails in seconds instead of after the control plane is
+    created.  Problems are collected and raised together.  Presence of
+    subnets, security groups, the vpc and roles goes through a lookup
+    picked by preflight_lookup ("aws" - boto3, "none" - skipped).
+    Warnings go to the job's results as preflight_warnings.
+    """
+
+    def __init__(self, stack, lookup=None):
+        self.stack = stack
+        self.lookup = lookup
+        self.problems = []
+        self.warnings = []
+
+    def _check(self, ok, message):
+        if not ok:
+            self.problems.append(message)
+
+    def _find(self, kind, ids):
+        if not self.lookup or not ids:
+            return {}
+
+        found = self.lookup(kind, ids)
+        unknown = [resource_id for resource_id in ids if resource_id not in found]
+        if unknown:
+            self.warnings.append(f"could not look up {kind} {', '.join(unknown)}, not checked")
+
+        return found
+
+    def check_capacity(self):
+        min_size, desired_size, max_size = [int(self.stack.get_attr(f"eks_node_{key}_capacity"))
+                                            for key in ["min", "desired", "max"]]
+
+        self._check(min_size >= 0, f"eks_node_min_capacity {min_size} is negative")
+        self._check(max_size >= 1, f"eks_node_max_capacity {max_size} needs to be at least 1")
+        self._check(min_size <= desired_size <= max_size,
+                    f"eks_node capacities need min <= desired <= max, "
+                    f"got {min_size} <= {desired_size} <= {max_size}")
+
+    def check_ami(self):
+        ami_type = self.stack.eks_node_ami_type
+        major, minor = _get_k8s_version(self.stack.eks_cluster_version)
+        instance_types = self.stack.to_list(self.stack.eks_node_instance_types)
+
+        if ami_type in AL2_AMI_TYPES:
+            self._check((major, minor) <= AL2_LAST_K8S_VERSION,
+                        f"{ami_type} AMIs are not published for kubernetes {major}.{minor}")
+
+        if ami_type != "CUSTOM":
+            arch = "arm64" if "ARM" in ami_type else "x86_64"
+            for instance_type in instance_types:
+                self._check(_get_instance_arch(instance_type) in [None, arch],
+                            f"{instance_type} is not {arch}, the architecture of {ami_type}")
+                if "GPU" in ami_type:
+                    self._check(_is_accelerated(instance_type),
+                                f"{instance_type} has no accelerator for {ami_type}")
+
+        if self.stack.eks_node_capacity_type == "SPOT" and len(instance_types) < 2:
+            self.warnings.append("SPOT nodegroup with one instance type, capacity is more "
+                                 "likely to be interrupted (see tools/spot_planner.py)")
+
+    def check_autoscaler(self):
+        if self.stack.get_attr("autoscaler") != "karpenter":
+            return
+
+        self._check(self.stack.eks_node_ami_type != "CUSTOM",
+                    "autoscaler karpenter selects AMIs by family, eks_node_ami_type "
+                    "CUSTOM has none")
+        self._check(int(self.stack.karpenter_system_nodes) >= 1,
+                    "karpenter_system_nodes needs to be at least 1, the controller "
+                    "runs on the nodegroup")
+
+    def check_network(self):
+        cluster_subnets = self.stack.to_list(self.stack.get_attr("eks_cluster_subnet_ids") or [])
+        node_subnets = self.stack.to_list(self.stack.get_attr("eks_node_group_subnet_ids") or
+                                          cluster_subnets)
+        vpc_id = self.stack.vpc_id
+        sg_id = self.stack.eks_cluster_sg_id
+
+        self._check(cluster_subnets, "eks_cluster_subnet_ids is required by aws_eks_cluster")
+
+        found = self._find("vpc", [vpc_id])
+        self._check(found.get(vpc_id, True) is not None, f"vpc {vpc_id} does not exist")
+
+        found = self._find("security_group", [sg_id])
+        if found.get(sg_id):
+            self._check(found[sg_id]["VpcId"] == vpc_id,
+                        f"security group {sg_id} is in {found[sg_id]['VpcId']}, not {vpc_id}")
+        else:
+            self._check(sg_id not in found, f"security group {sg_id} does not exist")
+
+        found = self._find("subnet", sorted(set(cluster_subnets + node_subnets)))
+        for subnet_id, subnet in sorted(found.items()):
+            if subnet is None:
+                self.problems.append(f"subnet {subnet_id} does not exist")
+            else:
+                self._check(subnet["VpcId"] == vpc_id,
+                            f"subnet {subnet_id} is in {subnet['VpcId']}, not {vpc_id}")
+
+        zones = {found[subnet_id]["AvailabilityZone"] for subnet_id in cluster_subnets
+                 if found.get(subnet_id)}
+        if len(zones) == 1 and all(found.get(subnet_id) for subnet_id in cluster_subnets):
+            self.problems.append("eks_cluster_subnet_ids need to span at least two "
+                                 "availability zones")
+
+    def check_role(self, key):
+        role_name = self.stack.get_attr(key)
+        if not role_name:
+            return
+        role_name = role_name.split("/")[-1]
+        found = self._find("iam_role", [role_name])
+        self._check(found.get(role_name, True) is not None,
+                    f"{key}: iam role {role_name} does not exist")
+
+    def run(self, *checks):
+        for check in checks:
+            check()
+
+        if self.warnings:
+            self.stack.set_variable("preflight_warnings", self.warnings, types="list")
+        if self.problems:
+            raise Exception("preflight failed:\n  " + "\n  ".join(self.problems + [
+                f"(warning) {warning}" for warning in self.warnings]))
+
+        return {"problems": [], "warnings": self.warnings}
+
+
+def _get_preflight(stack):
+    """_Preflight with the lookup preflight_lookup picks."""
+    preflight = _Preflight(stack)
+    if stack.get_attr("preflight_lookup") == "aws":
+        preflight.lookup = _get_aws_lookup(stack.aws_default_region)
+        if preflight.lookup is None:
+            preflight.warnings.append("boto3 is not installed, skipping aws lookups")
+    return preflight
+
+
+# seconds a job sleeps instead of probing when readiness_probe is aws
+# but boto3 is missing - the timewait the schedules used to have
+READY_FALLBACK_WAIT = 120
+
+
+def _get_aws_status_source(region):
+    """
+    status(kind, name) -> (ready, detail) for "nodegroup"
+    (<cluster>/<node group name>), ready once every node group of that
+    name is ACTIVE.  Returns None without boto3.
+    """
+    try:
+        import boto3
+        from botocore.exceptions import BotoCoreError, ClientError
+    except ImportError:
+        return None
+
+    eks = boto3.client("eks", region_name=region)
+
+    def status(kind, name):
+        if kind != "nodegroup":
+            raise ValueError(f"unknown readiness kind {kind}")
+
+        cluster, nodegroup = name.split("/", 1)
+        # blue_green pools are created with the name as name_prefix
+        pattern = re.compile(re.escape(nodegroup) + r"(-[0-9a-f]{26})?")
+
+        try:
+            found = [candidate
+                     for page in eks.get_paginator("list_nodegroups").paginate(clusterName=cluster)
+                     for candidate in page["nodegroups"] if pattern.fullmatch(candidate)]
+            if not found:
+                return False, "no node group yet"
+
+            states = [eks.describe_nodegroup(clusterName=cluster,
+                                             nodegroupName=candidate)["nodegroup"]["status"]
+                      for candidate in found]
+        except (BotoCoreError, ClientError) as error:
+            return False, str(error)
+
+        pending = [state for state in states if state != "ACTIVE"]
+        return not pending, (pending or ["ACTIVE"])[0]
+
+    return status
+
+
+class _Readiness:
+    """
+    Polls a status source until a condition holds, with exponential
+    backoff and jitter, so a job goes ahead as soon as what it depends
+    on is ready instead of after a fixed sched timewait.
+    """
+
+    def __init__(self, source, base=5, cap=60, timeout=900,
+                 sleep=time.sleep, clock=time.monotonic, rng=random):
+        self.source = source
+        self.base = base
+        self.cap = cap
+        self.timeout = timeout
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng
+
+    def delay(self, attempt):
+        """Equal jitter: uniform over [d/2, d], d = min(cap, base * 2^attempt)."""
+        delay = min(self.cap, self.base * 2 ** attempt)
+        return self.rng.uniform(delay / 2, delay)
+
+    def wait(self, kind, name):
+        """Return the seconds waited for kind/name to be ready."""
+        start = self.clock()
+        attempt = 0
+
+        while True:
+            ready, detail = self.source(kind, name)
+            elapsed = self.clock() - start
+            if ready:
+                return elapsed
+            if elapsed >= self.timeout:
+                raise Exception(f"{kind} {name} not ready after {int(elapsed)}s: {detail}")
+            self.sleep(min(self.delay(attempt), self.timeout - elapsed))
+            attempt += 1
+
+
+def _wait_ready(stack, *conditions):
+    """Wait for each (kind, name) with the source readiness_probe picks."""
+    if stack.get_attr("readiness_probe") != "aws":
+        return
+
+    source = _get_aws_status_source(stack.aws_default_region)
+    if source is None:
+        time.sleep(READY_FALLBACK_WAIT)
+        return
+
+    readiness = _Readiness(source)
+    for kind, name in conditions:
+        readiness.wait(kind, name)
+
+
 class Main(newSchedStack):
 
     def __init__(self, stackargs):
@@ -21,30 +399,78 @@ class Main(newSchedStack):
         # docker image to execute terraform with
         self.parse.add_optional(key="tf_runtime",
                                 default="tofu:1.9.1",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 types="str")
 
         self.parse.add_required(key="eks_cluster",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 types="str")
 
         self.parse.add_optional(key="aws_default_region",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 default="us-west-1")
 
         self.parse.add_optional(key="eks_cluster_subnet_ids",
                                 tags="cluster")
 
         self.parse.add_optional(key="cloud_tags_hash",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 default='null',
                                 types="str")
 
+        # cli config for the shared provider mirror/plugin cache
+        self.parse.add_optional(key="tf_cli_config_file",
+                                tags="cluster,nodegroups,karpenter",
+                                default="null",
+                                types="str")
+
+        # skip the plan cache and re-run tofu for every job (drift checks)
+        self.parse.add_optional(key="force",
+                                tags="cluster,nodegroups,karpenter",
+                                default="null",
+                                types="bool")
+
+        # timing spans in the job results (see tools/span_report.py), one
+        # trace per job unless trace_id ties the jobs of a run together
+        self.parse.add_optional(key="trace_spans",
+                                tags="cluster,nodegroups,karpenter",
+                                default="null",
+                                types="bool")
+
+        self.parse.add_optional(key="trace_id",
+                                default="null",
+                                types="str")
+
         self.parse.add_optional(key="remote_stateful_bucket",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 default='null',
                                 types="str,null")
 
+        # "karpenter" installs Karpenter after the nodegroup, which then
+        # only runs karpenter_system_nodes nodes for system pods
+        self.parse.add_optional(key="autoscaler",
+                                default="none",
+                                choices=["none", "karpenter"],
+                                types="str")
+
+        self.parse.add_optional(key="karpenter_system_nodes",
+                                default="2",
+                                types="int")
+
+        # how the preflight job checks subnets, security groups, the
+        # vpc and roles exist: "aws" (boto3) or "none"
+        self.parse.add_optional(key="preflight_lookup",
+                                default="aws",
+                                choices=["aws", "none"],
+                                types="str")
+
+        # how karpenter waits for the system node group to be ACTIVE:
+        # "aws" (poll eks with backoff) or "none"
+        self.parse.add_optional(key="readiness_probe",
+                                default="aws",
+                                choices=["aws", "none"],
+                                types="str")
+
         # add execgroup
         self.stack.add_execgroup("config0-hub:::aws_eks::eks-cluster",
                                  "cloud_resource")
@@ -56,13 +482,14 @@ class Main(newSchedStack):
         # add substacks
         self.stack.add_substack("config0-hub:::aws_eks::aws_eks_cluster")
         self.stack.add_substack("config0-hub:::aws_eks::aws_eks_nodegroup")
+        self.stack.add_substack("config0-hub:::aws_eks::aws_eks_karpenter")
 
         # initialize
         self.stack.init_execgroups()
         self.stack.init_substacks()
         self.stack.init_scripts()
 
-    def run_eks_cluster(self):
+    def _add_cluster_args(self):
         self.parse.add_required(key="vpc_id",
                                 tags="cluster",
                                 types="str")
@@ -77,6 +504,12 @@ class Main(newSchedStack):
                                 tags="cluster",
                                 types="str,null")
 
+        self.parse.add_optional(key="role_mapping",
+                                default="null",
+                                choices=["access_entry", "codebuild"],
+                                tags="cluster",
+                                types="str")
+
         self.parse.add_optional(key="eks_cluster_version",
                                 default="1.25",
                                 tags="cluster",
@@ -87,28 +520,53 @@ class Main(newSchedStack):
                                 tags="cluster",
                                 types="bool")
 
+        # core add-on settings passed through to aws_eks_cluster
+        for key in ["core_addons_most_recent",
+                    "vpc_cni_addon",
+                    "vpc_cni_version",
+                    "vpc_cni_prefix_delegation",
+                    "vpc_cni_warm_prefix_target",
+                    "vpc_cni_warm_ip_target",
+                    "vpc_cni_minimum_ip_target",
+                    "kube_proxy_addon",
+                    "kube_proxy_version",
+                    "kube_proxy_mode",
+                    "kube_proxy_ipvs_scheduler"]:
+            self.parse.add_optional(key=key,
+                                    tags="cluster",
+                                    default="null")
+
+    def run_eks_cluster(self):
+        self._add_cluster_args()
+
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="cluster",
-                                                    output="dict")
+        with _span(self.stack, "aws_eks", "job eks_cluster", job="eks_cluster") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="cluster",
+                                                        output="dict")
 
-        human_description = f"Create EKS cluster {self.stack.eks_cluster}"
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        inputargs = {
-            "default_values": default_values,
-            "automation_phase": "infrastructure",
-            "human_description": human_description
-        }
+            human_description = f"Create EKS cluster {self.stack.eks_cluster}"
 
-        return self.stack.aws_eks_cluster.insert(display=True, **inputargs)
+            inputargs = {
+                "default_values": default_values,
+                "automation_phase": "infrastructure",
+                "human_description": human_description
+            }
 
-    def run_eks_nodegroup(self):
+            results = self.stack.aws_eks_cluster.insert(display=True, **inputargs)
+
+        return results
+
+    def _add_nodegroup_args(self):
         self.parse.add_required(key="eks_node_capacity_type",
                                 default="ON_DEMAND",
                                 choices=["ON_DEMAND", "SPOT"],
-                                tags="nodegroups",
+                                tags="nodegroups,karpenter",
                                 types="str")
 
         self.parse.add_required(key="eks_node_ami_type",
@@ -116,18 +574,22 @@ class Main(newSchedStack):
                                 choices=["AL2_x86_64",
                                          "AL2_x86_64_GPU",
                                          "AL2_ARM_64",
+                                         "AL2023_x86_64_STANDARD",
+                                         "AL2023_ARM_64_STANDARD",
+                                         "BOTTLEROCKET_x86_64",
+                                         "BOTTLEROCKET_ARM_64",
                                          "CUSTOM"],
-                                tags="nodegroups",
+                                tags="nodegroups,karpenter",
                                 types="str")
 
         self.parse.add_optional(key="eks_node_instance_types",
                                 default=["t3.medium"],
-                                tags="nodegroups",
+                                tags="nodegroups,karpenter",
                                 types="list")
 
         self.parse.add_optional(key="eks_node_role_arn",
                                 default="null",
-                                tags="cluster,nodegroups",
+                                tags="cluster,nodegroups,karpenter",
                                 types="str")
 
         self.parse.add_optional(key="eks_node_max_capacity",
@@ -147,7 +609,7 @@ class Main(newSchedStack):
 
         self.parse.add_optional(key="eks_node_disksize",
                                 default="25",
-                                tags="nodegroups",
+                                tags="nodegroups,karpenter",
                                 types="int")
 
         self.parse.add_optional(key="eks_node_group_name",
@@ -160,43 +622,209 @@ class Main(newSchedStack):
                                 default=1800)
 
         self.parse.add_optional(key="eks_node_group_subnet_ids",
-                                tags="nodegroups",
+                                tags="nodegroups,karpenter",
                                 default="null")
 
-        self.stack.init_variables()
+        # rolling update controls passed through to aws_eks_nodegroup
+        self.parse.add_optional(key="eks_node_max_unavailable",
+                                tags="nodegroups",
+                                default="null",
+                                types="int")
+
+        self.parse.add_optional(key="eks_node_max_unavailable_percentage",
+                                tags="nodegroups",
+                                default="null",
+                                types="int")
+
+        self.parse.add_optional(key="eks_node_rollout",
+                                tags="nodegroups",
+                                default="rolling",
+                                choices=["rolling", "blue_green"],
+                                types="str")
+
+        self.parse.add_optional(key="eks_node_drain_budget",
+                                tags="nodegroups",
+                                default="null",
+                                types="int")
+
+        # launch template settings passed through to aws_eks_nodegroup;
+        # the EC2NodeClass takes all but the containerd config
+        for key in ["eks_node_max_pods",
+                    "eks_node_kube_reserved",
+                    "eks_node_system_reserved",
+                    "eks_node_containerd_config",
+                    "eks_node_volume_type",
+                    "eks_node_volume_iops",
+                    "eks_node_volume_throughput",
+                    "eks_node_user_data"]:
+            tags = "nodegroups" if key == "eks_node_containerd_config" else "nodegroups,karpenter"
+            self.parse.add_optional(key=key,
+                                    tags=tags,
+                                    default="null")
+
+        # coredns add-on passed through to aws_eks_nodegroup, which adds
+        # it after the pools it needs to go ACTIVE
+        for key in ["coredns_addon",
+                    "coredns_version",
+                    "coredns_autoscaling",
+                    "coredns_min_replicas",
+                    "coredns_max_replicas"]:
+            self.parse.add_optional(key=key,
+                                    tags="nodegroups",
+                                    default="null")
+
+    def _add_karpenter_args(self):
+        # controller and NodePool settings passed through to aws_eks_karpenter
+        for key in ["karpenter_version",
+                    "karpenter_namespace",
+                    "karpenter_replicas",
+                    "pod_identity_agent_addon",
+                    "chart_repo_url",
+                    "karpenter_nodepool",
+                    "karpenter_ami_version",
+                    "karpenter_labels",
+                    "karpenter_cpu_limit",
+                    "karpenter_memory_limit",
+                    "karpenter_consolidation_policy",
+                    "karpenter_consolidate_after",
+                    "karpenter_expire_after"]:
+            self.parse.add_optional(key=key,
+                                    tags="karpenter",
+                                    default="null")
+
+    def _get_system_nodegroup(self):
+        # the default aws_eks_nodegroup gives the main pool
+        return self.stack.get_attr("eks_node_group_name") or f"{self.stack.eks_cluster}-nodegroup-main"
+
+    def _set_system_nodes(self):
+        # with karpenter the nodegroup is a fixed-size on-demand system
+        # pool for the controller; eks_node_capacity_type is for the NodePool
+        if self.stack.autoscaler != "karpenter":
+            return
+
+        for key in ["min", "desired", "max"]:
+            self.stack.set_variable(f"eks_node_{key}_capacity",
+                                    self.stack.karpenter_system_nodes,
+                                    tags="nodegroups",
+                                    types="int")
+
+        self.stack.set_variable("eks_node_capacity_type",
+                                "ON_DEMAND",
+                                tags="nodegroups",
+                                types="str")
 
+    def _set_nodegroup_subnet_ids(self):
         if not self.stack.get_attr("eks_node_group_subnet_ids"):
             self.stack.set_variable("eks_node_group_subnet_ids",
-                                    self.stack.eks_cluster_subnet_ids)
+                                    self.stack.get_attr("eks_cluster_subnet_ids"))
+
+    def run_preflight(self):
+        # every argument of every job, so types and choices are
+        # verified here rather than in the job that uses them
+        self._add_cluster_args()
+        self._add_nodegroup_args()
+        self._add_karpenter_args()
+
+        self.stack.init_variables()
+        self._set_nodegroup_subnet_ids()
+        self.stack.verify_variables()
+
+        preflight = _get_preflight(self.stack)
+
+        with _span(self.stack, "aws_eks", "job preflight", job="preflight"):
+            preflight.run(preflight.check_capacity,
+                          preflight.check_ami,
+                          preflight.check_autoscaler,
+                          preflight.check_network,
+                          lambda: preflight.check_role("role_name"),
+                          lambda: preflight.check_role("eks_node_role_arn"))
+
+        return self.stack.get_results()
+
+    def run_eks_nodegroup(self):
+        self._add_nodegroup_args()
+
+        self.stack.init_variables()
+        self._set_nodegroup_subnet_ids()
 
         if not self.stack.get_attr("eks_node_group_subnet_ids"):
             raise Exception("needs to provide eks_cluster_subnet_ids or eks_node_group_subnet_ids")
 
         self.stack.verify_variables()
+        self._set_system_nodes()
 
-        default_values = self.stack.get_tagged_vars(tag="nodegroups",
-                                                    output="dict")
+        with _span(self.stack, "aws_eks", "job eks_nodegroup", job="eks_nodegroup") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="nodegroups",
+                                                        output="dict")
 
-        human_description = f"Create EKS nodegroup {self.stack.eks_cluster}"
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        inputargs = {"default_values": default_values,
-                     "automation_phase": "infrastructure",
-                     "human_description": human_description}
+            human_description = f"Create EKS nodegroup {self.stack.eks_cluster}"
 
-        return self.stack.aws_eks_nodegroup.insert(display=True, **inputargs)
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.aws_eks_nodegroup.insert(display=True, **inputargs)
+
+        return results
+
+    def run_karpenter(self):
+        self._add_nodegroup_args()
+        self._add_karpenter_args()
+
+        self.stack.init_variables()
+        self._set_nodegroup_subnet_ids()
+        self.stack.verify_variables()
+
+        if _is_skipped("karpenter", self.stack.autoscaler):
+            return self.stack.get_results()
+
+        with _span(self.stack, "aws_eks", "job karpenter", job="karpenter") as traceparent:
+            # the controller is scheduled on the system node group
+            system_nodegroup = f"{self.stack.eks_cluster}/{self._get_system_nodegroup()}"
+            _wait_ready(self.stack, ("nodegroup", system_nodegroup))
+
+            default_values = self.stack.get_tagged_vars(tag="karpenter",
+                                                        output="dict")
+
+            if traceparent:
+                default_values["trace_parent"] = traceparent
+
+            human_description = f"Install Karpenter on EKS cluster {self.stack.eks_cluster}"
+
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.aws_eks_karpenter.insert(display=True, **inputargs)
+
+        return results
 
     def run(self):
         self.stack.unset_parallel(sched_init=True)
+        self.add_job("preflight")
         self.add_job("eks_cluster")
         self.add_job("eks_nodegroup")
+        self.add_job("karpenter")
 
         return self.finalize_jobs()
 
     def schedule(self):
+        sched = self.new_schedule()
+        sched.job = "preflight"
+        sched.archive.timeout = 300
+        sched.archive.timewait = 10
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Validate arguments of every job"
+        sched.on_success = ["eks_cluster"]
+        self.add_schedule()
+
         sched = self.new_schedule()
         sched.job = "eks_cluster"
         sched.archive.timeout = 3600
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.conditions.retries = 1
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create EKS cluster"
@@ -206,9 +834,18 @@ class Main(newSchedStack):
         sched = self.new_schedule()
         sched.job = "eks_nodegroup"
         sched.archive.timeout = 3600
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create EKS nodegroup"
+        sched.on_success = ["karpenter"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "karpenter"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 10
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install Karpenter"
         self.add_schedule()
 
         return self.get_schedules()
\ No newline at end of file
@@ -15,6 +15,200 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Copyright (C) 2025 Gary Leong <gary@config0.com>
 """
 
+import os
+import time
+from contextlib import contextmanager
+
+# job -> jobs it waits on.  preflight validates the arguments of
+# every job before the cluster is created.  every add-on only needs the cluster
+# to exist; argocd is the one real join since the helm chart is
+# installed with installCRDs=false and expects the CRDs in place.
+# on_success edges in schedule() are derived from this table.
+# addons runs all of them as one root (aws_eks_addons) and only does
+# work with bundle_addons set, in which case BUNDLED_JOBS are no-ops.
+# a job only starts once its upstream insert has returned, i.e. after
+# tofu waited for the cluster to be ACTIVE, so the timewaits are short.
+DEPENDS_ON = {
+    "preflight": [],
+    "eks_cluster": ["preflight"],
+    "base_helm": ["eks_cluster"],
+    "external_dns": ["eks_cluster"],
+    "argocd_crds": ["eks_cluster"],
+    "argocd": ["argocd_crds"],
+    "addons": ["eks_cluster"]
+}
+
+BUNDLED_JOBS = ["base_helm", "external_dns", "argocd_crds", "argocd"]
+
+
+def _get_on_success(job):
+    return [name for name, upstreams in DEPENDS_ON.items()
+            if job in upstreams]
+
+
+def _is_skipped(job, bundle_addons):
+    if job in BUNDLED_JOBS:
+        return bool(bundle_addons)
+    if job == "addons":
+        return not bundle_addons
+    return False
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_aws_lookup(region):
+    """
+    lookup(kind, ids) -> {id: description, or None if it does not
+    exist}.  Ids the lookup cannot settle (no credentials, access
+    denied) are left out and their checks skipped with a warning.
+    Returns None without boto3.
+    """
+    try:
+        import boto3
+        from botocore.exceptions import BotoCoreError, ClientError
+    except ImportError:
+        return None
+
+    def lookup(kind, ids):
+        found = {}
+        for resource_id in ids:
+            try:
+                if kind == "vpc_name":
+                    response = boto3.client("ec2", region_name=region).describe_vpcs(
+                        Filters=[{"Name": "tag:Name", "Values": [resource_id]}])
+                    found[resource_id] = (response["Vpcs"] or [None])[0]
+                else:
+                    found[resource_id] = boto3.client("iam").get_role(RoleName=resource_id)["Role"]
+            except ClientError as error:
+                code = error.response.get("Error", {}).get("Code", "")
+                if code.endswith("NotFound") or code == "NoSuchEntity":
+                    found[resource_id] = None
+            except BotoCoreError:
+                pass
+        return found
+
+    return lookup
+
+
+class _Preflight:
+    """
+    Checks run by the preflight job before eks_cluster, so a missing
+    vpc or External DNS role fails in seconds instead of after the
+    control plane is created.  Problems are collected and raised
+    together; warnings go to the job's results as preflight_warnings.
+    Presence goes through a lookup picked by preflight_lookup ("aws" -
+    boto3, "none" - skipped).
+    """
+
+    def __init__(self, stack, lookup=None):
+        self.stack = stack
+        self.lookup = lookup
+        self.problems = []
+        self.warnings = []
+
+    def _check(self, ok, message):
+        if not ok:
+            self.problems.append(message)
+
+    def _find(self, kind, ids):
+        if not self.lookup or not ids:
+            return {}
+
+        found = self.lookup(kind, ids)
+        unknown = [resource_id for resource_id in ids if resource_id not in found]
+        if unknown:
+            self.warnings.append(f"could not look up {kind} {', '.join(unknown)}, not checked")
+
+        return found
+
+    def check_vpc_name(self):
+        vpc_name = self.stack.vpc_name
+        found = self._find("vpc_name", [vpc_name])
+        self._check(found.get(vpc_name, True) is not None, f"no vpc tagged Name={vpc_name}")
+
+    def check_role(self, key):
+        role_name = self.stack.get_attr(key)
+        if not role_name:
+            return
+        role_name = role_name.split("/")[-1]
+        found = self._find("iam_role", [role_name])
+        self._check(found.get(role_name, True) is not None,
+                    f"{key}: iam role {role_name} does not exist")
+
+    def run(self, *checks):
+        for check in checks:
+            check()
+
+        if self.warnings:
+            self.stack.set_variable("preflight_warnings",
+                                    self.warnings,
+                                    types="list")
+
+        if self.problems:
+            raise Exception("preflight failed:\n  " + "\n  ".join(self.problems + [
+                f"(warning) {warning}" for warning in self.warnings]))
+
+        return {"problems": [], "warnings": self.warnings}
+
+
+def _get_preflight(stack):
+    """_Preflight with the lookup preflight_lookup picks."""
+    preflight = _Preflight(stack)
+
+    if stack.get_attr("preflight_lookup") == "aws":
+        preflight.lookup = _get_aws_lookup(stack.aws_default_region)
+        if preflight.lookup is None:
+            preflight.warnings.append("boto3 is not installed, skipping aws lookups")
+
+    return preflight
+
+
 class Main(newSchedStack):
 
     def __init__(self, stackargs):
@@ -23,197 +217,347 @@ class Main(newSchedStack):
         # docker image to execute terraform with
         self.parse.add_optional(key="tf_runtime",
                                 default="tofu:1.9.1",
-                                tags="cluster,base_helm,external_dns,argocd_crds,argocd",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
                                 types="str")
 
         self.parse.add_required(key="eks_cluster",
-                                tags="cluster,base_helm,external_dns,argocd_crds,argocd",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
                                 types="str")
 
         self.parse.add_required(key="vpc_name",
                                 tags="cluster",
                                 types="str")
 
+        # null leaves the version to aws_eks_auto
+        self.parse.add_optional(key="eks_cluster_version",
+                                tags="cluster",
+                                default="null",
+                                types="str")
+
         self.parse.add_optional(key="aws_default_region",
-                                tags="cluster,base_helm,external_dns,argocd_crds,argocd",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
                                 default="us-west-1")
 
         self.parse.add_optional(key="cloud_tags_hash",
-                                tags="cluster,base_helm,external_dns,argocd_crds,argocd",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
                                 default='null',
                                 types="str")
 
+        # cli config for the shared provider mirror/plugin cache
+        self.parse.add_optional(key="tf_cli_config_file",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
+                                default="null",
+                                types="str")
+
+        # helm chart mirror (tools/chart_mirror.py) for base_helm and argocd
+        self.parse.add_optional(key="chart_repo_url",
+                                tags="base_helm,argocd,addons",
+                                default="null",
+                                types="str")
+
+        # skip the plan cache and re-run tofu for every job (drift checks)
+        self.parse.add_optional(key="force",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
+                                default="null",
+                                types="bool")
+
+        # timing spans in the job results (see tools/span_report.py), one
+        # trace per job unless trace_id ties the jobs of a run together
+        self.parse.add_optional(key="trace_spans",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
+                                default="null",
+                                types="bool")
+
+        self.parse.add_optional(key="trace_id",
+                                default="null",
+                                types="str")
+
         self.parse.add_optional(key="remote_stateful_bucket",
-                                tags="cluster,base_helm,external_dns,argocd_crds,argocd",
+                                tags="cluster,base_helm,external_dns,argocd_crds,argocd,addons",
                                 default='null',
                                 types="str,null")
 
         self.parse.add_required(key="general_external_dns_role_name",
-                                tags="external_dns",
+                                tags="external_dns,addons",
                                 types="str")
 
         self.parse.add_required(key="domain_filters",
                                 default="null",
-                                tags="external_dns",
+                                tags="external_dns,addons",
                                 types="str")
 
         self.parse.add_optional(key="external_dns_policy",
-                                tags="external_dns",
+                                tags="external_dns,addons",
                                 default="upsert-only",
                                 choices=["upsert-only","sync"])
 
+        # add-on substacks otherwise reuse the cluster metadata
+        # stored by aws_eks_auto instead of describing the cluster
+        self.parse.add_optional(key="refresh_cluster_metadata",
+                                tags="base_helm,external_dns,argocd_crds,argocd,addons",
+                                default="null",
+                                types="bool")
+
+        # how the preflight job checks the vpc and the external dns
+        # role exist: "aws" (boto3) or "none"
+        self.parse.add_optional(key="preflight_lookup",
+                                default="aws",
+                                choices=["aws", "none"],
+                                types="str")
+
+        # install the add-ons as one terraform root (aws_eks_addons)
+        # in the addons job instead of one root per add-on
+        self.parse.add_optional(key="bundle_addons",
+                                default="null",
+                                types="bool")
+
         # add substacks
         self.stack.add_substack("config0-hub:::aws_eks::aws_eks_auto")
         self.stack.add_substack("config0-hub:::aws_eks::base_helm_pkgs")
         self.stack.add_substack("config0-hub:::aws_eks::external_dns_addon")
         self.stack.add_substack("config0-hub:::aws_eks::install_argo_crds")
         self.stack.add_substack("config0-hub:::aws_eks::install_argocd")
+        self.stack.add_substack("config0-hub:::aws_eks::aws_eks_addons")
 
         # initialize
         self.stack.init_substacks()
 
-    def run_eks_cluster(self):
+    def run_preflight(self):
+        # every job's arguments are declared in __init__, so this
+        # verifies all of them before eks_cluster starts
+        self.stack.init_variables()
+        self.stack.verify_variables()
+
+        preflight = _get_preflight(self.stack)
+
+        with _span(self.stack, "aws_eks2", "job preflight", job="preflight"):
+            preflight.run(preflight.check_vpc_name,
+                          lambda: preflight.check_role("general_external_dns_role_name"))
+
+        return self.stack.get_results()
 
+    def run_eks_cluster(self):
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="cluster",
-                                                    output="dict")
+        with _span(self.stack, "aws_eks2", "job eks_cluster", job="eks_cluster") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="cluster",
+                                                        output="dict")
 
-        human_description = f"Create EKS cluster {self.stack.eks_cluster}"
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        inputargs = {
-            "default_values": default_values,
-            "automation_phase": "infrastructure",
-            "human_description": human_description
-        }
+            human_description = f"Create EKS cluster {self.stack.eks_cluster}"
 
-        return self.stack.aws_eks_auto.insert(display=True, **inputargs)
+            inputargs = {
+                "default_values": default_values,
+                "automation_phase": "infrastructure",
+                "human_description": human_description
+            }
 
-    def run_base_helm(self):
+            results = self.stack.aws_eks_auto.insert(display=True, **inputargs)
 
+        return results
+
+    def run_base_helm(self):
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="base_helm",
-                                                    output="dict")
+        if _is_skipped("base_helm", self.stack.get_attr("bundle_addons")):
+            return self.stack.get_results()
 
-        human_description = f"Create Base Helm {self.stack.eks_cluster}"
+        with _span(self.stack, "aws_eks2", "job base_helm", job="base_helm") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="base_helm",
+                                                        output="dict")
 
-        inputargs = {"default_values": default_values,
-                     "automation_phase": "infrastructure",
-                     "human_description": human_description}
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        return self.stack.base_helm_pkgs.insert(display=True, **inputargs)
+            human_description = f"Create Base Helm {self.stack.eks_cluster}"
 
-    def run_external_dns(self):
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.base_helm_pkgs.insert(display=True, **inputargs)
+
+        return results
 
+    def run_external_dns(self):
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="external_dns",
-                                                    output="dict")
+        if _is_skipped("external_dns", self.stack.get_attr("bundle_addons")):
+            return self.stack.get_results()
 
-        human_description = f"Install External DNS on {self.stack.eks_cluster}"
+        with _span(self.stack, "aws_eks2", "job external_dns", job="external_dns") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="external_dns",
+                                                        output="dict")
 
-        inputargs = {"default_values": default_values,
-                     "automation_phase": "infrastructure",
-                     "human_description": human_description}
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        return self.stack.external_dns_addon.insert(display=True, **inputargs)
+            human_description = f"Install External DNS on {self.stack.eks_cluster}"
 
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
 
-    def run_argocd_crds(self):
+            results = self.stack.external_dns_addon.insert(display=True, **inputargs)
 
+        return results
+
+
+    def run_argocd_crds(self):
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="argocd_crds",
-                                                    output="dict")
+        if _is_skipped("argocd_crds", self.stack.get_attr("bundle_addons")):
+            return self.stack.get_results()
+
+        with _span(self.stack, "aws_eks2", "job argocd_crds", job="argocd_crds") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="argocd_crds",
+                                                        output="dict")
 
-        human_description = f"Install ArgoCD CRDS on {self.stack.eks_cluster}"
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        inputargs = {"default_values": default_values,
-                     "automation_phase": "infrastructure",
-                     "human_description": human_description}
+            human_description = f"Install ArgoCD CRDS on {self.stack.eks_cluster}"
 
-        return self.stack.install_argo_crds.insert(display=True, **inputargs)
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.install_argo_crds.insert(display=True, **inputargs)
+
+        return results
 
     def run_argocd(self):
+        # initialize variables and verify
+        self.stack.init_variables()
+        self.stack.verify_variables()
+
+        if _is_skipped("argocd", self.stack.get_attr("bundle_addons")):
+            return self.stack.get_results()
+
+        with _span(self.stack, "aws_eks2", "job argocd", job="argocd") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="argocd",
+                                                        output="dict")
+
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
+            human_description = f"Install ArgoCD on {self.stack.eks_cluster}"
+
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.install_argocd.insert(display=True, **inputargs)
+
+        return results
+
+    def run_addons(self):
         # initialize variables and verify
         self.stack.init_variables()
         self.stack.verify_variables()
 
-        default_values = self.stack.get_tagged_vars(tag="argocd",
-                                                    output="dict")
+        if _is_skipped("addons", self.stack.get_attr("bundle_addons")):
+            return self.stack.get_results()
+
+        with _span(self.stack, "aws_eks2", "job addons", job="addons") as traceparent:
+            default_values = self.stack.get_tagged_vars(tag="addons",
+                                                        output="dict")
 
-        human_description = f"Install ArgoCD on {self.stack.eks_cluster}"
+            if traceparent:
+                default_values["trace_parent"] = traceparent
 
-        inputargs = {"default_values": default_values,
-                     "automation_phase": "infrastructure",
-                     "human_description": human_description}
+            human_description = f"Install add-ons on {self.stack.eks_cluster}"
 
-        return self.stack.install_argocd.insert(display=True, **inputargs)
+            inputargs = {"default_values": default_values,
+                         "automation_phase": "infrastructure",
+                         "human_description": human_description}
+
+            results = self.stack.aws_eks_addons.insert(display=True, **inputargs)
+
+        return results
 
     def run(self):
-        self.stack.unset_parallel(sched_init=True)
-        self.add_job("eks_cluster")
-        self.add_job("base_helm")
-        self.add_job("external_dns")
-        self.add_job("argocd_crds")
-        self.add_job("argocd")
+        # jobs fan out after eks_cluster - see DEPENDS_ON
+        self.stack.set_parallel()
+
+        for job in DEPENDS_ON:
+            self.add_job(job)
 
         return self.finalize_jobs()
 
     def schedule(self):
+        sched = self.new_schedule()
+        sched.job = "preflight"
+        sched.archive.timeout = 300
+        sched.archive.timewait = 10
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Validate arguments of every job"
+        sched.on_success = _get_on_success("preflight")
+        self.add_schedule()
+
         sched = self.new_schedule()
         sched.job = "eks_cluster"
         sched.archive.timeout = 3600
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.conditions.retries = 1
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create EKS cluster"
-        sched.on_success = ["base_helm"]
+        sched.on_success = _get_on_success("eks_cluster")
         self.add_schedule()
 
         sched = self.new_schedule()
         sched.job = "base_helm"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.automation_phase = "infrastructure"
         sched.human_description = "Install Base Helm Packages"
-        sched.on_success = ["external_dns"]
+        sched.on_success = _get_on_success("base_helm")
         self.add_schedule()
 
         sched = self.new_schedule()
         sched.job = "external_dns"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.automation_phase = "infrastructure"
         sched.human_description = "Install External DNS"
-        sched.on_success = ["argocd_crds"]
+        sched.on_success = _get_on_success("external_dns")
         self.add_schedule()
 
         sched = self.new_schedule()
         sched.job = "argocd_crds"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.automation_phase = "infrastructure"
         sched.human_description = "Install ArgoCD CRDS"
-        sched.on_success = ["argocd"]
+        sched.on_success = _get_on_success("argocd_crds")
         self.add_schedule()
 
         sched = self.new_schedule()
         sched.job = "argocd"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = 10
         sched.automation_phase = "infrastructure"
         sched.human_description = "Install ArgoCD"
+        sched.on_success = _get_on_success("argocd")
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "addons"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 10
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install add-ons (bundle_addons)"
+        sched.on_success = _get_on_success("addons")
         self.add_schedule()
 
         return self.get_schedules()
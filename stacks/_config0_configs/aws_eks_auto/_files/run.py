@@ -15,10 +15,105 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
 import json
+import os
+import time
+from contextlib import contextmanager
 from config0_publisher.terraform import TFConstructor
 
 
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "f0ee21697df2557b0b9e8ac08ed2555cea4e035fb6810f6001c5e4c182cdc35e"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
 def run(stackargs):
 
     # instantiate authoring stack
@@ -42,6 +137,34 @@ def run(stackargs):
                              tags="tfvar,role,db,resource,tf_exec_env",
                              types="str")
 
+    # a string, not a float (1.30 would become 1.3); saved with the
+    # cluster so the add-on stacks can skip describing it
+    stack.parse.add_optional(key="eks_cluster_version",
+                             default="1.33",
+                             tags="tfvar,db",
+                             types="str")
+
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
     # Add execgroup
     stack.add_execgroup("config0-hub:::aws_eks::eks-cluster-auto",
                         "tf_execgroup")
@@ -59,6 +182,12 @@ def run(stackargs):
 
     stack.set_variable("timeout", 1800)
 
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
     # use the terraform constructor (helper)
     # but this is optional
     tf = TFConstructor(stack=stack,
@@ -80,10 +209,14 @@ def run(stackargs):
                     "cluster_security_group_id",
                     "cluster_role_arn",
                     "oidc_provider_arn",
-                    "node_role_arn"])
-
-    # finalize the tf_executor
-    stack.tf_executor.insert(display=True,
-                             **tf.get())
+                    "node_role_arn",
+                    "cluster_certificate_authority_data",
+                    "oidc_issuer"])
+
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, stack.eks_cluster, "eks"):
+        with _span(stack, "aws_eks_auto", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
 
     return stack.get_results()
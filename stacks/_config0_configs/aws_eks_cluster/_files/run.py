@@ -15,36 +15,281 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 '''
 
+import hashlib
 import json
+import os
+import time
+from contextlib import contextmanager
 from config0_publisher.terraform import TFConstructor
 
 
-def _get_buildspec():
+# tools for the iam identity mapping build, pinned by version and
+# sha256 (tools/buildspec.py pin takes the digests from the release
+# checksums once; builds never trust a checksum fetched next to the
+# artifact). artifacts are cached under TOOLS_CACHE_DIR/<name>/<sha256>
+# and re-hashed on every cache hit before they are unpacked into
+# TOOLS_BIN_DIR.
+TOOLS_CACHE_DIR = "/root/.cache/config0-tools"
+TOOLS_BIN_DIR = "/tmp"
+
+TOOL_BUNDLE = {
+    "kubectl": {
+        "version": "1.19.6",
+        "base_url": "https://amazon-eks.s3.us-west-2.amazonaws.com/1.19.6/2021-01-05/bin/linux/amd64",
+        "artifact": "kubectl",
+        "checksum_file": "kubectl.sha256",
+        "sha256": None
+    },
+    "eksctl": {
+        "version": "0.190.0",
+        "base_url": "https://github.com/eksctl-io/eksctl/releases/download/v{version}",
+        "artifact": "eksctl_Linux_amd64.tar.gz",
+        "checksum_file": "eksctl_checksums.txt",
+        "sha256": None
+    }
+}
+
+
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "3a3d8d2979c149f2ce4a4fb0ab3f2dde6fdf326613679bbc1e9d4dba58b0768d"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
+def _get_tool_bundle(stack):
+
+    bundle = {}
+
+    for name, tool in TOOL_BUNDLE.items():
+        tool = dict(tool)
+
+        # only tools whose url is templated on the version can be re-pinned,
+        # and a re-pinned version needs its own digest
+        version = stack.get_attr(f"{name}_version")
+        if version and version != tool["version"] and "{version}" in tool["base_url"]:
+            tool["version"] = version
+            tool["sha256"] = None
+
+        tool["base_url"] = tool["base_url"].format(version=tool["version"])
+
+        if stack.get_attr("tools_mirror_url"):
+            tool["base_url"] = f'{stack.tools_mirror_url.rstrip("/")}/{name}/{tool["version"]}'
+
+        tool["sha256"] = stack.get_attr(f"{name}_sha256") or tool["sha256"]
+
+        # unpinned tools fall back to the unverified download below
+        if tool["sha256"] and not (len(tool["sha256"]) == 64 and
+                                   all(c in "0123456789abcdef" for c in tool["sha256"].lower())):
+            raise Exception(f'{name}_sha256 {tool["sha256"]} is not a sha256')
+
+        bundle[name] = tool
+
+    return bundle
+
+
+def _get_tool_install_script(name, tool):
+
+    if tool["artifact"].endswith(".tar.gz"):
+        unpack = f'tar xzf $ARTIFACT -C {TOOLS_BIN_DIR} {name}'
+    else:
+        unpack = f'cp $ARTIFACT {TOOLS_BIN_DIR}/{name}'
+
+    # not pinned yet (tools/buildspec.py pin): download without a
+    # digest check or cache, as the build did before TOOL_BUNDLE
+    if not tool["sha256"]:
+        return f"""(
+  set -e
+  echo "Installing {name} {tool["version"]} (no pinned sha256, not verified) ..."
+  ARTIFACT=$(mktemp)
+  curl --silent --show-error --fail --location -o $ARTIFACT {tool["base_url"]}/{tool["artifact"]}
+  {unpack}
+  rm -f $ARTIFACT
+  chmod +x {TOOLS_BIN_DIR}/{name}
+)
+"""
+
+    cache_dir = f'{TOOLS_CACHE_DIR}/{name}/{tool["sha256"]}'
+    artifact_url = f'{tool["base_url"]}/{tool["artifact"]}'
+
+    # a subshell: buildspec 0.2 runs all commands in one shell, so
+    # set -e and exit stay inside this command
+    return f"""(
+  set -e
+  DIR={cache_dir}
+  ARTIFACT=$DIR/{tool["artifact"]}
+  if [ -f $ARTIFACT ] && echo "{tool["sha256"]}  $ARTIFACT" | sha256sum -c --status -; then
+    echo "Using cached {name} {tool["version"]}"
+  else
+    echo "Installing {name} {tool["version"]} ..."
+    mkdir -p $DIR
+    curl --silent --show-error --fail --location -o $ARTIFACT {artifact_url}
+    echo "{tool["sha256"]}  $ARTIFACT" | sha256sum -c - || {{ rm -f $ARTIFACT; exit 1; }}
+  fi
+  {unpack}
+  chmod +x {TOOLS_BIN_DIR}/{name}
+)
+"""
+
+
+def _get_buildspec(tool_bundle):
 
     contents_1 = '''version: 0.2
 phases:
   install:
     on-failure: ABORT
     commands:
-      - echo "Installing kubectl ..."
-      - curl --silent --location -o /tmp/kubectl https://amazon-eks.s3.us-west-2.amazonaws.com/1.19.6/2021-01-05/bin/linux/amd64/kubectl
-      - chmod +x /tmp/kubectl
-      - echo "Installing eksctl ..."
-      - curl --silent --location "https://github.com/weaveworks/eksctl/releases/latest/download/eksctl_$(uname -s)_amd64.tar.gz" | tar xz -C /tmp
-      - chmod +x /tmp/eksctl
-
 '''
 
+    contents_2 = "".join(["      - |\n" + "".join(f"        {line}\n" for line in
+                                                 _get_tool_install_script(name, tool).splitlines())
+                          for name, tool in tool_bundle.items()])
+
     contents_3 = '''
   build:
     on-failure: ABORT
     commands:
       - export AWS_ACCOUNT_ID=$(aws sts get-caller-identity --output text --query Account)
-      - export EKS_ROLEARN=arn:aws:iam::${AWS_ACCOUNT_ID}:role/${EKS_ROLENAME}
-      - /tmp/eksctl create iamidentitymapping --cluster ${EKS_CLUSTER} --arn ${EKS_ROLEARN} --group system:masters --username admin
+      - |
+        for EKS_ROLENAME in $(echo ${EKS_ROLENAMES} | tr ',' ' '); do
+          ''' + TOOLS_BIN_DIR + '''/eksctl create iamidentitymapping --cluster ${EKS_CLUSTER} --arn arn:aws:iam::${AWS_ACCOUNT_ID}:role/${EKS_ROLENAME} --group system:masters --username admin
+        done
 '''
 
-    return contents_1 + contents_3
+    contents_4 = f'''
+cache:
+  paths:
+    - '{TOOLS_CACHE_DIR}/**/*'
+'''
+
+    return contents_1 + contents_2 + contents_3 + contents_4
+
+
+def _check_core_addons(stack):
+    """The vpc-cni/kube-proxy tuning only reaches clusters whose add-on is managed."""
+    settings = {"vpc_cni_addon": ["vpc_cni_version",
+                                  "vpc_cni_prefix_delegation",
+                                  "vpc_cni_warm_prefix_target",
+                                  "vpc_cni_warm_ip_target",
+                                  "vpc_cni_minimum_ip_target"],
+                "kube_proxy_addon": ["kube_proxy_version",
+                                     "kube_proxy_mode",
+                                     "kube_proxy_ipvs_scheduler"]}
+
+    for addon, keys in settings.items():
+        given = [key for key in keys if stack.get_attr(key) is not None]
+        if given and not stack.get_attr(addon):
+            raise Exception(f"{', '.join(given)} only take effect with {addon} set")
+
+
+def _set_role_mapping(stack):
+    """
+    access_entry for new clusters. Existing clusters keep the mapping
+    they were created with (codebuild if they predate role_mapping):
+    access entries move the cluster from CONFIG_MAP to
+    API_AND_CONFIG_MAP, which EKS does not allow to be undone, so that
+    only happens when role_mapping is given explicitly.
+    """
+    role_mapping = stack.get_attr("role_mapping")
+
+    if not role_mapping:
+        role_mapping = "access_entry"
+        for resource_info in stack.get_resource(name=stack.eks_cluster,
+                                                resource_type="eks") or []:
+            region = resource_info.get("aws_default_region")
+            if region and region != stack.aws_default_region:
+                continue
+            role_mapping = resource_info.get("role_mapping") or "codebuild"
+            break
+
+    stack.set_variable("role_mapping",
+                       role_mapping,
+                       tags="db",
+                       types="str")
 
 
 def run(stackargs):
@@ -72,16 +317,42 @@ def run(stackargs):
                              tags="tfvar,db",
                              types="float")
 
-    # mapping eks service account to aws role
+    # comma separated aws iam roles mapped into the cluster as admin
     stack.parse.add_optional(key="role_name",
                              default=None,
                              types="str")
 
+    # access_entry maps the roles in the cluster's own terraform apply;
+    # codebuild runs eksctl create iamidentitymapping in a separate build.
+    # unset, see _set_role_mapping
+    stack.parse.add_optional(key="role_mapping",
+                             default="null",
+                             choices=["access_entry", "codebuild"],
+                             types="str")
+
     stack.parse.add_optional(key="aws_default_region",
                              default="eu-west-1",
                              tags="tfvar,role,db,resource,tf_exec_env",
                              types="str")
 
+    # tool bundle for the iam mapping build - see TOOL_BUNDLE
+    stack.parse.add_optional(key="eksctl_version",
+                             default="null",
+                             types="str")
+
+    stack.parse.add_optional(key="eksctl_sha256",
+                             default="null",
+                             types="str")
+
+    stack.parse.add_optional(key="kubectl_sha256",
+                             default="null",
+                             types="str")
+
+    # prefetched tools laid out as <url>/<name>/<version>/<artifact>
+    stack.parse.add_optional(key="tools_mirror_url",
+                             default="null",
+                             types="str")
+
     stack.parse.add_optional(key="compute_type",
                              types="str",
                              default="BUILD_GENERAL1_SMALL")
@@ -90,6 +361,70 @@ def run(stackargs):
                              types="str",
                              default="LINUX_CONTAINER")
 
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # managed vpc-cni and kube-proxy add-ons (addons.tf in the execgroup);
+    # versions follow eks_cluster_version unless pinned
+    stack.parse.add_optional(key="core_addons_most_recent",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
+    for addon in ["vpc_cni", "kube_proxy"]:
+        stack.parse.add_optional(key=f"{addon}_addon",
+                                 default="null",
+                                 tags="tfvar",
+                                 types="bool")
+
+        stack.parse.add_optional(key=f"{addon}_version",
+                                 default="null",
+                                 tags="tfvar",
+                                 types="str")
+
+    # pod ip capacity: prefix delegation and warm pool sizes
+    stack.parse.add_optional(key="vpc_cni_prefix_delegation",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
+    for key in ["vpc_cni_warm_prefix_target",
+                "vpc_cni_warm_ip_target",
+                "vpc_cni_minimum_ip_target"]:
+        stack.parse.add_optional(key=key,
+                                 default="null",
+                                 tags="tfvar",
+                                 types="int")
+
+    stack.parse.add_optional(key="kube_proxy_mode",
+                             default="null",
+                             choices=["iptables", "ipvs"],
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="kube_proxy_ipvs_scheduler",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
     # Add execgroup
     stack.add_execgroup("config0-hub:::aws_eks::eks-cluster",
                         "tf_execgroup")
@@ -129,6 +464,25 @@ def run(stackargs):
 
     stack.set_variable("timeout", 800)
 
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
+    _check_core_addons(stack)
+    _set_role_mapping(stack)
+
+    if stack.get_attr("role_name") and stack.role_mapping == "access_entry":
+        stack.set_variable("access_entry_role_names",
+                           stack.role_name,
+                           tags="tfvar",
+                           types="str")
+
+    # resolved before the cluster insert so a bad pin fails up front
+    if stack.get_attr("role_name") and stack.role_mapping == "codebuild":
+        buildspec = _get_buildspec(_get_tool_bundle(stack))
+
     # use the terraform constructor (helper)
     # but this is optional
     tf = TFConstructor(stack=stack,
@@ -151,30 +505,38 @@ def run(stackargs):
                      "cluster_subnet_ids": "subnet_ids",
                      "cluster_endpoint": "endpoint"})
 
+    # endpoint, CA, node role, OIDC issuer and security groups
+    # are what the nodegroup/add-on stacks resolve the cluster by
     tf.output(keys=["endpoint",
                     "arn",
                     "cluster_security_group_ids",
                     "cluster_subnet_ids",
                     "cluster_role_arn",
-                    "cluster_node_role_arn"])
+                    "cluster_node_role_arn",
+                    "cluster_certificate_authority_data",
+                    "oidc_issuer",
+                    "access_entry_role_arns",
+                    "core_addon_versions"])
 
-    # finalize the tf_executor
-    stack.tf_executor.insert(display=True,
-                             **tf.get())
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, stack.eks_cluster, "eks"):
+        with _span(stack, "aws_eks_cluster", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
 
-    if stack.get_attr("role_name"):
+    if stack.get_attr("role_name") and stack.role_mapping == "codebuild":
 
         inputargs = {
             "build_timeout": 900,
             "compute_type": stack.compute_type,
             "image_type": stack.image_type,
             "build_image": stack.build_image,
-            "buildspec": _get_buildspec(),
+            "buildspec": buildspec,
         }
 
         build_env_vars = {
             "EKS_CLUSTER": stack.eks_cluster,
-            "EKS_ROLENAME": stack.role_name
+            "EKS_ROLENAMES": stack.role_name
         }
 
         env_vars = {"CODEBUILD_PARAMS_HASH": stack.b64_encode({
@@ -188,6 +550,7 @@ def run(stackargs):
                      "human_description": "Mapping AWS IAM to EKS role with Codebuild",
                      "env_vars": json.dumps(env_vars)}
 
-        stack.shellout_codebuild.run(**inputargs)
+        with _span(stack, "aws_eks_cluster", "codebuild"):
+            stack.shellout_codebuild.run(**inputargs)
 
     return stack.get_results()
@@ -0,0 +1,478 @@
+"""
+# Copyright 2025 Gary Leong gary@config0.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from config0_publisher.terraform import TFConstructor
+
+# eks_node_ami_type prefix -> EC2NodeClass amiSelectorTerms alias family
+AMI_FAMILIES = {
+    "AL2_": "al2",
+    "AL2023_": "al2023",
+    "BOTTLEROCKET_": "bottlerocket"
+}
+
+# eks_node_capacity_type -> karpenter.sh/capacity-type values
+CAPACITY_TYPES = {
+    "ON_DEMAND": ["on-demand"],
+    "SPOT": ["spot"]
+}
+
+
+# resource db keys written by aws_eks_cluster and aws_eks_auto
+CLUSTER_METADATA_KEYS = {
+    "endpoint": ["endpoint", "cluster_endpoint"],
+    "ca_data": ["cluster_certificate_authority_data"],
+    "node_role_arn": ["node_role_arn", "cluster_node_role_arn"],
+    "oidc_issuer": ["oidc_issuer"],
+    "security_group_ids": ["security_group_ids",
+                           "cluster_security_group_ids",
+                           "cluster_security_group_id"],
+    "version": ["eks_cluster_version"]
+}
+
+
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "2acbfa3fe101f9397635654c5a6a3128ceec454dc2d9d44bc44dcb022297009c"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
+def _get_cluster_metadata(stack, must_exists=False):
+    """Cluster record aws_eks_cluster/aws_eks_auto left in the resource db."""
+    lookup = {"name": stack.eks_cluster,
+              "resource_type": "eks"}
+
+    if must_exists:
+        lookup["must_exists"] = True
+
+    for resource_info in stack.get_resource(**lookup) or []:
+        region = resource_info.get("aws_default_region")
+        if region and region != stack.aws_default_region:
+            continue
+
+        return {attr: next((resource_info[k] for k in keys if resource_info.get(k)), None)
+                for attr, keys in CLUSTER_METADATA_KEYS.items()}
+
+    return {}
+
+
+def _set_eks_node_role_arn(stack):
+    """Set EKS node role ARN if not already set."""
+    if stack.get_attr("eks_node_role_arn"):
+        return
+
+    metadata = _get_cluster_metadata(stack, must_exists=True)
+
+    if not metadata.get("node_role_arn"):
+        raise Exception(f"could not resolve node_role_arn for eks cluster {stack.eks_cluster}")
+
+    stack.set_variable(
+        "eks_node_role_arn",
+        metadata["node_role_arn"],
+        tags="tfvar,db",
+        types="str"
+    )
+
+
+def _get_json_arg(stack, key):
+    """An argument given as json, base64 encoded json or already parsed."""
+    value = stack.get_attr(key)
+
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = stack.b64_decode(value)
+
+    return value
+
+
+def _set_node_class(stack):
+    """
+    Translate the node group arguments into what the EC2NodeClass and
+    NodePool take: AMI family, architecture and capacity types.
+    """
+    ami_type = stack.eks_node_ami_type
+    family = next((family for prefix, family in AMI_FAMILIES.items()
+                   if ami_type.startswith(prefix)), None)
+
+    if not family:
+        raise Exception(f"karpenter selects AMIs by family, {ami_type} has none; "
+                        "use an AL2, AL2023 or BOTTLEROCKET AMI type")
+
+    stack.set_variable("karpenter_ami_family",
+                       family,
+                       tags="tfvar",
+                       types="str")
+
+    stack.set_variable("karpenter_arch",
+                       "arm64" if "ARM" in ami_type else "amd64",
+                       tags="tfvar",
+                       types="str")
+
+    stack.set_variable("karpenter_capacity_types",
+                       CAPACITY_TYPES[stack.eks_node_capacity_type],
+                       tags="tfvar",
+                       types="list")
+
+    if stack.get_attr("eks_node_instance_types"):
+        stack.set_variable("eks_node_instance_types",
+                           stack.to_list(stack.eks_node_instance_types),
+                           tags="tfvar,db",
+                           types="list")
+
+    for key in ["eks_node_kube_reserved", "eks_node_system_reserved", "karpenter_labels"]:
+        value = _get_json_arg(stack, key)
+        if value is None:
+            continue
+        if not isinstance(value, dict):
+            raise Exception(f"{key} needs to be a map like {{\"cpu\": \"250m\", \"memory\": \"1Gi\"}}")
+        stack.set_variable(key,
+                           {name: str(item) for name, item in value.items()},
+                           tags="tfvar",
+                           types="dict")
+
+    volume_type = stack.get_attr("eks_node_volume_type") or "gp3"
+
+    if stack.get_attr("eks_node_volume_throughput") is not None and volume_type != "gp3":
+        raise Exception("eks_node_volume_throughput is only for gp3 volumes")
+
+    if volume_type in ["io1", "io2"] and stack.get_attr("eks_node_volume_iops") is None:
+        raise Exception(f"{volume_type} volumes need eks_node_volume_iops")
+
+
+def run(stackargs):
+    """Main entry point for the stack configuration."""
+    # instantiate authoring stack
+    stack = newStack(stackargs)
+
+    stack.parse.add_required(key="eks_cluster",
+                             tags="tfvar,db",
+                             types="str")
+
+    # the node group arguments the NodePool/EC2NodeClass are rendered
+    # from; nodes join with the node group's role and subnets
+    stack.parse.add_required(key="eks_node_group_subnet_ids")
+
+    stack.parse.add_optional(key="eks_node_capacity_type",
+                             default="ON_DEMAND",
+                             choices=["ON_DEMAND", "SPOT"],
+                             types="str")
+
+    stack.parse.add_optional(key="eks_node_ami_type",
+                             default="AL2023_x86_64_STANDARD",
+                             choices=["AL2_x86_64", "AL2_x86_64_GPU",
+                                      "AL2_ARM_64", "AL2023_x86_64_STANDARD",
+                                      "AL2023_ARM_64_STANDARD", "BOTTLEROCKET_x86_64",
+                                      "BOTTLEROCKET_ARM_64"],
+                             types="str")
+
+    stack.parse.add_optional(key="eks_node_role_arn",
+                             default=None,
+                             tags="tfvar",
+                             types="str")
+
+    # empty lets karpenter pick any instance type of the architecture
+    stack.parse.add_optional(key="eks_node_instance_types",
+                             default="null")
+
+    stack.parse.add_optional(key="eks_node_disksize",
+                             default="25",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_volume_type",
+                             default="null",
+                             choices=["gp2", "gp3", "io1", "io2"],
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="eks_node_volume_iops",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_volume_throughput",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    # kubelet settings go into the EC2NodeClass for every AMI family;
+    # the reserved maps are json or b64 json
+    stack.parse.add_optional(key="eks_node_max_pods",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_kube_reserved",
+                             default="null")
+
+    stack.parse.add_optional(key="eks_node_system_reserved",
+                             default="null")
+
+    stack.parse.add_optional(key="eks_node_user_data",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    # security groups of karpenter nodes, by default the cluster
+    # security group EKS attaches to managed node group nodes
+    stack.parse.add_optional(key="security_group_ids",
+                             default="null",
+                             tags="tfvar",
+                             types="list")
+
+    # controller
+    stack.parse.add_optional(key="karpenter_version",
+                             default="null",
+                             tags="tfvar,db",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_namespace",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_replicas",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    # false when the cluster already runs eks-pod-identity-agent
+    stack.parse.add_optional(key="pod_identity_agent_addon",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
+    stack.parse.add_optional(key="chart_repo_url",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    # NodePool
+    stack.parse.add_optional(key="karpenter_nodepool",
+                             default="null",
+                             tags="tfvar,db",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_ami_version",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_labels",
+                             default="null")
+
+    stack.parse.add_optional(key="karpenter_cpu_limit",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_memory_limit",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_consolidation_policy",
+                             default="null",
+                             choices=["WhenEmptyOrUnderutilized", "WhenEmpty"],
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_consolidate_after",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="karpenter_expire_after",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="aws_default_region",
+                             default="eu-west-1",
+                             tags="tfvar,resource,db,tf_exec_env",
+                             types="str")
+
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
+    # Add execgroup
+    stack.add_execgroup("config0-hub:::aws_eks::eks-karpenter",
+                        "tf_execgroup")
+
+    # Add substack
+    stack.add_substack("config0-hub:::config0_core::tf_executor")
+
+    # Initialize
+    stack.init_variables()
+    stack.init_execgroups()
+    stack.init_substacks()
+
+    # Verify variables after initialization
+    stack.verify_variables()
+
+    stack.set_variable(
+        "eks_node_group_subnet_ids",
+        stack.to_list(stack.eks_node_group_subnet_ids),
+        tags="tfvar",
+        types="list"
+    )
+
+    stack.set_variable("timeout", 1800)
+
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
+    _set_eks_node_role_arn(stack)
+    _set_node_class(stack)
+
+    # use the terraform constructor (helper)
+    # but this is optional
+    tf = TFConstructor(stack=stack,
+                       execgroup_name=stack.tf_execgroup.name,
+                       provider="aws",
+                       resource_name=f'{stack.eks_cluster}-karpenter',
+                       resource_type="k8s-pkgs")
+
+    tf.include(values={
+        "aws_default_region": stack.aws_default_region,
+        "name": f'{stack.eks_cluster}-karpenter',
+    })
+
+    tf.output(keys=["controller_role_arn",
+                    "interruption_queue_name",
+                    "karpenter_version",
+                    "node_pool"])
+
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, f'{stack.eks_cluster}-karpenter', "k8s-pkgs"):
+        with _span(stack, "aws_eks_karpenter", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
+
+    return stack.get_results()
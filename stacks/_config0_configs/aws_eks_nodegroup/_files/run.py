@@ -15,23 +15,186 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
 from config0_publisher.terraform import TFConstructor
 
+NODE_GROUP_KEYS = [
+    "node_group_name",
+    "subnet_ids",
+    "capacity_type",
+    "ami_type",
+    "instance_types",
+    "disk_size",
+    "desired_size",
+    "max_size",
+    "min_size",
+    "labels",
+    "max_unavailable",
+    "max_unavailable_percentage"
+]
+
+# node settings that put the pools on a generated launch template
+LAUNCH_TEMPLATE_KEYS = [
+    "eks_node_max_pods",
+    "eks_node_kube_reserved",
+    "eks_node_system_reserved",
+    "eks_node_containerd_config",
+    "eks_node_volume_type",
+    "eks_node_volume_iops",
+    "eks_node_volume_throughput",
+    "eks_node_user_data"
+]
+
+# AMI types whose user data takes kubelet settings (nodeadm NodeConfig
+# or Bottlerocket TOML); AL2 bootstraps before user data could change them
+KUBELET_AMI_PREFIXES = ("AL2023_", "BOTTLEROCKET_")
+
+# EKS limits: update_config takes 1-100 nodes (or percent) and
+# node_group_name_prefix leaves 37 of the 63 chars of a name
+MAX_UNAVAILABLE_LIMIT = 100
+NODE_GROUP_NAME_PREFIX_LIMIT = 37
+
+
+# resource db keys written by aws_eks_cluster and aws_eks_auto
+CLUSTER_METADATA_KEYS = {
+    "endpoint": ["endpoint", "cluster_endpoint"],
+    "ca_data": ["cluster_certificate_authority_data"],
+    "node_role_arn": ["node_role_arn", "cluster_node_role_arn"],
+    "oidc_issuer": ["oidc_issuer"],
+    "security_group_ids": ["security_group_ids",
+                           "cluster_security_group_ids",
+                           "cluster_security_group_id"],
+    "version": ["eks_cluster_version"]
+}
+
+
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "a199416d3bea3e235e7c8137714d037311e55d00c080bcaace01423a529ec547"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
+def _get_cluster_metadata(stack, must_exists=False):
+    """Cluster record aws_eks_cluster/aws_eks_auto left in the resource db."""
+    lookup = {"name": stack.eks_cluster,
+              "resource_type": "eks"}
+
+    if must_exists:
+        lookup["must_exists"] = True
+
+    for resource_info in stack.get_resource(**lookup) or []:
+        region = resource_info.get("aws_default_region")
+        if region and region != stack.aws_default_region:
+            continue
+
+        return {attr: next((resource_info[k] for k in keys if resource_info.get(k)), None)
+                for attr, keys in CLUSTER_METADATA_KEYS.items()}
+
+    return {}
+
 
 def _set_eks_node_role_arn(stack):
     """Set EKS node role ARN if not already set."""
     if stack.get_attr("eks_node_role_arn"):
         return
 
-    resource_info = stack.get_resource(
-        name=stack.eks_cluster,
-        resource_type="eks",
-        must_exists=True
-    )[0]
+    metadata = _get_cluster_metadata(stack, must_exists=True)
+
+    if not metadata.get("node_role_arn"):
+        raise Exception(f"could not resolve node_role_arn for eks cluster {stack.eks_cluster}")
 
     stack.set_variable(
         "eks_node_role_arn",
-        resource_info["node_role_arn"],
+        metadata["node_role_arn"],
         tags="tfvar,db",
         types="str"
     )
@@ -50,6 +213,281 @@ def _set_eks_node_group_name(stack):
     )
 
 
+def _get_json_arg(stack, key):
+    """An argument given as json, base64 encoded json or already parsed."""
+    value = stack.get_attr(key)
+
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = stack.b64_decode(value)
+
+    return value
+
+
+def _set_eks_node_groups(stack):
+    """
+    Expand the nodegroups input into the eks_node_groups tfvar so all
+    pools are created in a single plan/apply.
+
+    nodegroups is json (or base64 encoded json) of either a map keyed
+    by pool name or a list of pools that each carry a "name".
+    """
+    nodegroups = _get_json_arg(stack, "nodegroups")
+
+    if not nodegroups:
+        return
+
+    if isinstance(nodegroups, list):
+        pools = {}
+        for pool in nodegroups:
+            pool = dict(pool)
+            name = pool.pop("name", None)
+            if not name:
+                raise Exception("each entry in nodegroups needs a name")
+            if name in pools:
+                raise Exception(f"nodegroups has duplicate pool {name}")
+            pools[name] = pool
+        nodegroups = pools
+
+    if not isinstance(nodegroups, dict) or not nodegroups:
+        raise Exception("nodegroups needs to be a non-empty list or map of pools")
+
+    for name, pool in nodegroups.items():
+        unknown = set(pool) - set(NODE_GROUP_KEYS)
+        if unknown:
+            raise Exception(f"nodegroups pool {name} has unknown keys {sorted(unknown)}")
+
+        if pool.get("capacity_type") not in [None, "ON_DEMAND", "SPOT"]:
+            raise Exception(f"nodegroups pool {name} capacity_type must be ON_DEMAND or SPOT")
+
+        if pool.get("max_unavailable") is not None and \
+                pool.get("max_unavailable_percentage") is not None:
+            raise Exception(f"nodegroups pool {name} sets both max_unavailable "
+                            "and max_unavailable_percentage")
+
+        if pool.get("subnet_ids"):
+            pool["subnet_ids"] = stack.to_list(pool["subnet_ids"])
+
+        if pool.get("instance_types"):
+            pool["instance_types"] = stack.to_list(pool["instance_types"])
+
+    stack.set_variable(
+        "eks_node_groups",
+        nodegroups,
+        tags="tfvar",
+        types="dict"
+    )
+
+
+def _check_launch_template_rollout(stack, enabled):
+    """
+    Record whether the pools use the launch template. Moving existing
+    pools on or off it replaces them (disk_size moves into the template),
+    and under the rolling rollout the new pools would be created with the
+    names the old ones still hold, so that needs blue_green.
+    """
+    stack.set_variable("launch_template",
+                       enabled,
+                       tags="db",
+                       types="bool")
+
+    if stack.get_attr("eks_node_rollout") == "blue_green":
+        return
+
+    for resource_info in stack.get_resource(name=stack.eks_node_group_name,
+                                            resource_type="k8_node_group") or []:
+        if bool(resource_info.get("launch_template")) != enabled:
+            raise Exception(f"{'adding' if enabled else 'removing'} the launch template replaces "
+                            f"the pools of {stack.eks_node_group_name}; set eks_node_rollout "
+                            "to blue_green for this run, or delete the node group first")
+
+
+def _set_launch_template(stack):
+    """
+    Parse and check the launch template settings against the AMI types
+    of the pools; the execgroup generates the template from them.
+    """
+    for key in ["eks_node_kube_reserved", "eks_node_system_reserved"]:
+        reserved = _get_json_arg(stack, key)
+        if reserved is None:
+            continue
+        if not isinstance(reserved, dict):
+            raise Exception(f"{key} needs to be a map like {{\"cpu\": \"250m\", \"memory\": \"1Gi\"}}")
+        stack.set_variable(key,
+                           {name: str(value) for name, value in reserved.items()},
+                           tags="tfvar",
+                           types="dict")
+
+    settings = [key for key in LAUNCH_TEMPLATE_KEYS if stack.get_attr(key) is not None]
+    _check_launch_template_rollout(stack, bool(settings))
+    if not settings:
+        return
+
+    pools = stack.get_attr("eks_node_groups") or {"main": {}}
+    ami_types = {pool.get("ami_type") or stack.eks_node_ami_type for pool in pools.values()}
+
+    if "CUSTOM" in ami_types:
+        raise Exception(f"{', '.join(settings)} need a generated launch template, "
+                        "CUSTOM AMIs need their own")
+
+    kubelet = [key for key in ["eks_node_max_pods", "eks_node_kube_reserved", "eks_node_system_reserved"]
+               if key in settings]
+    unsupported = sorted(ami_type for ami_type in ami_types
+                         if not ami_type.startswith(KUBELET_AMI_PREFIXES))
+    if kubelet and unsupported:
+        raise Exception(f"{', '.join(kubelet)} need AL2023 or BOTTLEROCKET AMI types, "
+                        f"not {', '.join(unsupported)}")
+
+    if "eks_node_containerd_config" in settings and \
+            any(not ami_type.startswith("AL2023_") for ami_type in ami_types):
+        raise Exception("eks_node_containerd_config needs AL2023 AMI types")
+
+    volume_type = stack.get_attr("eks_node_volume_type") or "gp3"
+    iops = stack.get_attr("eks_node_volume_iops")
+    throughput = stack.get_attr("eks_node_volume_throughput")
+
+    if throughput is not None and volume_type != "gp3":
+        raise Exception("eks_node_volume_throughput is only for gp3 volumes")
+
+    if volume_type == "gp3" and iops is not None and not 3000 <= int(iops) <= 16000:
+        raise Exception("eks_node_volume_iops of a gp3 volume must be between 3000 and 16000")
+
+    if volume_type in ["io1", "io2"] and iops is None:
+        raise Exception(f"{volume_type} volumes need eks_node_volume_iops")
+
+    if volume_type == "gp2" and iops is not None:
+        raise Exception("gp2 volumes take no eks_node_volume_iops")
+
+
+def _get_update_pools(stack):
+    """
+    {pool key: {"name", "desired", "max_unavailable",
+    "max_unavailable_percentage", "explicit"}} as the module resolves
+    them - a pool's own update settings replace the eks_node_* ones.
+    """
+    nodegroups = stack.get_attr("eks_node_groups") or {"main": {}}
+    pools = {}
+
+    for key, pool in nodegroups.items():
+        own = pool.get("max_unavailable") is not None or \
+            pool.get("max_unavailable_percentage") is not None
+        source = pool if own else {
+            "max_unavailable": stack.get_attr("eks_node_max_unavailable"),
+            "max_unavailable_percentage": stack.get_attr("eks_node_max_unavailable_percentage")
+        }
+
+        name = pool.get("node_group_name") or (stack.eks_node_group_name if key == "main"
+                                               else f"{stack.eks_cluster}-nodegroup-{key}")
+
+        pools[key] = {
+            "name": name,
+            "desired": int(pool.get("desired_size") or stack.eks_node_desired_capacity),
+            "max_unavailable": source.get("max_unavailable"),
+            "max_unavailable_percentage": source.get("max_unavailable_percentage"),
+            "explicit": source.get("max_unavailable") is not None or
+            source.get("max_unavailable_percentage") is not None
+        }
+
+    return pools
+
+
+def _get_nodes_unavailable(pool):
+    """Nodes a pool drains at once during an update (EKS default 1)."""
+    if pool["max_unavailable"] is not None:
+        return int(pool["max_unavailable"])
+
+    if pool["max_unavailable_percentage"] is not None:
+        return max(1, pool["desired"] * int(pool["max_unavailable_percentage"]) // 100)
+
+    return 1
+
+
+def _get_drain_shares(pools, remaining):
+    """
+    Split remaining nodes over pools by desired size: one node each,
+    the rest by largest remainder, capped at the pool's desired size
+    and MAX_UNAVAILABLE_LIMIT.
+    """
+    caps = {key: max(1, min(pool["desired"], MAX_UNAVAILABLE_LIMIT)) for key, pool in pools.items()}
+    spare = remaining - len(pools)
+    total = sum(pool["desired"] for pool in pools.values()) or len(pools)
+
+    shares = {key: 1 + min(spare * pool["desired"] // total, caps[key] - 1)
+              for key, pool in pools.items()}
+
+    left = remaining - sum(shares.values())
+    for key in sorted(pools, key=lambda key: spare * pools[key]["desired"] % total, reverse=True):
+        if left <= 0:
+            break
+        if shares[key] < caps[key]:
+            shares[key] += 1
+            left -= 1
+
+    assert sum(shares.values()) <= remaining
+    return shares
+
+
+def _set_update_config(stack):
+    """
+    Check the rolling update settings and spread eks_node_drain_budget -
+    the nodes all pools of this apply may drain at once - over the
+    pools without max_unavailable settings, by desired size.
+    """
+    if stack.get_attr("eks_node_max_unavailable") is not None and \
+            stack.get_attr("eks_node_max_unavailable_percentage") is not None:
+        raise Exception("set only one of eks_node_max_unavailable and "
+                        "eks_node_max_unavailable_percentage")
+
+    pools = _get_update_pools(stack)
+
+    for key, pool in pools.items():
+        for attr in ["max_unavailable", "max_unavailable_percentage"]:
+            if pool[attr] is not None and not 1 <= int(pool[attr]) <= MAX_UNAVAILABLE_LIMIT:
+                raise Exception(f"{attr} of pool {key} must be between 1 and {MAX_UNAVAILABLE_LIMIT}")
+
+        if stack.get_attr("eks_node_rollout") == "blue_green" and \
+                len(pool["name"]) + 1 > NODE_GROUP_NAME_PREFIX_LIMIT:
+            raise Exception(f"blue_green rollout needs node group names of at most "
+                            f"{NODE_GROUP_NAME_PREFIX_LIMIT - 1} chars, {pool['name']} is longer")
+
+    budget = stack.get_attr("eks_node_drain_budget")
+    if not budget:
+        return
+
+    budget = int(budget)
+    fixed = sum(_get_nodes_unavailable(pool) for pool in pools.values() if pool["explicit"])
+    free = {key: pool for key, pool in pools.items() if not pool["explicit"]}
+
+    if fixed + len(free) > budget:
+        raise Exception(f"eks_node_drain_budget {budget} is below the {fixed} nodes the pools "
+                        f"drain at once plus one for each of the other {len(free)} pools")
+
+    if not free:
+        return
+
+    shares = _get_drain_shares(free, budget - fixed)
+
+    if not stack.get_attr("eks_node_groups"):
+        stack.set_variable("eks_node_max_unavailable",
+                           shares["main"],
+                           tags="tfvar",
+                           types="int")
+        return
+
+    nodegroups = dict(stack.eks_node_groups)
+    for key, share in shares.items():
+        nodegroups[key] = dict(nodegroups[key], max_unavailable=share)
+
+    stack.set_variable(
+        "eks_node_groups",
+        nodegroups,
+        tags="tfvar",
+        types="dict"
+    )
+
+
 def run(stackargs):
     """Main entry point for the stack configuration."""
     # instantiate authoring stack
@@ -70,7 +508,9 @@ def run(stackargs):
     stack.parse.add_required(key="eks_node_ami_type",
                              default="AL2_x86_64",
                              choices=["AL2_x86_64", "AL2_x86_64_GPU",
-                                      "AL2_ARM_64", "CUSTOM"],
+                                      "AL2_ARM_64", "AL2023_x86_64_STANDARD",
+                                      "AL2023_ARM_64_STANDARD", "BOTTLEROCKET_x86_64",
+                                      "BOTTLEROCKET_ARM_64", "CUSTOM"],
                              tags="tfvar",
                              types="str")
 
@@ -114,6 +554,119 @@ def run(stackargs):
                              tags="tfvar,resource,db,tf_exec_env",
                              types="str")
 
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
+    # fleet mode - json/b64 list or map of pools, see _set_eks_node_groups
+    stack.parse.add_optional(key="nodegroups",
+                             default="null")
+
+    # nodes (or percent of nodes) replaced at a time by in-place
+    # updates; pools in nodegroups can set their own
+    stack.parse.add_optional(key="eks_node_max_unavailable",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_max_unavailable_percentage",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    # blue_green: replacing changes bring up a new pool next to the
+    # old one instead of replacing it in place
+    stack.parse.add_optional(key="eks_node_rollout",
+                             default="rolling",
+                             choices=["rolling", "blue_green"],
+                             tags="tfvar",
+                             types="str")
+
+    # nodes all pools may drain at once, see _set_update_config
+    stack.parse.add_optional(key="eks_node_drain_budget",
+                             default="null",
+                             types="int")
+
+    # kubelet settings and node volume, through a launch template the
+    # execgroup generates (see _set_launch_template); the reserved maps
+    # are json or b64 json
+    stack.parse.add_optional(key="eks_node_max_pods",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_kube_reserved",
+                             default="null")
+
+    stack.parse.add_optional(key="eks_node_system_reserved",
+                             default="null")
+
+    stack.parse.add_optional(key="eks_node_containerd_config",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="eks_node_volume_type",
+                             default="null",
+                             choices=["gp2", "gp3", "io1", "io2"],
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="eks_node_volume_iops",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_volume_throughput",
+                             default="null",
+                             tags="tfvar",
+                             types="int")
+
+    stack.parse.add_optional(key="eks_node_user_data",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    # coredns add-on (coredns.tf in the execgroup), applied after the
+    # pools since it only goes ACTIVE once it has nodes
+    stack.parse.add_optional(key="coredns_addon",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
+    stack.parse.add_optional(key="coredns_version",
+                             default="null",
+                             tags="tfvar",
+                             types="str")
+
+    stack.parse.add_optional(key="coredns_autoscaling",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
+    for key in ["coredns_min_replicas", "coredns_max_replicas"]:
+        stack.parse.add_optional(key=key,
+                                 default="null",
+                                 tags="tfvar",
+                                 types="int")
+
     # publish_resource -> output_resource_to_ui
     stack.add_substack("config0-hub:::config0_core::output_resource_to_ui")
 
@@ -155,8 +708,17 @@ def run(stackargs):
 
     stack.set_variable("timeout", 2700)
 
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
     _set_eks_node_group_name(stack)
     _set_eks_node_role_arn(stack)
+    _set_eks_node_groups(stack)
+    _set_update_config(stack)
+    _set_launch_template(stack)
 
     # use the terraform constructor (helper)
     # but this is optional
@@ -174,12 +736,14 @@ def run(stackargs):
 
     tf.include(maps={"id": "arn"})
 
-    tf.output(keys=["arn"])
+    tf.output(keys=["arn",
+                    "node_group_arns",
+                    "node_group_names"])
 
-    # finalize the tf_executor
-    stack.tf_executor.insert(
-        display=True,
-        **tf.get()
-    )
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, stack.eks_node_group_name, "k8_node_group"):
+        with _span(stack, "aws_eks_nodegroup", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
 
     return stack.get_results()
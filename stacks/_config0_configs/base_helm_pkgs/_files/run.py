@@ -15,9 +15,157 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
 import json
+import os
+import time
+from contextlib import contextmanager
 from config0_publisher.terraform import TFConstructor
 
+# resource db keys written by aws_eks_cluster and aws_eks_auto
+CLUSTER_METADATA_KEYS = {
+    "endpoint": ["endpoint", "cluster_endpoint"],
+    "ca_data": ["cluster_certificate_authority_data"],
+    "node_role_arn": ["node_role_arn", "cluster_node_role_arn"],
+    "oidc_issuer": ["oidc_issuer"],
+    "security_group_ids": ["security_group_ids",
+                           "cluster_security_group_ids",
+                           "cluster_security_group_id"],
+    "version": ["eks_cluster_version"]
+}
+
+
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "b54bfc215407031ae32598f4e92c5df22d58dbe441c1c9c9a25ed97c236050f7"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
+def _get_cluster_metadata(stack, must_exists=False):
+    """Cluster record aws_eks_cluster/aws_eks_auto left in the resource db."""
+    lookup = {"name": stack.eks_cluster,
+              "resource_type": "eks"}
+
+    if must_exists:
+        lookup["must_exists"] = True
+
+    for resource_info in stack.get_resource(**lookup) or []:
+        region = resource_info.get("aws_default_region")
+        if region and region != stack.aws_default_region:
+            continue
+
+        return {attr: next((resource_info[k] for k in keys if resource_info.get(k)), None)
+                for attr, keys in CLUSTER_METADATA_KEYS.items()}
+
+    return {}
+
+
+def _set_cluster_metadata(stack):
+    """Hand the execgroup the cluster connection so it skips describing the cluster."""
+    # with null endpoint/CA the execgroup describes the cluster itself
+    if stack.get_attr("refresh_cluster_metadata"):
+        return
+
+    metadata = _get_cluster_metadata(stack)
+
+    if not metadata.get("endpoint") or not metadata.get("ca_data"):
+        return
+
+    stack.set_variable("eks_cluster_endpoint",
+                       metadata["endpoint"],
+                       tags="tfvar",
+                       types="str")
+
+    stack.set_variable("eks_cluster_ca_data",
+                       metadata["ca_data"],
+                       tags="tfvar",
+                       types="str")
+
 
 def run(stackargs):
 
@@ -41,6 +189,39 @@ def run(stackargs):
                              tags="tfvar,db,resource",
                              default="true")
 
+    # chart mirror (tools/chart_mirror.py); the charts are installed from
+    # <chart_repo_url>/<chart>-<version>.tgz instead of the public repos
+    stack.parse.add_optional(key="chart_repo_url",
+                             default="null",
+                             tags="tfvar,db",
+                             types="str")
+
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
+    # skip the resource db record and let terraform describe the cluster
+    stack.parse.add_optional(key="refresh_cluster_metadata",
+                             default="null",
+                             types="bool")
+
     stack.add_execgroup("config0-hub:::aws_eks::base-helm-pkgs",
                         "tf_execgroup")
 
@@ -57,6 +238,14 @@ def run(stackargs):
 
     stack.set_variable("timeout", 800)
 
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
+    _set_cluster_metadata(stack)
+
     if stack.install_metrics_server in ["null", None, "None"]:
         stack.set_variable("install_metrics_server", None)
 
@@ -76,8 +265,10 @@ def run(stackargs):
         "name": f'{stack.eks_cluster}-base-helm-pkgs'
     })
 
-    # finalize the tf_executor
-    stack.tf_executor.insert(display=True,
-                             **tf.get())
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, f'{stack.eks_cluster}-base-helm-pkgs', "helm-pkgs"):
+        with _span(stack, "base_helm_pkgs", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
 
     return stack.get_results()
@@ -15,9 +15,183 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
 import json
+import os
+import time
+from contextlib import contextmanager
 from config0_publisher.terraform import TFConstructor
 
+# resource db keys written by aws_eks_cluster and aws_eks_auto
+CLUSTER_METADATA_KEYS = {
+    "endpoint": ["endpoint", "cluster_endpoint"],
+    "ca_data": ["cluster_certificate_authority_data"],
+    "node_role_arn": ["node_role_arn", "cluster_node_role_arn"],
+    "oidc_issuer": ["oidc_issuer"],
+    "security_group_ids": ["security_group_ids",
+                           "cluster_security_group_ids",
+                           "cluster_security_group_id"],
+    "version": ["eks_cluster_version"]
+}
+
+
+# sha256 over the execgroup's files (lock file included), kept in
+# sync by tools/plan_cache.py stamp
+EXECGROUP_HASH = "0ec9e787281308915600228ff93f7b18786b7d2442e733a8b06138c354cab388"
+
+
+@contextmanager
+def _span(stack, stack_name, name, job=None, export=False):
+    """
+    Time name as a span with OpenTelemetry fields, added to the "spans"
+    variable of the stack results when trace_spans is set
+    (tools/span_report.py reads them back).  Yields
+    the span's W3C traceparent for the substack it inserts, or None;
+    export also hands it to the executor as TRACEPARENT.
+    """
+    if not stack.get_attr("trace_spans"):
+        yield None
+        return
+
+    if stack.get_attr("trace_parent"):
+        # w3c traceparent: 00-<trace id>-<parent span id>-<flags>
+        _, trace_id, parent_span_id, _ = stack.trace_parent.split("-")
+    else:
+        trace_id, parent_span_id = stack.get_attr("trace_id") or os.urandom(16).hex(), None
+
+    span = {"name": name,
+            "trace_id": trace_id,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": parent_span_id,
+            "start_time_unix_nano": time.time_ns(),
+            "attributes": {"config0.stack": stack_name},
+            "status": {"code": "OK"}}
+    if job:
+        span["attributes"]["config0.job"] = job
+
+    traceparent = f"00-{trace_id}-{span['span_id']}-01"
+    if export:
+        stack.set_variable("traceparent",
+                           traceparent,
+                           tags="tf_exec_env",
+                           types="str")
+
+    try:
+        yield traceparent
+    except Exception as error:
+        span["status"] = {"code": "ERROR", "message": str(error)}
+        raise
+    finally:
+        span["end_time_unix_nano"] = time.time_ns()
+        stack.set_variable("spans",
+                           (stack.get_attr("spans") or []) + [span],
+                           types="list")
+
+
+def _get_plan_fingerprint(stack, tf):
+    """Hash of everything the plan depends on."""
+    inputs = {
+        "execgroup": [stack.tf_execgroup.name, EXECGROUP_HASH],
+        "tfvars": stack.get_tagged_vars(tag="tfvar", output="dict"),
+        "tf_exec_env": stack.get_tagged_vars(tag="tf_exec_env", output="dict"),
+        "tf_runtime": stack.get_attr("tf_runtime"),
+        # include() values/maps and output keys shape the resource db entry
+        "tf": tf.get()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _plan_is_cached(stack, tf, resource_name, resource_type):
+    """
+    Record the plan fingerprint with the resource and return True if
+    the last successful apply of this resource had the same one, in
+    which case its outputs in the resource db are still current.
+    """
+    fingerprint = _get_plan_fingerprint(stack, tf)
+
+    stack.set_variable("plan_fingerprint",
+                       fingerprint,
+                       tags="db",
+                       types="str")
+
+    if stack.get_attr("force"):
+        return False
+
+    for resource_info in stack.get_resource(name=resource_name,
+                                            resource_type=resource_type) or []:
+        if resource_info.get("plan_fingerprint") == fingerprint:
+            return True
+
+    return False
+
+
+def _get_k8s_version(value):
+    """
+    (major, minor) of a cluster version.  aws_eks_cluster stores
+    eks_cluster_version as a float so 1.30 arrives as 1.3 - there is no
+    single digit minor EKS still runs, so one is read as a dropped
+    trailing zero.
+    """
+    major, _, minor = str(value).partition(".")
+    if len(minor) == 1:
+        minor += "0"
+    return int(major), int(minor or 0)
+
+
+def _get_cluster_metadata(stack, must_exists=False):
+    """Cluster record aws_eks_cluster/aws_eks_auto left in the resource db."""
+    lookup = {"name": stack.eks_cluster,
+              "resource_type": "eks"}
+
+    if must_exists:
+        lookup["must_exists"] = True
+
+    for resource_info in stack.get_resource(**lookup) or []:
+        region = resource_info.get("aws_default_region")
+        if region and region != stack.aws_default_region:
+            continue
+
+        return {attr: next((resource_info[k] for k in keys if resource_info.get(k)), None)
+                for attr, keys in CLUSTER_METADATA_KEYS.items()}
+
+    return {}
+
+
+def _set_cluster_metadata(stack):
+    """Hand the execgroup the cluster connection so it skips describing the cluster."""
+    # with null endpoint/CA the execgroup describes the cluster itself
+    if stack.get_attr("refresh_cluster_metadata"):
+        return
+
+    metadata = _get_cluster_metadata(stack)
+
+    if not metadata.get("endpoint") or not metadata.get("ca_data"):
+        return
+
+    stack.set_variable("eks_cluster_endpoint",
+                       metadata["endpoint"],
+                       tags="tfvar",
+                       types="str")
+
+    stack.set_variable("eks_cluster_ca_data",
+                       metadata["ca_data"],
+                       tags="tfvar",
+                       types="str")
+
+    if metadata.get("oidc_issuer"):
+        stack.set_variable("eks_oidc_issuer",
+                           metadata["oidc_issuer"],
+                           tags="tfvar",
+                           types="str")
+
+    if metadata.get("version"):
+        major, minor = _get_k8s_version(metadata["version"])
+        stack.set_variable("eks_cluster_version",
+                           f"{major}.{minor}",
+                           tags="tfvar",
+                           types="str")
+
 
 def run(stackargs):
 
@@ -28,10 +202,17 @@ def run(stackargs):
                              tags="tfvar,db",
                              types="str")
 
-    stack.parse.add_required(key="general_external_dns_role",
+    # the execgroup variable aws_eks2 and aws_eks_addons pass;
+    # general_external_dns_role is still read as the older name
+    stack.parse.add_optional(key="general_external_dns_role_name",
+                             default="null",
                              tags="tfvar,db",
                              types="str")
 
+    stack.parse.add_optional(key="general_external_dns_role",
+                             default="null",
+                             types="str")
+
     stack.parse.add_required(key="domain_filters",
                              tags="tfvar,db",
                              default="null",
@@ -42,11 +223,19 @@ def run(stackargs):
                              default="upsert-only",
                              choices=["upsert-only","sync"])
 
+    # null resolves the version for the cluster's kubernetes version
+    # from the execgroup's addon_versions.json (tools/addon_versions.py)
     stack.parse.add_optional(key="addon_version",
-                             default="v0.18.0-eksbuild.1",
+                             default="null",
                              tags="tfvar,db",
                              types="str")
 
+    # newest compatible version instead of the EKS default
+    stack.parse.add_optional(key="addon_most_recent",
+                             default="null",
+                             tags="tfvar",
+                             types="bool")
+
     stack.parse.add_optional(key="internal",
                              default="1m",
                              tags="tfvar,db",
@@ -62,6 +251,32 @@ def run(stackargs):
                              tags="tfvar,db,resource,tf_exec_env",
                              types="str")
 
+    # cli config pointing tofu at the shared provider mirror and
+    # plugin cache (tools/provider_mirror.py)
+    stack.parse.add_optional(key="tf_cli_config_file",
+                             default="null",
+                             types="str")
+
+    # re-run tofu even if the plan fingerprint matches the last apply
+    stack.parse.add_optional(key="force",
+                             default="null",
+                             types="bool")
+
+    # timing spans in the stack results (see tools/span_report.py); trace_parent
+    # is the w3c traceparent of the sched job that inserted this stack
+    stack.parse.add_optional(key="trace_spans",
+                             default="null",
+                             types="bool")
+
+    stack.parse.add_optional(key="trace_parent",
+                             default="null",
+                             types="str")
+
+    # skip the resource db record and let terraform describe the cluster
+    stack.parse.add_optional(key="refresh_cluster_metadata",
+                             default="null",
+                             types="bool")
+
     stack.add_execgroup("config0-hub:::aws_eks::external-dns-addon",
                         "tf_execgroup")
 
@@ -76,8 +291,24 @@ def run(stackargs):
     # Verify variables after initialization
     stack.verify_variables()
 
+    if not stack.get_attr("general_external_dns_role_name"):
+        if not stack.get_attr("general_external_dns_role"):
+            raise Exception("needs general_external_dns_role_name")
+        stack.set_variable("general_external_dns_role_name",
+                           stack.general_external_dns_role,
+                           tags="tfvar,db",
+                           types="str")
+
     stack.set_variable("timeout", 800)
 
+    if stack.get_attr("tf_cli_config_file"):
+        stack.set_variable("tf_cli_config_file",
+                           stack.tf_cli_config_file,
+                           tags="tf_exec_env",
+                           types="str")
+
+    _set_cluster_metadata(stack)
+
     # use the terraform constructor (helper)
     # but this is optional
     tf = TFConstructor(stack=stack,
@@ -88,12 +319,14 @@ def run(stackargs):
 
     tf.include(values={
         "aws_default_region": stack.aws_default_region,
-        "role_name": stack.general_external_dns_role,
+        "role_name": stack.general_external_dns_role_name,
         "name": f'{stack.eks_cluster}-external-dns',
     })
 
-    # finalize the tf_executor
-    stack.tf_executor.insert(display=True,
-                             **tf.get())
+    # finalize the tf_executor unless nothing changed since the last apply
+    if not _plan_is_cached(stack, tf, f'{stack.eks_cluster}-external-dns', "k8s-pkgs"):
+        with _span(stack, "external_dns_addon", "tf_executor.insert", export=True):
+            stack.tf_executor.insert(display=True,
+                                     **tf.get())
 
     return stack.get_results()
@@ -0,0 +1,309 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Index of EKS add-on versions built from describe-addon-versions.
+#
+# One `aws eks describe-addon-versions` (all add-ons, all cluster
+# versions) is turned into
+#
+#   {"generated_at": <unix time>, "ttl": <seconds>,
+#    "versions": {"<addon>/<k8s version>/<compute type>/<arch>":
+#                 {"default": "...", "latest": "..."}}}
+#
+# "default" is the version EKS flags as the default for that cluster
+# version (the newest compatible one if none is flagged), "latest" the
+# newest compatible one.  The index is kept in CACHE_DIR and rebuilt
+# once it is older than its ttl.
+#
+# sync writes the add-ons an execgroup installs into its
+# addon_versions.json; the execgroup looks the version up there by
+# cluster version instead of a hard coded constant, and only falls back
+# to the aws_eks_addon_version data source for keys the index lacks.
+#
+# refresh   - rebuild the cached index (aws cli, or --input recorded json)
+# resolve   - print the version for an add-on and cluster version
+# sync      - write the execgroup addon_versions.json files
+# check     - exit 1 if an execgroup file is out of date with the index
+# selftest  - build/resolve against tools/fixtures/describe-addon-versions.json
+#
+#   python tools/addon_versions.py refresh
+#   python tools/addon_versions.py resolve external-dns 1.33
+#   python tools/addon_versions.py resolve external-dns 1.33 --compute-type auto --latest
+#   python tools/addon_versions.py sync
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECGROUPS_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs")
+FIXTURE = os.path.join(REPO_DIR, "tools", "fixtures", "describe-addon-versions.json")
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "config0-addons")
+INDEX_FILE = "addon_versions.json"
+DEFAULT_TTL = 86400
+
+# add-ons each execgroup installs through aws_eks_addon
+EXECGROUP_ADDONS = {
+    "external-dns-addon": ["external-dns"]
+}
+
+
+def _version_key(version):
+    """v1.19.0-eksbuild.2 -> (1, 19, 0, 2) for ordering."""
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+def make_key(addon, cluster_version, compute_type="ec2", arch="amd64"):
+    return f"{addon}/{cluster_version}/{compute_type}/{arch}"
+
+
+def build_index(documents, ttl=DEFAULT_TTL, generated_at=None):
+    """Index one or more describe-addon-versions responses."""
+    candidates = {}
+    for document in documents:
+        for addon in document.get("addons", []):
+            for entry in addon.get("addonVersions", []):
+                version = entry["addonVersion"]
+                for compatibility in entry.get("compatibilities", []):
+                    for compute_type in entry.get("computeTypes") or ["ec2"]:
+                        for arch in entry.get("architecture") or ["amd64"]:
+                            key = make_key(addon["addonName"], compatibility["clusterVersion"],
+                                           compute_type, arch)
+                            candidates.setdefault(key, []).append(
+                                (version, bool(compatibility.get("defaultVersion"))))
+
+    versions = {}
+    for key, entries in sorted(candidates.items()):
+        latest = max((version for version, _ in entries), key=_version_key)
+        flagged = [version for version, default in entries if default]
+        versions[key] = {"default": max(flagged, key=_version_key) if flagged else latest,
+                         "latest": latest}
+
+    return {"generated_at": int(generated_at if generated_at is not None else time.time()),
+            "ttl": ttl,
+            "versions": versions}
+
+
+def describe_addon_versions(aws="aws", region=None):
+    """All add-ons for all cluster versions (the cli follows pagination)."""
+    cmd = [aws, "eks", "describe-addon-versions", "--output", "json"]
+    if region:
+        cmd.extend(["--region", region])
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{result.stderr.decode()}")
+    return json.loads(result.stdout)
+
+
+def is_stale(index, now=None):
+    return (now if now is not None else time.time()) - index["generated_at"] >= index["ttl"]
+
+
+def read_index(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(index, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def load_index(cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, aws="aws", region=None, refresh=False):
+    """
+    Return the cached index, rebuilding it when missing, stale or
+    refresh is set.  A stale index is still returned if the rebuild
+    fails (no credentials, no network) - versions only move forward.
+    """
+    path = os.path.join(cache_dir, INDEX_FILE)
+    index = read_index(path)
+
+    if index is not None and not refresh and not is_stale(index):
+        return index
+
+    try:
+        index = build_index([describe_addon_versions(aws=aws, region=region)], ttl=ttl)
+    except (OSError, RuntimeError) as error:
+        if index is None:
+            raise
+        print(f"warning: using stale index from {path}: {error}", file=sys.stderr)
+        return index
+
+    write_index(index, path)
+    return index
+
+
+def resolve(index, addon, cluster_version, compute_type="ec2", arch="amd64", latest=False):
+    entry = index["versions"].get(make_key(addon, cluster_version, compute_type, arch))
+    if not entry:
+        return None
+    return entry["latest" if latest else "default"]
+
+
+def get_execgroup_index(index, addons):
+    """The part of index covering addons, without generated_at so the
+    file (and the execgroup hash) only changes when a version does."""
+    prefixes = tuple(f"{addon}/" for addon in addons)
+    return {"versions": {key: value for key, value in index["versions"].items()
+                         if key.startswith(prefixes)}}
+
+
+def _execgroup_path(execgroup):
+    return os.path.join(EXECGROUPS_DIR, execgroup, "_chrootfiles", "var", "tmp", "terraform",
+                        INDEX_FILE)
+
+
+def _load(args):
+    if args.input:
+        documents = []
+        for path in args.input:
+            with open(path) as f:
+                documents.append(json.load(f))
+        index = build_index(documents, ttl=args.ttl)
+        write_index(index, os.path.join(args.cache, INDEX_FILE))
+        return index
+    return load_index(cache_dir=args.cache, ttl=args.ttl, aws=args.aws, region=args.region,
+                      refresh=getattr(args, "refresh", False))
+
+
+def refresh(args):
+    args.refresh = True
+    index = _load(args)
+    print(f"{len(index['versions'])} keys, ttl {index['ttl']}s -> "
+          f"{os.path.join(args.cache, INDEX_FILE)}")
+    return 0
+
+
+def resolve_cmd(args):
+    version = resolve(_load(args), args.addon, args.cluster_version,
+                      compute_type=args.compute_type, arch=args.arch, latest=args.latest)
+    if not version:
+        print(f"{make_key(args.addon, args.cluster_version, args.compute_type, args.arch)} "
+              f"not in index", file=sys.stderr)
+        return 1
+    print(version)
+    return 0
+
+
+def sync(args):
+    index = _load(args)
+    for execgroup, addons in sorted(EXECGROUP_ADDONS.items()):
+        path = _execgroup_path(execgroup)
+        contents = get_execgroup_index(index, addons)
+        if read_index(path) == contents:
+            continue
+        write_index(contents, path)
+        print(f"wrote {os.path.relpath(path, REPO_DIR)} ({len(contents['versions'])} keys)")
+    return 0
+
+
+def check(args):
+    index = _load(args)
+    stale = 0
+    for execgroup, addons in sorted(EXECGROUP_ADDONS.items()):
+        path = _execgroup_path(execgroup)
+        ok = read_index(path) == get_execgroup_index(index, addons)
+        stale += not ok
+        print(f"{'ok   ' if ok else 'stale'} {os.path.relpath(path, REPO_DIR)}")
+    return 1 if stale else 0
+
+
+def selftest(args):
+    with open(FIXTURE) as f:
+        document = json.load(f)
+
+    index = build_index([document], ttl=60, generated_at=1000)
+
+    # the aws cli is pointed at a missing binary, so any rebuild fails
+    current = build_index([document], ttl=3600)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_index(current, os.path.join(tmpdir, INDEX_FILE))
+        fresh = load_index(cache_dir=tmpdir, aws=os.path.join(tmpdir, "aws"))
+        write_index(index, os.path.join(tmpdir, INDEX_FILE))
+        fallback = load_index(cache_dir=tmpdir, aws=os.path.join(tmpdir, "aws"))
+
+    checks = {
+        "default is the flagged version": resolve(index, "external-dns", "1.33") == "v0.18.0-eksbuild.1",
+        "latest is the newest version": resolve(index, "external-dns", "1.33",
+                                                latest=True) == "v0.18.0-eksbuild.1",
+        "every compute type and arch is indexed": all(
+            resolve(index, "external-dns", "1.33", compute_type, arch)
+            for compute_type in ["auto", "ec2", "fargate"] for arch in ["amd64", "arm64"]),
+        "unknown cluster version resolves to None": resolve(index, "external-dns", "1.20") is None,
+        "ttl expires": not is_stale(index, now=1059) and is_stale(index, now=1060),
+        "version ordering is numeric": max(["v0.9.0-eksbuild.1", "v0.10.0-eksbuild.1"],
+                                           key=_version_key) == "v0.10.0-eksbuild.1",
+        "execgroup index drops generated_at": set(get_execgroup_index(index, ["external-dns"])) == {"versions"},
+        "fresh index is read without a rebuild": fresh == current,
+        "stale index is kept when the rebuild fails": fallback == index
+    }
+
+    for check_name, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check_name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EKS add-on version index")
+    parser.add_argument("--cache", default=CACHE_DIR, help="index cache dir")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="index ttl in seconds")
+    parser.add_argument("--input", action="append",
+                        help="recorded describe-addon-versions json instead of the aws cli")
+    parser.add_argument("--aws", default="aws", help="aws cli binary")
+    parser.add_argument("--region")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("refresh", help="rebuild the cached index")
+
+    resolve_parser = subparsers.add_parser("resolve", help="version for an add-on")
+    resolve_parser.add_argument("addon")
+    resolve_parser.add_argument("cluster_version")
+    resolve_parser.add_argument("--compute-type", default="ec2", choices=["auto", "ec2", "fargate"])
+    resolve_parser.add_argument("--arch", default="amd64", choices=["amd64", "arm64"])
+    resolve_parser.add_argument("--latest", action="store_true",
+                                help="newest compatible version instead of the default")
+    resolve_parser.add_argument("--refresh", action="store_true", help="ignore the ttl")
+
+    subparsers.add_parser("sync", help="write the execgroup addon_versions.json files")
+    subparsers.add_parser("check", help="exit 1 if an execgroup file is out of date")
+    subparsers.add_parser("selftest", help="run against the recorded fixture")
+
+    args = parser.parse_args(argv)
+
+    return {"refresh": refresh,
+            "resolve": resolve_cmd,
+            "sync": sync,
+            "check": check,
+            "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Generates the modules of the eks-addons-bundle execgroup from the
+# add-on execgroups it composes, so the bundle cannot drift from them.
+#
+# Each add-on's _combined.tf is split (tf_bundle.py) into
+# modules/<execgroup>/, minus
+#   - provider blocks: the bundle root configures aws, kubernetes, helm
+#     and kubectl once and the modules inherit them (which also lets the
+#     root use count/depends_on on the modules)
+#   - removed blocks: they only migrate the state of the standalone
+#     root, the bundle starts from its own state
+# and with the files the add-on reads through path.module.  The
+# bundle's lock file is merged from the add-ons' lock files, one
+# version per provider that meets every module's constraints.
+#
+# build  - regenerate modules/ and the bundle lock file
+# check  - exit 1 if either is out of date
+#
+#   python tools/addons_bundle.py build
+#   python tools/addons_bundle.py check
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import tf_bundle
+from lock_resolver import (get_hashes, parse_constraints, parse_required_providers,
+                           parse_version, satisfies)
+from provider_mirror import LOCK_FILE, get_execgroup_dirs, parse_lock_file
+
+BUNDLE = "eks-addons-bundle"
+
+# add-on execgroup -> files/dirs it reads through path.module
+MODULES = {
+    "base-helm-pkgs": [],
+    "external-dns-addon": ["addon_versions.json"],
+    "install-argocd-crds": ["crds-compact"],
+    "install-argocd": []
+}
+
+STRIP_BLOCKS = ["provider", "removed"]
+
+_BLOCK_START_RE = re.compile(r'^(%s)\b[^\n]*\{\s*$' % "|".join(STRIP_BLOCKS))
+
+LOCK_HEADER = ('# This file is maintained automatically by "tofu init".\n'
+               "# Manual edits may be lost in future updates.\n")
+
+
+def strip_blocks(text):
+    """
+    Drop top level provider/removed blocks and the comment lines right
+    above them.  Blocks end at the first "}" in column 0, which is how
+    every execgroup in the repo is formatted.
+    """
+    lines = text.split("\n")
+    out = []
+    index = 0
+    while index < len(lines):
+        if not _BLOCK_START_RE.match(lines[index]):
+            out.append(lines[index])
+            index += 1
+            continue
+
+        while out and out[-1].startswith("#"):
+            out.pop()
+
+        end = index + 1
+        while end < len(lines) and lines[end].rstrip() != "}":
+            end += 1
+        if end == len(lines):
+            raise ValueError(f"unterminated block: {lines[index]}")
+        index = end + 1
+
+    text = re.sub(r"\n{3,}", "\n\n", "\n".join(out))
+    return text.rstrip("\n") + "\n" if text.strip() else text
+
+
+def get_module_files(execgroup):
+    """Return {path relative to the module dir: bytes} for one add-on."""
+    src = get_execgroup_dirs()[execgroup]
+    files = {}
+
+    with tf_bundle.Bundle(os.path.join(src, "_combined.tf")) as bundle:
+        for name, body, _ in bundle.sections():
+            if name != tf_bundle.PREAMBLE:
+                files[name] = strip_blocks(bytes(body).decode()).encode()
+            body.release()
+
+    for extra in MODULES[execgroup]:
+        path = os.path.join(src, extra)
+        paths = [path] if os.path.isfile(path) else \
+            [os.path.join(dirpath, f) for dirpath, _, names in os.walk(path) for f in names]
+        for file_path in sorted(paths):
+            with open(file_path, "rb") as f:
+                files[os.path.relpath(file_path, src)] = f.read()
+
+    return files
+
+
+def get_bundle_lock(root_dir, module_dirs):
+    """Merged lock file contents for the bundle root and its modules."""
+    required = {}
+    for path in [root_dir] + module_dirs:
+        for address, constraint in parse_required_providers(path).items():
+            required.setdefault(address, [])
+            if constraint and constraint not in required[address]:
+                required[address].append(constraint)
+
+    locks = {execgroup: parse_lock_file(os.path.join(get_execgroup_dirs()[execgroup], LOCK_FILE))
+             for execgroup in MODULES}
+    hashes = get_hashes(locks)
+
+    blocks = []
+    for address, constraints in sorted(required.items()):
+        parsed = [c for constraint in constraints for c in parse_constraints(constraint)]
+        candidates = sorted({version for found, version in hashes if found == address},
+                            key=parse_version, reverse=True)
+        version = next((v for v in candidates if satisfies(v, parsed)), None)
+        if version is None:
+            raise ValueError(f"no locked {address} version meets {', '.join(constraints)}")
+
+        lines = [f'provider "{address}" {{',
+                 f'  version     = "{version}"',
+                 f'  constraints = "{", ".join(constraints)}"',
+                 "  hashes = ["]
+        lines.extend(f'    "{h}",' for h in hashes[(address, version)])
+        lines.extend(["  ]", "}"])
+        blocks.append("\n".join(lines))
+
+    return LOCK_HEADER + "\n" + "\n\n".join(blocks) + "\n"
+
+
+def render(root_dir):
+    """Return {path relative to root_dir: bytes} for the generated files."""
+    outputs = {}
+    for execgroup in MODULES:
+        for name, body in get_module_files(execgroup).items():
+            outputs[os.path.join("modules", execgroup, name)] = body
+
+    # the lock is resolved against the rendered modules
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module_dirs = []
+        for execgroup in MODULES:
+            module_dir = os.path.join(tmpdir, execgroup)
+            module_dirs.append(module_dir)
+            os.makedirs(module_dir)
+        for path, body in outputs.items():
+            if path.endswith(".tf") and path.count(os.sep) == 2:
+                with open(os.path.join(tmpdir, path.split(os.sep, 1)[1]), "wb") as f:
+                    f.write(body)
+
+        with tempfile.TemporaryDirectory() as root_copy:
+            with tf_bundle.Bundle(os.path.join(root_dir, "_combined.tf")) as bundle:
+                for name, body, _ in bundle.sections():
+                    if name != tf_bundle.PREAMBLE:
+                        with open(os.path.join(root_copy, name), "wb") as f:
+                            f.write(body)
+                    body.release()
+            outputs[LOCK_FILE] = get_bundle_lock(root_copy, module_dirs).encode()
+
+    return outputs
+
+
+def _current(root_dir):
+    current = {}
+    modules_dir = os.path.join(root_dir, "modules")
+    for dirpath, _, names in os.walk(modules_dir):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                current[os.path.relpath(path, root_dir)] = f.read()
+    lock = os.path.join(root_dir, LOCK_FILE)
+    if os.path.exists(lock):
+        with open(lock, "rb") as f:
+            current[LOCK_FILE] = f.read()
+    return current
+
+
+def build(args):
+    root_dir = get_execgroup_dirs()[BUNDLE]
+    outputs = render(root_dir)
+    current = _current(root_dir)
+
+    for path, body in sorted(outputs.items()):
+        if current.get(path) == body:
+            continue
+        target = os.path.join(root_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(body)
+        print(f"wrote {path}")
+
+    for path in sorted(set(current) - set(outputs)):
+        os.remove(os.path.join(root_dir, path))
+        print(f"removed {path}")
+
+    # drop module dirs an add-on no longer has
+    for dirpath, dirnames, filenames in os.walk(os.path.join(root_dir, "modules"), topdown=False):
+        if not dirnames and not filenames:
+            shutil.rmtree(dirpath)
+
+    return 0
+
+
+def check(args):
+    root_dir = get_execgroup_dirs()[BUNDLE]
+    outputs = render(root_dir)
+    current = _current(root_dir)
+
+    stale = sorted(path for path in set(outputs) | set(current)
+                   if outputs.get(path) != current.get(path))
+    for path in stale:
+        print(f"stale: {path}")
+
+    return 1 if stale else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f"generate the {BUNDLE} modules")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="regenerate modules/ and the lock file")
+    subparsers.add_parser("check", help="exit 1 if they are out of date")
+
+    args = parser.parse_args(argv)
+
+    return {"build": build, "check": check}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Pins and tests the tool bundle of the aws_eks_cluster IAM mapping
+# build (TOOL_BUNDLE in its run.py).
+#
+# Every tool carries the sha256 of its artifact in TOOL_BUNDLE. pin
+# reads it from the checksum file published with the release (or takes
+# it from --digest) and writes it into run.py, so the one time the
+# checksum file is trusted is a reviewed commit, not every build.
+#
+# pin       - write the sha256 of each tool into TOOL_BUNDLE
+# check     - exit 1 unless every tool in TOOL_BUNDLE is pinned
+# render    - print the buildspec for --args
+# selftest  - serve fake kubectl/eksctl artifacts over a local http
+#             server and run the generated install phase with sh
+#
+#   python tools/buildspec.py pin
+#   python tools/buildspec.py pin --digest kubectl=<sha256>
+#   python tools/buildspec.py check
+#   python tools/buildspec.py render --args '{"tools_mirror_url": "http://mirror.internal/tools"}'
+
+import argparse
+import hashlib
+import http.server
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import urllib.request
+
+import fake_runtime
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+STACK = "aws_eks_cluster"
+RUN_PY = os.path.join(fake_runtime.STACKS_DIR, STACK, "_files", "run.py")
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def load_module():
+    """Globals of the aws_eks_cluster run.py (TOOL_BUNDLE and the buildspec helpers)."""
+    return fake_runtime.Runtime().load(STACK)
+
+
+class _Args:
+    """The stack attributes _get_tool_bundle reads."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def get_attr(self, key):
+        return self.__dict__.get(key)
+
+
+def get_published_digest(tool, timeout=30):
+    """sha256 of the tool's artifact from the checksum file of its release."""
+    base_url = tool["base_url"].format(version=tool["version"])
+    with urllib.request.urlopen(f'{base_url}/{tool["checksum_file"]}', timeout=timeout) as response:
+        lines = response.read().decode().splitlines()
+
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 1 or (len(fields) == 2 and fields[1].lstrip("*") == tool["artifact"]):
+            return fields[0].lower()
+
+    raise ValueError(f'{tool["checksum_file"]} lists no digest for {tool["artifact"]}')
+
+
+def write_digests(digests, path=RUN_PY):
+    """Replace the "sha256" entry of each named tool in TOOL_BUNDLE."""
+    with open(path) as f:
+        text = f.read()
+
+    for name, digest in digests.items():
+        pattern = re.compile(rf'("{name}": {{\n(?:[^\n]*\n)*?\s*"sha256": )(None|"[0-9a-f]*")')
+        text, count = pattern.subn(lambda m: f'{m.group(1)}"{digest}"', text)
+        if count != 1:
+            raise ValueError(f"no TOOL_BUNDLE entry for {name} in {path}")
+
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def pin(args):
+    bundle = load_module()["TOOL_BUNDLE"]
+    digests = dict(item.split("=", 1) for item in args.digest or [])
+
+    for name, tool in bundle.items():
+        if name not in digests:
+            digests[name] = get_published_digest(tool)
+
+    for name, digest in digests.items():
+        if name not in bundle:
+            raise ValueError(f"{name} is not in TOOL_BUNDLE")
+        if not SHA256_RE.match(digest):
+            raise ValueError(f"{name}: {digest} is not a sha256")
+        print(f"{name:<8} {bundle[name]['version']:<10} {digest}")
+
+    write_digests(digests)
+    return 0
+
+
+def check(args):
+    problems = [f'{name} {tool["version"]} has no pinned sha256'
+                for name, tool in load_module()["TOOL_BUNDLE"].items()
+                if not SHA256_RE.match(tool.get("sha256") or "")]
+
+    for problem in problems:
+        print(problem)
+
+    return 1 if problems else 0
+
+
+def render(args):
+    module = load_module()
+    print(module["_get_buildspec"](module["_get_tool_bundle"](_Args(json.loads(args.args)))), end="")
+    return 0
+
+
+def get_install_commands(buildspec):
+    if yaml is None:
+        raise RuntimeError("reading the buildspec needs pyyaml")
+    return yaml.safe_load(buildspec)["phases"]["install"]["commands"]
+
+
+def run_install(commands):
+    """Run the install phase like CodeBuild: in order, stop at the first failure."""
+    output = []
+    for command in commands:
+        result = subprocess.run(["sh", "-c", command], capture_output=True, text=True)
+        output.append(result.stdout + result.stderr)
+        if result.returncode:
+            return result.returncode, "".join(output)
+    return 0, "".join(output)
+
+
+class _CountingHandler(http.server.SimpleHTTPRequestHandler):
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        return super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_fake_tools(mirror_dir, bundle):
+    """kubectl as a bare binary, eksctl as a tarball, laid out like tools_mirror_url."""
+    digests = {}
+    for name, tool in bundle.items():
+        script = f"#!/bin/sh\necho {name} {tool['version']}\n".encode()
+        if tool["artifact"].endswith(".tar.gz"):
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode="w:gz") as tar:
+                info = tarfile.TarInfo(name)
+                info.size = len(script)
+                info.mode = 0o755
+                tar.addfile(info, io.BytesIO(script))
+            content = data.getvalue()
+        else:
+            content = script
+
+        tool_dir = os.path.join(mirror_dir, name, tool["version"])
+        os.makedirs(tool_dir)
+        with open(os.path.join(tool_dir, tool["artifact"]), "wb") as f:
+            f.write(content)
+        digests[name] = hashlib.sha256(content).hexdigest()
+    return digests
+
+
+def selftest(args):
+    module = load_module()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module["TOOLS_CACHE_DIR"] = os.path.join(tmpdir, "cache")
+        module["TOOLS_BIN_DIR"] = os.path.join(tmpdir, "bin")
+        os.makedirs(module["TOOLS_BIN_DIR"])
+
+        mirror_dir = os.path.join(tmpdir, "mirror")
+        digests = _write_fake_tools(mirror_dir, module["TOOL_BUNDLE"])
+
+        handler = lambda *a, **kw: _CountingHandler(*a, directory=mirror_dir, **kw)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        values = {"tools_mirror_url": f"http://127.0.0.1:{server.server_address[1]}",
+                  **{f"{name}_sha256": digest for name, digest in digests.items()}}
+
+        def install(**overrides):
+            buildspec = module["_get_buildspec"](module["_get_tool_bundle"](_Args({**values, **overrides})))
+            downloads = len(_CountingHandler.requests)
+            rc, output = run_install(get_install_commands(buildspec))
+            return rc, output, len(_CountingHandler.requests) - downloads
+
+        try:
+            first = install()
+            tools_run = [subprocess.run([os.path.join(module["TOOLS_BIN_DIR"], name)],
+                                        capture_output=True, text=True).stdout.strip()
+                         for name in module["TOOL_BUNDLE"]]
+            cached = install()
+
+            artifact = os.path.join(module["TOOLS_CACHE_DIR"], "kubectl", digests["kubectl"],
+                                    module["TOOL_BUNDLE"]["kubectl"]["artifact"])
+            with open(artifact, "ab") as f:
+                f.write(b"tampered")
+            tampered = install()
+
+            wrong = install(kubectl_sha256="0" * 64)
+
+            module["TOOL_BUNDLE"]["kubectl"]["sha256"] = None
+            unpinned = install(kubectl_sha256=None)
+        finally:
+            server.shutdown()
+
+        try:
+            module["_get_tool_bundle"](_Args({**values, "kubectl_sha256": "not-a-digest"}))
+            malformed = None
+        except Exception as error:
+            malformed = str(error)
+
+        repinned = module["_get_tool_bundle"](_Args({"eksctl_version": "0.191.0", **values}))
+
+        checks = {
+            "first install downloads and verifies every tool": first[0] == 0 and first[2] == len(digests)
+            and first[1].count("OK") == len(digests),
+            "installed tools run": tools_run == [f"{name} {tool['version']}"
+                                                 for name, tool in module["TOOL_BUNDLE"].items()],
+            "cache dirs are keyed on the digest": all(
+                os.path.isdir(os.path.join(module["TOOLS_CACHE_DIR"], name, digest))
+                for name, digest in digests.items()),
+            "second install is served from the cache": cached[0] == 0 and cached[2] == 0
+            and cached[1].count("Using cached") == len(digests),
+            "a tampered cache entry is re-hashed and downloaded again": tampered[0] == 0
+            and tampered[2] == 1 and "Installing kubectl" in tampered[1],
+            "a digest mismatch fails the install phase": wrong[0] != 0 and "FAILED" in wrong[1]
+            and "eksctl" not in wrong[1],
+            "unpinned tools fall back to an unverified download": unpinned[0] == 0
+            and unpinned[2] == 1 and "(no pinned sha256, not verified)" in unpinned[1],
+            "a malformed digest argument is refused": malformed is not None and "kubectl_sha256" in malformed,
+            "eksctl_version keeps the pinned eksctl_sha256 argument": repinned["eksctl"]["version"] == "0.191.0"
+            and repinned["eksctl"]["sha256"] == digests["eksctl"]
+        }
+
+    for check_name, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check_name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pin and test the aws_eks_cluster IAM mapping tool bundle")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pin_parser = subparsers.add_parser("pin", help="write the sha256 of each tool into TOOL_BUNDLE")
+    pin_parser.add_argument("--digest", action="append",
+                            help="name=sha256, instead of the release checksum file")
+
+    subparsers.add_parser("check", help="exit 1 unless every tool is pinned")
+
+    render_parser = subparsers.add_parser("render", help="print the buildspec")
+    render_parser.add_argument("--args", default="{}", help="stack args as json")
+
+    subparsers.add_parser("selftest", help="run the install phase against a local http server")
+
+    args = parser.parse_args(argv)
+    return {"pin": pin, "check": check, "render": render, "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Mirrors the helm charts base-helm-pkgs and install-argocd install.
+#
+# The charts are pinned in CHARTS (version and the execgroup variable
+# holding it, or its mirror_chart_versions entry).  prefetch reads each upstream index.yaml through the
+# conditional GET cache of crd_fetch.py, downloads the chart tarball,
+# checks it against the digest the upstream index publishes and writes
+#
+#   <mirror>/<chart>-<version>.tgz
+#   <mirror>/index.yaml         helm repo index (json is valid yaml)
+#   <mirror>/charts.lock.json   chart, version, upstream url, sha256
+#
+# Tarballs already in the mirror with the locked digest are not
+# downloaded again.  The mirror is a plain directory, so it can be
+# served as is or published to an S3-compatible bucket.
+#
+# The execgroups take the mirror through chart_repo_url: the
+# helm_release charts then point straight at
+# <chart_repo_url>/<chart>-<version>.tgz and no repo index is
+# downloaded on apply.
+#
+# prefetch  - fetch the pinned charts into --mirror
+# verify    - exit 1 if the mirror does not match charts.lock.json
+# check     - exit 1 if CHARTS and the execgroup defaults disagree
+# publish   - aws s3 sync the mirror to an S3(-compatible) url
+# selftest  - prefetch from a local directory-backed repo
+#
+#   python tools/chart_mirror.py prefetch --mirror /srv/charts
+#   python tools/chart_mirror.py publish --mirror /srv/charts --dest s3://charts-bucket/eks
+#   python tools/chart_mirror.py check
+
+import argparse
+import hashlib
+import http.server
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+import crd_fetch
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECGROUPS_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs")
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "config0-charts")
+INDEX = "index.yaml"
+LOCK = "charts.lock.json"
+
+CHARTS = [
+    {"name": "metrics-server",
+     "repo": "https://kubernetes-sigs.github.io/metrics-server/",
+     "version": "3.12.1",
+     "execgroup": "base-helm-pkgs",
+     "variable": "metrics_server_chart_version"},
+    {"name": "prometheus",
+     "repo": "https://prometheus-community.github.io/helm-charts",
+     "version": "25.21.0",
+     "execgroup": "base-helm-pkgs",
+     "variable": "prometheus_chart_version"},
+    {"name": "grafana",
+     "repo": "https://grafana.github.io/helm-charts",
+     "version": "7.3.11",
+     "execgroup": "base-helm-pkgs",
+     "variable": "grafana_chart_version"},
+    {"name": "argo-cd",
+     "repo": "https://argoproj.github.io/argo-helm",
+     "version": "7.1.3",
+     "execgroup": "install-argocd",
+     "variable": "argocd_chart_version"}
+]
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _tarball(chart):
+    return f"{chart['name']}-{chart['version']}.tgz"
+
+
+def read_repo_index(repo, cache_dir):
+    """Upstream index.yaml, fetched with If-None-Match/If-Modified-Since."""
+    if yaml is None:
+        raise RuntimeError("PyYAML is needed to read the upstream index.yaml (pip install pyyaml)")
+
+    repo_cache = os.path.join(cache_dir, hashlib.sha256(repo.encode()).hexdigest()[:16])
+    os.makedirs(repo_cache, exist_ok=True)
+    body, status = crd_fetch.fetch_file(f"{repo.rstrip('/')}/{INDEX}", repo_cache)
+    return yaml.safe_load(body), status
+
+
+def find_entry(index, chart):
+    for entry in index.get("entries", {}).get(chart["name"], []):
+        if entry.get("version") == chart["version"]:
+            return entry
+    raise ValueError(f"{chart['name']} {chart['version']} not in {chart['repo']}")
+
+
+def read_lock(mirror):
+    try:
+        with open(os.path.join(mirror, LOCK)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(data, path, **kwargs):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, **kwargs)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def prefetch(mirror, charts=None, cache_dir=CACHE_DIR):
+    """Fetch charts into mirror; return {tarball: status}."""
+    charts = charts or CHARTS
+    os.makedirs(mirror, exist_ok=True)
+    lock = read_lock(mirror)
+    status = {}
+    repo_indexes = {}
+
+    for chart in charts:
+        tarball = _tarball(chart)
+        target = os.path.join(mirror, tarball)
+        locked = lock.get(tarball, {})
+
+        if locked.get("repo") == chart["repo"] and os.path.exists(target):
+            with open(target, "rb") as f:
+                if _sha256(f.read()) == locked["sha256"]:
+                    status[tarball] = "cached"
+                    continue
+
+        if chart["repo"] not in repo_indexes:
+            repo_indexes[chart["repo"]] = read_repo_index(chart["repo"], cache_dir)[0]
+        entry = find_entry(repo_indexes[chart["repo"]], chart)
+        url = urllib.parse.urljoin(f"{chart['repo'].rstrip('/')}/", entry["urls"][0])
+
+        with urllib.request.urlopen(url, timeout=60) as response:
+            body = response.read()
+
+        digest = _sha256(body)
+        if entry.get("digest") and entry["digest"] != digest:
+            raise ValueError(f"{tarball}: sha256 {digest} does not match the index ({entry['digest']})")
+
+        with open(f"{target}.tmp", "wb") as f:
+            f.write(body)
+        os.replace(f"{target}.tmp", target)
+
+        lock[tarball] = {"name": chart["name"],
+                         "version": chart["version"],
+                         "repo": chart["repo"],
+                         "url": url,
+                         "sha256": digest,
+                         "chart": {key: entry[key] for key in
+                                   ["apiVersion", "appVersion", "description", "type"]
+                                   if key in entry}}
+        status[tarball] = "downloaded"
+
+    _write_json(lock, os.path.join(mirror, LOCK), indent=2, sort_keys=True)
+    write_repo_index(mirror, lock)
+
+    return status
+
+
+def write_repo_index(mirror, lock):
+    """helm repo index over the locked tarballs, with relative urls."""
+    entries = {}
+    for tarball, locked in sorted(lock.items()):
+        entry = dict(locked.get("chart", {}))
+        entry.update(name=locked["name"],
+                     version=locked["version"],
+                     digest=locked["sha256"],
+                     urls=[tarball])
+        entries.setdefault(locked["name"], []).append(entry)
+
+    # no "generated" timestamp, so the index only changes with the charts
+    _write_json({"apiVersion": "v1", "entries": entries},
+                os.path.join(mirror, INDEX), indent=2, sort_keys=True)
+
+
+def verify(mirror):
+    """Return [problems] comparing the mirror against its lock."""
+    lock = read_lock(mirror)
+    if not lock:
+        return [f"no {LOCK} in {mirror}, run prefetch"]
+
+    problems = []
+    for tarball, locked in sorted(lock.items()):
+        path = os.path.join(mirror, tarball)
+        if not os.path.exists(path):
+            problems.append(f"missing {tarball}")
+            continue
+        with open(path, "rb") as f:
+            if _sha256(f.read()) != locked["sha256"]:
+                problems.append(f"sha256 mismatch {tarball}")
+
+    return problems
+
+
+def get_execgroup_default(execgroup, variable):
+    """
+    Version the execgroup installs from the mirror: the variable's
+    default, or its entry in mirror_chart_versions when the variable
+    defaults to null (public repo unpinned).
+    """
+    path = os.path.join(EXECGROUPS_DIR, execgroup, "_chrootfiles", "var", "tmp", "terraform",
+                        "_combined.tf")
+    with open(path) as f:
+        contents = f.read()
+    match = re.search(r'variable "%s" \{[^}]*?default\s*=\s*"([^"]*)"' % re.escape(variable),
+                      contents) or \
+        re.search(r'mirror_chart_versions = \{[^}]*?\b%s\s*=\s*"([^"]*)"' % re.escape(variable),
+                  contents)
+    return match.group(1) if match else None
+
+
+def check(args):
+    stale = 0
+    for chart in CHARTS:
+        current = get_execgroup_default(chart["execgroup"], chart["variable"])
+        ok = current == chart["version"]
+        stale += not ok
+        print(f"{'ok   ' if ok else 'stale'} {chart['execgroup']}:{chart['variable']} "
+              f"{current} (pinned {chart['version']})")
+    return 1 if stale else 0
+
+
+def publish(args):
+    problems = verify(args.mirror)
+    if problems:
+        for problem in problems:
+            print(problem)
+        return 1
+
+    base = [args.aws, "s3"]
+    if args.endpoint_url:
+        base = [args.aws, "--endpoint-url", args.endpoint_url, "s3"]
+
+    # tarballs first so the index never points at a missing chart
+    subprocess.run(base + ["sync", args.mirror, args.dest, "--exclude", INDEX], check=True)
+    subprocess.run(base + ["cp", os.path.join(args.mirror, INDEX), f"{args.dest.rstrip('/')}/{INDEX}"],
+                   check=True)
+    return 0
+
+
+def _make_chart(name, version):
+    """Minimal chart tarball (Chart.yaml only), byte stable."""
+    chart_yaml = f"apiVersion: v2\nname: {name}\nversion: {version}\n".encode()
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", format=tarfile.USTAR_FORMAT) as tar:
+        info = tarfile.TarInfo(f"{name}/Chart.yaml")
+        info.size = len(chart_yaml)
+        info.mtime = 0
+        tar.addfile(info, io.BytesIO(chart_yaml))
+    return buf.getvalue()
+
+
+def selftest(args):
+    """Prefetch twice from a directory-backed repo served over http."""
+    if yaml is None:
+        print("PyYAML is needed for the selftest (pip install pyyaml)")
+        return 1
+
+    charts = [{"name": "demo", "version": "1.0.0"}, {"name": "other", "version": "0.2.0"}]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        served = os.path.join(tmpdir, "served", "repo")
+        os.makedirs(served)
+        entries = {}
+        for chart in charts:
+            body = _make_chart(chart["name"], chart["version"])
+            with open(os.path.join(served, _tarball(chart)), "wb") as f:
+                f.write(body)
+            entries[chart["name"]] = [{"name": chart["name"], "version": chart["version"],
+                                       "apiVersion": "v2", "digest": _sha256(body),
+                                       "urls": [_tarball(chart)]}]
+        with open(os.path.join(served, INDEX), "w") as f:
+            yaml.safe_dump({"apiVersion": "v1", "entries": entries}, f)
+
+        handler = lambda *a, **kw: crd_fetch._ETagHandler(*a, directory=os.path.join(tmpdir, "served"), **kw)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        repo = f"http://127.0.0.1:{server.server_address[1]}/repo"
+        for chart in charts:
+            chart["repo"] = repo
+
+        mirror = os.path.join(tmpdir, "mirror")
+        cache_dir = os.path.join(tmpdir, "cache")
+        try:
+            first = prefetch(mirror, charts, cache_dir=cache_dir)
+            second = prefetch(mirror, charts, cache_dir=cache_dir)
+            with open(os.path.join(mirror, INDEX)) as f:
+                index = yaml.safe_load(f)
+
+            # a tampered upstream tarball must be rejected
+            with open(os.path.join(served, _tarball(charts[0])), "wb") as f:
+                f.write(_make_chart("demo", "9.9.9"))
+            os.remove(os.path.join(mirror, _tarball(charts[0])))
+            try:
+                prefetch(mirror, charts, cache_dir=cache_dir)
+                rejected = False
+            except ValueError:
+                rejected = True
+        finally:
+            server.shutdown()
+
+        checks = {
+            "first run downloads every chart": all(s == "downloaded" for s in first.values()),
+            "second run is served from the mirror": all(s == "cached" for s in second.values()),
+            "mirror index lists the charts with relative urls":
+                {name: [e["urls"] for e in versions] for name, versions in index["entries"].items()}
+                == {"demo": [["demo-1.0.0.tgz"]], "other": [["other-0.2.0.tgz"]]},
+            "digest mismatch is rejected": rejected
+        }
+
+    for check_name, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check_name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mirror the pinned helm charts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prefetch_parser = subparsers.add_parser("prefetch", help="fetch the pinned charts")
+    prefetch_parser.add_argument("--mirror", required=True, help="mirror directory")
+    prefetch_parser.add_argument("--cache", default=CACHE_DIR, help="upstream index cache dir")
+
+    verify_parser = subparsers.add_parser("verify", help="check the mirror against its lock")
+    verify_parser.add_argument("--mirror", required=True)
+
+    subparsers.add_parser("check", help="pinned versions vs execgroup defaults")
+
+    publish_parser = subparsers.add_parser("publish", help="sync the mirror to s3")
+    publish_parser.add_argument("--mirror", required=True)
+    publish_parser.add_argument("--dest", required=True, help="s3://bucket/prefix")
+    publish_parser.add_argument("--endpoint-url", help="S3-compatible endpoint")
+    publish_parser.add_argument("--aws", default="aws", help="aws cli binary")
+
+    subparsers.add_parser("selftest", help="prefetch from a local directory-backed repo")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prefetch":
+        for tarball, result in prefetch(args.mirror, cache_dir=args.cache).items():
+            print(f"{tarball:<28} {result}")
+        return 0
+
+    if args.command == "verify":
+        problems = verify(args.mirror)
+        for problem in problems:
+            print(problem)
+        return 1 if problems else 0
+
+    return {"check": check, "publish": publish, "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Preprocesses the ArgoCD CRDs for install-argocd-crds.
+#
+# Every CustomResourceDefinition in crds/*.yaml is
+#   - stripped of the schema "description" strings (a field that is
+#     itself called description, i.e. a key under "properties", stays)
+#   - canonicalized: sorted keys, no whitespace
+#   - written to crds-compact/<crd name>.json
+#
+# The output is byte stable for the same input, so the execgroup can key
+# apply on filesha256() and kubectl_manifest only sees a change when a
+# CRD really changed.
+#
+# build   - regenerate crds-compact/ from crds/
+# check   - exit 1 if crds-compact/ is out of date
+# report  - bytes per CRD: yaml, canonical json, compact
+# bench   - time tofu plan and measure state size in existing workdirs
+#
+#   python tools/crd_compact.py build
+#   python tools/crd_compact.py report
+#   python tools/crd_compact.py bench --workdir before=/tmp/crds-old --workdir after=/tmp/crds-new
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERRAFORM_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs", "install-argocd-crds",
+                             "_chrootfiles", "var", "tmp", "terraform")
+SRC_DIR = os.path.join(TERRAFORM_DIR, "crds")
+OUT_DIR = os.path.join(TERRAFORM_DIR, "crds-compact")
+
+
+def strip_descriptions(node, parent=None):
+    if isinstance(node, dict):
+        return {key: strip_descriptions(value, key)
+                for key, value in node.items()
+                if not (key == "description" and isinstance(value, str) and parent != "properties")}
+    if isinstance(node, list):
+        return [strip_descriptions(value) for value in node]
+    return node
+
+
+def canonical(manifest):
+    return json.dumps(manifest, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def load_crds(src_dir):
+    """Return [(source file, manifest)] for every CRD document in src_dir."""
+    if yaml is None:
+        raise RuntimeError("PyYAML is needed to read the CRD yaml (pip install pyyaml)")
+
+    crds = []
+    for path in sorted(glob.glob(os.path.join(src_dir, "*.yaml"))):
+        with open(path) as f:
+            for manifest in yaml.safe_load_all(f):
+                if manifest and manifest.get("kind") == "CustomResourceDefinition":
+                    crds.append((path, manifest))
+    return crds
+
+
+def compact(src_dir):
+    """Return {output file name: compact json} for src_dir."""
+    outputs = {}
+    for path, manifest in load_crds(src_dir):
+        name = f"{manifest['metadata']['name']}.json"
+        if name in outputs:
+            raise ValueError(f"CRD {name[:-5]} defined twice ({path})")
+        outputs[name] = canonical(strip_descriptions(manifest)) + "\n"
+    return outputs
+
+
+def _current(out_dir):
+    current = {}
+    for path in glob.glob(os.path.join(out_dir, "*.json")):
+        with open(path) as f:
+            current[os.path.basename(path)] = f.read()
+    return current
+
+
+def build(args):
+    outputs = compact(args.src)
+    current = _current(args.out)
+    os.makedirs(args.out, exist_ok=True)
+
+    for name, contents in sorted(outputs.items()):
+        if current.get(name) == contents:
+            continue
+        with open(os.path.join(args.out, name), "w") as f:
+            f.write(contents)
+        print(f"wrote {name} {hashlib.sha256(contents.encode()).hexdigest()[:12]}")
+
+    for name in sorted(set(current) - set(outputs)):
+        os.remove(os.path.join(args.out, name))
+        print(f"removed {name}")
+
+    return 0
+
+
+def check(args):
+    outputs = compact(args.src)
+    current = _current(args.out)
+
+    stale = sorted(name for name in set(outputs) | set(current)
+                   if outputs.get(name) != current.get(name))
+    for name in stale:
+        print(f"stale: {name}")
+
+    return 1 if stale else 0
+
+
+def report(args):
+    rows = []
+    for path, manifest in load_crds(args.src):
+        rows.append({"crd": manifest["metadata"]["name"],
+                     "yaml": os.path.getsize(path),
+                     "json": len(canonical(manifest).encode()),
+                     "compact": len(canonical(strip_descriptions(manifest)).encode())})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    print(f"{'crd':<36} {'yaml':>10} {'json':>10} {'compact':>10}")
+    for row in rows:
+        print(f"{row['crd']:<36} {row['yaml']:>10} {row['json']:>10} {row['compact']:>10}")
+    print(f"{'total':<36} {sum(r['yaml'] for r in rows):>10} "
+          f"{sum(r['json'] for r in rows):>10} {sum(r['compact'] for r in rows):>10}")
+
+    return 0
+
+
+def _run(cmd, cwd):
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode not in (0, 2):  # 2 = plan has changes with -detailed-exitcode
+        raise RuntimeError(f"{' '.join(cmd)} failed in {cwd}:\n{result.stderr.decode()}")
+    return result.stdout
+
+
+def bench(args):
+    """Workdirs must be initialized and applied against the same cluster."""
+    print(f"{'workdir':<12} {'plan':>9} {'state bytes':>12}")
+    for entry in args.workdir:
+        label, workdir = entry.split("=", 1)
+        timings = []
+        for _ in range(args.iterations):
+            start = time.monotonic()
+            _run([args.tofu, "plan", "-input=false", "-lock=false", "-detailed-exitcode",
+                  "-no-color"], workdir)
+            timings.append(time.monotonic() - start)
+        state = _run([args.tofu, "state", "pull"], workdir)
+        print(f"{label:<12} {min(timings):>8.1f}s {len(state):>12}")
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="compact the ArgoCD CRDs")
+    parser.add_argument("--src", default=SRC_DIR, help="directory with the CRD yaml")
+    parser.add_argument("--out", default=OUT_DIR, help="directory for the compact json")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("build", help="regenerate the compact CRDs")
+    subparsers.add_parser("check", help="exit 1 if the compact CRDs are out of date")
+
+    report_parser = subparsers.add_parser("report", help="size per CRD")
+    report_parser.add_argument("--json", action="store_true", help="emit json")
+
+    bench_parser = subparsers.add_parser("bench", help="plan time and state size")
+    bench_parser.add_argument("--workdir", action="append", required=True,
+                              help="label=path of an initialized, applied workdir")
+    bench_parser.add_argument("--iterations", type=int, default=3)
+    bench_parser.add_argument("--tofu", default="tofu")
+
+    args = parser.parse_args(argv)
+
+    return {"build": build, "check": check, "report": report, "bench": bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Fetches the ArgoCD CRDs for install-argocd-crds from a pinned release
+# (replaces get_latest_crds.sh, which took whatever was on master).
+#
+# Files are downloaded in parallel with conditional requests
+# (If-None-Match / If-Modified-Since) against a local cache keyed by
+# release, so a re-run against an unchanged release transfers nothing.
+# Files are only rewritten in crds/ when their content changed, and
+# crds/manifest.json records the release and the sha256 of each file.
+# The compact CRDs (tools/crd_compact.py) are rebuilt afterwards.
+#
+# The crds/ in the repo are still the copies get_latest_crds.sh took
+# from master and have no manifest; verify reports them as unpinned and
+# passes (--strict fails) until fetch is run against ARGOCD_VERSION.
+#
+# fetch     - download the CRDs of --version into crds/
+# verify    - exit 1 if crds/ does not match crds/manifest.json
+# selftest  - fetch twice from a local HTTP server stand-in
+#
+#   python tools/crd_fetch.py fetch
+#   python tools/crd_fetch.py fetch --version v2.12.4
+#   python tools/crd_fetch.py fetch --base-url http://mirror.internal/argo-cd/{version}/manifests/crds
+#   python tools/crd_fetch.py verify
+#   python tools/crd_fetch.py verify --strict
+
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import crd_compact
+
+# app version of the argo-cd helm chart install-argocd defaults to (7.1.3)
+ARGOCD_VERSION = "v2.11.3"
+BASE_URL = "https://raw.githubusercontent.com/argoproj/argo-cd/{version}/manifests/crds"
+CONTENTS_URL = "https://api.github.com/repos/argoproj/argo-cd/contents/manifests/crds?ref={version}"
+
+CRD_FILES = [
+    "application-crd.yaml",
+    "applicationset-crd.yaml",
+    "appproject-crd.yaml"
+]
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "config0-crds")
+MANIFEST = "manifest.json"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def discover(version, timeout=30):
+    """List *-crd.yaml in manifests/crds of the release (GitHub contents api)."""
+    with urllib.request.urlopen(CONTENTS_URL.format(version=version), timeout=timeout) as response:
+        entries = json.load(response)
+    return sorted(entry["name"] for entry in entries
+                  if entry["type"] == "file" and entry["name"].endswith("-crd.yaml"))
+
+
+def fetch_file(url, cache_dir, timeout=30):
+    """
+    Conditional GET of url through cache_dir.
+    Returns (bytes, "200" or "304").
+    """
+    name = os.path.basename(url)
+    body_path = os.path.join(cache_dir, name)
+    meta_path = f"{body_path}.meta.json"
+
+    meta = {}
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    request = urllib.request.Request(url)
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as error:
+        if error.code != 304:
+            raise
+        with open(body_path, "rb") as f:
+            body = f.read()
+        if _sha256(body) != meta.get("sha256"):
+            raise RuntimeError(f"cached {name} does not match its recorded sha256")
+        return body, "304"
+
+    tmp = f"{body_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, body_path)
+
+    with open(meta_path, "w") as f:
+        json.dump({"url": url,
+                   "etag": headers.get("ETag"),
+                   "last_modified": headers.get("Last-Modified"),
+                   "sha256": _sha256(body)}, f, indent=2)
+
+    return body, "200"
+
+
+def fetch(version, out_dir, base_url=BASE_URL, files=None, cache_dir=CACHE_DIR, workers=8):
+    """Fetch the CRDs of version into out_dir; return {file: status}."""
+    files = files or CRD_FILES
+    base_url = base_url.format(version=version).rstrip("/")
+    cache_dir = os.path.join(cache_dir, version)
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(files, pool.map(lambda name: fetch_file(f"{base_url}/{name}", cache_dir),
+                                           files)))
+
+    status = {}
+    digests = {}
+    for name, (body, http_status) in sorted(results.items()):
+        digests[name] = _sha256(body)
+        target = os.path.join(out_dir, name)
+
+        unchanged = False
+        if os.path.exists(target):
+            with open(target, "rb") as f:
+                unchanged = _sha256(f.read()) == digests[name]
+
+        if not unchanged:
+            with open(target, "wb") as f:
+                f.write(body)
+
+        status[name] = f"{http_status} {'unchanged' if unchanged else 'written'}"
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({"version": version,
+                   "base_url": base_url,
+                   "files": digests}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+    return status
+
+
+def verify(out_dir, strict=False):
+    """
+    Return [problems] comparing out_dir against its manifest.  Without a
+    manifest (CRDs not fetched by this tool) there is nothing to compare
+    against, which is only a problem with strict.
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return [f"no {MANIFEST} in {out_dir}, run fetch"] if strict else []
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    problems = []
+    for name, digest in sorted(manifest["files"].items()):
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            problems.append(f"missing {name}")
+            continue
+        with open(path, "rb") as f:
+            if _sha256(f.read()) != digest:
+                problems.append(f"sha256 mismatch {name}")
+
+    return problems
+
+
+class _ETagHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with a sha256 ETag, answering If-None-Match with 304."""
+
+    requests = []
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                etag = f'"{_sha256(f.read())}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.requests.append((self.path, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.requests.append((self.path, 200))
+            self._etag = etag
+        return super().do_GET()
+
+    def end_headers(self):
+        etag = getattr(self, "_etag", None)
+        if etag:
+            self.send_header("ETag", etag)
+            self._etag = None
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def selftest(args):
+    """Serve copies of the repo CRDs locally and fetch them twice."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        served = os.path.join(tmpdir, "served", "test", "manifests", "crds")
+        os.makedirs(served)
+        for name in CRD_FILES:
+            with open(os.path.join(crd_compact.SRC_DIR, name), "rb") as src, \
+                    open(os.path.join(served, name), "wb") as dst:
+                dst.write(src.read())
+
+        handler = lambda *a, **kw: _ETagHandler(*a, directory=os.path.join(tmpdir, "served"), **kw)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/{{version}}/manifests/crds"
+
+        out_dir = os.path.join(tmpdir, "crds")
+        cache_dir = os.path.join(tmpdir, "cache")
+        try:
+            first = fetch("test", out_dir, base_url=base_url, cache_dir=cache_dir)
+            second = fetch("test", out_dir, base_url=base_url, cache_dir=cache_dir)
+        finally:
+            server.shutdown()
+
+        checks = {
+            "first run downloads every file": all(s == "200 written" for s in first.values()),
+            "second run is all 304 and unchanged": all(s == "304 unchanged" for s in second.values()),
+            "manifest matches the files": not verify(out_dir),
+            "a missing manifest only fails with strict": not verify(served)
+            and verify(served, strict=True) != [],
+            "server saw one 200 and one 304 per file": sorted(code for _, code in _ETagHandler.requests)
+            == [200] * len(CRD_FILES) + [304] * len(CRD_FILES)
+        }
+
+    for check, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fetch the ArgoCD CRDs from a pinned release")
+    parser.add_argument("--out", default=crd_compact.SRC_DIR, help="crds directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser("fetch", help="download the CRDs of a release")
+    fetch_parser.add_argument("--version", default=ARGOCD_VERSION, help="argo-cd release tag")
+    fetch_parser.add_argument("--base-url", default=BASE_URL,
+                              help="url of the crds directory, {version} is substituted")
+    fetch_parser.add_argument("--discover", action="store_true",
+                              help="list the *-crd.yaml files of the release instead of CRD_FILES")
+    fetch_parser.add_argument("--cache", default=CACHE_DIR, help="download cache dir")
+    fetch_parser.add_argument("--workers", type=int, default=8)
+    fetch_parser.add_argument("--skip-compact", action="store_true",
+                              help="do not rebuild crds-compact/ afterwards")
+
+    verify_parser = subparsers.add_parser("verify", help="check crds/ against crds/manifest.json")
+    verify_parser.add_argument("--strict", action="store_true",
+                               help="also fail when crds/ has no manifest (unpinned)")
+    subparsers.add_parser("selftest", help="fetch from a local http server stand-in")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "verify":
+        if not os.path.exists(os.path.join(args.out, MANIFEST)):
+            print(f"{args.out} has no {MANIFEST}: unpinned CRDs, "
+                  f"run fetch to pin them to {ARGOCD_VERSION}")
+        problems = verify(args.out, strict=args.strict)
+        for problem in problems:
+            print(problem)
+        return 1 if problems else 0
+
+    if args.command == "selftest":
+        return selftest(args)
+
+    files = discover(args.version) if args.discover else CRD_FILES
+    status = fetch(args.version, args.out, base_url=args.base_url, files=files,
+                   cache_dir=args.cache, workers=args.workers)
+    for name, result in status.items():
+        print(f"{name:<28} {result}")
+
+    if not args.skip_compact and os.path.abspath(args.out) == os.path.abspath(crd_compact.SRC_DIR):
+        return crd_compact.build(argparse.Namespace(src=args.out, out=crd_compact.OUT_DIR))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Dry render of a sched stack (aws_eks2 by default) into reviewable
+# artifacts, without running anything.
+#
+# run() and schedule() and every run_<job>() are walked on the fake
+# runtime (fake_runtime.py) and for each job every tf_executor insert,
+# through the substacks the job inserts, is written as
+#
+#   <out>/schedule.json                       jobs, timeouts, on_success
+#   <out>/jobs/<job>/job.json                 schedule entry, inserts, error
+#   <out>/jobs/<job>/<substack>/default_values.json
+#   <out>/jobs/<job>/<substack>/tfvars.json   get_tagged_vars("tfvar")
+#   <out>/jobs/<job>/<substack>/tf_exec_env.json
+#   <out>/jobs/<job>/<substack>/include.json  TFConstructor include values/maps
+#   <out>/jobs/<job>/<substack>/outputs.json  TFConstructor output keys
+#   <out>/manifest.json                       sha256 per file and per job
+#
+# Files are only rewritten when their content changes, and the job hashes
+# are compared with the previous manifest: a job whose hash is unchanged
+# would apply the same inputs again and can be skipped.  Values that
+# differ per run (trace ids) are left out.
+#
+# render  - render into --out, list the jobs that changed
+# diff    - compare two rendered directories
+#
+#   python tools/dry_render.py render
+#   python tools/dry_render.py render --args '{"bundle_addons": true}' --out /tmp/eks2-bundled
+#   python tools/dry_render.py diff build/dry-render/aws_eks2 /tmp/eks2-bundled
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sys
+
+import fake_runtime
+
+DEFAULT_STACK = "aws_eks2"
+DEFAULT_OUT = os.path.join("build", "dry-render")
+MANIFEST = "manifest.json"
+
+# per-run values, not inputs of the plan
+VOLATILE_KEYS = ["trace_parent", "traceparent", "trace_id"]
+
+
+def _dumps(value):
+    return json.dumps(value, indent=2, sort_keys=True, default=fake_runtime.json_default) + "\n"
+
+
+def _strip(values):
+    return {key: value for key, value in (values or {}).items() if key not in VOLATILE_KEYS}
+
+
+def _get_insert_files(part, prefix):
+    """{relative path: contents} for the inserts of one rendered part."""
+    files = {}
+    seen = {}
+
+    for insert in part.get("inserts", []):
+        name = fake_runtime.get_stack_name(insert["substack"])
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}.{seen[name]}"
+        path = f"{prefix}/{name}"
+        kwargs = insert["kwargs"]
+
+        if "tfvars" in kwargs:
+            files[f"{path}/tfvars.json"] = _dumps(_strip(kwargs["tfvars"]))
+            files[f"{path}/tf_exec_env.json"] = _dumps(_strip(kwargs["tf_exec_env"]))
+            files[f"{path}/include.json"] = _dumps({
+                "execgroup_name": kwargs["execgroup_name"],
+                "provider": kwargs["provider"],
+                "resource_name": kwargs["resource_name"],
+                "resource_type": kwargs["resource_type"],
+                "values": _strip(kwargs["values"]),
+                "maps": kwargs["maps"]})
+            files[f"{path}/outputs.json"] = _dumps(kwargs["output_keys"])
+        elif "default_values" in kwargs:
+            files[f"{path}/default_values.json"] = _dumps(_strip(kwargs["default_values"]))
+
+        rendered = insert.get("render")
+        if rendered and rendered["kind"] == "stack":
+            files.update(_get_insert_files(rendered, path))
+        if rendered and rendered.get("error"):
+            files[f"{path}/error.txt"] = rendered["error"] + "\n"
+
+    return files
+
+
+def get_artifacts(rendered):
+    """{relative path: contents} for a rendered sched stack."""
+    if rendered["kind"] != "sched":
+        raise ValueError(f"{rendered['stack']} is not a sched stack")
+    if rendered["plan"].get("error"):
+        raise RuntimeError(f"{rendered['stack']}: {rendered['plan']['error']}")
+
+    schedules = {sched["job"]: {"timeout": sched.get("archive", {}).get("timeout"),
+                                "timewait": sched.get("archive", {}).get("timewait"),
+                                "retries": sched.get("conditions", {}).get("retries"),
+                                "on_success": sched.get("on_success") or []}
+                 for sched in rendered["schedules"]}
+
+    files = {"schedule.json": _dumps({"stack": rendered["stack"],
+                                      "jobs": rendered["order"],
+                                      "schedules": schedules,
+                                      "shape": fake_runtime.get_schedule_shape(rendered)})}
+
+    for job, part in rendered["jobs"].items():
+        job_files = _get_insert_files(part, f"jobs/{job}")
+        files[f"jobs/{job}/job.json"] = _dumps({
+            "job": job,
+            "schedule": schedules.get(job),
+            "inserts": [insert["substack"] for insert in part.get("inserts", [])],
+            "error": part.get("error")})
+        files.update(job_files)
+
+    return files
+
+
+def _sha256(contents):
+    return hashlib.sha256(contents.encode()).hexdigest()
+
+
+def get_manifest(stack, files):
+    jobs = {}
+    for path in sorted(files):
+        if path.startswith("jobs/"):
+            job = path.split("/")[1]
+            jobs.setdefault(job, hashlib.sha256())
+            jobs[job].update(f"{path}\0{_sha256(files[path])}\n".encode())
+
+    return {"stack": stack,
+            "jobs": {job: digest.hexdigest() for job, digest in jobs.items()},
+            "files": {path: _sha256(contents) for path, contents in sorted(files.items())}}
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_artifacts(out_dir, stack, files):
+    """Write files into out_dir; return (previous manifest, manifest, written paths)."""
+    previous = read_manifest(out_dir) or {"jobs": {}, "files": {}}
+    manifest = get_manifest(stack, files)
+    written = []
+
+    for path, contents in sorted(files.items()):
+        if previous["files"].get(path) == manifest["files"][path] and \
+                os.path.exists(os.path.join(out_dir, path)):
+            continue
+        target = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as f:
+            f.write(contents)
+        written.append(path)
+
+    for path in sorted(set(previous["files"]) - set(files)):
+        target = os.path.join(out_dir, path)
+        if os.path.exists(target):
+            os.remove(target)
+    for dirpath, dirnames, filenames in os.walk(out_dir, topdown=False):
+        if dirpath != out_dir and not dirnames and not filenames:
+            os.rmdir(dirpath)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        f.write(_dumps(manifest))
+
+    return previous, manifest, written
+
+
+def render(stack, stackargs, resources=None):
+    runtime = fake_runtime.Runtime(resources=resources)
+    rendered = runtime.render(stack, stackargs)
+    return rendered, get_artifacts(rendered)
+
+
+def render_cmd(args):
+    fixture = fake_runtime.load_fixture(args.fixture)
+    stackargs = dict(fixture["stacks"].get(args.stack, {})) if not args.no_fixture_args else {}
+    if args.args:
+        stackargs.update(json.loads(args.args))
+
+    rendered, files = render(args.stack, stackargs, fixture.get("resources"))
+    out_dir = args.out or os.path.join(DEFAULT_OUT, args.stack)
+    previous, manifest, written = write_artifacts(out_dir, args.stack, files)
+
+    for job, digest in manifest["jobs"].items():
+        status = "unchanged" if previous["jobs"].get(job) == digest else \
+            "new" if job not in previous["jobs"] else "changed"
+        print(f"{job:<16} {digest[:12]} {status}")
+    print(f"{len(written)} of {len(files)} files written to {out_dir}")
+
+    errors = fake_runtime.get_errors(rendered)
+    for where, error in errors:
+        print(f"error: {where}: {error}", file=sys.stderr)
+
+    changed = [job for job, digest in manifest["jobs"].items() if previous["jobs"].get(job) != digest]
+    if args.check and changed:
+        return 1
+    return 1 if errors else 0
+
+
+def diff(args):
+    before, after = read_manifest(args.before), read_manifest(args.after)
+    if before is None or after is None:
+        print(f"no {MANIFEST} in {args.before if before is None else args.after}", file=sys.stderr)
+        return 2
+
+    changed = 0
+    for path in sorted(set(before["files"]) | set(after["files"])):
+        if before["files"].get(path) == after["files"].get(path):
+            continue
+        changed += 1
+        lines = {}
+        for label, root, manifest in [("before", args.before, before), ("after", args.after, after)]:
+            lines[label] = []
+            if path in manifest["files"]:
+                with open(os.path.join(root, path)) as f:
+                    lines[label] = f.readlines()
+        sys.stdout.writelines(difflib.unified_diff(lines["before"], lines["after"],
+                                                   f"a/{path}", f"b/{path}"))
+
+    for job in sorted(set(before["jobs"]) | set(after["jobs"])):
+        if before["jobs"].get(job) != after["jobs"].get(job):
+            print(f"job changed: {job}")
+
+    return 1 if changed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dry render a sched stack into json artifacts")
+    parser.add_argument("--fixture", default=fake_runtime.FIXTURE,
+                        help="json with stack args per stack and the resource db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = subparsers.add_parser("render", help="render into --out")
+    render_parser.add_argument("stack", nargs="?", default=DEFAULT_STACK)
+    render_parser.add_argument("--args", help="json merged over the fixture args")
+    render_parser.add_argument("--no-fixture-args", action="store_true",
+                               help="use only --args, not the fixture's args for the stack")
+    render_parser.add_argument("--out", help=f"output dir, default {DEFAULT_OUT}/<stack>")
+    render_parser.add_argument("--check", action="store_true",
+                               help="exit 1 if any job changed since the last render")
+
+    diff_parser = subparsers.add_parser("diff", help="compare two rendered directories")
+    diff_parser.add_argument("before")
+    diff_parser.add_argument("after")
+
+    args = parser.parse_args(argv)
+
+    return {"render": render_cmd, "diff": diff}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,732 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# In-process stand-in for the config0 runtime the stacks are run in.
+#
+# A stack's run.py is executed with newStack, newSchedStack and
+# config0_publisher.terraform.TFConstructor injected, implemented just
+# far enough for the stacks in this repo:
+#   - parse.add_required/add_optional, init_variables (type conversion,
+#     "null" defaults), verify_variables (required, choices)
+#   - set_variable, get_attr, get_tagged_vars, to_list, b64 helpers
+#   - add_execgroup/add_substack/add_script and their init_* calls
+#   - get_resource against an in-memory resource db
+#   - substack insert and script run calls are recorded; substacks that
+#     live in this repo are rendered in turn with the default_values
+#     they were inserted with
+#   - sched stacks: run() for the jobs, schedule() for the schedules,
+#     then run_<job>() of every job on a fresh Main
+#
+# Nothing is executed: tf_executor.insert records the TFConstructor
+# payload (tfvars, include values/maps, output keys) instead.
+#
+# render    - render one stack and print what it recorded as json
+# bench     - render every stack repeatedly: render time, time spent
+#             resolving variables, schedule shape; --save/--compare a
+#             baseline to catch regressions
+# selftest  - render every stack in tools/fixtures/stack_args.json
+#
+#   python tools/fake_runtime.py render aws_eks2
+#   python tools/fake_runtime.py render aws_eks --args '{"eks_node_min_capacity": 3}'
+#   python tools/fake_runtime.py bench --save /tmp/bench.json
+#   python tools/fake_runtime.py bench --compare /tmp/bench.json
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import types as pytypes
+
+import schedule_sim
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACKS_DIR = os.path.join(REPO_DIR, "stacks", "_config0_configs")
+FIXTURE = os.path.join(REPO_DIR, "tools", "fixtures", "stack_args.json")
+
+# wall clock of these calls is reported as variable resolution
+TIMED_CALLS = ["init_variables", "verify_variables", "get_tagged_vars", "set_variable"]
+
+
+class RenderError(Exception):
+    pass
+
+
+def _is_null(value):
+    return value is None or value == "null" or value == "None"
+
+
+def convert(value, types):
+    """Convert an input the way the parse types ("str", "int", "bool", ...) ask."""
+    if _is_null(value):
+        return None
+    if not types:
+        return value
+
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip() != "null"]
+    kind = kinds[0] if kinds else None
+
+    if kind == "bool":
+        if isinstance(value, str):
+            return value.lower() in ("true", "1", "yes")
+        return bool(value)
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    if kind == "list":
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = [item.strip() for item in value.split(",") if item.strip()]
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+    if kind == "dict":
+        return json.loads(value) if isinstance(value, str) else dict(value)
+    if kind == "str":
+        return value if isinstance(value, str) else json.dumps(value) \
+            if isinstance(value, (dict, list)) else str(value)
+    return value
+
+
+def get_stack_name(ref):
+    """config0-hub:::aws_eks::aws_eks_cluster -> aws_eks_cluster"""
+    return ref.split("::")[-1]
+
+
+class _Parse:
+
+    def __init__(self, stack):
+        self.stack = stack
+        self.declared = {}
+
+    def _add(self, key, required, default=None, tags=None, types=None, choices=None):
+        entry = self.declared.setdefault(key, {"required": False, "tags": set()})
+        entry["required"] = entry["required"] or required
+        entry["default"] = default
+        entry["types"] = types
+        entry["choices"] = choices
+        if tags:
+            entry["tags"].update(tags.split(","))
+
+    def add_required(self, key, default=None, tags=None, types=None, choices=None):
+        self._add(key, True, default, tags, types, choices)
+
+    def add_optional(self, key, default=None, tags=None, types=None, choices=None):
+        self._add(key, False, default, tags, types, choices)
+
+
+class _Execgroup:
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.name = ref
+
+
+class _Script:
+
+    def __init__(self, runtime, ref):
+        self.runtime = runtime
+        self.ref = ref
+
+    def run(self, **kwargs):
+        self.runtime.record("script_runs", {"script": self.ref, "kwargs": kwargs})
+        return {}
+
+
+class _Substack:
+
+    def __init__(self, runtime, ref):
+        self.runtime = runtime
+        self.ref = ref
+
+    def insert(self, display=None, **kwargs):
+        name = get_stack_name(self.ref)
+        entry = {"substack": self.ref, "kwargs": kwargs}
+        self.runtime.record("inserts", entry)
+
+        if self.runtime.recurse and os.path.isdir(os.path.join(STACKS_DIR, name)):
+            entry["render"] = self.runtime.render(name, kwargs.get("default_values") or {})
+
+        return {}
+
+
+class FakeStack:
+    """newStack(stackargs) - the authoring stack a run.py works against."""
+
+    def __init__(self, runtime, stackargs):
+        object.__setattr__(self, "_runtime", runtime)
+        object.__setattr__(self, "_inputs", dict(stackargs))
+        object.__setattr__(self, "_variables", {})
+        object.__setattr__(self, "_tags", {})
+        object.__setattr__(self, "_explicit", set())
+        object.__setattr__(self, "_refs", {})
+        object.__setattr__(self, "parse", _Parse(self))
+
+    def __getattr__(self, name):
+        variables = object.__getattribute__(self, "_variables")
+        if name in variables:
+            return variables[name]
+        refs = object.__getattribute__(self, "_refs")
+        if name in refs:
+            return refs[name]
+        raise AttributeError(f"stack has no variable or dependency {name}")
+
+    def __setattr__(self, name, value):
+        self._variables[name] = value
+
+    def _timed(self, name):
+        return self._runtime.timed(name)
+
+    def init_variables(self):
+        with self._timed("init_variables"):
+            for key, entry in self.parse.declared.items():
+                if key in self._explicit:
+                    continue
+                value = self._inputs.get(key, entry["default"])
+                self._variables[key] = convert(value, entry["types"])
+                self._tags[key] = set(entry["tags"])
+
+    def verify_variables(self):
+        with self._timed("verify_variables"):
+            for key, entry in self.parse.declared.items():
+                value = self._variables.get(key)
+                if entry["required"] and value is None:
+                    raise RenderError(f"required variable {key} is not set")
+                if entry["choices"] and value is not None and value not in entry["choices"]:
+                    raise RenderError(f"{key}={value} is not one of {entry['choices']}")
+
+    def set_variable(self, name, value, tags=None, types=None):
+        with self._timed("set_variable"):
+            self._variables[name] = convert(value, types) if types else value
+            self._explicit.add(name)
+            if tags:
+                self._tags[name] = set(tags.split(","))
+            else:
+                self._tags.setdefault(name, set())
+
+    def get_attr(self, name):
+        return self._variables.get(name)
+
+    def get_tagged_vars(self, tag=None, output="dict"):
+        with self._timed("get_tagged_vars"):
+            return {key: value for key, value in sorted(self._variables.items())
+                    if tag in self._tags.get(key, ()) and value is not None}
+
+    def to_list(self, value):
+        return convert(value, "list") or []
+
+    def b64_encode(self, obj):
+        return base64.b64encode(json.dumps(obj, sort_keys=True).encode()).decode()
+
+    def b64_decode(self, value):
+        return json.loads(base64.b64decode(value))
+
+    def add_execgroup(self, ref, name=None):
+        self._refs[name or get_stack_name(ref)] = _Execgroup(ref)
+        self._runtime.record("execgroups", ref)
+
+    def add_substack(self, ref, name=None):
+        self._refs[name or get_stack_name(ref)] = _Substack(self._runtime, ref)
+        self._runtime.record("substacks", ref)
+
+    def add_script(self, ref, name=None):
+        self._refs[name or get_stack_name(ref)] = _Script(self._runtime, ref)
+        self._runtime.record("scripts", ref)
+
+    def init_execgroups(self):
+        pass
+
+    def init_substacks(self):
+        pass
+
+    def init_scripts(self):
+        pass
+
+    def set_parallel(self, **kwargs):
+        self._runtime.record("parallel", True)
+
+    def unset_parallel(self, **kwargs):
+        self._runtime.record("parallel", False)
+
+    def get_resource(self, must_exists=None, **lookup):
+        found = [resource for resource in self._runtime.resources
+                 if all(resource.get(key) == value for key, value in lookup.items())]
+        if must_exists and not found:
+            raise RenderError(f"no resource matches {lookup}")
+        return found
+
+    def get_results(self):
+        return {"variables": dict(self._variables)}
+
+
+class _Attrs:
+    """Attribute bag for schedules (sched.archive.timeout = ...)."""
+
+    def __getattr__(self, name):
+        value = _Attrs()
+        object.__setattr__(self, name, value)
+        return value
+
+    def to_dict(self):
+        return {key: value.to_dict() if isinstance(value, _Attrs) else value
+                for key, value in vars(self).items()}
+
+
+class FakeSchedStack:
+    """newSchedStack - base class of a sched stack's Main."""
+
+    def __init__(self, stackargs):
+        self.stack = FakeStack(self._runtime, stackargs)
+        self.parse = self.stack.parse
+        self._jobs = []
+        self._schedules = []
+        self._sched = None
+
+    def add_job(self, name):
+        self._jobs.append(name)
+
+    def finalize_jobs(self):
+        return list(self._jobs)
+
+    def new_schedule(self):
+        self._sched = _Attrs()
+        return self._sched
+
+    def add_schedule(self):
+        self._schedules.append(self._sched.to_dict())
+        self._sched = None
+
+    def get_schedules(self):
+        return list(self._schedules)
+
+
+class TFConstructor:
+    """config0_publisher.terraform.TFConstructor, recording its payload."""
+
+    def __init__(self, stack=None, execgroup_name=None, provider=None, resource_name=None,
+                 resource_type=None, **kwargs):
+        self.stack = stack
+        self.payload = {"execgroup_name": execgroup_name,
+                        "provider": provider,
+                        "resource_name": resource_name,
+                        "resource_type": resource_type,
+                        "values": {},
+                        "maps": {},
+                        "output_keys": []}
+
+    def include(self, values=None, maps=None, keys=None):
+        self.payload["values"].update(values or {})
+        self.payload["maps"].update(maps or {})
+        for key in keys or []:
+            self.payload["values"][key] = self.stack.get_attr(key)
+
+    def output(self, keys=None):
+        self.payload["output_keys"].extend(keys or [])
+
+    def get(self):
+        return {**self.payload,
+                "tfvars": self.stack.get_tagged_vars(tag="tfvar", output="dict"),
+                "tf_exec_env": self.stack.get_tagged_vars(tag="tf_exec_env", output="dict")}
+
+
+@contextlib.contextmanager
+def _injected_modules():
+    """config0_publisher.terraform for the run.py imports, only while rendering."""
+    names = ["config0_publisher", "config0_publisher.terraform"]
+    saved = {name: sys.modules.get(name) for name in names}
+
+    package = pytypes.ModuleType("config0_publisher")
+    terraform = pytypes.ModuleType("config0_publisher.terraform")
+    terraform.TFConstructor = TFConstructor
+    package.terraform = terraform
+    sys.modules.update({"config0_publisher": package, "config0_publisher.terraform": terraform})
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+class Runtime:
+    """
+    Renders stacks by name.  resources is the resource db get_resource
+    reads; stdout of the stacks is captured.
+    """
+
+    def __init__(self, resources=None, recurse=True):
+        self.resources = list(resources or [])
+        self.recurse = recurse
+        self.timings = {name: 0.0 for name in TIMED_CALLS}
+        self.calls = {name: 0 for name in TIMED_CALLS}
+        self._code = {}
+        self._records = []
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    def record(self, kind, value):
+        self._records[-1].setdefault(kind, []).append(value)
+
+    def load(self, name):
+        """Fresh module globals for one run.py (module level caches included)."""
+        if name not in self._code:
+            path = os.path.join(STACKS_DIR, name, "_files", "run.py")
+            if not os.path.exists(path):
+                raise RenderError(f"no stack {name}")
+            with open(path) as f:
+                self._code[name] = compile(f.read(), path, "exec")
+
+        runtime = self
+
+        class SchedStack(FakeSchedStack):
+            _runtime = runtime
+
+        module = {"__name__": f"stack_{name}",
+                  "newStack": lambda stackargs: FakeStack(runtime, stackargs),
+                  "newSchedStack": SchedStack}
+        with _injected_modules():
+            exec(self._code[name], module)
+        return module
+
+    def _render_part(self, name, part, call):
+        self._records.append({"part": part})
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                result = call()
+        except Exception as error:
+            self._records[-1]["error"] = f"{type(error).__name__}: {error}"
+            result = None
+        record = self._records.pop()
+        record["stdout"] = output.getvalue().splitlines()
+        record["result"] = result
+        return record
+
+    def render(self, name, stackargs):
+        """Render stack name with stackargs; returns what it recorded."""
+        module = self.load(name)
+
+        if "Main" not in module:
+            record = self._render_part(name, "run", lambda: module["run"](stackargs))
+            return {"stack": name, "kind": "stack", **record}
+
+        main = module["Main"]
+        plan = self._render_part(name, "plan",
+                                 lambda: (main(stackargs).run(), main(stackargs).schedule()))
+        rendered = {"stack": name, "kind": "sched", "plan": plan, "jobs": {}}
+        if plan.get("error"):
+            return rendered
+
+        jobs, schedules = plan.pop("result")
+        rendered["order"] = jobs
+        rendered["schedules"] = schedules
+        for job in jobs:
+            rendered["jobs"][job] = self._render_part(
+                name, job, lambda job=job: getattr(main(stackargs), f"run_{job}")())
+
+        return rendered
+
+
+def get_errors(rendered, path=""):
+    """[(where, error)] over a render and its nested substack renders."""
+    where = f"{path}{rendered['stack']}"
+    parts = [rendered] if rendered["kind"] == "stack" else \
+        [rendered["plan"]] + list(rendered["jobs"].values())
+
+    errors = []
+    for part in parts:
+        label = where if part is rendered else f"{where}:{part['part']}"
+        if part.get("error"):
+            errors.append((label, part["error"]))
+        for insert in part.get("inserts", []):
+            if "render" in insert:
+                errors.extend(get_errors(insert["render"], f"{label} > "))
+    return errors
+
+
+def get_schedule_shape(rendered):
+    """Jobs, on_success edges, timeouts and the critical path of a sched render."""
+    if rendered["kind"] != "sched" or "schedules" not in rendered:
+        return None
+
+    depends_on = {sched["job"]: [] for sched in rendered["schedules"]}
+    timeouts = {}
+    for sched in rendered["schedules"]:
+        timeouts[sched["job"]] = sched.get("archive", {}).get("timeout", 0)
+        for downstream in sched.get("on_success") or []:
+            depends_on.setdefault(downstream, []).append(sched["job"])
+
+    _, path, makespan = schedule_sim.simulate(depends_on, timeouts)
+    return {"jobs": rendered["order"],
+            "edges": sorted(f"{up}->{job}" for job, ups in depends_on.items() for up in ups),
+            "critical_path": path,
+            "critical_path_timeout": makespan}
+
+
+def _count_inserts(rendered):
+    parts = [rendered] if rendered["kind"] == "stack" else list(rendered["jobs"].values())
+    count = 0
+    for part in parts:
+        for insert in part.get("inserts", []):
+            count += 1
+            if "render" in insert:
+                count += _count_inserts(insert["render"])
+    return count
+
+
+def load_fixture(path=FIXTURE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def json_default(value):
+    if isinstance(value, set):
+        return sorted(value)
+    return str(value)
+
+
+def render_cmd(args):
+    fixture = load_fixture(args.fixture)
+    stackargs = dict(fixture["stacks"].get(args.stack, {}))
+    if args.args:
+        stackargs.update(json.loads(args.args))
+
+    runtime = Runtime(resources=fixture.get("resources"), recurse=not args.no_recurse)
+    rendered = runtime.render(args.stack, stackargs)
+
+    print(json.dumps(rendered, indent=2, sort_keys=True, default=json_default))
+
+    errors = get_errors(rendered)
+    for where, error in errors:
+        print(f"error: {where}: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def bench(args):
+    fixture = load_fixture(args.fixture)
+    results = {}
+
+    for stack, stackargs in sorted(fixture["stacks"].items()):
+        if args.stack and stack not in args.stack:
+            continue
+
+        timings = []
+        resolve = []
+        for _ in range(args.iterations):
+            runtime = Runtime(resources=fixture.get("resources"), recurse=not args.no_recurse)
+            start = time.perf_counter()
+            rendered = runtime.render(stack, stackargs)
+            timings.append(time.perf_counter() - start)
+            resolve.append(sum(runtime.timings.values()))
+
+        results[stack] = {"render_ms": round(statistics.median(timings) * 1000, 3),
+                          "resolve_ms": round(statistics.median(resolve) * 1000, 3),
+                          "variable_calls": sum(runtime.calls.values()),
+                          "inserts": _count_inserts(rendered),
+                          "errors": len(get_errors(rendered)),
+                          "schedule": get_schedule_shape(rendered)}
+
+    print(f"{'stack':<22} {'render':>10} {'resolve':>10} {'var calls':>10} {'inserts':>8} "
+          f"{'jobs':>5} {'critical path':>14}")
+    for stack, result in results.items():
+        shape = result["schedule"] or {}
+        print(f"{stack:<22} {result['render_ms']:>8.2f}ms {result['resolve_ms']:>8.2f}ms "
+              f"{result['variable_calls']:>10} {result['inserts']:>8} "
+              f"{len(shape.get('jobs', [])) or '-':>5} "
+              f"{str(shape.get('critical_path_timeout', '-')) + ('s' if shape else ''):>14}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if not args.compare:
+        return 1 if any(result["errors"] for result in results.values()) else 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for stack, result in results.items():
+        before = baseline.get(stack)
+        if not before:
+            continue
+        # small absolute floor so sub-millisecond noise is not a regression
+        limit = before["render_ms"] * (1 + args.tolerance) + 0.5
+        if result["render_ms"] > limit:
+            regressions.append(f"{stack}: render {before['render_ms']}ms -> {result['render_ms']}ms")
+        for key in ["variable_calls", "inserts", "errors", "schedule"]:
+            if result[key] != before[key]:
+                regressions.append(f"{stack}: {key} {before[key]} -> {result[key]}")
+
+    for regression in regressions:
+        print(f"regression: {regression}")
+
+    return 1 if regressions else 0
+
+
+def get_include_fingerprints(runtime, name="aws_eks_nodegroup"):
+    """Plan fingerprints of one stack for the same tfvars and two include() values."""
+    module = runtime.load(name)
+    stack = FakeStack(runtime, {})
+    stack._refs["tf_execgroup"] = pytypes.SimpleNamespace(name=name)
+
+    fingerprints = []
+    for values in [{"cluster": "a"}, {"cluster": "b"}]:
+        tf = TFConstructor(stack=stack, resource_name=name, resource_type="eks")
+        tf.include(values=values)
+        fingerprints.append(module["_get_plan_fingerprint"](stack, tf))
+    return fingerprints
+
+
+def selftest(args):
+    fixture = load_fixture(args.fixture)
+    runtime = Runtime(resources=fixture.get("resources"))
+    renders = {stack: runtime.render(stack, stackargs)
+               for stack, stackargs in sorted(fixture["stacks"].items())}
+
+    missing = Runtime().render("install_argocd", {})
+    eks = renders["aws_eks"]
+    eks2 = renders["aws_eks2"]
+    nodegroup = eks["jobs"]["eks_nodegroup"]["inserts"][0]["render"]
+    executor = next(insert for insert in nodegroup["inserts"]
+                    if insert["substack"].endswith("tf_executor"))
+
+    karpenter = runtime.render("aws_eks", {**fixture["stacks"]["aws_eks"],
+                                           "autoscaler": "karpenter",
+                                           "eks_node_capacity_type": "SPOT"})
+    system_pool = next(insert for insert in
+                       karpenter["jobs"]["eks_nodegroup"]["inserts"][0]["render"]["inserts"]
+                       if insert["substack"].endswith("tf_executor"))["kwargs"]["tfvars"]
+    node_pool = next(insert for insert in
+                     karpenter["jobs"]["karpenter"]["inserts"][0]["render"]["inserts"]
+                     if insert["substack"].endswith("tf_executor"))["kwargs"]["tfvars"]
+
+    drain = runtime.render("aws_eks_nodegroup", {**fixture["stacks"]["aws_eks_nodegroup"],
+                                                 "nodegroups": json.dumps({
+                                                     "big": {"desired_size": 100, "max_size": 100},
+                                                     "small": {"desired_size": 1},
+                                                     "tiny": {"desired_size": 1}}),
+                                                 "eks_node_drain_budget": 3})
+    drain_pools = next(insert for insert in drain["inserts"]
+                       if insert["substack"].endswith("tf_executor"))["kwargs"]["tfvars"]["eks_node_groups"]
+
+    coredns = runtime.render("aws_eks", {**fixture["stacks"]["aws_eks"],
+                                         "coredns_addon": True,
+                                         "coredns_autoscaling": True})
+    coredns_tfvars = {job: next(insert for insert in
+                                coredns["jobs"][job]["inserts"][0]["render"]["inserts"]
+                                if insert["substack"].endswith("tf_executor"))["kwargs"]["tfvars"]
+                      for job in ["eks_cluster", "eks_nodegroup"]}
+
+    stacks = sorted(name for name in os.listdir(STACKS_DIR)
+                    if os.path.exists(os.path.join(STACKS_DIR, name, "_files", "run.py")))
+    include_fingerprints = get_include_fingerprints(runtime)
+    existing_pool = Runtime(resources=fixture.get("resources", []) + [
+        {"name": "demo-nodegroup-main", "resource_type": "k8_node_group"}])
+    template_args = {**fixture["stacks"]["aws_eks_nodegroup"], "eks_node_volume_type": "gp3"}
+    template_rolling = existing_pool.render("aws_eks_nodegroup", template_args)
+    template_blue_green = existing_pool.render("aws_eks_nodegroup", {**template_args,
+                                                                     "eks_node_rollout": "blue_green"})
+    depends_on, _ = schedule_sim.load_graph(os.path.join(STACKS_DIR, "aws_eks2", "_files", "run.py"))
+
+    checks = {
+        "every stack has fixture args": sorted(fixture["stacks"]) == stacks,
+        "every stack renders without errors": not any(get_errors(r) for r in renders.values()),
+        "missing required args are reported": any("eks_cluster" in error
+                                                  for _, error in get_errors(missing)),
+        "sched jobs run in run() order": eks["order"] == ["preflight", "eks_cluster", "eks_nodegroup", "karpenter"],
+        "aws_eks2 schedules follow DEPENDS_ON": get_schedule_shape(eks2)["edges"] == sorted(
+            f"{up}->{job}" for job, ups in depends_on.items() for up in ups),
+        "substacks are rendered with their default_values": nodegroup["kind"] == "stack"
+        and executor["kwargs"]["tfvars"]["eks_cluster"] == fixture["stacks"]["aws_eks"]["eks_cluster"],
+        "tfvars are typed": executor["kwargs"]["tfvars"]["eks_node_max_capacity"] == 2,
+        "null variables are not tagged out": "eks_node_role_arn" not in executor["kwargs"]["tf_exec_env"],
+        "karpenter job is a no-op without autoscaler": not eks["jobs"]["karpenter"].get("inserts"),
+        "autoscaler karpenter shrinks the nodegroup to a system pool": not get_errors(karpenter)
+        and system_pool["eks_node_max_capacity"] == 2
+        and system_pool["eks_node_capacity_type"] == "ON_DEMAND"
+        and node_pool["karpenter_capacity_types"] == ["spot"],
+        "the drain budget holds for uneven pools": not get_errors(drain)
+        and sum(pool["max_unavailable"] for pool in drain_pools.values()) <= 3,
+        "coredns is applied with the nodegroup, not the cluster": not get_errors(coredns)
+        and coredns_tfvars["eks_nodegroup"].get("coredns_autoscaling") is True
+        and not any(key.startswith("coredns") for key in coredns_tfvars["eks_cluster"]),
+        "include values are part of the plan fingerprint": len(set(include_fingerprints)) == 2,
+        "a launch template on an existing rolling pool needs blue_green": any(
+            "blue_green" in error for _, error in get_errors(template_rolling))
+        and not get_errors(template_blue_green),
+        "every tf_executor insert has an execgroup": all(
+            insert["kwargs"].get("execgroup_name")
+            for r in renders.values() for part in
+            ([r] if r["kind"] == "stack" else r["jobs"].values())
+            for insert in part.get("inserts", []) if insert["substack"].endswith("tf_executor"))
+    }
+
+    for check_name, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check_name}")
+
+    for stack, rendered in renders.items():
+        for where, error in get_errors(rendered):
+            print(f"     {where}: {error}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="render stacks against a fake config0 runtime")
+    parser.add_argument("--fixture", default=FIXTURE,
+                        help="json with stack args per stack and the resource db")
+    parser.add_argument("--no-recurse", action="store_true",
+                        help="record substack inserts without rendering them")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = subparsers.add_parser("render", help="render one stack, print json")
+    render_parser.add_argument("stack")
+    render_parser.add_argument("--args", help="json merged over the fixture args")
+
+    bench_parser = subparsers.add_parser("bench", help="time rendering every stack")
+    bench_parser.add_argument("--stack", action="append", help="only these stacks")
+    bench_parser.add_argument("--iterations", type=int, default=20)
+    bench_parser.add_argument("--save", help="write the results as a baseline")
+    bench_parser.add_argument("--compare", help="baseline to compare against, exit 1 on regression")
+    bench_parser.add_argument("--tolerance", type=float, default=0.5,
+                              help="allowed render time increase over the baseline (0.5 = 50%%)")
+
+    subparsers.add_parser("selftest", help="render every stack in the fixture")
+
+    args = parser.parse_args(argv)
+
+    return {"render": render_cmd, "bench": bench, "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,760 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Drives the aws_eks / aws_eks2 job graphs of many clusters at once.
+#
+# The inventory (yaml or json) lists the clusters:
+#
+#   defaults:
+#     stack: aws_eks2
+#     args: {vpc_name: shared, ...}
+#   clusters:
+#     - eks_cluster: dev-use1
+#       region: us-east-1
+#       account: "111111111111"
+#       args: {...}
+#
+# Each cluster gets the job graph of its stack's run.py (DEPENDS_ON, or
+# the on_success lists, via schedule_sim.py) and all the jobs of all the
+# clusters go through one scheduler, which
+#   - caps running jobs globally, per region and per account
+#   - spends a token bucket AWS API budget per account/region, each job
+#     costing API_COSTS calls when it starts
+#   - retries failed jobs with exponential backoff and full jitter, and
+#     blocks the downstream jobs of a job that keeps failing
+#   - starts the ready job with the longest remaining path first
+#   - reports progress and an ETA from the work done so far
+#
+# run       - run every job through --command, a template formatted with
+#             {stack} {job} {eks_cluster} {region} {account}; the stack
+#             args are passed as json in FLEET_ARGS
+# simulate  - the same scheduler on a virtual clock with a fake executor:
+#             lognormal job durations, random failures and an account/
+#             region API quota that throttles jobs past it
+# selftest  - scheduler checks against the fake executor
+#
+#   python tools/fleet.py simulate --clusters 60 --regions us-east-1,eu-west-1 --per-region 8
+#   python tools/fleet.py simulate inventory.yml --api-rate 4 --api-burst 40 --quota 10
+#   python tools/fleet.py run inventory.yml --per-account 6 \
+#       --command "config0 stack run {stack} --job {job} --name {eks_cluster}"
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+
+import schedule_sim
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACKS_DIR = os.path.join(REPO_DIR, "stacks", "_config0_configs")
+
+DEFAULT_STACK = "aws_eks2"
+DEFAULT_ACCOUNT = "default"
+
+# estimated AWS API calls a job makes (mostly in its first minutes:
+# create/describe calls before the waiters settle)
+API_COSTS = {
+    "preflight": 4,
+    "eks_cluster": 40,
+    "eks_nodegroup": 20,
+    "addons": 15,
+    "base_helm": 5,
+    "external_dns": 8,
+    "argocd_crds": 2,
+    "argocd": 5,
+    "karpenter": 12
+}
+DEFAULT_API_COST = 5
+
+# fraction of sched.archive.timeout a job is expected to take
+DURATION_FACTOR = 0.4
+
+PENDING, RUNNING, DONE, FAILED, BLOCKED = "pending", "running", "done", "failed", "blocked"
+
+
+def _is_true(value):
+    return str(value).lower() in ("true", "1", "yes")
+
+
+def load_inventory(path):
+    """Return the merged cluster entries of an inventory file."""
+    with open(path) as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        document = json.loads(text)
+    elif yaml is not None:
+        document = yaml.safe_load(text)
+    else:
+        try:
+            document = json.loads(text)
+        except ValueError:
+            raise RuntimeError("PyYAML is needed to read a yaml inventory (pip install pyyaml)")
+
+    if isinstance(document, list):
+        document = {"clusters": document}
+
+    defaults = document.get("defaults") or {}
+    clusters = []
+    names = set()
+
+    for entry in document.get("clusters") or []:
+        cluster = {**defaults, **entry,
+                   "args": {**(defaults.get("args") or {}), **(entry.get("args") or {})}}
+        for key in ["eks_cluster", "region"]:
+            if not cluster.get(key):
+                raise ValueError(f"inventory entry without {key}: {entry}")
+        cluster.setdefault("stack", DEFAULT_STACK)
+        cluster["account"] = str(cluster.get("account") or DEFAULT_ACCOUNT)
+        cluster["args"].setdefault("eks_cluster", cluster["eks_cluster"])
+        cluster["args"].setdefault("aws_default_region", cluster["region"])
+
+        name = f"{cluster['account']}/{cluster['region']}/{cluster['eks_cluster']}"
+        if name in names:
+            raise ValueError(f"{name} is in the inventory twice")
+        names.add(name)
+        cluster["name"] = name
+        clusters.append(cluster)
+
+    return clusters
+
+
+def generate_inventory(count, regions, accounts, stack=DEFAULT_STACK):
+    """count clusters spread round robin over regions and accounts."""
+    clusters = []
+    for index in range(count):
+        region = regions[index % len(regions)]
+        account = accounts[(index // len(regions)) % len(accounts)]
+        clusters.append({"name": f"{account}/{region}/eks-{index:03d}",
+                         "eks_cluster": f"eks-{index:03d}",
+                         "stack": stack,
+                         "region": region,
+                         "account": account,
+                         "args": {"eks_cluster": f"eks-{index:03d}", "aws_default_region": region}})
+    return clusters
+
+
+def load_stack(stack):
+    """(depends_on, timeouts, skipped(args)) for a stack in the repo."""
+    path = os.path.join(STACKS_DIR, stack, "_files", "run.py")
+    depends_on, timeouts = schedule_sim.load_graph(path)
+    bundled = schedule_sim.load_constant(path, "BUNDLED_JOBS", [])
+    karpenter = schedule_sim.load_constant(path, "KARPENTER_JOBS", [])
+
+    # same rule as _is_skipped in the stack: the jobs still run, as no-ops
+    def skipped(args):
+        jobs = set()
+        if bundled:
+            jobs |= set(bundled) if _is_true(args.get("bundle_addons")) else {"addons"}
+        if args.get("autoscaler") != "karpenter":
+            jobs |= set(karpenter)
+        return jobs
+
+    return depends_on, timeouts, skipped
+
+
+class Task:
+
+    def __init__(self, cluster, job, upstreams, expected, skipped):
+        self.cluster = cluster
+        self.job = job
+        self.upstreams = upstreams
+        self.downstreams = []
+        self.expected = expected
+        self.skipped = skipped
+        self.state = PENDING
+        self.attempts = 0
+        self.ready_at = 0.0
+        self.started_at = None
+        self.tail = expected
+        self.error = None
+
+    @property
+    def key(self):
+        return f"{self.cluster['name']}:{self.job}"
+
+
+def build_tasks(clusters, factor=DURATION_FACTOR):
+    tasks = []
+    stacks = {}
+
+    for cluster in clusters:
+        if cluster["stack"] not in stacks:
+            stacks[cluster["stack"]] = load_stack(cluster["stack"])
+        depends_on, timeouts, skipped = stacks[cluster["stack"]]
+        skip = skipped(cluster["args"])
+
+        by_job = {}
+        for job in schedule_sim.topo_order(depends_on):
+            expected = 0.0 if job in skip else timeouts.get(job, 1800) * factor
+            task = Task(cluster, job, [by_job[up] for up in depends_on[job]], expected, job in skip)
+            for upstream in task.upstreams:
+                upstream.downstreams.append(task)
+            by_job[job] = task
+            tasks.append(task)
+
+        # longest remaining path, used to pick between ready jobs
+        for task in reversed(list(by_job.values())):
+            task.tail = task.expected + max((d.tail for d in task.downstreams), default=0.0)
+
+    return tasks
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst, now=0.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost, now):
+        self._refill(now)
+        cost = min(cost, self.burst)
+        if self.tokens < cost - 1e-6:
+            return False
+        self.tokens -= cost
+        return True
+
+    def available_at(self, cost, now):
+        self._refill(now)
+        missing = min(cost, self.burst) - self.tokens
+        return now if missing <= 1e-6 else now + missing / self.rate
+
+
+def backoff(attempt, rng, base=30.0, cap=900.0):
+    """Full jitter: uniform over [0, min(cap, base * 2^attempt)]."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class SimClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def wait_until(self, when):
+        self.now = max(self.now, when)
+
+
+class RealClock:
+
+    def __init__(self, max_sleep=5.0):
+        self.start = time.monotonic()
+        self.max_sleep = max_sleep
+
+    def time(self):
+        return time.monotonic() - self.start
+
+    def wait_until(self, when):
+        time.sleep(max(0.0, min(when - self.time(), self.max_sleep)))
+
+
+class FakeExecutor:
+    """
+    Jobs take expected * lognormal(0, jitter) seconds (skipped jobs take
+    noop seconds) and fail with probability fail_rate, or always for
+    the task keys in fail.  A job spends its API calls evenly over its
+    first window seconds; starting one that takes the account/region
+    past quota calls per second gets it throttled partway through.
+    """
+
+    def __init__(self, rng, api_costs, jitter=0.25, fail_rate=0.0, fail=(), quota=None,
+                 window=60.0, noop=20.0):
+        self.rng = rng
+        self.api_costs = api_costs
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.fail = set(fail)
+        self.quota = quota
+        self.window = window
+        self.noop = noop
+        self.running = []
+        self.calls = {}
+        self.seq = itertools.count()
+        self.throttled = 0
+
+    def _demand(self, scope, now):
+        active = [(end, rate) for end, rate in self.calls.get(scope, []) if end > now]
+        self.calls[scope] = active
+        return sum(rate for _, rate in active)
+
+    def start(self, task, now):
+        if task.skipped:
+            heapq.heappush(self.running, (now + self.noop, next(self.seq), task, True, None))
+            return
+
+        duration = max(1.0, task.expected * self.rng.lognormvariate(0, self.jitter))
+        ok, error = True, None
+
+        cost = self.api_costs.get(task.job, DEFAULT_API_COST)
+        scope = (task.cluster["account"], task.cluster["region"])
+        rate = cost / self.window
+        if self.quota is not None and self._demand(scope, now) + rate > self.quota:
+            duration = self.rng.uniform(1.0, self.window)
+            ok, error = False, "ThrottlingException: Rate exceeded"
+            self.throttled += 1
+        elif task.key in self.fail or self.rng.random() < self.fail_rate:
+            duration = self.rng.uniform(1.0, duration)
+            ok, error = False, "job failed"
+        self.calls.setdefault(scope, []).append((now + min(duration, self.window), rate))
+
+        heapq.heappush(self.running, (now + duration, next(self.seq), task, ok, error))
+
+    def poll(self, now):
+        finished = []
+        while self.running and self.running[0][0] <= now:
+            _, _, task, ok, error = heapq.heappop(self.running)
+            finished.append((task, ok, error))
+        return finished
+
+    def next_event(self, now):
+        return self.running[0][0] if self.running else None
+
+
+class CommandExecutor:
+    """Runs each job as a subprocess, logging to log_dir/<cluster>.<job>.log."""
+
+    def __init__(self, template, log_dir, poll_interval=5.0):
+        self.template = template
+        self.log_dir = log_dir
+        self.poll_interval = poll_interval
+        self.running = {}
+
+    def start(self, task, now):
+        cluster = task.cluster
+        cmd = self.template.format(stack=cluster["stack"], job=task.job,
+                                   eks_cluster=cluster["eks_cluster"],
+                                   region=cluster["region"], account=cluster["account"])
+        env = dict(os.environ,
+                   FLEET_ARGS=json.dumps(cluster["args"], sort_keys=True),
+                   FLEET_JOB=task.job,
+                   FLEET_ATTEMPT=str(task.attempts))
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f"{task.key.replace('/', '_').replace(':', '.')}.log")
+        log = open(log_path, "a")
+        log.write(f"### attempt {task.attempts}: {cmd}\n")
+        log.flush()
+        process = subprocess.Popen(shlex.split(cmd), stdout=log, stderr=subprocess.STDOUT, env=env)
+        self.running[task.key] = (task, process, log, log_path)
+
+    def poll(self, now):
+        finished = []
+        for key, (task, process, log, log_path) in list(self.running.items()):
+            code = process.poll()
+            if code is None:
+                continue
+            log.close()
+            del self.running[key]
+            finished.append((task, code == 0, None if code == 0 else f"exit {code}, see {log_path}"))
+        return finished
+
+    def next_event(self, now):
+        return now + self.poll_interval if self.running else None
+
+
+class Fleet:
+
+    def __init__(self, tasks, executor, clock, rng, max_parallel=None, per_region=None,
+                 per_account=None, region_limits=None, api_rate=None, api_burst=None,
+                 api_costs=None, retries=2, backoff_base=30.0, backoff_cap=900.0,
+                 report_interval=None, out=sys.stdout):
+        self.tasks = tasks
+        self.executor = executor
+        self.clock = clock
+        self.rng = rng
+        self.max_parallel = max_parallel
+        self.per_region = per_region
+        self.per_account = per_account
+        self.region_limits = region_limits or {}
+        self.api_rate = api_rate
+        self.api_burst = api_burst or (api_rate * 10 if api_rate else None)
+        self.api_costs = api_costs or API_COSTS
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.report_interval = report_interval
+        self.out = out
+
+        self.buckets = {}
+        self.running = {"all": 0}
+        self.peak = {}
+        self.retried = 0
+        self.work_done = 0.0
+        self.events = []
+
+    def _scopes(self, task):
+        return ["all", f"region:{task.cluster['region']}", f"account:{task.cluster['account']}"]
+
+    def _limit(self, scope):
+        if scope == "all":
+            return self.max_parallel
+        kind, name = scope.split(":", 1)
+        if kind == "region":
+            return self.region_limits.get(name, self.per_region)
+        return self.per_account
+
+    def _has_slot(self, task):
+        for scope in self._scopes(task):
+            limit = self._limit(scope)
+            if limit is not None and self.running.get(scope, 0) >= limit:
+                return False
+        return True
+
+    def _bucket(self, task, now):
+        scope = (task.cluster["account"], task.cluster["region"])
+        if scope not in self.buckets:
+            self.buckets[scope] = TokenBucket(self.api_rate, self.api_burst, now)
+        return self.buckets[scope]
+
+    def _cost(self, task):
+        return 0 if task.skipped else self.api_costs.get(task.job, DEFAULT_API_COST)
+
+    def _start(self, task, now):
+        task.state = RUNNING
+        task.started_at = now
+        task.attempts += 1
+        for scope in self._scopes(task):
+            self.running[scope] = self.running.get(scope, 0) + 1
+            self.peak[scope] = max(self.peak.get(scope, 0), self.running[scope])
+        self.events.append((now, "start", task.key))
+        self.executor.start(task, now)
+
+    def _finish(self, task, ok, error, now):
+        for scope in self._scopes(task):
+            self.running[scope] -= 1
+        self.events.append((now, "done" if ok else "fail", task.key))
+
+        if ok:
+            task.state = DONE
+            self.work_done += task.expected
+            return
+
+        task.error = error
+        if task.attempts <= self.retries:
+            task.state = PENDING
+            task.ready_at = now + backoff(task.attempts - 1, self.rng, self.backoff_base,
+                                          self.backoff_cap)
+            self.retried += 1
+            return
+
+        task.state = FAILED
+        blocked = list(task.downstreams)
+        while blocked:
+            downstream = blocked.pop()
+            if downstream.state == PENDING:
+                downstream.state = BLOCKED
+                blocked.extend(downstream.downstreams)
+
+    def _ready(self, now):
+        return sorted((task for task in self.tasks
+                       if task.state == PENDING and task.ready_at <= now
+                       and all(up.state == DONE for up in task.upstreams)),
+                      key=lambda task: -task.tail)
+
+    def progress(self, now):
+        counts = {state: 0 for state in [PENDING, RUNNING, DONE, FAILED, BLOCKED]}
+        for task in self.tasks:
+            counts[task.state] += 1
+
+        remaining = sum(task.expected for task in self.tasks if task.state in (PENDING, RUNNING))
+        eta = remaining / (self.work_done / now) if self.work_done and now else None
+
+        return {"time": round(now), "jobs": len(self.tasks), **counts, "retries": self.retried,
+                "eta": None if eta is None else round(eta)}
+
+    def _report(self, now):
+        p = self.progress(now)
+        eta = "-" if p["eta"] is None else f"{p['eta']}s"
+        print(f"[{p['time']:>7}s] {p['done']}/{p['jobs']} done, {p['running']} running, "
+              f"{p['failed']} failed, {p['blocked']} blocked, {p['retries']} retries, eta {eta}",
+              file=self.out, flush=True)
+
+    def run(self):
+        next_report = self.report_interval
+
+        while True:
+            now = self.clock.time()
+            for task, ok, error in self.executor.poll(now):
+                self._finish(task, ok, error, now)
+
+            wake = []
+            for task in self._ready(now):
+                if not self._has_slot(task):
+                    continue
+                cost = self._cost(task)
+                if self.api_rate and cost:
+                    bucket = self._bucket(task, now)
+                    if not bucket.take(cost, now):
+                        wake.append(bucket.available_at(cost, now))
+                        continue
+                self._start(task, now)
+
+            if next_report is not None and now >= next_report:
+                self._report(now)
+                next_report = now + self.report_interval
+
+            if not any(task.state in (PENDING, RUNNING) for task in self.tasks):
+                break
+
+            wake.extend(task.ready_at for task in self.tasks
+                        if task.state == PENDING and task.ready_at > now)
+            executor_wake = self.executor.next_event(now)
+            if executor_wake is not None:
+                wake.append(executor_wake)
+            if next_report is not None:
+                wake.append(next_report)
+            if not wake:
+                raise RuntimeError("fleet stalled: pending jobs but nothing running or scheduled")
+
+            self.clock.wait_until(min(wake))
+
+        now = self.clock.time()
+        if self.report_interval is not None:
+            self._report(now)
+        return now
+
+
+def _parse_pairs(entries, cast=float):
+    pairs = {}
+    for entry in entries or []:
+        key, value = entry.split("=", 1)
+        pairs[key] = cast(value)
+    return pairs
+
+
+def _get_clusters(args):
+    if args.inventory:
+        return load_inventory(args.inventory)
+    return generate_inventory(args.clusters, args.regions.split(","), args.accounts.split(","),
+                              stack=args.stack)
+
+
+def _make_fleet(args, tasks, executor, clock, rng):
+    return Fleet(tasks, executor, clock, rng,
+                 max_parallel=args.max_parallel,
+                 per_region=args.per_region,
+                 per_account=args.per_account,
+                 region_limits=_parse_pairs(args.region_limit, int),
+                 api_rate=args.api_rate,
+                 api_burst=args.api_burst,
+                 api_costs={**API_COSTS, **_parse_pairs(args.api_cost)},
+                 retries=args.retries,
+                 backoff_base=args.backoff_base,
+                 backoff_cap=args.backoff_cap,
+                 report_interval=args.report_interval)
+
+
+def _summary(fleet, elapsed, as_json):
+    clusters = {}
+    for task in fleet.tasks:
+        entry = clusters.setdefault(task.cluster["name"], {"status": DONE, "jobs": {}})
+        entry["jobs"][task.job] = {"state": task.state, "attempts": task.attempts,
+                                   "error": task.error if task.state == FAILED else None}
+        if task.state != DONE:
+            entry["status"] = FAILED
+
+    summary = {"elapsed": round(elapsed),
+               "clusters": len(clusters),
+               "failed_clusters": sorted(name for name, e in clusters.items() if e["status"] != DONE),
+               "retries": fleet.retried,
+               "peak_running": fleet.peak,
+               "throttled": getattr(fleet.executor, "throttled", None)}
+
+    if as_json:
+        print(json.dumps({**summary, "detail": clusters}, indent=2))
+    else:
+        print(f"\n{summary['clusters']} clusters in {summary['elapsed']}s, "
+              f"{len(summary['failed_clusters'])} failed, {summary['retries']} retries"
+              + (f", {summary['throttled']} throttled" if summary["throttled"] is not None else ""))
+        for name in summary["failed_clusters"]:
+            bad = {job: e for job, e in clusters[name]["jobs"].items() if e["state"] != DONE}
+            print(f"  {name}: " + ", ".join(f"{job} {e['state']}" + (f" ({e['error']})" if e["error"] else "")
+                                            for job, e in bad.items()))
+
+    return 1 if summary["failed_clusters"] else 0
+
+
+def run(args):
+    tasks = build_tasks(_get_clusters(args))
+    executor = CommandExecutor(args.command, args.log_dir, poll_interval=args.poll_interval)
+    fleet = _make_fleet(args, tasks, executor, RealClock(), random.Random(args.seed))
+    return _summary(fleet, fleet.run(), args.json)
+
+
+def simulate(args):
+    rng = random.Random(args.seed)
+    tasks = build_tasks(_get_clusters(args), factor=args.duration_factor)
+    executor = FakeExecutor(rng, {**API_COSTS, **_parse_pairs(args.api_cost)},
+                            jitter=args.jitter, fail_rate=args.fail_rate, quota=args.quota,
+                            window=args.window)
+    fleet = _make_fleet(args, tasks, executor, SimClock(), rng)
+    _summary(fleet, fleet.run(), args.json)
+    return 0
+
+
+def selftest(args):
+    def sim(clusters, seed=1, fail_rate=0.0, fail=(), quota=None, **kwargs):
+        rng = random.Random(seed)
+        tasks = build_tasks(clusters)
+        executor = FakeExecutor(rng, API_COSTS, fail_rate=fail_rate, fail=fail, quota=quota)
+        fleet = Fleet(tasks, executor, SimClock(), rng, **kwargs)
+        return fleet, fleet.run()
+
+    regions = ["us-east-1", "us-west-2", "eu-west-1"]
+    accounts = ["111111111111", "222222222222"]
+    clusters = generate_inventory(24, regions, accounts)
+    eks = generate_inventory(6, regions, accounts, stack="aws_eks")
+    bundled = generate_inventory(3, regions, accounts)
+    for cluster in bundled:
+        cluster["args"]["bundle_addons"] = "true"
+
+    fleet, elapsed = sim(clusters, per_region=4, per_account=5)
+    order_ok = True
+    started = {key: t for t, kind, key in fleet.events if kind == "start"}
+    finished = {key: t for t, kind, key in fleet.events if kind == "done"}
+    for task in fleet.tasks:
+        for upstream in task.upstreams:
+            order_ok &= started[task.key] >= finished[upstream.key]
+
+    again, again_elapsed = sim(clusters, per_region=4, per_account=5)
+    serial, serial_elapsed = sim(clusters, max_parallel=1)
+    eks_fleet, _ = sim(eks, per_region=2)
+    bundled_fleet, _ = sim(bundled)
+
+    failing, _ = sim(clusters[:2], fail=[f"{clusters[0]['name']}:eks_cluster"], retries=2)
+    flaky, _ = sim(clusters[:6], fail_rate=0.2, retries=6)
+
+    throttled, _ = sim(clusters, quota=1.0)
+    budgeted, _ = sim(clusters, quota=1.0, api_rate=0.3, api_burst=40)
+
+    rng = random.Random(3)
+    jitter = [backoff(attempt, rng, 30, 900) for attempt in range(8) for _ in range(50)]
+
+    checks = {
+        "every job of every cluster is done": all(t.state == DONE for t in fleet.tasks),
+        "jobs start after their upstreams finish": order_ok,
+        "per region and per account limits hold": all(
+            peak <= (4 if scope.startswith("region:") else 5)
+            for scope, peak in fleet.peak.items() if scope != "all"),
+        "same seed gives the same schedule": fleet.events == again.events and elapsed == again_elapsed,
+        "concurrency beats one job at a time": elapsed < serial_elapsed / 4,
+        "aws_eks graph comes from on_success": {t.job for t in eks_fleet.tasks} == {"preflight", "eks_cluster", "eks_nodegroup", "karpenter"}
+        and all(t.state == DONE for t in eks_fleet.tasks),
+        "karpenter is skipped without autoscaler": {t.job for t in eks_fleet.tasks if t.skipped}
+        == {"karpenter"},
+        "bundle_addons skips the bundled jobs": {t.job for t in bundled_fleet.tasks if t.skipped}
+        == {"base_helm", "external_dns", "argocd_crds", "argocd"},
+        "failing job is retried then blocks its downstreams": all(
+            (t.state, t.attempts) == {"preflight": (DONE, 1), "eks_cluster": (FAILED, 3)}.get(
+                t.job, (BLOCKED, 0))
+            for t in failing.tasks if t.cluster is clusters[0])
+        and all(t.state == DONE for t in failing.tasks if t.cluster is clusters[1]),
+        "transient failures are retried to completion": flaky.retried > 0
+        and all(t.state == DONE for t in flaky.tasks),
+        "quota throttles an unbudgeted fleet": throttled.executor.throttled > 0,
+        "api budget keeps the fleet under the quota": budgeted.executor.throttled == 0
+        and all(t.state == DONE for t in budgeted.tasks),
+        "backoff stays within [0, min(cap, base * 2^n)]": all(
+            0 <= delay <= min(900, 30 * 2 ** (index // 50)) for index, delay in enumerate(jitter)),
+        "eta is reported once work is done": fleet.progress(elapsed / 2)["eta"] is not None
+    }
+
+    for check_name, ok in checks.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {check_name}")
+
+    return 0 if all(checks.values()) else 1
+
+
+def _add_scheduler_args(parser):
+    parser.add_argument("inventory", nargs="?", help="cluster inventory (yaml or json)")
+    parser.add_argument("--max-parallel", type=int, help="running jobs overall")
+    parser.add_argument("--per-region", type=int, help="running jobs per region")
+    parser.add_argument("--per-account", type=int, help="running jobs per account")
+    parser.add_argument("--region-limit", action="append",
+                        help="region=N, overrides --per-region for one region")
+    parser.add_argument("--api-rate", type=float,
+                        help="AWS API calls per second per account/region (no budget if unset)")
+    parser.add_argument("--api-burst", type=float, help="bucket size, default 10 * --api-rate")
+    parser.add_argument("--api-cost", action="append", help="job=calls, overrides API_COSTS")
+    parser.add_argument("--retries", type=int, default=2, help="retries per job")
+    parser.add_argument("--backoff-base", type=float, default=30.0)
+    parser.add_argument("--backoff-cap", type=float, default=900.0)
+    parser.add_argument("--report-interval", type=float, help="seconds between progress lines")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="emit the summary as json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="provision and reconcile a fleet of EKS clusters")
+    subparsers = parser.add_subparsers(dest="command_name", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run every job through --command")
+    _add_scheduler_args(run_parser)
+    run_parser.add_argument("--command", required=True,
+                            help="command template: {stack} {job} {eks_cluster} {region} {account}")
+    run_parser.add_argument("--log-dir", default="fleet-logs")
+    run_parser.add_argument("--poll-interval", type=float, default=5.0)
+    run_parser.set_defaults(report_interval=60.0)
+
+    sim_parser = subparsers.add_parser("simulate", help="run on a virtual clock with a fake executor")
+    _add_scheduler_args(sim_parser)
+    sim_parser.add_argument("--clusters", type=int, default=30,
+                            help="generated clusters when no inventory is given")
+    sim_parser.add_argument("--regions", default="us-east-1,us-west-2,eu-west-1")
+    sim_parser.add_argument("--accounts", default="default")
+    sim_parser.add_argument("--stack", default=DEFAULT_STACK)
+    sim_parser.add_argument("--duration-factor", type=float, default=DURATION_FACTOR,
+                            help="mean job duration as a fraction of its timeout")
+    sim_parser.add_argument("--jitter", type=float, default=0.25, help="lognormal sigma")
+    sim_parser.add_argument("--fail-rate", type=float, default=0.0)
+    sim_parser.add_argument("--quota", type=float,
+                            help="API calls per second per account/region before throttling")
+    sim_parser.add_argument("--window", type=float, default=60.0,
+                            help="seconds over which a job spends its API calls")
+    sim_parser.set_defaults(report_interval=1800.0)
+
+    subparsers.add_parser("selftest", help="scheduler checks against the fake executor")
+
+    args = parser.parse_args(argv)
+
+    if args.command_name == "run" and not args.inventory:
+        parser.error("run needs an inventory")
+
+    return {"run": run, "simulate": simulate, "selftest": selftest}[args.command_name](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Resolves one provider version set for every execgroup in this repo.
+#
+# Constraints come from each execgroup's lock file and from the
+# required_providers blocks in its .tf files.  For every provider the
+# resolver picks as few versions as possible out of the versions already
+# pinned somewhere in the repo (so their hashes are known and no
+# registry access is needed to rewrite a lock).  When the constraints
+# cannot be met by one version (e.g. aws ~> 5.0 vs ~> 6.0) the providers
+# are split into the smallest number of version groups.  Versions are
+# never moved below what an execgroup already pins unless
+# --allow-downgrade is given: state written by a newer provider may not
+# load with an older one.
+#
+# check   - report the resolved set and exit 1 if any lock differs from
+#           it or is stale against its required_providers
+# write   - rewrite the lock files to the resolved set
+# report  - provider download bytes per fleet run (one run of every
+#           execgroup sharing a plugin cache), before vs after
+#
+#   python tools/lock_resolver.py check
+#   python tools/lock_resolver.py write
+#   python tools/lock_resolver.py report --mirror /opt/tf/mirror
+#   python tools/lock_resolver.py report --registry
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import urllib.request
+
+from provider_mirror import LOCK_FILE
+from provider_mirror import get_execgroup_dirs
+from provider_mirror import parse_lock_file
+
+DEFAULT_HOST = "registry.opentofu.org"
+REGISTRY_URL = "https://registry.opentofu.org/v1/providers"
+
+_CONSTRAINT_RE = re.compile(r'^\s*(~>|>=|<=|!=|>|<|=)?\s*v?([0-9][0-9A-Za-z.\-+]*)\s*$')
+_REQUIRED_PROVIDERS_RE = re.compile(r'required_providers\s*\{')
+_ENTRY_RE = re.compile(r'(\w[\w-]*)\s*=\s*\{([^{}]*)\}', re.S)
+_SOURCE_RE = re.compile(r'source\s*=\s*"([^"]+)"')
+_VERSION_RE = re.compile(r'version\s*=\s*"([^"]+)"')
+
+
+def parse_version(version):
+    """'5.100.0' -> (5, 100, 0); pre-release suffixes sort below the release."""
+    core = re.split(r"[-+]", version, maxsplit=1)[0]
+    parts = tuple(int(part) for part in core.split("."))
+    return parts + (0,) * (3 - len(parts))
+
+
+def parse_constraints(constraints):
+    """'>= 5.0, ~> 5.3' -> [(op, version tuple, number of components)]"""
+    parsed = []
+    if not constraints:
+        return parsed
+
+    for constraint in constraints.split(","):
+        if not constraint.strip():
+            continue
+        match = _CONSTRAINT_RE.match(constraint)
+        if not match:
+            raise ValueError(f"unsupported version constraint '{constraint}'")
+        op, version = match.groups()
+        core = re.split(r"[-+]", version, maxsplit=1)[0]
+        parsed.append((op or "=", parse_version(version), len(core.split("."))))
+
+    return parsed
+
+
+def _pessimistic_upper(version, components):
+    # ~> 5.0 -> < 6.0.0, ~> 1.2.3 -> < 1.3.0, ~> 2 -> < 3.0.0
+    if components == 1:
+        return (version[0] + 1, 0, 0)
+    upper = list(version[:components - 1])
+    upper[-1] += 1
+    return tuple(upper) + (0,) * (3 - len(upper))
+
+
+def satisfies(version, constraints):
+    """True if version (str) meets every parsed constraint."""
+    version = parse_version(version)
+
+    for op, bound, components in constraints:
+        if op == "=" and version != bound:
+            return False
+        if op == "!=" and version == bound:
+            return False
+        if op == ">" and not version > bound:
+            return False
+        if op == ">=" and not version >= bound:
+            return False
+        if op == "<" and not version < bound:
+            return False
+        if op == "<=" and not version <= bound:
+            return False
+        if op == "~>" and not bound <= version < _pessimistic_upper(bound, components):
+            return False
+
+    return True
+
+
+def _address(source):
+    # hashicorp/aws -> registry.opentofu.org/hashicorp/aws
+    if source.count("/") == 1:
+        return f"{DEFAULT_HOST}/{source}"
+    return source
+
+
+def _strip_comments(contents):
+    return re.sub(r'(?m)^\s*(#|//).*$', "", contents)
+
+
+def parse_required_providers(path):
+    """Return {provider address: constraint string} from every .tf file in path."""
+    required = {}
+
+    for tf_file in sorted(glob.glob(os.path.join(path, "*.tf"))):
+        with open(tf_file) as f:
+            contents = _strip_comments(f.read())
+
+        for match in _REQUIRED_PROVIDERS_RE.finditer(contents):
+            # walk braces to the end of the block
+            depth, end = 1, match.end()
+            while depth and end < len(contents):
+                depth += {"{": 1, "}": -1}.get(contents[end], 0)
+                end += 1
+
+            for name, body in _ENTRY_RE.findall(contents[match.end():end - 1]):
+                source = _SOURCE_RE.search(body)
+                version = _VERSION_RE.search(body)
+                address = _address(source.group(1) if source else f"hashicorp/{name}")
+                if version:
+                    required[address] = version.group(1)
+                else:
+                    required.setdefault(address, None)
+
+    return required
+
+
+def get_inventory():
+    """Return {execgroup: {address: {"version", "constraints", "required", "hashes"}}}"""
+    inventory = {}
+
+    for name, path in get_execgroup_dirs().items():
+        lock_file = os.path.join(path, LOCK_FILE)
+        if not os.path.exists(lock_file):
+            continue
+
+        locked = parse_lock_file(lock_file)
+        required = parse_required_providers(path)
+
+        providers = {}
+        for address, entry in locked.items():
+            providers[address] = dict(entry, required=required.get(address))
+        inventory[name] = providers
+
+    return inventory
+
+
+def _get_constraints(entry, allow_downgrade):
+    constraints = parse_constraints(entry["constraints"])
+    constraints.extend(parse_constraints(entry["required"]))
+    if not allow_downgrade and entry["version"]:
+        constraints.append((">=", parse_version(entry["version"]), 3))
+    return constraints
+
+
+def resolve(inventory, allow_downgrade=False):
+    """Return {address: {execgroup: version}} using the fewest versions per provider.
+
+    Greedy set cover over the versions already pinned in the repo: take the
+    version that satisfies the most remaining execgroups (ties go to the
+    version fewer execgroups have to move to, then the newest), repeat.
+    Execgroups nothing satisfies keep their current pin.
+    """
+    by_provider = {}
+    for name, providers in inventory.items():
+        for address, entry in providers.items():
+            by_provider.setdefault(address, {})[name] = entry
+
+    resolved = {}
+    for address, entries in sorted(by_provider.items()):
+        candidates = sorted({entry["version"] for entry in entries.values()},
+                            key=parse_version, reverse=True)
+        constraints = {name: _get_constraints(entry, allow_downgrade)
+                       for name, entry in entries.items()}
+
+        remaining = set(entries)
+        assignment = {}
+
+        while remaining:
+            best = None
+            for version in candidates:
+                covered = {name for name in remaining
+                           if satisfies(version, constraints[name])}
+                unchanged = sum(1 for name in covered
+                                if entries[name]["version"] == version)
+                score = (len(covered), unchanged, parse_version(version))
+                if covered and (best is None or score > best[0]):
+                    best = (score, version, covered)
+
+            if best is None:
+                for name in remaining:
+                    assignment[name] = entries[name]["version"]
+                break
+
+            _, version, covered = best
+            for name in covered:
+                assignment[name] = version
+            remaining -= covered
+
+        resolved[address] = assignment
+
+    return resolved
+
+
+def get_hashes(inventory):
+    """Return {(address, version): sorted hashes} merged across all lock files."""
+    hashes = {}
+    for providers in inventory.values():
+        for address, entry in providers.items():
+            hashes.setdefault((address, entry["version"]), set()).update(entry["hashes"])
+
+    # tofu writes h1: before zh:, each sorted
+    return {key: sorted(values, key=lambda h: (not h.startswith("h1:"), h))
+            for key, values in hashes.items()}
+
+
+def get_changes(inventory, resolved):
+    """Return [(execgroup, address, locked version, resolved version)] that differ."""
+    changes = []
+    for address, assignment in resolved.items():
+        for name, version in sorted(assignment.items()):
+            locked = inventory[name][address]["version"]
+            if locked != version:
+                changes.append((name, address, locked, version))
+    return changes
+
+
+def _normalize(constraints):
+    # tofu records ">= 5.0" as ">= 5.0.0"; only ~> depends on the component count
+    return [(op, version, components if op == "~>" else 3)
+            for op, version, components in parse_constraints(constraints)]
+
+
+def get_stale(inventory):
+    """Return [(execgroup, address, lock constraints, required_providers)] out of sync."""
+    stale = []
+    for name, providers in sorted(inventory.items()):
+        for address, entry in sorted(providers.items()):
+            required = entry["required"]
+            if not required:
+                continue
+            if not set(_normalize(required)) <= set(_normalize(entry["constraints"])):
+                stale.append((name, address, entry["constraints"], required))
+    return stale
+
+
+def rewrite_lock_file(path, versions, hashes):
+    """Rewrite version and hashes of every provider in versions {address: version}."""
+    with open(path) as f:
+        contents = f.read()
+
+    def _replace(match):
+        address, body = match.group(1), match.group(2)
+        if address not in versions:
+            return match.group(0)
+        version = versions[address]
+        body = re.sub(r'(?m)^(\s*version\s*=\s*)"[^"]*"', rf'\g<1>"{version}"', body, count=1)
+        lines = "".join(f'    "{h}",\n' for h in hashes[(address, version)])
+        body = re.sub(r'hashes\s*=\s*\[.*?\]', lambda _: f"hashes = [\n{lines}  ]", body,
+                      count=1, flags=re.S)
+        return f'provider "{address}" {{\n{body}}}'
+
+    contents = re.sub(r'^provider "([^"]+)" \{\n(.*?)^\}', _replace, contents, flags=re.M | re.S)
+
+    with open(path, "w") as f:
+        f.write(contents)
+
+
+def _package_name(address, version, platform):
+    return f"terraform-provider-{address.split('/')[-1]}_{version}_{platform}.zip"
+
+
+def get_size_from_mirror(mirror_dir, address, version, platform):
+    # packed layout written by tofu providers mirror
+    path = os.path.join(mirror_dir, *address.split("/"), _package_name(address, version, platform))
+    if os.path.exists(path):
+        return os.path.getsize(path)
+    return None
+
+
+def get_size_from_registry(address, version, platform, timeout=30):
+    namespace, provider_type = address.split("/")[-2:]
+    os_name, arch = platform.split("_", 1)
+    url = f"{REGISTRY_URL}/{namespace}/{provider_type}/{version}/download/{os_name}/{arch}"
+
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        download_url = json.load(response)["download_url"]
+
+    request = urllib.request.Request(download_url, method="HEAD")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        length = response.headers.get("Content-Length")
+
+    return int(length) if length else None
+
+
+def _print_resolved(inventory, resolved):
+    for address, assignment in resolved.items():
+        groups = {}
+        for name, version in assignment.items():
+            groups.setdefault(version, []).append(name)
+        pinned = sorted({inventory[name][address]["version"] for name in assignment},
+                        key=parse_version)
+        print(f"{address}  ({len(pinned)} -> {len(groups)} versions)")
+        for version in sorted(groups, key=parse_version, reverse=True):
+            print(f"  {version:<10} {', '.join(sorted(groups[version]))}")
+
+
+def check(args):
+    inventory = get_inventory()
+    resolved = resolve(inventory, allow_downgrade=args.allow_downgrade)
+    changes = get_changes(inventory, resolved)
+    stale = get_stale(inventory)
+
+    if args.json:
+        print(json.dumps({"resolved": resolved,
+                          "changes": [dict(zip(["execgroup", "provider", "locked", "resolved"], c))
+                                      for c in changes],
+                          "stale": [dict(zip(["execgroup", "provider", "lock", "required"], s))
+                                    for s in stale]}, indent=2))
+    else:
+        _print_resolved(inventory, resolved)
+        for name, address, locked, version in changes:
+            print(f"change: {name} {address} {locked} -> {version}")
+        for name, address, locked, required in stale:
+            print(f"stale: {name} {address} lock has '{locked}', required_providers has '{required}'")
+
+    return 1 if changes or stale else 0
+
+
+def write(args):
+    inventory = get_inventory()
+    resolved = resolve(inventory, allow_downgrade=args.allow_downgrade)
+    hashes = get_hashes(inventory)
+
+    per_execgroup = {}
+    for name, address, _, version in get_changes(inventory, resolved):
+        per_execgroup.setdefault(name, {})[address] = version
+
+    dirs = get_execgroup_dirs()
+    for name, versions in sorted(per_execgroup.items()):
+        rewrite_lock_file(os.path.join(dirs[name], LOCK_FILE), versions, hashes)
+        for address, version in sorted(versions.items()):
+            print(f"{name}: {address} -> {version}")
+
+    for name, address, locked, required in get_stale(inventory):
+        print(f"stale: {name} {address} lock has '{locked}', required_providers has "
+              f"'{required}' (run tofu init -upgrade=false to refresh constraints)")
+
+    if not per_execgroup:
+        print("lock files already match the resolved set")
+
+    return 0
+
+
+def report(args):
+    inventory = get_inventory()
+    resolved = resolve(inventory, allow_downgrade=args.allow_downgrade)
+
+    before = {(address, entry["version"])
+              for providers in inventory.values()
+              for address, entry in providers.items()}
+    after = {(address, version)
+             for address, assignment in resolved.items()
+             for version in assignment.values()}
+
+    sizes = {}
+    for address, version in sorted(before | after):
+        if args.mirror:
+            sizes[(address, version)] = get_size_from_mirror(args.mirror, address, version,
+                                                             args.platform)
+        elif args.registry:
+            sizes[(address, version)] = get_size_from_registry(address, version, args.platform)
+        else:
+            sizes[(address, version)] = None
+
+    unknown = sorted(key for key, size in sizes.items() if size is None)
+
+    def _total(packages):
+        return sum(sizes[key] or 0 for key in packages)
+
+    result = {"platform": args.platform,
+              "packages_before": len(before),
+              "packages_after": len(after),
+              "bytes_before": _total(before),
+              "bytes_after": _total(after),
+              "bytes_saved": _total(before) - _total(after),
+              "unknown_sizes": [f"{address} {version}" for address, version in unknown]}
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    mb = 1024 * 1024
+    print(f"provider downloads per fleet run ({args.platform}, shared plugin cache)")
+    print(f"  before: {result['packages_before']:>3} packages {result['bytes_before'] / mb:>9.1f} MiB")
+    print(f"  after:  {result['packages_after']:>3} packages {result['bytes_after'] / mb:>9.1f} MiB")
+    print(f"  saved:  {result['packages_before'] - result['packages_after']:>3} packages "
+          f"{result['bytes_saved'] / mb:>9.1f} MiB")
+    if unknown:
+        print(f"  size unknown for {len(unknown)} package(s); pass --mirror or --registry")
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="resolve one provider version set for all execgroups")
+    parser.add_argument("--allow-downgrade", action="store_true",
+                        help="allow resolving below an execgroup's current pin")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = subparsers.add_parser("check", help="validate lock files against the resolved set")
+    check_parser.add_argument("--json", action="store_true", help="emit json")
+
+    subparsers.add_parser("write", help="rewrite lock files to the resolved set")
+
+    report_parser = subparsers.add_parser("report", help="download bytes saved per fleet run")
+    report_parser.add_argument("--platform", default="linux_amd64")
+    report_parser.add_argument("--mirror", help="mirror dir from provider_mirror.py build")
+    report_parser.add_argument("--registry", action="store_true",
+                               help="look package sizes up on the registry")
+    report_parser.add_argument("--json", action="store_true", help="emit json")
+
+    args = parser.parse_args(argv)
+
+    return {"check": check, "write": write, "report": report}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
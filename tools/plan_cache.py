@@ -0,0 +1,126 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Keeps the EXECGROUP_HASH constant in each stack's run.py in sync with
+# the execgroup it runs.
+#
+# The stacks fingerprint a plan as (execgroup hash, tfvars, tf_exec_env,
+# tf_runtime, TFConstructor payload) and skip tf_executor.insert when
+# the fingerprint matches the one stored with the resource by the last
+# successful apply.  The stacks cannot read the execgroup files at run
+# time, so the hash over those files (lock file included) is stamped
+# into the stack source.
+#
+# stamp  - rewrite EXECGROUP_HASH in every stack that has one
+# check  - exit 1 if any stamped hash is stale
+#
+#   python tools/plan_cache.py stamp
+#   python tools/plan_cache.py check
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACKS_DIR = os.path.join(REPO_DIR, "stacks", "_config0_configs")
+EXECGROUPS_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs")
+
+SKIP_DIRS = ["__pycache__", ".terraform"]
+
+_EXECGROUP_RE = re.compile(r'add_execgroup\(\s*"[^"]*::([^":]+)",\s*"tf_execgroup"\)')
+_HASH_RE = re.compile(r'^EXECGROUP_HASH = "[^"]*"$', re.M)
+
+
+def get_execgroup_hash(name):
+    """sha256 over (relative path, sha256 of contents) of every execgroup file."""
+    root = os.path.join(EXECGROUPS_DIR, name)
+    if not os.path.isdir(root):
+        raise ValueError(f"execgroup {name} not found in {EXECGROUPS_DIR}")
+
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                contents = hashlib.sha256(f.read()).hexdigest()
+            digest.update(f"{os.path.relpath(path, root)}\0{contents}\n".encode())
+
+    return digest.hexdigest()
+
+
+def get_stamped_stacks():
+    """Return [(run.py path, execgroup name, stamped hash)]."""
+    stacks = []
+    for path in sorted(glob.glob(os.path.join(STACKS_DIR, "*", "_files", "run.py"))):
+        with open(path) as f:
+            contents = f.read()
+
+        stamped = _HASH_RE.search(contents)
+        execgroup = _EXECGROUP_RE.search(contents)
+        if not stamped or not execgroup:
+            continue
+
+        stacks.append((path, execgroup.group(1), stamped.group(0).split('"')[1]))
+
+    return stacks
+
+
+def stamp(args):
+    for path, execgroup, stamped in get_stamped_stacks():
+        current = get_execgroup_hash(execgroup)
+        if current == stamped:
+            continue
+
+        with open(path) as f:
+            contents = f.read()
+
+        with open(path, "w") as f:
+            f.write(_HASH_RE.sub(f'EXECGROUP_HASH = "{current}"', contents, count=1))
+
+        print(f"{os.path.relpath(path, REPO_DIR)}: {execgroup} {current[:12]}")
+
+    return 0
+
+
+def check(args):
+    stale = 0
+    for path, execgroup, stamped in get_stamped_stacks():
+        current = get_execgroup_hash(execgroup)
+        ok = current == stamped
+        stale += not ok
+        print(f"{'ok   ' if ok else 'stale'} {os.path.relpath(path, REPO_DIR)} ({execgroup})")
+
+    return 1 if stale else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="stamp execgroup hashes for the plan cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stamp", help="rewrite EXECGROUP_HASH in the stacks")
+    subparsers.add_parser("check", help="exit 1 if a stamped hash is stale")
+
+    args = parser.parse_args(argv)
+
+    return {"stamp": stamp, "check": check}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Shared provider mirror for every execgroup in this repo.
+#
+# build  - mirrors the union of all provider versions pinned in the
+#          execgroups' .terraform.lock.hcl files into one filesystem
+#          mirror (tofu providers mirror) and writes a CLI config that
+#          points provider_installation and plugin_cache_dir at it.
+#          Mirrored packages are verified by tofu against the h1/zh
+#          hashes in the lock files, so the mirror is content addressed
+#          by those hashes.
+# bench  - runs tofu init for every execgroup twice against the mirror:
+#          cold (empty plugin cache) and warm (populated cache) and
+#          reports the timings.  Needs no network once the mirror exists.
+#
+# The stacks hand the CLI config to the executor through their
+# tf_cli_config_file argument (exported as TF_CLI_CONFIG_FILE).
+#
+#   python tools/provider_mirror.py build --mirror /opt/tf/mirror --cache /opt/tf/plugin-cache
+#   python tools/provider_mirror.py bench --config /opt/tf/mirror/tofurc
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECGROUPS_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs")
+TERRAFORM_SUBDIR = os.path.join("_chrootfiles", "var", "tmp", "terraform")
+LOCK_FILE = ".terraform.lock.hcl"
+
+_PROVIDER_RE = re.compile(r'^provider "([^"]+)" \{\n(.*?)^\}', re.M | re.S)
+_ATTR_RE = re.compile(r'^\s*(version|constraints)\s*=\s*"([^"]*)"', re.M)
+_HASHES_RE = re.compile(r'hashes\s*=\s*\[(.*?)\]', re.S)
+
+
+def get_execgroup_dirs():
+    """Return {execgroup name: terraform dir} for every execgroup."""
+    dirs = {}
+    for path in sorted(glob.glob(os.path.join(EXECGROUPS_DIR, "*", TERRAFORM_SUBDIR))):
+        name = os.path.relpath(path, EXECGROUPS_DIR).split(os.sep)[0]
+        dirs[name] = path
+    return dirs
+
+
+def parse_lock_file(path):
+    """Return {provider address: {"version", "constraints", "hashes"}}."""
+    with open(path) as f:
+        contents = f.read()
+
+    providers = {}
+    for match in _PROVIDER_RE.finditer(contents):
+        address, body = match.groups()
+        attrs = dict(_ATTR_RE.findall(body))
+        hashes = _HASHES_RE.search(body)
+        providers[address] = {
+            "version": attrs.get("version"),
+            "constraints": attrs.get("constraints"),
+            "hashes": re.findall(r'"([^"]+)"', hashes.group(1)) if hashes else []
+        }
+
+    return providers
+
+
+def get_locks():
+    """Return {execgroup name: parsed lock file} for execgroups that ship one."""
+    locks = {}
+    for name, path in get_execgroup_dirs().items():
+        lock_file = os.path.join(path, LOCK_FILE)
+        if os.path.exists(lock_file):
+            locks[name] = parse_lock_file(lock_file)
+    return locks
+
+
+def get_provider_union(locks):
+    """Return sorted [(address, version)] pinned across all lock files."""
+    union = set()
+    for providers in locks.values():
+        for address, entry in providers.items():
+            union.add((address, entry["version"]))
+    return sorted(union)
+
+
+def _source(address):
+    # registry.opentofu.org/hashicorp/aws -> hashicorp/aws
+    return "/".join(address.split("/")[-2:])
+
+
+def _run(cmd, cwd=None, env=None):
+    result = subprocess.run(cmd, cwd=cwd, env=env,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed in {cwd}:\n{result.stdout}")
+    return result.stdout
+
+
+def mirror_provider(tofu, address, version, mirror_dir, platforms):
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "main.tf"), "w") as f:
+            f.write("terraform {\n"
+                    "  required_providers {\n"
+                    f'    {address.split("/")[-1]} = {{ source = "{_source(address)}", version = "= {version}" }}\n'
+                    "  }\n"
+                    "}\n")
+
+        cmd = [tofu, "providers", "mirror"]
+        cmd.extend([f"-platform={platform}" for platform in platforms])
+        cmd.append(mirror_dir)
+        _run(cmd, cwd=workdir)
+
+
+def write_cli_config(path, mirror_dir, cache_dir, addresses, offline=False):
+    includes = json.dumps(sorted(addresses))
+
+    lines = [f'plugin_cache_dir = "{cache_dir}"',
+             "",
+             "provider_installation {",
+             "  filesystem_mirror {",
+             f'    path    = "{mirror_dir}"',
+             f"    include = {includes}",
+             "  }"]
+
+    if not offline:
+        lines.extend(["  direct {",
+                      f"    exclude = {includes}",
+                      "  }"])
+
+    lines.append("}")
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def build(args):
+    locks = get_locks()
+    union = get_provider_union(locks)
+
+    os.makedirs(args.mirror, exist_ok=True)
+    os.makedirs(args.cache, exist_ok=True)
+
+    for address, version in union:
+        print(f"mirroring {address} {version}")
+        mirror_provider(args.tofu, address, version, args.mirror, args.platform)
+
+    config = args.config or os.path.join(args.mirror, "tofurc")
+    write_cli_config(config, os.path.abspath(args.mirror),
+                     os.path.abspath(args.cache),
+                     {address for address, _ in union},
+                     offline=args.offline)
+
+    pins = sum(len(providers) for providers in locks.values())
+    print(f"{len(union)} provider packages mirrored for {pins} pins across {len(locks)} execgroups")
+    print(f"cli config: {config}")
+
+    return 0
+
+
+def _timed_init(tofu, workdir, env):
+    start = time.monotonic()
+    _run([tofu, "init", "-backend=false", "-get=false", "-input=false", "-no-color"],
+         cwd=workdir, env=env)
+    return time.monotonic() - start
+
+
+def bench(args):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, "plugin-cache")
+        os.makedirs(cache_dir)
+
+        env = dict(os.environ)
+        env["TF_CLI_CONFIG_FILE"] = os.path.abspath(args.config)
+        # a fresh cache dir overrides the one in the cli config
+        env["TF_PLUGIN_CACHE_DIR"] = cache_dir
+
+        for name, path in get_execgroup_dirs().items():
+            if args.execgroup and name not in args.execgroup:
+                continue
+
+            timings = {}
+            try:
+                for phase in ["cold", "warm"]:
+                    if phase == "cold":
+                        shutil.rmtree(cache_dir)
+                        os.makedirs(cache_dir)
+                    # bundle markers (####FILE####:::) are comments to
+                    # tofu, so _combined.tf loads as is
+                    workdir = os.path.join(tmpdir, f"{name}-{phase}")
+                    shutil.copytree(path, workdir)
+                    timings[phase] = _timed_init(args.tofu, workdir, env)
+            except RuntimeError as error:
+                timings["error"] = str(error).splitlines()[0]
+
+            results[name] = timings
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'execgroup':<24} {'cold':>8} {'warm':>8}")
+    for name, timings in results.items():
+        if "error" in timings:
+            print(f"{name:<24} {timings['error']}")
+            continue
+        print(f"{name:<24} {timings['cold']:>7.1f}s {timings['warm']:>7.1f}s")
+
+    cold = sum(t.get("cold", 0) for t in results.values())
+    warm = sum(t.get("warm", 0) for t in results.values())
+    print(f"{'total':<24} {cold:>7.1f}s {warm:>7.1f}s")
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="shared terraform provider mirror")
+    parser.add_argument("--tofu", default="tofu", help="tofu/terraform binary")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="mirror all locked providers")
+    build_parser.add_argument("--mirror", required=True, help="filesystem mirror dir")
+    build_parser.add_argument("--cache", required=True, help="plugin cache dir")
+    build_parser.add_argument("--config", help="cli config to write (default <mirror>/tofurc)")
+    build_parser.add_argument("--platform", action="append", default=None,
+                              help="target platform, may be repeated (default linux_amd64)")
+    build_parser.add_argument("--offline", action="store_true",
+                              help="no direct registry fallback in the cli config")
+
+    bench_parser = subparsers.add_parser("bench", help="time tofu init cold vs warm")
+    bench_parser.add_argument("--config", required=True, help="cli config written by build")
+    bench_parser.add_argument("--execgroup", action="append", help="limit to execgroup(s)")
+    bench_parser.add_argument("--json", action="store_true", help="emit json")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        args.platform = args.platform or ["linux_amd64"]
+        return build(args)
+
+    return bench(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
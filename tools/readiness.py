@@ -0,0 +1,281 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Exercises the readiness probes of aws_eks (_Readiness in its run.py)
+# against a fake status source on a simulated clock.
+#
+# The karpenter job polls the system node group until it is ACTIVE with
+# exponential backoff and jitter before inserting anything, so the
+# schedules only keep a short timewait.  chain
+# compares the dead time along a chain of jobs - from the moment a
+# job's upstream condition really holds to the moment the job goes
+# ahead - between a fixed timewait and the probes.
+#
+# chain     - dead time along a chain, fixed timewait vs probes
+# selftest  - checks of _Readiness on the fake status source
+#
+#   python tools/readiness.py chain
+#   python tools/readiness.py chain --jobs 5 --lag 20 --lag 90 --fixed-wait 120
+#   python tools/readiness.py selftest
+
+import argparse
+import contextlib
+import random
+import sys
+import types
+
+import fake_runtime
+
+DEFAULT_STACK = "aws_eks"
+
+
+class SimClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+
+class FakeStatus:
+    """
+    Status source whose conditions become ready at fixed times on a
+    SimClock; (kind, name) not in ready_at never become ready.
+    """
+
+    def __init__(self, clock, ready_at, pending="CREATING"):
+        self.clock = clock
+        self.ready_at = dict(ready_at)
+        self.pending = pending
+        self.polls = []
+
+    def __call__(self, kind, name):
+        self.polls.append((self.clock.time(), kind, name))
+        ready_at = self.ready_at.get((kind, name))
+        if ready_at is not None and self.clock.time() >= ready_at:
+            return True, "ACTIVE"
+        return False, self.pending
+
+
+class FakeEks:
+    """The two calls of the eks client the node group probe makes."""
+
+    def __init__(self, nodegroups):
+        self.nodegroups = nodegroups
+
+    def get_paginator(self, operation):
+        return types.SimpleNamespace(
+            paginate=lambda clusterName: [{"nodegroups": sorted(self.nodegroups)}])
+
+    def describe_nodegroup(self, clusterName, nodegroupName):
+        return {"nodegroup": {"status": self.nodegroups[nodegroupName]}}
+
+
+@contextlib.contextmanager
+def fake_boto3(nodegroups):
+    """boto3/botocore returning a FakeEks, only while the source is built."""
+    names = ["boto3", "botocore", "botocore.exceptions"]
+    saved = {name: sys.modules.get(name) for name in names}
+
+    boto3 = types.ModuleType("boto3")
+    boto3.client = lambda service, region_name=None: FakeEks(nodegroups)
+    exceptions = types.ModuleType("botocore.exceptions")
+    exceptions.BotoCoreError = exceptions.ClientError = type("FakeError", (Exception,), {})
+    botocore = types.ModuleType("botocore")
+    botocore.exceptions = exceptions
+    sys.modules.update({"boto3": boto3, "botocore": botocore, "botocore.exceptions": exceptions})
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def get_nodegroup_status(module, nodegroups, name="demo/demo-nodegroup-main"):
+    with fake_boto3(nodegroups):
+        source = module["_get_aws_status_source"]("us-west-2")
+    return source("nodegroup", name)
+
+
+def load_readiness(stack=DEFAULT_STACK):
+    """The _Readiness class and module globals of a stack's run.py."""
+    module = fake_runtime.Runtime().load(stack)
+    return module["_Readiness"], module
+
+
+def new_readiness(cls, source, clock, seed=0, **kwargs):
+    return cls(source, sleep=clock.sleep, clock=clock.time,
+               rng=random.Random(seed), **kwargs)
+
+
+def get_chain_dead_time(cls, lags, timewait, fixed_wait, seed=0):
+    """
+    lags: seconds after each job ends until what the next job needs is
+    ready.  Returns [(fixed dead, probe dead)] per edge of the chain.
+    """
+    edges = []
+    for index, lag in enumerate(lags):
+        clock = SimClock()
+        source = FakeStatus(clock, {("nodegroup", "chain/ng"): lag})
+
+        # the schedule's timewait, then the job probes
+        clock.sleep(timewait)
+        readiness = new_readiness(cls, source, clock, seed=seed + index)
+        readiness.wait("nodegroup", "chain/ng")
+
+        # a fixed wait shorter than the lag has the next job fail and retry
+        fixed = fixed_wait if fixed_wait >= lag else fixed_wait * -(-lag // fixed_wait)
+        edges.append((fixed - lag, clock.time() - lag))
+
+    return edges
+
+
+def chain(args):
+    cls, module = load_readiness(args.stack)
+    lags = args.lag or [0]
+    lags = [lags[index % len(lags)] for index in range(args.jobs - 1)]
+
+    edges = get_chain_dead_time(cls, lags, args.timewait, args.fixed_wait, args.seed)
+
+    print(f"{'edge':<6} {'lag':>6} {'fixed':>8} {'probe':>8}")
+    for index, (lag, (fixed, probe)) in enumerate(zip(lags, edges)):
+        print(f"{index + 1:<6} {lag:>6} {fixed:>7.0f}s {probe:>7.0f}s")
+
+    total_fixed = sum(fixed for fixed, _ in edges)
+    total_probe = sum(probe for _, probe in edges)
+    print(f"dead time over {args.jobs} jobs: {total_fixed:.0f}s fixed timewait, "
+          f"{total_probe:.0f}s with probes ({total_fixed - total_probe:.0f}s saved)")
+
+    return 0
+
+
+def _check(results, ok, name):
+    results.append((ok, name))
+    print(f"{'ok' if ok else 'FAIL':<4} {name}")
+
+
+def selftest(args):
+    results = []
+    cls, module = load_readiness(args.stack)
+
+    clock = SimClock()
+    source = FakeStatus(clock, {("nodegroup", "demo/ng"): 0})
+    waited = new_readiness(cls, source, clock).wait("nodegroup", "demo/ng")
+    _check(results, waited == 0 and len(source.polls) == 1,
+           "a ready condition is released on the first poll")
+
+    clock = SimClock()
+    source = FakeStatus(clock, {("nodegroup", "demo/ng"): 100})
+    readiness = new_readiness(cls, source, clock, base=5, cap=60)
+    waited = readiness.wait("nodegroup", "demo/ng")
+    _check(results, 100 <= waited <= 100 + 60,
+           "released within one backoff of the condition holding")
+
+    gaps = [later[0] - earlier[0] for earlier, later in zip(source.polls, source.polls[1:])]
+    bounded = all(min(60, 5 * 2 ** attempt) / 2 <= gap <= min(60, 5 * 2 ** attempt)
+                  for attempt, gap in enumerate(gaps))
+    _check(results, bounded and len(gaps) >= 3,
+           "poll gaps grow exponentially with jitter in [d/2, d]")
+
+    clock = SimClock()
+    readiness = new_readiness(cls, FakeStatus(clock, {}), clock, base=5, cap=60)
+    delays = [readiness.delay(attempt) for attempt in range(12)]
+    _check(results, max(delays) <= 60 and min(delays[6:]) >= 30,
+           "backoff is capped")
+
+    clock = SimClock()
+    source = FakeStatus(clock, {}, pending="DEGRADED")
+    try:
+        new_readiness(cls, source, clock, timeout=300).wait("nodegroup", "demo/ng")
+        message = ""
+    except Exception as error:
+        message = str(error)
+    _check(results, "not ready after 300s" in message and "DEGRADED" in message
+           and clock.time() == 300,
+           "a condition that never holds fails at the timeout with its status")
+
+    rngs = [random.Random(7), random.Random(7)]
+    jitter = [[cls(None, rng=rng).delay(attempt) for attempt in range(6)] for rng in rngs]
+    _check(results, jitter[0] == jitter[1] and len(set(jitter[0])) == 6,
+           "jitter comes from the rng it is given")
+
+    # a blue_green pool is named <name>-<26 char suffix>
+    suffix = "202610181200000000" + "0000000a"
+    statuses = [
+        get_nodegroup_status(module, {"demo-nodegroup-main": "ACTIVE"}),
+        get_nodegroup_status(module, {f"demo-nodegroup-main-{suffix}": "ACTIVE",
+                                      "demo-nodegroup-main-spot": "CREATING"}),
+        get_nodegroup_status(module, {"demo-nodegroup-main": "DELETING",
+                                      f"demo-nodegroup-main-{suffix}": "ACTIVE"}),
+        get_nodegroup_status(module, {"demo-nodegroup-spot": "ACTIVE"})
+    ]
+    _check(results, [ready for ready, _ in statuses] == [True, True, False, False]
+           and statuses[2][1] == "DELETING",
+           "the node group probe matches blue_green names and waits on every pool of the name")
+
+    edges = get_chain_dead_time(cls, [30, 5, 90, 45], timewait=10, fixed_wait=120)
+    fixed = sum(edge[0] for edge in edges)
+    probe = sum(edge[1] for edge in edges)
+    _check(results, probe < fixed / 2, "dead time over a five job chain drops")
+
+    fixture = fake_runtime.load_fixture()
+    for stack in ["aws_eks", "aws_eks2"]:
+        rendered = fake_runtime.Runtime(resources=fixture.get("resources")).render(
+            stack, fixture["stacks"][stack])
+        timewaits = {sched["job"]: sched["archive"]["timewait"] for sched in rendered["schedules"]}
+        _check(results, max(timewaits.values()) <= 10 and not fake_runtime.get_errors(rendered),
+               f"{stack} renders with short timewaits")
+
+    failed = [name for ok, name in results if not ok]
+    print(f"{len(results) - len(failed)}/{len(results)} passed")
+
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="readiness probes on a fake status source")
+    parser.add_argument("--stack", default=DEFAULT_STACK, choices=["aws_eks"],
+                        help="stack whose _Readiness is used")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chain_parser = subparsers.add_parser("chain", help="dead time along a chain of jobs")
+    chain_parser.add_argument("--jobs", type=int, default=5)
+    chain_parser.add_argument("--lag", type=int, action="append",
+                              help="seconds until a job's upstream condition holds, "
+                                   "repeat per edge (cycled)")
+    chain_parser.add_argument("--timewait", type=int, default=10,
+                              help="sched.archive.timewait before a job probes")
+    chain_parser.add_argument("--fixed-wait", type=int, default=120,
+                              help="the fixed timewait to compare against")
+    chain_parser.add_argument("--seed", type=int, default=0)
+
+    subparsers.add_parser("selftest", help="checks on the fake status source")
+
+    args = parser.parse_args(argv)
+
+    return {"chain": chain, "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
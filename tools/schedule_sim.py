@@ -0,0 +1,223 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Local simulation of a sched stack's job graph.
+#
+# Reads the DEPENDS_ON table (or the literal on_success lists) and the
+# per-job archive.timeout values
+# straight out of a stack's run.py (without executing it - run.py
+# needs the config0 runtime) and reports the critical path for a
+# given set of per-job durations.
+#
+#   python tools/schedule_sim.py stacks/_config0_configs/aws_eks2/_files/run.py
+#   python tools/schedule_sim.py <run.py> --duration eks_cluster=900 --duration argocd=300
+#   python tools/schedule_sim.py <run.py> --durations durations.json --json
+
+import argparse
+import ast
+import json
+import sys
+
+
+def _parse(path):
+    with open(path) as f:
+        return ast.parse(f.read(), filename=path)
+
+
+def _get_timeouts(tree):
+    timeouts = {}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "schedule":
+            current = None
+            for stmt in node.body:
+                if not isinstance(stmt, ast.Assign):
+                    continue
+                target = ast.unparse(stmt.targets[0])
+                if target == "sched.job":
+                    current = ast.literal_eval(stmt.value)
+                elif target == "sched.archive.timeout" and current:
+                    timeouts[current] = ast.literal_eval(stmt.value)
+
+    return timeouts
+
+
+def load_timeouts(path):
+    """Return {job: sched.archive.timeout} parsed from a stack run.py."""
+    return _get_timeouts(_parse(path))
+
+
+def _get_on_success_graph(tree):
+    """DEPENDS_ON equivalent of literal sched.on_success lists (aws_eks)."""
+    depends_on = {}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "schedule":
+            current = None
+            for stmt in node.body:
+                if not isinstance(stmt, ast.Assign):
+                    continue
+                target = ast.unparse(stmt.targets[0])
+                if target == "sched.job":
+                    current = ast.literal_eval(stmt.value)
+                    depends_on.setdefault(current, [])
+                elif target == "sched.on_success" and current:
+                    for downstream in ast.literal_eval(stmt.value):
+                        depends_on.setdefault(downstream, []).append(current)
+
+    return depends_on or None
+
+
+def load_graph(path):
+    """
+    Return (depends_on, timeouts) parsed from a stack run.py, from its
+    DEPENDS_ON table or else the literal on_success lists in schedule().
+    """
+    tree = _parse(path)
+    depends_on = None
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id == "DEPENDS_ON":
+                depends_on = ast.literal_eval(node.value)
+
+    if depends_on is None:
+        depends_on = _get_on_success_graph(tree)
+
+    if depends_on is None:
+        raise ValueError(f"no DEPENDS_ON table or on_success lists found in {path}")
+
+    return depends_on, _get_timeouts(tree)
+
+
+def load_constant(path, name, default=None):
+    """Literal value of a module level NAME = ... in a stack run.py."""
+    for node in _parse(path).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id == name:
+                return ast.literal_eval(node.value)
+    return default
+
+
+def topo_order(depends_on):
+    order = []
+    done = set()
+    visiting = set()
+
+    def visit(job):
+        if job in done:
+            return
+        if job in visiting:
+            raise ValueError(f"dependency cycle through {job}")
+        visiting.add(job)
+        for upstream in depends_on.get(job, []):
+            if upstream not in depends_on:
+                raise ValueError(f"{job} depends on unknown job {upstream}")
+            visit(upstream)
+        visiting.discard(job)
+        done.add(job)
+        order.append(job)
+
+    for job in depends_on:
+        visit(job)
+
+    return order
+
+
+def simulate(depends_on, durations):
+    """
+    Earliest start/finish per job assuming unlimited parallelism.
+    Returns (schedule, critical_path, makespan).
+    """
+    schedule = {}
+    for job in topo_order(depends_on):
+        start = max([schedule[up]["finish"] for up in depends_on[job]],
+                    default=0)
+        schedule[job] = {"start": start,
+                         "finish": start + durations[job]}
+
+    makespan = max([entry["finish"] for entry in schedule.values()],
+                   default=0)
+
+    # walk back from the job that finishes last
+    path = []
+    job = max(schedule, key=lambda name: schedule[name]["finish"], default=None)
+    while job:
+        path.append(job)
+        upstreams = depends_on[job]
+        job = max(upstreams,
+                  key=lambda name: schedule[name]["finish"],
+                  default=None)
+
+    return schedule, list(reversed(path)), makespan
+
+
+def _parse_durations(args, jobs, timeouts):
+    durations = dict(timeouts)
+
+    if args.durations:
+        with open(args.durations) as f:
+            durations.update(json.load(f))
+
+    for entry in args.duration or []:
+        job, _, value = entry.partition("=")
+        durations[job] = float(value)
+
+    missing = [job for job in jobs if job not in durations]
+    if missing:
+        raise ValueError(f"no duration for jobs: {', '.join(missing)}")
+
+    return durations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="simulate a sched stack job graph")
+    parser.add_argument("run_py", help="path to the stack's _files/run.py")
+    parser.add_argument("--durations", help="json file of job -> seconds")
+    parser.add_argument("--duration", action="append",
+                        help="job=seconds, may be repeated (default is archive.timeout)")
+    parser.add_argument("--json", action="store_true", help="emit json")
+    args = parser.parse_args(argv)
+
+    depends_on, timeouts = load_graph(args.run_py)
+    durations = _parse_durations(args, depends_on, timeouts)
+    schedule, path, makespan = simulate(depends_on, durations)
+    serial = sum(durations[job] for job in depends_on)
+
+    if args.json:
+        print(json.dumps({"schedule": schedule,
+                          "critical_path": path,
+                          "critical_path_time": makespan,
+                          "serial_time": serial}, indent=2))
+        return 0
+
+    for job in topo_order(depends_on):
+        entry = schedule[job]
+        print(f"{job:<24} start {entry['start']:>8.0f}s  finish {entry['finish']:>8.0f}s")
+
+    print()
+    print(f"critical path: {' -> '.join(path)}")
+    print(f"critical path time: {makespan:.0f}s")
+    print(f"serial chain time:  {serial:.0f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Reads the timing spans the stacks record with trace_spans set.
+#
+# Each span (name, trace_id, span_id, parent_span_id,
+# start/end_time_unix_nano, attributes, status) is in the "spans" list
+# of the stack results: one per sched job and one around each
+# substack's tf_executor insert, which carries the tofu run.  The
+# results can be saved as JSON files or show up as JSON lines in a job
+# log; both are searched.  The executor gets the insert's span as
+# TRACEPARENT but emits no spans of its own, so tofu init/plan/apply
+# are not broken out.
+#
+# summary   - duration percentiles per stack and span name
+# timeouts  - observed job durations vs a sched stack's
+#             sched.archive.timeout, with a suggested value
+# otlp      - convert to OTLP/JSON (POST to a collector's /v1/traces)
+#
+#   python tools/span_report.py summary logs/*.log
+#   python tools/span_report.py timeouts logs/*.log --stack stacks/_config0_configs/aws_eks2/_files/run.py
+#   python tools/span_report.py otlp logs/*.log -o traces.json
+
+import argparse
+import json
+import math
+import sys
+
+from schedule_sim import load_timeouts
+
+SPAN_KEYS = ["trace_id", "span_id", "start_time_unix_nano", "end_time_unix_nano"]
+
+
+def _find_spans(value, spans):
+    if isinstance(value, dict):
+        if all(value.get(key) for key in SPAN_KEYS):
+            spans.setdefault((value["trace_id"], value["span_id"]), value)
+            return
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            _find_spans(item, spans)
+
+
+def read_spans(paths):
+    """
+    Return spans found in the given results or logs ("-" reads stdin),
+    once per span_id.
+    """
+    spans = {}
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path)
+        try:
+            text = f.read()
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        try:
+            _find_spans(json.loads(text), spans)
+            continue
+        except ValueError:
+            pass
+        for line in text.splitlines():
+            start = line.find("{")
+            if start == -1:
+                continue
+            try:
+                _find_spans(json.loads(line[start:]), spans)
+            except ValueError:
+                continue
+    return list(spans.values())
+
+
+def duration(span):
+    return (span["end_time_unix_nano"] - span["start_time_unix_nano"]) / 1e9
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def get_job_durations(spans):
+    """
+    Return {job: [seconds]} - one entry per job span, covering the job
+    span and every span below it in the same trace (the substack's
+    tf_executor insert), in case those finish after the job span.
+    """
+    children = {}
+    for span in spans:
+        key = (span["trace_id"], span.get("parent_span_id"))
+        children.setdefault(key, []).append(span)
+
+    durations = {}
+    for span in spans:
+        job = span.get("attributes", {}).get("config0.job")
+        if not job or not span["name"].startswith("job "):
+            continue
+
+        start, end = span["start_time_unix_nano"], span["end_time_unix_nano"]
+        queue = [span]
+        while queue:
+            current = queue.pop()
+            start = min(start, current["start_time_unix_nano"])
+            end = max(end, current["end_time_unix_nano"])
+            queue.extend(children.get((current["trace_id"], current["span_id"]), []))
+
+        durations.setdefault(job, []).append((end - start) / 1e9)
+
+    return durations
+
+
+def summary(args):
+    groups = {}
+    for span in read_spans(args.logs):
+        stack = span.get("attributes", {}).get("config0.stack", "-")
+        groups.setdefault((stack, span["name"]), []).append(duration(span))
+
+    if args.json:
+        print(json.dumps([{"stack": stack, "name": name, "count": len(values),
+                           "p50": percentile(values, 0.5),
+                           "p95": percentile(values, 0.95),
+                           "max": max(values)}
+                          for (stack, name), values in sorted(groups.items())], indent=2))
+        return 0
+
+    print(f"{'stack':<20} {'span':<24} {'count':>5} {'p50':>9} {'p95':>9} {'max':>9}")
+    for (stack, name), values in sorted(groups.items()):
+        print(f"{stack:<20} {name:<24} {len(values):>5} "
+              f"{percentile(values, 0.5):>8.2f}s {percentile(values, 0.95):>8.2f}s "
+              f"{max(values):>8.2f}s")
+
+    return 0
+
+
+def timeouts(args):
+    current = load_timeouts(args.stack)
+    durations = get_job_durations(read_spans(args.logs))
+
+    rows = []
+    for job, timeout in current.items():
+        observed = durations.get(job, [])
+        row = {"job": job, "timeout": timeout, "runs": len(observed)}
+        if observed:
+            base = percentile(observed, args.quantile)
+            row.update(observed=base,
+                       max=max(observed),
+                       suggested=int(math.ceil(base * args.margin / args.round) * args.round))
+        rows.append(row)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    print(f"{'job':<16} {'runs':>5} {'p' + str(int(args.quantile * 100)):>9} "
+          f"{'max':>9} {'timeout':>8} {'suggested':>10}")
+    for row in rows:
+        if not row["runs"]:
+            print(f"{row['job']:<16} {0:>5} {'-':>9} {'-':>9} {row['timeout']:>8} {'-':>10}")
+            continue
+        print(f"{row['job']:<16} {row['runs']:>5} {row['observed']:>8.0f}s {row['max']:>8.0f}s "
+              f"{row['timeout']:>8} {row['suggested']:>10}")
+
+    return 0
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp(args):
+    scope_spans = []
+    for span in read_spans(args.logs):
+        status = span.get("status", {})
+        converted = {"traceId": span["trace_id"],
+                     "spanId": span["span_id"],
+                     "name": span["name"],
+                     "kind": 1,
+                     "startTimeUnixNano": str(span["start_time_unix_nano"]),
+                     "endTimeUnixNano": str(span["end_time_unix_nano"]),
+                     "attributes": [{"key": key, "value": _otlp_value(value)}
+                                    for key, value in sorted(span.get("attributes", {}).items())],
+                     # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                     "status": {"code": 2 if status.get("code") == "ERROR" else 1,
+                                "message": status.get("message", "")}}
+        if span.get("parent_span_id"):
+            converted["parentSpanId"] = span["parent_span_id"]
+        scope_spans.append(converted)
+
+    document = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name",
+                                     "value": {"stringValue": args.service_name}}]},
+        "scopeSpans": [{"scope": {"name": "config0-stacks"}, "spans": scope_spans}]
+    }]}
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(document, f)
+    else:
+        print(json.dumps(document))
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="timing spans from stack results and logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="percentiles per stack and span")
+    summary_parser.add_argument("logs", nargs="*")
+    summary_parser.add_argument("--json", action="store_true", help="emit json")
+
+    timeouts_parser = subparsers.add_parser("timeouts", help="suggest sched.archive.timeout values")
+    timeouts_parser.add_argument("logs", nargs="*")
+    timeouts_parser.add_argument("--stack", required=True, help="sched stack run.py")
+    timeouts_parser.add_argument("--quantile", type=float, default=0.99)
+    timeouts_parser.add_argument("--margin", type=float, default=1.5,
+                                 help="headroom multiplied onto the quantile")
+    timeouts_parser.add_argument("--round", type=int, default=100, help="round up to (seconds)")
+    timeouts_parser.add_argument("--json", action="store_true", help="emit json")
+
+    otlp_parser = subparsers.add_parser("otlp", help="convert to OTLP/JSON")
+    otlp_parser.add_argument("logs", nargs="*")
+    otlp_parser.add_argument("-o", "--out", help="write to file instead of stdout")
+    otlp_parser.add_argument("--service-name", default="config0")
+
+    args = parser.parse_args(argv)
+
+    return {"summary": summary, "timeouts": timeouts, "otlp": otlp}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Plans a diversified eks_node_instance_types list for SPOT node groups.
+#
+# A SPOT node group with one instance type draws from one spot pool per
+# availability zone, so its nodes are starved and reclaimed together.
+# The planner picks instance types of the same shape (vCPU and memory,
+# so cluster-autoscaler sizes the group correctly) from as many
+# different families as it can, ranked by spot price per vCPU and the
+# spot advisor interruption range.
+#
+# The catalog is a local snapshot
+#
+#   {"region": ..., "generated_at": <unix time>,
+#    "instance_types": [{"instance_type", "vcpu", "memory_gib", "arch",
+#                        "gpus", "burstable", "on_demand_price",
+#                        "spot_price", "interruption"}]}
+#
+# with interruption the spot advisor range (0 "<5%" .. 4 ">20%").  It
+# is held as columns and filtered/scored a column at a time, so a full
+# EC2 catalog plans in milliseconds.
+#
+# plan      - ranked, diversified instance types for a shape
+# snapshot  - write a catalog from the spot advisor data and EC2 (boto3)
+# bench     - plan time over a catalog scaled up from the snapshot
+# selftest  - checks against tools/fixtures/ec2-spot-catalog.json
+#
+#   python tools/spot_planner.py plan --vcpu 4 --memory 16
+#   python tools/spot_planner.py plan --ami-type AL2_ARM_64 --vcpu 2 --memory 8 --format args
+#   python tools/spot_planner.py snapshot --region us-west-2 --out catalog.json
+#   python tools/spot_planner.py bench --rows 100000
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+from array import array
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(REPO_DIR, "tools", "fixtures", "ec2-spot-catalog.json")
+
+SPOT_ADVISOR_URL = "https://spot-bid-advisor.s3.amazonaws.com/spot-advisor-data.json"
+INTERRUPTION_RANGES = ["<5%", "5-10%", "10-15%", "15-20%", ">20%"]
+
+# the most instance types an EKS managed node group takes
+MAX_INSTANCE_TYPES = 20
+
+# eks_node_ami_type -> (arch, needs a gpu); CUSTOM needs --arch
+AMI_TYPES = {
+    "AL2_x86_64": ("x86_64", False),
+    "AL2_x86_64_GPU": ("x86_64", True),
+    "AL2_ARM_64": ("arm64", False),
+    "AL2023_x86_64_STANDARD": ("x86_64", False),
+    "AL2023_ARM_64_STANDARD": ("arm64", False),
+    "AL2023_x86_64_NVIDIA": ("x86_64", True),
+    "BOTTLEROCKET_x86_64": ("x86_64", False),
+    "BOTTLEROCKET_ARM_64": ("arm64", False),
+    "BOTTLEROCKET_x86_64_NVIDIA": ("x86_64", True)
+}
+
+_SERIES_RE = re.compile(r"^([a-z]+\d+)")
+
+
+def get_series(family):
+    """m5a -> m5, c7gn -> c7, g4dn -> g4: families sharing a generation."""
+    match = _SERIES_RE.match(family)
+    return match.group(1) if match else family
+
+
+def get_arch(ami_type, arch=None):
+    """(arch, needs a gpu) for an eks_node_ami_type."""
+    if ami_type in AMI_TYPES:
+        found, gpu = AMI_TYPES[ami_type]
+        if arch and arch != found:
+            raise ValueError(f"{ami_type} is {found}, not {arch}")
+        return found, gpu
+
+    if ami_type == "CUSTOM" and arch:
+        return arch, False
+
+    raise ValueError(f"no architecture for {ami_type}, pass --arch")
+
+
+class Catalog:
+    """The instance types of a snapshot, one column per field."""
+
+    def __init__(self, rows):
+        self.instance_type = [row["instance_type"] for row in rows]
+        self.family = [name.split(".")[0] for name in self.instance_type]
+        self.series = [get_series(family) for family in self.family]
+        self.arch = [row["arch"] for row in rows]
+        self.vcpu = array("i", [int(row["vcpu"]) for row in rows])
+        self.memory = array("d", [float(row["memory_gib"]) for row in rows])
+        self.gpus = array("i", [int(row.get("gpus") or 0) for row in rows])
+        self.burstable = array("b", [bool(row.get("burstable")) for row in rows])
+        self.on_demand = array("d", [float(row.get("on_demand_price") or 0) for row in rows])
+        self.spot = array("d", [float(row.get("spot_price") or 0) for row in rows])
+        self.interruption = array("b", [int(row.get("interruption", 4)) for row in rows])
+
+    def __len__(self):
+        return len(self.instance_type)
+
+
+def load_catalog(path=FIXTURE):
+    with open(path) as f:
+        document = json.load(f)
+    return Catalog(document["instance_types"]), document
+
+
+def select(catalog, arch, gpu=False, vcpu=2, max_vcpu=None, memory=None,
+           memory_tolerance=0.0, burstable=False):
+    """Indexes of the instance types that fit the shape."""
+    max_vcpu = max_vcpu or vcpu
+    mask = [a == arch for a in catalog.arch]
+    mask = [m and vcpu <= v <= max_vcpu for m, v in zip(mask, catalog.vcpu)]
+    mask = [m and (g > 0) == gpu for m, g in zip(mask, catalog.gpus)]
+    mask = [m and p > 0 for m, p in zip(mask, catalog.spot)]
+    if not burstable:
+        mask = [m and not b for m, b in zip(mask, catalog.burstable)]
+    if memory:
+        # memory per vcpu, so a vcpu range keeps one shape
+        low = memory / vcpu
+        high = low * (1 + memory_tolerance)
+        mask = [m and low <= mem / v <= high + 1e-9
+                for m, mem, v in zip(mask, catalog.memory, catalog.vcpu)]
+
+    return [index for index, keep in enumerate(mask) if keep]
+
+
+def score(catalog, indexes, price_weight=0.5):
+    """
+    Score per index in [0, 1]: price_weight on the cheapest spot price
+    per vcpu over this one's, the rest on the interruption range.
+    """
+    per_vcpu = [catalog.spot[i] / catalog.vcpu[i] for i in indexes]
+    if not per_vcpu:
+        return []
+    cheapest = min(per_vcpu)
+    stability = [1 - catalog.interruption[i] / (len(INTERRUPTION_RANGES) - 1) for i in indexes]
+
+    return [price_weight * cheapest / price + (1 - price_weight) * stable
+            for price, stable in zip(per_vcpu, stability)]
+
+
+def diversify(catalog, ranked, count, per_family=1, per_series=2):
+    """
+    Pick count indexes off ranked (best first), at most per_family from
+    one family and per_series from one series (m5, m5a, m5n), so the
+    pools do not share capacity.  Caps are relaxed only to fill count.
+    """
+    picked = []
+    for family_cap, series_cap in [(per_family, per_series), (count, count)]:
+        families, series = {}, {}
+        for index in picked:
+            families[catalog.family[index]] = families.get(catalog.family[index], 0) + 1
+            series[catalog.series[index]] = series.get(catalog.series[index], 0) + 1
+
+        for index in ranked:
+            if len(picked) >= count:
+                return picked
+            if index in picked or families.get(catalog.family[index], 0) >= family_cap or \
+                    series.get(catalog.series[index], 0) >= series_cap:
+                continue
+            picked.append(index)
+            families[catalog.family[index]] = families.get(catalog.family[index], 0) + 1
+            series[catalog.series[index]] = series.get(catalog.series[index], 0) + 1
+
+    return picked
+
+
+def plan(catalog, ami_type="AL2_x86_64", arch=None, vcpu=2, max_vcpu=None, memory=None,
+         memory_tolerance=0.0, burstable=False, count=6, per_family=1, per_series=2,
+         price_weight=0.5):
+    """Ranked, diversified instance types for a shape, best first."""
+    if not 1 <= count <= MAX_INSTANCE_TYPES:
+        raise ValueError(f"count must be between 1 and {MAX_INSTANCE_TYPES}")
+
+    arch, gpu = get_arch(ami_type, arch)
+    indexes = select(catalog, arch, gpu=gpu, vcpu=vcpu, max_vcpu=max_vcpu, memory=memory,
+                     memory_tolerance=memory_tolerance, burstable=burstable)
+    scores = score(catalog, indexes, price_weight)
+    ranked = [index for _, index in sorted(zip(scores, indexes),
+                                           key=lambda item: (-item[0], catalog.instance_type[item[1]]))]
+    by_index = dict(zip(indexes, scores))
+
+    return [{"instance_type": catalog.instance_type[i],
+             "vcpu": catalog.vcpu[i],
+             "memory_gib": catalog.memory[i],
+             "spot_price": catalog.spot[i],
+             "on_demand_price": catalog.on_demand[i],
+             "savings": round(1 - catalog.spot[i] / catalog.on_demand[i], 3) if catalog.on_demand[i] else None,
+             "interruption": INTERRUPTION_RANGES[catalog.interruption[i]],
+             "score": round(by_index[i], 4)}
+            for i in diversify(catalog, ranked, count, per_family, per_series)]
+
+
+def _plan_kwargs(args):
+    return {"ami_type": args.ami_type,
+            "arch": args.arch,
+            "vcpu": args.vcpu,
+            "max_vcpu": args.max_vcpu,
+            "memory": args.memory,
+            "memory_tolerance": args.memory_tolerance,
+            "burstable": args.burstable,
+            "count": args.count,
+            "per_family": args.per_family,
+            "per_series": args.per_series,
+            "price_weight": args.price_weight}
+
+
+def plan_cmd(args):
+    catalog, document = load_catalog(args.catalog)
+    picked = plan(catalog, **_plan_kwargs(args))
+
+    if not picked:
+        print("no instance type in the catalog fits", file=sys.stderr)
+        return 1
+
+    if args.format == "json":
+        print(json.dumps(picked, indent=2))
+    elif args.format == "args":
+        print(json.dumps({"eks_node_capacity_type": "SPOT",
+                          "eks_node_ami_type": args.ami_type,
+                          "eks_node_instance_types": [entry["instance_type"] for entry in picked]}))
+    else:
+        age = (time.time() - document.get("generated_at", 0)) / 86400
+        print(f"catalog {document.get('region')} ({len(catalog)} types, {age:.0f} days old)")
+        print(f"{'instance_type':<16} {'vcpu':>4} {'GiB':>6} {'spot':>8} {'savings':>8} "
+              f"{'interrupt':>10} {'score':>6}")
+        for entry in picked:
+            savings = f"{entry['savings']:.0%}" if entry["savings"] is not None else "-"
+            print(f"{entry['instance_type']:<16} {entry['vcpu']:>4} {entry['memory_gib']:>6g} "
+                  f"{entry['spot_price']:>8.4f} {savings:>8} {entry['interruption']:>10} "
+                  f"{entry['score']:>6.3f}")
+        print(",".join(entry["instance_type"] for entry in picked))
+
+    return 0
+
+
+def snapshot(args):
+    try:
+        import boto3
+    except ImportError:
+        print("snapshot needs boto3", file=sys.stderr)
+        return 2
+
+    with urllib.request.urlopen(SPOT_ADVISOR_URL, timeout=60) as response:
+        advisor = json.load(response)
+    rates = advisor["spot_advisor"][args.region][args.os]
+
+    ec2 = boto3.client("ec2", region_name=args.region)
+    described = {}
+    for page in ec2.get_paginator("describe_instance_types").paginate():
+        for info in page["InstanceTypes"]:
+            described[info["InstanceType"]] = info
+
+    # current price per zone; the dearest zone, as a pool spans them
+    prices = {}
+    product = "Linux/UNIX" if args.os == "Linux" else "Windows"
+    for page in ec2.get_paginator("describe_spot_price_history").paginate(
+            ProductDescriptions=[product], StartTime=time.time()):
+        for entry in page["SpotPriceHistory"]:
+            name = entry["InstanceType"]
+            prices[name] = max(prices.get(name, 0.0), float(entry["SpotPrice"]))
+
+    rows = []
+    for name, rate in sorted(rates.items()):
+        info = described.get(name)
+        if not info or not prices.get(name):
+            continue
+        architectures = info["ProcessorInfo"]["SupportedArchitectures"]
+        savings = min(rate["s"], 99) / 100
+        rows.append({"instance_type": name,
+                     "vcpu": info["VCpuInfo"]["DefaultVCpus"],
+                     "memory_gib": round(info["MemoryInfo"]["SizeInMiB"] / 1024, 2),
+                     "arch": "arm64" if "arm64" in architectures else "x86_64",
+                     "gpus": sum(gpu["Count"] for gpu in info.get("GpuInfo", {}).get("Gpus", [])),
+                     "burstable": info.get("BurstablePerformanceSupported", False),
+                     "on_demand_price": round(prices[name] / (1 - savings), 4),
+                     "spot_price": prices[name],
+                     "interruption": rate["r"]})
+
+    document = {"region": args.region,
+                "os": args.os,
+                "generated_at": int(time.time()),
+                "interruption_ranges": INTERRUPTION_RANGES,
+                "instance_types": rows}
+    with open(args.out, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"wrote {len(rows)} instance types to {args.out}")
+
+    return 0
+
+
+def scale_rows(rows, size):
+    """size rows cycled from rows, each copy a new family."""
+    scaled = []
+    for index in range(size):
+        row = dict(rows[index % len(rows)])
+        family, _, kind = row["instance_type"].partition(".")
+        row["instance_type"] = f"{family}x{index // len(rows)}.{kind}"
+        scaled.append(row)
+    return scaled
+
+
+def bench(args):
+    _, document = load_catalog(args.catalog)
+    rows = scale_rows(document["instance_types"], args.rows)
+
+    start = time.perf_counter()
+    catalog = Catalog(rows)
+    load_time = time.perf_counter() - start
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        plan(catalog, vcpu=4, max_vcpu=8, memory=16, memory_tolerance=0.25, count=MAX_INSTANCE_TYPES)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(f"{len(catalog)} rows: columns built in {load_time * 1000:.1f}ms, "
+          f"plan median {timings[len(timings) // 2] * 1000:.1f}ms "
+          f"best {timings[0] * 1000:.1f}ms over {args.repeat} runs")
+
+    return 0
+
+
+def _check(results, ok, name):
+    results.append((ok, name))
+    print(f"{'ok' if ok else 'FAIL':<4} {name}")
+
+
+def selftest(args):
+    results = []
+    catalog, document = load_catalog(FIXTURE)
+
+    picked = plan(catalog, vcpu=4, memory=16)
+    names = [entry["instance_type"] for entry in picked]
+    _check(results, len(names) == 6 and all(entry["vcpu"] == 4 and entry["memory_gib"] == 16
+                                            for entry in picked),
+           "six types of the requested shape")
+
+    families = [name.split(".")[0] for name in names]
+    series = [get_series(family) for family in families]
+    _check(results, len(set(families)) == len(families) and
+           max(series.count(s) for s in series) <= 2,
+           "one per family and at most two per series")
+
+    scores = [entry["score"] for entry in picked]
+    _check(results, scores == sorted(scores, reverse=True), "ranked best first")
+
+    arm = plan(catalog, ami_type="AL2_ARM_64", vcpu=2, memory=8)
+    _check(results, arm and all(catalog.arch[catalog.instance_type.index(entry["instance_type"])] == "arm64"
+                                for entry in arm),
+           "AL2_ARM_64 only gets arm64 types")
+
+    gpu = plan(catalog, ami_type="AL2_x86_64_GPU", vcpu=4, memory=16)
+    _check(results, gpu and all(entry["instance_type"].startswith("g") for entry in gpu),
+           "GPU AMI types only get accelerated types")
+
+    _check(results, not any(name.startswith("t") for name in names) and
+           any(entry["instance_type"].startswith("t")
+               for entry in plan(catalog, vcpu=4, memory=16, burstable=True, count=20)),
+           "burstable types only with --burstable")
+
+    wide = plan(catalog, vcpu=2, max_vcpu=8, memory=8, count=20)
+    _check(results, {entry["vcpu"] for entry in wide} == {2, 4, 8} and
+           all(entry["memory_gib"] / entry["vcpu"] == 4 for entry in wide),
+           "a vcpu range keeps the memory per vcpu")
+
+    cheap = plan(catalog, vcpu=4, memory=16, price_weight=1.0, count=1)[0]
+    candidates = select(catalog, "x86_64", vcpu=4, memory=16)
+    best = min(candidates, key=lambda i: catalog.spot[i] / catalog.vcpu[i])
+    _check(results, cheap["instance_type"] == catalog.instance_type[best],
+           "price_weight 1 picks the cheapest per vcpu")
+
+    stable = plan(catalog, vcpu=4, memory=16, price_weight=0.0, count=1)[0]
+    _check(results, stable["interruption"] == INTERRUPTION_RANGES[
+        min(catalog.interruption[i] for i in candidates)],
+        "price_weight 0 picks the least interrupted")
+
+    few = plan(catalog, vcpu=4, memory=16, count=20)
+    _check(results, len(few) == len(candidates),
+           "caps relax to fill the count from what fits")
+
+    try:
+        plan(catalog, ami_type="CUSTOM")
+        custom = False
+    except ValueError:
+        custom = True
+    _check(results, custom and plan(catalog, ami_type="CUSTOM", arch="arm64"),
+           "CUSTOM needs an explicit arch")
+
+    scaled = Catalog(scale_rows(document["instance_types"], 20000))
+    start = time.perf_counter()
+    plan(scaled, vcpu=4, max_vcpu=8, memory=16, count=MAX_INSTANCE_TYPES)
+    _check(results, time.perf_counter() - start < 1.0, "20000 row catalog plans under a second")
+
+    failed = [name for ok, name in results if not ok]
+    print(f"{len(results) - len(failed)}/{len(results)} passed")
+
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="plan diversified SPOT instance types")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="ranked instance types for a shape")
+    plan_parser.add_argument("--catalog", default=FIXTURE)
+    plan_parser.add_argument("--ami-type", default="AL2_x86_64",
+                             help="eks_node_ami_type, picks the architecture")
+    plan_parser.add_argument("--arch", choices=["x86_64", "arm64"], help="for CUSTOM AMIs")
+    plan_parser.add_argument("--vcpu", type=int, default=2)
+    plan_parser.add_argument("--max-vcpu", type=int, help="take sizes up to this many vcpus")
+    plan_parser.add_argument("--memory", type=float, help="GiB at --vcpu")
+    plan_parser.add_argument("--memory-tolerance", type=float, default=0.0,
+                             help="fraction of extra memory per vcpu allowed")
+    plan_parser.add_argument("--burstable", action="store_true", help="allow t* types")
+    plan_parser.add_argument("--count", type=int, default=6)
+    plan_parser.add_argument("--per-family", type=int, default=1)
+    plan_parser.add_argument("--per-series", type=int, default=2)
+    plan_parser.add_argument("--price-weight", type=float, default=0.5,
+                             help="0 ranks on interruption only, 1 on price only")
+    plan_parser.add_argument("--format", choices=["table", "json", "args"], default="table")
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="write a catalog (boto3)")
+    snapshot_parser.add_argument("--region", required=True)
+    snapshot_parser.add_argument("--os", default="Linux", choices=["Linux", "Windows"])
+    snapshot_parser.add_argument("--out", required=True)
+
+    bench_parser = subparsers.add_parser("bench", help="plan time over a scaled catalog")
+    bench_parser.add_argument("--catalog", default=FIXTURE)
+    bench_parser.add_argument("--rows", type=int, default=100000)
+    bench_parser.add_argument("--repeat", type=int, default=5)
+
+    subparsers.add_parser("selftest", help="checks against the fixture catalog")
+
+    args = parser.parse_args(argv)
+
+    return {"plan": plan_cmd, "snapshot": snapshot, "bench": bench,
+            "selftest": selftest}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
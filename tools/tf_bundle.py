@@ -0,0 +1,347 @@
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Splits and joins ####FILE####::: bundles (_combined.tf).
+#
+# A bundle is an optional preamble (the license header) followed by
+# sections, each starting with a marker line
+#
+#   ####FILE####:::main.tf
+#
+# and running to the next marker.  A section's bytes after its marker
+# line are the logical file, byte for byte, so split and join round
+# trip exactly.
+#
+# The bundle is memory mapped and scanned once; each section is hashed
+# (sha256 of its bytes) as it is yielded.  split compares those hashes
+# with the manifest it wrote last time (and the file on disk) and only
+# rewrites sections that changed (removing ones the bundle dropped), so
+# an executor can split into a warm workdir and skip untouched sub-files.
+#
+# split   - split a bundle into a directory, skipping unchanged files
+# join    - join files (in order) back into a bundle
+# hash    - per-file and bundle sha256
+# verify  - round trip every bundle in the repo
+# bench   - split/join throughput over every bundle in the repo
+#
+#   python tools/tf_bundle.py split _combined.tf /var/tmp/terraform
+#   python tools/tf_bundle.py join -o _combined.tf --preamble header.txt variables.tf main.tf
+#   python tools/tf_bundle.py verify
+
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+
+MARKER = b"####FILE####:::"
+MANIFEST = ".bundle.sha256.json"
+PREAMBLE = "_preamble"
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECGROUPS_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs")
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _find_markers(buf):
+    """Return offsets of every marker that starts a line."""
+    offsets = []
+    if buf[:len(MARKER)] == MARKER:
+        offsets.append(0)
+
+    needle = b"\n" + MARKER
+    position = buf.find(needle)
+    while position != -1:
+        offsets.append(position + 1)
+        position = buf.find(needle, position + 1)
+
+    return offsets
+
+
+def iter_sections(buf):
+    """Yield (name, memoryview, sha256) for the preamble and every section.
+
+    The preamble is yielded as PREAMBLE, only if it is non-empty.  The
+    views are released when the generator finishes or is closed, so an
+    error here is not masked by closing the map under them.
+    """
+    view = memoryview(buf)
+    body = None
+    seen = set()
+
+    try:
+        offsets = _find_markers(buf)
+
+        if not offsets:
+            raise ValueError("no ####FILE####::: markers found")
+
+        if offsets[0]:
+            body = view[:offsets[0]]
+            yield PREAMBLE, body, _sha256(body)
+
+        for index, start in enumerate(offsets):
+            end = offsets[index + 1] if index + 1 < len(offsets) else len(buf)
+            eol = buf.find(b"\n", start, end)
+            if eol == -1:
+                # marker on the last line with no content
+                name, body_start = bytes(view[start + len(MARKER):end]), end
+            else:
+                name, body_start = bytes(view[start + len(MARKER):eol]), eol + 1
+            name = name.decode().strip()
+            if not name or os.sep in name or name in (".", "..", PREAMBLE):
+                raise ValueError(f"invalid bundle file name '{name}'")
+            if name in seen:
+                # split would write both to the same path, the last one winning
+                raise ValueError(f"duplicate bundle file name '{name}'")
+            seen.add(name)
+            body = view[body_start:end]
+            yield name, body, _sha256(body)
+    finally:
+        if body is not None:
+            body.release()
+        view.release()
+
+
+class Bundle:
+    """Memory mapped bundle; use as a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._sections = []
+
+    def __enter__(self):
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc):
+        # release the generators' views before the map they point into
+        for sections in self._sections:
+            sections.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def sections(self):
+        sections = iter_sections(self._map if self._map is not None else b"")
+        self._sections.append(sections)
+        return sections
+
+
+def get_hashes(path):
+    """Return {"files": {name: sha256}, "bundle": sha256}.
+
+    The bundle hash covers file names, order and per-file hashes, not the
+    preamble, so license header edits do not count as changes.
+    """
+    files = {}
+    with Bundle(path) as bundle:
+        for name, body, digest in bundle.sections():
+            files[name] = digest
+            body.release()
+
+    ordered = [f"{name}:{digest}" for name, digest in files.items() if name != PREAMBLE]
+    return {"files": files, "bundle": _sha256("\n".join(ordered).encode())}
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _unchanged(path, digest, previous):
+    # trust the manifest only if the file is still there with the size we wrote
+    if previous.get("sha256") != digest or not os.path.exists(path):
+        return False
+    return os.path.getsize(path) == previous.get("size")
+
+
+def split(path, out_dir, preamble=False, force=False):
+    """Split a bundle into out_dir; return {"written", "skipped", "removed"} names."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else _read_manifest(out_dir)
+    result = {"written": [], "skipped": [], "removed": []}
+    files = {}
+
+    with Bundle(path) as bundle:
+        for name, body, digest in bundle.sections():
+            if name == PREAMBLE and not preamble:
+                body.release()
+                continue
+
+            target = os.path.join(out_dir, name)
+            files[name] = {"sha256": digest, "size": len(body)}
+
+            if _unchanged(target, digest, manifest.get("files", {}).get(name, {})):
+                result["skipped"].append(name)
+            else:
+                tmp = f"{target}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, target)
+                result["written"].append(name)
+
+            body.release()
+
+    # files a previous split wrote that the bundle no longer has
+    for name in sorted(set(manifest.get("files", {})) - set(files)):
+        target = os.path.join(out_dir, name)
+        if os.path.exists(target):
+            os.remove(target)
+            result["removed"].append(name)
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({"bundle": os.path.abspath(path), "files": files}, f, indent=2, sort_keys=True)
+
+    return result
+
+
+def join(paths, out, preamble=None):
+    """Join files (in order) into a bundle at out; preamble is a file path."""
+    tmp = f"{out}.tmp"
+    with open(tmp, "wb") as dst:
+        if preamble:
+            with open(preamble, "rb") as src:
+                dst.write(src.read())
+        for path in paths:
+            dst.write(MARKER + os.path.basename(path).encode() + b"\n")
+            with open(path, "rb") as src:
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+    os.replace(tmp, out)
+
+
+def get_repo_bundles():
+    return sorted(glob.glob(os.path.join(EXECGROUPS_DIR, "*", "_chrootfiles", "**", "_combined.tf"),
+                            recursive=True))
+
+
+def _round_trip(path, workdir):
+    result = split(path, workdir, preamble=True, force=True)
+    names = [name for name in result["written"] if name != PREAMBLE]
+    preamble = os.path.join(workdir, PREAMBLE)
+    out = os.path.join(workdir, "_joined.tf")
+    join([os.path.join(workdir, name) for name in names], out,
+         preamble=preamble if PREAMBLE in result["written"] else None)
+    return out
+
+
+def verify(args):
+    failed = 0
+    for path in args.bundle or get_repo_bundles():
+        with tempfile.TemporaryDirectory() as workdir:
+            out = _round_trip(path, workdir)
+            with open(path, "rb") as a, open(out, "rb") as b:
+                ok = a.read() == b.read()
+            # a second split into the same dir must skip everything
+            second = split(path, workdir)
+        ok = ok and not second["written"]
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {os.path.relpath(path, REPO_DIR)}")
+    return 1 if failed else 0
+
+
+def bench(args):
+    bundles = args.bundle or get_repo_bundles()
+    total = sum(os.path.getsize(path) for path in bundles)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        timings = {}
+        for phase in ["split", "resplit", "join"]:
+            start = time.monotonic()
+            for _ in range(args.iterations):
+                for index, path in enumerate(bundles):
+                    out_dir = os.path.join(workdir, str(index))
+                    if phase == "split":
+                        split(path, out_dir, force=True)
+                    elif phase == "resplit":
+                        split(path, out_dir)
+                    else:
+                        names = [n for n in get_hashes(path)["files"] if n != PREAMBLE]
+                        join([os.path.join(out_dir, n) for n in names],
+                             os.path.join(out_dir, "_joined.tf"))
+            timings[phase] = time.monotonic() - start
+
+    mb = total * args.iterations / (1024 * 1024)
+    print(f"{len(bundles)} bundles, {total} bytes, {args.iterations} iterations")
+    for phase, elapsed in timings.items():
+        print(f"{phase:<8} {elapsed:>7.3f}s {mb / elapsed if elapsed else 0:>9.1f} MiB/s")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="split/join ####FILE####::: bundles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = subparsers.add_parser("split", help="split a bundle, skipping unchanged files")
+    split_parser.add_argument("bundle")
+    split_parser.add_argument("out_dir")
+    split_parser.add_argument("--preamble", action="store_true",
+                              help=f"also write the preamble as {PREAMBLE}")
+    split_parser.add_argument("--force", action="store_true", help="ignore the manifest")
+
+    join_parser = subparsers.add_parser("join", help="join files into a bundle")
+    join_parser.add_argument("files", nargs="+")
+    join_parser.add_argument("-o", "--out", required=True)
+    join_parser.add_argument("--preamble", help="file written before the first marker")
+
+    hash_parser = subparsers.add_parser("hash", help="per-file sha256")
+    hash_parser.add_argument("bundle")
+
+    verify_parser = subparsers.add_parser("verify", help="round trip bundles (default: all in repo)")
+    verify_parser.add_argument("bundle", nargs="*")
+
+    bench_parser = subparsers.add_parser("bench", help="throughput (default: all in repo)")
+    bench_parser.add_argument("bundle", nargs="*")
+    bench_parser.add_argument("--iterations", type=int, default=100)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "split":
+        print(json.dumps(split(args.bundle, args.out_dir, preamble=args.preamble,
+                               force=args.force), indent=2))
+        return 0
+
+    if args.command == "join":
+        join(args.files, args.out, preamble=args.preamble)
+        return 0
+
+    if args.command == "hash":
+        print(json.dumps(get_hashes(args.bundle), indent=2))
+        return 0
+
+    return {"verify": verify, "bench": bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())